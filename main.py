@@ -4,6 +4,7 @@
 """
 
 import sys
+import multiprocessing
 from pathlib import Path
 
 # Добавляем папку src в путь для импорта
@@ -12,4 +13,6 @@ sys.path.insert(0, str(Path(__file__).parent / "src"))
 from src.gui import main
 
 if __name__ == "__main__":
+    # Поиск по регулярным выражениям запускает рабочий процесс (нужно для сборки PyInstaller)
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,308 @@
+"""
+Модуль анализа текста для поискового индекса.
+Анализатор - цепочка стадий: разбиение на слова, нормализация (casefold, NFC,
+ё → е), стоп-слова и лёгкий стеммер для русского и английского языков.
+Индексация и разбор запроса используют одни и те же анализаторы, поэтому
+"заметка", "заметки" и "заметкой" приводятся к одной основе.
+"""
+
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+try:
+    from text_cache import fold
+except ImportError:
+    from .text_cache import fold
+
+_WORD_RE = re.compile(r"\w+")
+
+# Размер кэша ключей анализатора (словарь заметок обычно заметно меньше)
+KEY_CACHE_SIZE = 200_000
+
+
+def segment(text: str) -> List[str]:
+    """
+    Разбиение текста на нормализованные слова (регистр, NFC, ё → е).
+
+    Args:
+        text: Исходный текст
+
+    Returns:
+        List[str]: Слова в порядке следования
+    """
+    return _WORD_RE.findall(fold(text))
+
+
+# --- Стоп-слова ---
+
+STOPWORDS_RU = frozenset("""
+а без более бы был была были было быть в вам вас весь во вот все всего всех вы где да даже для до его ее
+если есть еще же за здесь и из или им их к как ко когда кто ли либо мне может мы на над надо наш не него
+нее нет ни них но ну о об однако он она они оно от очень по под при с со так также такой там те тем то того
+тоже той только том ты у уже хотя чего чей чем что чтобы чье чья эта эти это я
+""".split())
+
+STOPWORDS_EN = frozenset("""
+a an and are as at be but by for from has have he her his i if in into is it its me my no not of on or our
+she so than that the their them then there these they this to was we were what when which who will with you
+""".split())
+
+STOPWORDS = STOPWORDS_RU | STOPWORDS_EN
+
+
+# --- Стеммер для русского языка (упрощённый алгоритм Портера/Snowball) ---
+
+_RU_VOWELS = frozenset("аеиоуыэюя")
+
+
+class _Endings:
+    """Группа окончаний: поиск самого длинного подходящего по множествам длин."""
+
+    __slots__ = ("by_length",)
+
+    def __init__(self, *endings: str):
+        lengths = sorted({len(ending) for ending in endings}, reverse=True)
+        self.by_length = [(length, frozenset(e for e in endings if len(e) == length)) for length in lengths]
+
+    def strip(self, word: str, start: int, after_a: bool = False) -> Optional[str]:
+        """Удаление самого длинного окончания не левее start (after_a - только после а/я)."""
+        size = len(word)
+        for length, endings in self.by_length:
+            if size - length < start:
+                continue
+            if word[size - length:] in endings:
+                stem = word[:size - length]
+                if not after_a:
+                    return stem
+                if len(stem) > start and stem[-1] in "ая":
+                    return stem
+        return None
+
+
+_RU_PERFECTIVE_GERUND_1 = _Endings("вшись", "вши", "в")  # после а/я
+_RU_PERFECTIVE_GERUND_2 = _Endings("ившись", "ывшись", "ивши", "ывши", "ив", "ыв")
+_RU_REFLEXIVE = _Endings("ся", "сь")
+_RU_ADJECTIVE = _Endings(
+    "ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой", "ем", "им", "ым",
+    "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+_RU_PARTICIPLE_1 = _Endings("ем", "нн", "вш", "ющ", "щ")  # после а/я
+_RU_PARTICIPLE_2 = _Endings("ивш", "ывш", "ующ")
+_RU_VERB_1 = _Endings("ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н")
+_RU_VERB_2 = _Endings(
+    "ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют", "ены", "ить",
+    "ыть", "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю",
+)
+_RU_NOUN = _Endings(
+    "иями", "ями", "ами", "иях", "ием", "иям", "ией", "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой", "ий", "ям",
+    "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья", "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+)
+_RU_SUPERLATIVE = _Endings("ейше", "ейш")
+_RU_DERIVATIONAL = _Endings("ость", "ост")
+
+
+def _ru_regions(word: str):
+    """Области RV и R2 алгоритма Snowball (позиции начала)."""
+    rv = r1 = r2 = len(word)
+    for position, char in enumerate(word):
+        if char in _RU_VOWELS:
+            rv = position + 1
+            break
+    for position in range(1, len(word)):
+        if word[position - 1] in _RU_VOWELS and word[position] not in _RU_VOWELS:
+            r1 = position + 1
+            break
+    for position in range(r1 + 1, len(word)):
+        if word[position - 1] in _RU_VOWELS and word[position] not in _RU_VOWELS:
+            r2 = position + 1
+            break
+    return rv, r2
+
+
+def stem_ru(word: str) -> str:
+    """
+    Основа русского слова (окончания отсекаются только в области RV).
+
+    Args:
+        word: Нормализованное слово (нижний регистр, ё → е)
+
+    Returns:
+        str: Основа слова
+    """
+    rv, r2 = _ru_regions(word)
+    if rv >= len(word):
+        return word
+
+    stem = _RU_PERFECTIVE_GERUND_2.strip(word, rv) or _RU_PERFECTIVE_GERUND_1.strip(word, rv, after_a=True)
+    if stem is None:
+        stem = _RU_REFLEXIVE.strip(word, rv) or word
+        adjective = _RU_ADJECTIVE.strip(stem, rv)
+        if adjective is not None:
+            stem = (_RU_PARTICIPLE_2.strip(adjective, rv)
+                    or _RU_PARTICIPLE_1.strip(adjective, rv, after_a=True)
+                    or adjective)
+        else:
+            stem = (_RU_VERB_2.strip(stem, rv)
+                    or _RU_VERB_1.strip(stem, rv, after_a=True)
+                    or _RU_NOUN.strip(stem, rv)
+                    or stem)
+
+    if stem.endswith("и") and len(stem) - 1 >= rv:
+        stem = stem[:-1]
+    stem = _RU_DERIVATIONAL.strip(stem, r2) or stem
+    if stem.endswith("ь") and len(stem) - 1 >= rv:
+        stem = stem[:-1]
+    else:
+        stem = _RU_SUPERLATIVE.strip(stem, rv) or stem
+        if stem.endswith("нн"):
+            stem = stem[:-1]
+    return stem
+
+
+# --- Стеммер для английского языка (шаг 1 алгоритма Портера) ---
+
+_EN_VOWELS = frozenset("aeiou")
+
+
+def _has_vowel(stem: str) -> bool:
+    return any(char in _EN_VOWELS for char in stem)
+
+
+def stem_en(word: str) -> str:
+    """
+    Основа английского слова: множественное число, -ed, -ing и конечное y.
+
+    Args:
+        word: Слово в нижнем регистре
+
+    Returns:
+        str: Основа слова
+    """
+    if len(word) <= 3:
+        return word
+
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss") and not word.endswith("us"):
+        word = word[:-1]
+
+    if word.endswith("eed"):
+        if len(word) > 4:
+            word = word[:-1]
+    else:
+        for ending in ("ing", "ed"):
+            if word.endswith(ending) and _has_vowel(word[:-len(ending)]):
+                word = word[:-len(ending)]
+                if word.endswith(("at", "bl", "iz")):
+                    word += "e"
+                elif len(word) > 2 and word[-1] == word[-2] and word[-1] not in "lsz" and word[-1] not in _EN_VOWELS:
+                    word = word[:-1]
+                break
+
+    if word.endswith("y") and _has_vowel(word[:-1]):
+        word = word[:-1] + "i"
+    return word
+
+
+def stem(word: str) -> str:
+    """
+    Основа слова: стеммер выбирается по алфавиту слова (кириллица или латиница).
+
+    Короткие слова и слова с цифрами не изменяются.
+
+    Args:
+        word: Нормализованное слово
+
+    Returns:
+        str: Основа слова
+    """
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.isascii():
+        return stem_en(word)
+    if "а" <= word[-1] <= "я":
+        return stem_ru(word)
+    return word
+
+
+# --- Анализаторы ---
+
+TokenFilter = Callable[[str], Optional[str]]
+
+
+def stopword_filter(word: str) -> Optional[str]:
+    """Стадия: стоп-слова исключаются."""
+    return None if word in STOPWORDS else word
+
+
+class Analyzer:
+    """
+    Цепочка анализа текста: разбиение на нормализованные слова и фильтры слов.
+
+    Термины индекса - нормализованные слова (по ним работают префиксы,
+    подстроки и нечёткий поиск), а ключ термина - результат фильтров
+    (основа слова или None для стоп-слова), по нему сопоставляются формы слова
+    при ранжировании. Ключи вычисляются один раз на слово и кэшируются.
+
+    Атрибуты:
+        name (str): Имя анализатора
+        filters (Sequence[TokenFilter]): Стадии обработки слова
+    """
+
+    def __init__(self, name: str, filters: Sequence[TokenFilter] = ()):
+        self.name = name
+        self.filters = tuple(filters)
+        self._keys: Dict[str, Optional[str]] = {}
+
+    @property
+    def normalizes(self) -> bool:
+        """Анализатор изменяет слова (ключ термина может отличаться от самого термина)."""
+        return bool(self.filters)
+
+    def terms(self, text: str) -> List[str]:
+        """Термины текста (нормализованные слова)."""
+        return segment(text)
+
+    def key(self, term: str) -> Optional[str]:
+        """
+        Ключ термина после всех стадий.
+
+        Args:
+            term: Нормализованное слово
+
+        Returns:
+            Optional[str]: Ключ или None, если слово отброшено (стоп-слово)
+        """
+        try:
+            return self._keys[term]
+        except KeyError:
+            pass
+        value: Optional[str] = term
+        for token_filter in self.filters:
+            value = token_filter(value)
+            if value is None:
+                break
+        if len(self._keys) < KEY_CACHE_SIZE:
+            self._keys[term] = value
+        return value
+
+    def keys(self, terms: Iterable[str]) -> List[str]:
+        """Ключи терминов (отброшенные стадиями не включаются)."""
+        key = self.key
+        return [value for value in map(key, terms) if value is not None]
+
+    def analyze(self, text: str) -> List[str]:
+        """Полный анализ текста: ключи всех слов."""
+        return self.keys(self.terms(text))
+
+    def __repr__(self) -> str:
+        return f"Analyzer({self.name!r})"
+
+
+# Слова без изменений: теги сравниваются как написаны
+KEYWORD_ANALYZER = Analyzer("keyword")
+
+# Текст на русском и английском: стоп-слова и основы слов
+TEXT_ANALYZER = Analyzer("text", (stopword_filter, stem))
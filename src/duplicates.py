@@ -0,0 +1,362 @@
+"""
+Модуль поиска почти одинаковых заметок (MinHash + LSH).
+Для каждой заметки вычисляется подпись MinHash по шинглам из трёх слов,
+подписи раскладываются по корзинам LSH (полосам подписи). Кандидаты
+в дубликаты - заметки из одной корзины, поэтому попарное сравнение всех
+заметок не выполняется. Индекс корзин строится при первом обращении и затем
+поддерживается по событиям NoteStore.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+try:
+    from notes import Note, NoteStore, STORE_RESET
+    from search_index import ATTR_MODIFIED, note_attributes
+    from text_cache import fold
+    from analysis import segment
+except ImportError:
+    from .notes import Note, NoteStore, STORE_RESET
+    from .search_index import ATTR_MODIFIED, note_attributes
+    from .text_cache import fold
+    from .analysis import segment
+
+logger = logging.getLogger(__name__)
+
+# Длина шингла в словах
+SHINGLE_SIZE = 3
+
+# Подпись делится на BANDS полос по ROWS значений: заметки с совпадающей
+# полосой попадают в одну корзину. Порог срабатывания ~ (1/BANDS)^(1/ROWS) ≈ 0.5
+BANDS = 16
+ROWS = 4
+SIGNATURE_SIZE = BANDS * ROWS
+
+# Сдвиг значения, заимствованного пустой ячейкой у соседней (уплотнение подписи):
+# выводит значение за пределы диапазона хешей, чтобы не совпасть с настоящим
+_DENSIFY_OFFSET = 1 << 64
+
+Signature = Tuple[int, ...]
+
+
+def shingles(note: Note) -> Set[Tuple[str, ...]]:
+    """
+    Шинглы заметки: последовательности из SHINGLE_SIZE нормализованных слов.
+
+    Args:
+        note: Заметка
+
+    Returns:
+        Set[Tuple[str, ...]]: Шинглы (для коротких текстов - один шингл из всех слов)
+    """
+    words = segment(note.title) + segment(note.body)
+    if len(words) <= SHINGLE_SIZE:
+        return {tuple(words)} if words else set()
+    return set(zip(*(words[i:] for i in range(SHINGLE_SIZE))))
+
+
+def minhash_signature(items: Iterable) -> Optional[Signature]:
+    """
+    Подпись MinHash с одним хешированием на шингл (one permutation hashing).
+
+    Хеш шингла выбирает ячейку подписи, в ячейке хранится минимум. Пустые
+    ячейки заполняются значением ближайшей непустой ячейки справа со сдвигом,
+    чтобы доля совпадающих ячеек оставалась оценкой коэффициента Жаккара.
+    Используется встроенный hash(), поэтому подписи сравнимы только в пределах
+    одного запуска приложения (индекс не сохраняется на диск).
+
+    Args:
+        items: Шинглы
+
+    Returns:
+        Optional[Signature]: Подпись из SIGNATURE_SIZE чисел или None для пустого набора
+    """
+    # Хеши по убыванию: в словаре по ячейке остаётся последнее, то есть минимальное значение
+    hashes = sorted(map(hash, items), reverse=True)
+    if not hashes:
+        return None
+    bins = {value % SIGNATURE_SIZE: value for value in hashes}
+    if len(bins) == SIGNATURE_SIZE:
+        return tuple(map(bins.__getitem__, range(SIGNATURE_SIZE)))
+
+    # Пустые ячейки между соседними непустыми заимствуют значение правой из них
+    signature = [0] * SIGNATURE_SIZE
+    cells = sorted(bins)
+    previous = cells[-1] - SIGNATURE_SIZE
+    for cell in cells:
+        value = bins[cell]
+        for position in range(previous + 1, cell + 1):
+            signature[position] = value + (cell - position) * _DENSIFY_OFFSET
+        previous = cell
+    return tuple(signature)
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Оценка коэффициента Жаккара по двум подписям (доля совпадающих ячеек)."""
+    return sum(x == y for x, y in zip(a, b)) / SIGNATURE_SIZE
+
+
+class DuplicateCluster:
+    """
+    Группа почти одинаковых заметок.
+
+    Атрибуты:
+        note_ids (List[str]): ID заметок, первая - самая новая
+        similarity (float): Минимальное сходство заметок группы с первой
+    """
+
+    __slots__ = ("note_ids", "similarity")
+
+    def __init__(self, note_ids: List[str], similarity: float):
+        self.note_ids = note_ids
+        self.similarity = similarity
+
+    def __len__(self) -> int:
+        return len(self.note_ids)
+
+    def __repr__(self) -> str:
+        return f"DuplicateCluster(notes={len(self)}, similarity={self.similarity:.2f})"
+
+
+class DuplicateFinder:
+    """
+    Поиск групп почти одинаковых заметок по индексу LSH.
+
+    Сравниваются только заметки из общих корзин. В больших корзинах
+    (частые общие фрагменты) заметки сравниваются лишь с одним
+    представителем корзины, поэтому число сравнений растёт линейно.
+    """
+
+    # Порог сходства по умолчанию (оценка коэффициента Жаккара шинглов)
+    THRESHOLD = 0.8
+
+    # Корзины больше этого размера сравниваются через представителя
+    MAX_BUCKET_SIZE = 32
+
+    def __init__(self, store: NoteStore, threshold: Optional[float] = None):
+        """
+        Args:
+            store: Хранилище заметок
+            threshold: Порог сходства (по умолчанию THRESHOLD)
+        """
+        self.store = store
+        self.threshold = self.THRESHOLD if threshold is None else threshold
+        self._lock = threading.RLock()
+        self._signatures: Dict[str, Signature] = {}
+        self._buckets: List[Dict[Signature, Union[str, Set[str]]]] = [{} for _ in range(BANDS)]
+        self.built = False
+        # ID заметок, изменённых во время построения (None - построение не идёт)
+        self._pending: Optional[Set[str]] = None
+        self._pending_lock = threading.Lock()
+
+        store.add_listener(self._on_store_changed)
+
+    @staticmethod
+    def _band_keys(signature: Signature) -> List[Signature]:
+        return [signature[band * ROWS:(band + 1) * ROWS] for band in range(BANDS)]
+
+    def _add(self, note_id: str, signature: Signature) -> None:
+        # Корзина из одной заметки хранится как ID, из нескольких - как множество
+        self._signatures[note_id] = signature
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            ids = buckets.get(key)
+            if ids is None:
+                buckets[key] = note_id
+            elif isinstance(ids, set):
+                ids.add(note_id)
+            elif ids != note_id:
+                buckets[key] = {ids, note_id}
+
+    def _remove(self, note_id: str) -> None:
+        signature = self._signatures.pop(note_id, None)
+        if signature is None:
+            return
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            ids = buckets.get(key)
+            if ids == note_id:
+                del buckets[key]
+            elif isinstance(ids, set):
+                ids.discard(note_id)
+                if len(ids) == 1:
+                    buckets[key] = ids.pop()
+
+    def _reindex(self, note_id: str) -> None:
+        self._remove(note_id)
+        note = self.store.get_note(note_id)
+        if note is not None and not note.deleted:
+            signature = minhash_signature(shingles(note))
+            if signature is not None:
+                self._add(note_id, signature)
+
+    def build(self, notes: Optional[List[Note]] = None) -> None:
+        """
+        Построение индекса корзин (можно вызывать из фонового потока).
+
+        Подписи вычисляются без блокировки, заметки, изменённые за это время,
+        пересчитываются после построения.
+
+        Args:
+            notes: Снимок активных заметок (по умолчанию - из хранилища)
+        """
+        started = time.perf_counter()
+        if notes is None:
+            notes = self.store.get_all_notes()
+        with self._pending_lock:
+            self._pending = set()
+
+        signatures = {}
+        for note in notes:
+            signature = minhash_signature(shingles(note))
+            if signature is not None:
+                signatures[note.id] = signature
+
+        with self._lock:
+            self._signatures = {}
+            self._buckets = [{} for _ in range(BANDS)]
+            for note_id, signature in signatures.items():
+                self._add(note_id, signature)
+            with self._pending_lock:
+                pending, self._pending = self._pending, None
+            for note_id in pending:
+                self._reindex(note_id)
+            self.built = True
+
+        logger.info("Индекс дубликатов построен за %.2f с: %d заметок",
+                    time.perf_counter() - started, len(self._signatures))
+
+    def _on_store_changed(self, event: str, note_ids: List[str]) -> None:
+        """Поддержка индекса: пересчитываются подписи только изменившихся заметок."""
+        with self._pending_lock:
+            if self._pending is not None:
+                self._pending.update(note_ids)
+                return
+        if not self.built:
+            return
+
+        if event == STORE_RESET:
+            self.build()
+            return
+        with self._lock:
+            for note_id in note_ids:
+                self._reindex(note_id)
+
+    def similarity(self, first_id: str, second_id: str) -> float:
+        """
+        Оценка сходства двух заметок (0, если у заметки нет подписи).
+
+        Args:
+            first_id: ID первой заметки
+            second_id: ID второй заметки
+        """
+        with self._lock:
+            a = self._signatures.get(first_id)
+            b = self._signatures.get(second_id)
+        if a is None or b is None:
+            return 0.0
+        return similarity(a, b)
+
+    def clusters(self, threshold: Optional[float] = None) -> List[DuplicateCluster]:
+        """
+        Группы почти одинаковых заметок.
+
+        Args:
+            threshold: Порог сходства (по умолчанию порог поиска)
+
+        Returns:
+            List[DuplicateCluster]: Группы из двух и более заметок, крупные первыми
+        """
+        if not self.built:
+            self.build()
+        threshold = self.threshold if threshold is None else threshold
+
+        parent: Dict[str, str] = {}
+
+        def find(note_id: str) -> str:
+            root = parent.setdefault(note_id, note_id)
+            while root != parent[root]:
+                parent[root] = parent[parent[root]]
+                root = parent[root]
+            return root
+
+        with self._lock:
+            signatures = self._signatures
+            compared: Set[Tuple[str, str]] = set()
+            for buckets in self._buckets:
+                for ids in buckets.values():
+                    if not isinstance(ids, set):
+                        continue
+                    members = sorted(ids)
+                    if len(members) <= self.MAX_BUCKET_SIZE:
+                        pairs = itertools.combinations(members, 2)
+                    else:
+                        pairs = ((members[0], other) for other in members[1:])
+                    for a, b in pairs:
+                        if (a, b) in compared:
+                            continue
+                        compared.add((a, b))
+                        root_a, root_b = find(a), find(b)
+                        if root_a != root_b and similarity(signatures[a], signatures[b]) >= threshold:
+                            parent[root_b] = root_a
+
+            groups: Dict[str, List[str]] = {}
+            for note_id in parent:
+                groups.setdefault(find(note_id), []).append(note_id)
+
+            result = []
+            for ids in groups.values():
+                if len(ids) < 2:
+                    continue
+                notes = [note for note in map(self.store.get_note, ids) if note is not None]
+                notes.sort(key=lambda note: note_attributes(note)[ATTR_MODIFIED], reverse=True)
+                first = signatures[notes[0].id]
+                score = min(similarity(first, signatures[note.id]) for note in notes[1:])
+                result.append(DuplicateCluster([note.id for note in notes], score))
+
+        result.sort(key=lambda cluster: (-len(cluster), -cluster.similarity))
+        logger.info("Найдено групп похожих заметок: %d (сравнений: %d)", len(result), len(compared))
+        return result
+
+    def merge(self, note_ids: List[str]) -> Optional[str]:
+        """
+        Объединение группы: остаётся самая новая заметка, остальные удаляются.
+
+        Теги всех заметок объединяются, заметка закрепляется, если была
+        закреплена любая из группы.
+
+        Args:
+            note_ids: ID заметок группы
+
+        Returns:
+            Optional[str]: ID оставшейся заметки (None, если заметок нет)
+        """
+        notes = [note for note in map(self.store.get_note, note_ids) if note is not None and not note.deleted]
+        if not notes:
+            return None
+        keep = max(notes, key=lambda note: note_attributes(note)[ATTR_MODIFIED])
+
+        tags = list(keep.tags)
+        seen = {fold(tag) for tag in tags}
+        for note in notes:
+            for tag in note.tags:
+                if fold(tag) not in seen:
+                    seen.add(fold(tag))
+                    tags.append(tag)
+        if tags != keep.tags:
+            self.store.update_note(keep.id, tags=tags)
+        if not keep.pinned and any(note.pinned for note in notes):
+            self.store.set_pinned(keep.id, True)
+
+        for note in notes:
+            if note is not keep:
+                self.store.delete_note(note.id)
+        logger.info("Объединено похожих заметок: %d -> %s", len(notes), keep.id[:8])
+        return keep.id
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __repr__(self) -> str:
+        return f"DuplicateFinder(notes={len(self)}, threshold={self.threshold})"
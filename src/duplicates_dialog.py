@@ -0,0 +1,237 @@
+"""
+Диалог поиска похожих заметок (дубликатов) с объединением и удалением.
+"""
+
+import logging
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTreeWidget, QTreeWidgetItem, QPushButton,
+    QLabel, QMessageBox
+)
+from PySide6.QtCore import Qt, Signal, QObject, QRunnable, QThreadPool
+
+try:
+    from duplicates import DuplicateFinder
+except ImportError:
+    from .duplicates import DuplicateFinder
+
+logger = logging.getLogger(__name__)
+
+
+class ClustersSignals(QObject):
+    """Сигналы для передачи групп похожих заметок из рабочего потока."""
+    finished = Signal(int, object)  # generation, [DuplicateCluster]
+    failed = Signal(int, str)  # generation, error message
+
+
+class ClustersTask(QRunnable):
+    """Поиск групп похожих заметок в пуле потоков."""
+
+    def __init__(self, finder: DuplicateFinder, notes, generation: int, signals: ClustersSignals):
+        super().__init__()
+        self.finder = finder
+        self.notes = notes
+        self.generation = generation
+        self.signals = signals
+
+    def run(self):
+        """Построение индекса (при первом запуске) и поиск групп (рабочий поток)."""
+        try:
+            if self.notes is not None:
+                self.finder.build(self.notes)
+            clusters = self.finder.clusters()
+        except Exception as e:
+            logger.error("Ошибка в фоновом потоке поиска похожих заметок: %s", e)
+            self.signals.failed.emit(self.generation, f"Ошибка: {e}")
+            return
+        self.signals.finished.emit(self.generation, clusters)
+
+
+class DuplicatesDialog(QDialog):
+    """Диалог со списком групп похожих заметок."""
+
+    def __init__(self, parent, finder: DuplicateFinder):
+        super().__init__(parent)
+        self.finder = finder
+        self.clusters = []
+        # Заметки, изменённые или удалённые в диалоге
+        self.changed_ids = []
+
+        self.signals = ClustersSignals()
+        self.signals.finished.connect(self._on_clusters_finished)
+        self.signals.failed.connect(self._on_clusters_failed)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._generation = 0
+
+        self.setWindowTitle("Похожие заметки")
+        self.setModal(True)
+        self.setMinimumSize(600, 480)
+
+        self.init_ui()
+        self.refresh()
+
+    def init_ui(self):
+        """Инициализация интерфейса."""
+        layout = QVBoxLayout(self)
+
+        # Группы: отмечены все заметки, кроме самой новой (для удаления)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Заметка", "Изменена"])
+        self.tree.setColumnWidth(0, 400)
+        self.tree.currentItemChanged.connect(self._update_buttons)
+        self.tree.itemChanged.connect(self._update_buttons)
+        layout.addWidget(self.tree)
+
+        self.summary_label = QLabel("Поиск...")
+        layout.addWidget(self.summary_label)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch()
+
+        self.btn_merge = QPushButton("Объединить")
+        self.btn_merge.setToolTip("Оставить самую новую заметку группы, объединив теги")
+        self.btn_merge.setEnabled(False)
+        self.btn_merge.clicked.connect(self.merge_selected)
+        buttons_layout.addWidget(self.btn_merge)
+
+        self.btn_delete = QPushButton("Удалить отмеченные")
+        self.btn_delete.setEnabled(False)
+        self.btn_delete.clicked.connect(self.delete_checked)
+        buttons_layout.addWidget(self.btn_delete)
+
+        btn_close = QPushButton("Закрыть")
+        btn_close.clicked.connect(self.reject)
+        buttons_layout.addWidget(btn_close)
+
+        layout.addLayout(buttons_layout)
+
+    def refresh(self):
+        """Запуск поиска групп в пуле потоков (индекс строится по снимку заметок)."""
+        self._generation += 1
+        notes = None if self.finder.built else self.finder.store.get_all_notes()
+        self.pool.start(ClustersTask(self.finder, notes, self._generation, self.signals))
+        self.btn_merge.setEnabled(False)
+        self.btn_delete.setEnabled(False)
+        self.summary_label.setText("Поиск...")
+
+    def _on_clusters_failed(self, generation: int, message: str):
+        """Ошибка поиска (главный поток)."""
+        if generation == self._generation:
+            self.summary_label.setText(message)
+
+    def _on_clusters_finished(self, generation: int, clusters: list):
+        """Готовые группы (главный поток): результаты устаревших запусков игнорируются."""
+        if generation != self._generation:
+            return
+        self.clusters = clusters
+        store = self.finder.store
+
+        self.tree.blockSignals(True)
+        self.tree.clear()
+        for cluster in clusters:
+            group = QTreeWidgetItem([
+                f"Похожих заметок: {len(cluster)}, сходство от {cluster.similarity:.0%}", ""
+            ])
+            group.setData(0, Qt.UserRole, cluster)
+            for position, note_id in enumerate(cluster.note_ids):
+                note = store.get_note(note_id)
+                if note is None:
+                    continue
+                item = QTreeWidgetItem([note.title or "(Без заголовка)", note.last_modified[:16].replace("T", " ")])
+                item.setData(0, Qt.UserRole, note_id)
+                item.setToolTip(0, note.body[:300])
+                item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+                item.setCheckState(0, Qt.Checked if position else Qt.Unchecked)
+                group.addChild(item)
+            self.tree.addTopLevelItem(group)
+            group.setExpanded(True)
+        self.tree.blockSignals(False)
+
+        if clusters:
+            self.summary_label.setText(
+                f"Групп: {len(clusters)}, заметок в них: {sum(len(cluster) for cluster in clusters)}"
+            )
+        else:
+            self.summary_label.setText("Похожих заметок не найдено")
+        self._update_buttons()
+
+    def _current_group(self):
+        """Группа, к которой относится выбранный элемент дерева."""
+        item = self.tree.currentItem()
+        if item is None:
+            return None
+        return item.parent() or item
+
+    @staticmethod
+    def _group_ids(group, checked_only: bool = False) -> list:
+        """Заметки группы (все или только отмеченные)."""
+        return [
+            group.child(row).data(0, Qt.UserRole) for row in range(group.childCount())
+            if not checked_only or group.child(row).checkState(0) == Qt.Checked
+        ]
+
+    def _all_checked_ids(self) -> list:
+        """Отмеченные заметки всех групп."""
+        ids = []
+        for row in range(self.tree.topLevelItemCount()):
+            ids.extend(self._group_ids(self.tree.topLevelItem(row), checked_only=True))
+        return ids
+
+    def _update_buttons(self, *args):
+        """Доступность кнопок по выбранной группе и отметкам."""
+        group = self._current_group()
+        self.btn_merge.setEnabled(group is not None and group.childCount() > 1)
+        self.btn_delete.setEnabled(bool(self._all_checked_ids()))
+
+    def merge_selected(self):
+        """Объединение выбранной группы в самую новую заметку."""
+        group = self._current_group()
+        if group is None:
+            return
+        note_ids = self._group_ids(group)
+        if len(note_ids) < 2:
+            return
+
+        try:
+            self.finder.merge(note_ids)
+        except Exception as e:
+            logger.error("Ошибка при объединении заметок: %s", e)
+            QMessageBox.critical(self, "Ошибка", f"Не удалось объединить заметки:\n{e}")
+            return
+
+        self.changed_ids.extend(note_ids)
+        self.refresh()
+
+    def delete_checked(self):
+        """Удаление отмеченных заметок всех групп."""
+        note_ids = self._all_checked_ids()
+        if not note_ids:
+            return
+
+        reply = QMessageBox.question(
+            self,
+            "Подтверждение удаления",
+            f"Удалить отмеченные заметки ({len(note_ids)})?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        store = self.finder.store
+        try:
+            deleted = [note_id for note_id in note_ids if store.delete_note(note_id)]
+        except Exception as e:
+            logger.error("Ошибка при удалении похожих заметок: %s", e)
+            QMessageBox.critical(self, "Ошибка", f"Не удалось удалить заметки:\n{e}")
+            return
+
+        logger.info("Удалено похожих заметок: %d", len(deleted))
+        self.changed_ids.extend(deleted)
+        self.refresh()
+
+    def done(self, result: int):
+        """Закрытие диалога: выполняющийся поиск дожидается завершения."""
+        self._generation += 1
+        self.pool.waitForDone()
+        super().done(result)
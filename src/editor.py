@@ -0,0 +1,440 @@
+"""
+Редактор текста заметки на основе QPlainTextEdit.
+Текст загружается как обычный (без определения форматированного текста),
+разметка строится только для видимых блоков. Большие заметки загружаются
+частями: первая часть показывается сразу, остальные добавляются в цикле
+событий с ограничением времени на каждую порцию. Текст неизменённого
+документа не извлекается заново при сохранении. Документы недавно открытых
+заметок хранятся в кэше (LRU) вместе с историей отмены и прокруткой.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator, Optional
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtGui import QTextCursor, QTextDocument
+from PySide6.QtWidgets import QPlainTextDocumentLayout, QPlainTextEdit
+
+
+class TextCounter(QObject):
+    """
+    Счётчик символов и слов документа, обновляемый по изменённому диапазону.
+
+    Количество слов хранится для каждого блока (строки) документа. При
+    изменении документа (сигнал contentsChange) пересчитываются только
+    затронутые блоки, поэтому ввод символа не перебирает весь текст.
+    Слова считаются как в str.split(): перевод строки - тоже разделитель.
+    Документ должен быть документом поля редактора: без разметки
+    QTextDocument не отправляет contentsChange.
+    """
+
+    def __init__(self, document: QTextDocument = None, parent=None):
+        super().__init__(parent)
+        self._document = None
+        # Количество слов в каждом блоке документа (по номеру блока)
+        self._block_words = []
+        self._words = 0
+        if document is not None:
+            self.set_document(document)
+
+    def set_document(self, document: QTextDocument) -> None:
+        """
+        Подсчёт для другого документа (полный пересчёт).
+
+        Args:
+            document: Документ редактора
+        """
+        if self._document is not None:
+            self._document.contentsChange.disconnect(self._on_contents_change)
+        self._document = document
+        document.contentsChange.connect(self._on_contents_change)
+        self._recount()
+
+    def _recount(self) -> None:
+        """Полный пересчёт слов по блокам."""
+        self._block_words = []
+        block = self._document.firstBlock()
+        while block.isValid():
+            self._block_words.append(len(block.text().split()))
+            block = block.next()
+        self._words = sum(self._block_words)
+
+    def _on_contents_change(self, position: int, removed: int, added: int) -> None:
+        """Пересчёт блоков, затронутых изменением."""
+        document = self._document
+        end = min(position + added, document.characterCount() - 1)
+        first = document.findBlock(position)
+        last = document.findBlock(end)
+        if not first.isValid() or not last.isValid():
+            self._recount()
+            return
+
+        start = first.blockNumber()
+        new_count = last.blockNumber() - start + 1
+        # Сколько блоков занимал изменённый диапазон до правки
+        old_count = new_count - (document.blockCount() - len(self._block_words))
+        if old_count < 1 or start + old_count > len(self._block_words):
+            # Сигнал не согласуется с сохранёнными блоками - пересчитываем всё
+            self._recount()
+            return
+
+        counts = []
+        block = first
+        for _ in range(new_count):
+            counts.append(len(block.text().split()))
+            block = block.next()
+        self._words += sum(counts) - sum(self._block_words[start:start + old_count])
+        self._block_words[start:start + old_count] = counts
+
+    def chars(self) -> int:
+        """Количество символов документа (переводы строк включены)."""
+        return self._document.characterCount() - 1 if self._document is not None else 0
+
+    def words(self) -> int:
+        """Количество слов документа."""
+        return self._words
+
+
+class CachedDocument:
+    """
+    Подготовленный документ заметки в кэше поля.
+
+    Атрибуты:
+        note_id (Optional[str]): ID заметки (None - документ без заметки)
+        document (QTextDocument): Документ с разметкой и историей отмены
+        counter (TextCounter): Счётчик символов и слов документа
+        text (str): Текст документа на момент загрузки или сохранения
+        cursor (int): Позиция курсора при уходе с заметки
+        scroll (int): Положение вертикальной прокрутки при уходе с заметки
+    """
+
+    __slots__ = ("note_id", "document", "counter", "text", "cursor", "scroll")
+
+    def __init__(self, note_id: Optional[str], document: QTextDocument, text: str):
+        self.note_id = note_id
+        self.document = document
+        self.counter = TextCounter(document, document)
+        self.text = text
+        self.cursor = 0
+        self.scroll = 0
+
+
+class NoteBodyEdit(QPlainTextEdit):
+    """
+    Поле текста заметки с отложенной загрузкой больших текстов.
+
+    Пока загрузка не завершена, поле доступно только для чтения, а история
+    отмены не ведётся. Сигнал loaded отправляется после загрузки всего текста.
+    Счётчик символов и слов текущего документа - counter.
+
+    Заметки открываются через show_note(): документ заметки, открытой
+    недавно, берётся из кэша без повторной загрузки текста и разметки.
+    В кэше остаются только полностью загруженные документы без
+    несохранённых правок; общий размер ограничен CACHE_CHARS символов.
+    """
+
+    loaded = Signal()
+
+    # Тексты длиннее этого значения (символов) загружаются частями
+    LARGE_TEXT = 100_000
+    # Размер порции загрузки (символов, часть заканчивается на границе строки)
+    CHUNK_SIZE = 64_000
+    # Время на порции загрузки за один проход цикла событий (секунды)
+    CHUNK_BUDGET = 0.008
+    # Суммарный размер текста документов в кэше (символов)
+    CACHE_CHARS = 2_000_000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Текст документа на момент загрузки или последнего сохранения
+        self._text = ""
+        # Позиция, до которой текст загружен в документ
+        self._loaded = 0
+        self._load_timer = QTimer(self)
+        self._load_timer.setSingleShot(True)
+        self._load_timer.setInterval(0)
+        self._load_timer.timeout.connect(self._load_next_chunks)
+        # Кэш документов заметок: {ID заметки: CachedDocument}, последние открытые - в конце
+        self._documents = OrderedDict()
+        self._current = None
+        self.counter = None
+        self._activate(self._new_document(None, ""))
+
+    def _new_document(self, note_id: Optional[str], text: str) -> CachedDocument:
+        """Пустой документ для текста заметки (разметка обычного текста, шрифт поля)."""
+        document = QTextDocument(self)
+        document.setDocumentLayout(QPlainTextDocumentLayout(document))
+        document.setDefaultFont(self.font())
+        return CachedDocument(note_id, document, text)
+
+    def _activate(self, entry: CachedDocument) -> None:
+        """Показ документа в поле (предыдущий документ не удаляется)."""
+        self._load_timer.stop()
+        previous = self._current
+        self._current = entry
+        if entry.document.defaultFont() != self.font():
+            entry.document.setDefaultFont(self.font())
+        self.setDocument(entry.document)
+        self.counter = entry.counter
+        self._text = entry.text
+        self._loaded = len(entry.text)
+        self.setReadOnly(False)
+        if previous is not None and previous is not entry and previous.note_id not in self._documents:
+            previous.document.deleteLater()
+
+    def _park_current(self) -> None:
+        """Уход с текущего документа: сохранение в кэше или удаление из него."""
+        entry = self._current
+        if entry is None or entry.note_id is None:
+            return
+        if self.is_loading() or self.document().isModified():
+            # Неполный или изменённый документ не соответствует тексту заметки
+            self._documents.pop(entry.note_id, None)
+            return
+        entry.text = self._text
+        entry.cursor = self.textCursor().position()
+        entry.scroll = self.verticalScrollBar().value()
+        self._documents[entry.note_id] = entry
+
+    def _evict(self) -> None:
+        """Удаление давно открытых документов сверх CACHE_CHARS (кроме текущего)."""
+        total = sum(len(entry.text) for entry in self._documents.values())
+        for note_id in list(self._documents):
+            if total <= self.CACHE_CHARS:
+                break
+            entry = self._documents[note_id]
+            if entry is self._current:
+                continue
+            del self._documents[note_id]
+            total -= len(entry.text)
+            entry.document.deleteLater()
+
+    def show_note(self, note_id: Optional[str], text: str) -> bool:
+        """
+        Показ текста заметки: документ из кэша или новый документ.
+
+        Документ из кэша используется, если его текст совпадает с текстом
+        заметки; курсор, прокрутка и история отмены восстанавливаются.
+
+        Args:
+            note_id: ID заметки (None - пустое поле без заметки)
+            text: Текст заметки
+
+        Returns:
+            bool: True, если документ взят из кэша
+        """
+        self._park_current()
+        entry = self._documents.get(note_id) if note_id is not None else None
+        if entry is not None and (entry.text is text or entry.text == text):
+            self._documents.move_to_end(note_id)
+            self._activate(entry)
+            cursor = QTextCursor(entry.document)
+            cursor.setPosition(min(entry.cursor, entry.document.characterCount() - 1))
+            self.setTextCursor(cursor)
+            self.verticalScrollBar().setValue(entry.scroll)
+            return True
+
+        if entry is not None:
+            # Текст заметки изменился (сохранение в другом окне, синхронизация)
+            del self._documents[note_id]
+        entry = self._new_document(note_id, text)
+        if note_id is not None:
+            self._documents[note_id] = entry
+        self._activate(entry)
+        self.set_text(text)
+        self._evict()
+        return False
+
+    def revalidate(self, text_of: Callable[[str], Optional[str]], note_ids: Optional[Iterable[str]] = None) -> None:
+        """
+        Удаление из кэша документов, текст которых разошёлся с заметками.
+
+        Текущий документ не удаляется: его проверяет следующий show_note().
+
+        Args:
+            text_of: Функция (ID заметки) -> текст заметки или None (заметка удалена)
+            note_ids: ID изменённых заметок (None - проверить весь кэш)
+        """
+        candidates = list(self._documents) if note_ids is None else [
+            note_id for note_id in note_ids if note_id in self._documents
+        ]
+        for note_id in candidates:
+            entry = self._documents[note_id]
+            if entry is self._current:
+                continue
+            text = text_of(note_id)
+            if text is None or not (entry.text is text or entry.text == text):
+                del self._documents[note_id]
+                entry.document.deleteLater()
+
+    def prepare(self, note_id: str, text: str) -> Iterator[None]:
+        """
+        Подготовка документа заметки в кэше без показа в поле.
+
+        Генератор: каждый шаг добавляет в документ одну порцию текста
+        (CHUNK_SIZE символов), после последней документ попадает в кэш.
+        Вызывающий код распределяет шаги по простою цикла событий.
+
+        Args:
+            note_id: ID заметки
+            text: Текст заметки
+        """
+        if self._current is not None and self._current.note_id == note_id:
+            return
+        entry = self._documents.get(note_id)
+        if entry is not None:
+            if entry.text is text or entry.text == text:
+                return
+            del self._documents[note_id]
+            entry.document.deleteLater()
+
+        entry = self._new_document(note_id, text)
+        document = entry.document
+        document.setUndoRedoEnabled(False)
+        cursor = QTextCursor(document)
+        position = 0
+        try:
+            while position < len(text):
+                end = self._chunk_end(text, position)
+                cursor.insertText(text[position:end])
+                position = end
+                yield
+        finally:
+            # Подготовка прервана (генератор закрыт) - документ не нужен
+            if position < len(text):
+                document.deleteLater()
+        document.setUndoRedoEnabled(True)
+        document.setModified(False)
+
+        # За время подготовки заметка могла быть открыта в поле
+        if note_id in self._documents or (self._current is not None and self._current.note_id == note_id):
+            document.deleteLater()
+            return
+        self._documents[note_id] = entry
+        self._evict()
+
+    def cached_notes(self) -> list:
+        """ID заметок с документами в кэше (последние открытые - в конце)."""
+        return list(self._documents)
+
+    def _chunk_end(self, text: str, start: int) -> int:
+        """
+        Конец порции: первая граница строки после CHUNK_SIZE символов.
+
+        Разметка строки строится целиком, поэтому длинная строка без переводов
+        загружается одной порцией. Исключение - первая порция: она обрезается
+        по пробелу, чтобы начало текста показалось сразу.
+        """
+        end = start + self.CHUNK_SIZE
+        if end >= len(text):
+            return len(text)
+        newline = text.find("\n", end)
+        if newline >= 0:
+            return newline + 1
+        if start == 0:
+            space = text.find(" ", end)
+            if space >= 0:
+                return space + 1
+        return len(text)
+
+    def set_text(self, text: str) -> None:
+        """
+        Загрузка текста заметки (большой текст - частями).
+
+        Args:
+            text: Текст заметки
+        """
+        self._load_timer.stop()
+        self._text = text
+        if len(text) <= self.LARGE_TEXT:
+            self._loaded = len(text)
+            self.setReadOnly(False)
+            self.setUndoRedoEnabled(True)
+            super().setPlainText(text)
+            self.document().setModified(False)
+            return
+
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self._loaded = self._chunk_end(text, 0)
+        super().setPlainText(text[:self._loaded])
+        self._load_timer.start()
+
+    def _load_next_chunks(self, budget: float = None) -> None:
+        """Добавление порций текста в конец документа в пределах бюджета времени."""
+        deadline = time.perf_counter() + (self.CHUNK_BUDGET if budget is None else budget)
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        # Добавление порций не является правкой пользователя
+        blocked = self.blockSignals(True)
+        try:
+            while self._loaded < len(self._text) and time.perf_counter() < deadline:
+                end = self._chunk_end(self._text, self._loaded)
+                cursor.insertText(self._text[self._loaded:end])
+                self._loaded = end
+        finally:
+            self.blockSignals(blocked)
+
+        if self._loaded < len(self._text):
+            self._load_timer.start()
+            return
+        self.setUndoRedoEnabled(True)
+        self.document().setModified(False)
+        self.setReadOnly(False)
+        self.loaded.emit()
+
+    def is_loading(self) -> bool:
+        """Идёт ли загрузка текста частями."""
+        return self._loaded < len(self._text)
+
+    def finish_loading(self) -> None:
+        """Немедленная загрузка оставшейся части текста."""
+        if self.is_loading():
+            self._load_timer.stop()
+            self._load_next_chunks(budget=float("inf"))
+
+    def plain_text(self) -> str:
+        """
+        Текст заметки в поле.
+
+        Пока документ не изменён после загрузки или сохранения (в том числе
+        если правки отменены), возвращается сохранённая строка без извлечения
+        текста из документа.
+
+        Returns:
+            str: Текст поля
+        """
+        if self.is_loading() or not self.document().isModified():
+            return self._text
+        return self.toPlainText()
+
+    def mark_saved(self, text: str) -> None:
+        """
+        Текст поля сохранён: документ снова считается неизменённым.
+
+        Args:
+            text: Сохранённый текст (результат plain_text())
+        """
+        if self.is_loading():
+            return
+        self._text = text
+        self._loaded = len(text)
+        self.document().setModified(False)
+
+    def setPlainText(self, text: str) -> None:
+        """
+        Замена текста как правка пользователя.
+
+        Документ остаётся изменённым, поэтому plain_text() и сохранение
+        видят новый текст. Текст заметки загружается через set_text().
+        """
+        self.finish_loading()
+        # Текст известен заранее: обработчики textChanged получают его без извлечения
+        self._text = text
+        self._loaded = len(text)
+        super().setPlainText(text)
+        self.document().setModified(True)
+
+    # Совместимость с QTextEdit
+    setText = setPlainText
@@ -162,7 +162,7 @@ id: {note.id}
             return False
     
     @staticmethod
-    def export_all_to_zip(notes: list, zip_path: Path, format_type: str = 'markdown') -> bool:
+    def export_all_to_zip(notes: list, zip_path: Path, format_type: str = 'markdown', token=None) -> bool:
         """
         Экспорт всех заметок в ZIP архив.
         
@@ -170,9 +170,10 @@ id: {note.id}
             notes: Список заметок для экспорта
             zip_path: Путь к ZIP файлу
             format_type: Формат экспорта ('markdown', 'txt', 'html')
+            token: Токен фоновой задачи (TaskToken): прогресс по заметкам и отмена
         
         Returns:
-            bool: True если успешно, False иначе
+            bool: True если успешно, False иначе (в том числе при отмене)
         """
         import zipfile
         import tempfile
@@ -184,7 +185,12 @@ id: {note.id}
                 temp_path = Path(temp_dir)
                 
                 # Экспортируем каждую заметку
-                for note in notes:
+                for done, note in enumerate(notes):
+                    if token is not None:
+                        if token.cancelled:
+                            logger.info("Экспорт в ZIP отменён")
+                            return False
+                        token.progress(done, len(notes), note.title)
                     # Безопасное имя файла
                     safe_title = "".join(c for c in note.title if c.isalnum() or c in (' ', '-', '_')).strip()
                     if not safe_title:
@@ -207,8 +213,16 @@ id: {note.id}
                 zip_path.parent.mkdir(parents=True, exist_ok=True)
                 with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
                     for file_path in temp_path.iterdir():
+                        if token is not None and token.cancelled:
+                            break
                         zipf.write(file_path, file_path.name)
                 
+                # Отмена во время записи - неполный архив удаляется
+                if token is not None and token.cancelled:
+                    zip_path.unlink(missing_ok=True)
+                    logger.info("Экспорт в ZIP отменён")
+                    return False
+                
                 logger.info(f"Все заметки экспортированы в ZIP: {zip_path}")
                 return True
         except Exception as e:
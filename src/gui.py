@@ -6,32 +6,228 @@
 import sys
 import logging
 from pathlib import Path
-from datetime import datetime, timezone
+from datetime import datetime
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QListWidget, QListWidgetItem, QLineEdit, QTextEdit, QPushButton,
-    QSplitter, QMessageBox, QLabel, QFileDialog, QComboBox
+    QListWidget, QListWidgetItem, QLineEdit, QTextEdit, QPlainTextEdit, QPushButton,
+    QSplitter, QMessageBox, QLabel, QFileDialog, QComboBox, QCheckBox,
+    QStyledItemDelegate, QStyle, QStyleOptionViewItem, QInputDialog, QMenu, QAbstractItemView
 )
-from PySide6.QtCore import Qt, QTimer, Signal, QObject
-import threading
-from PySide6.QtGui import QFont, QShortcut, QKeySequence, QTextCharFormat, QColor, QTextCursor, QPalette, QBrush
+from PySide6.QtCore import Qt, QTimer, Signal, QObject, QRunnable, QThreadPool, QPoint
+from PySide6.QtGui import QFont, QShortcut, QKeySequence, QTextCharFormat, QColor, QTextCursor, QPalette, QBrush, QFontMetrics
 
 try:
-    from notes import Note, NoteStore
+    from notes import Note, NoteStore, STORE_RESET, content_hash
     from sync import SyncManager
     from themes import theme_manager
+    from search import SearchEngine, SearchToken, MATCH_TITLE, MATCH_TAGS, MATCH_BODY, MATCH_FILTER
+    from search_index import SearchIndex
+    from regex_search import RegexError, RegexTimeout
+    from text_cache import NormalizedText, MatchOffsets, fold
+    from smart_folders import SmartFolders
+    from query import is_structured
+    from replace import VaultReplacer
+    from replace_dialog import ReplaceDialog
+    from duplicates import DuplicateFinder
+    from duplicates_dialog import DuplicatesDialog
+    from notes_model import NotesListModel, NotesListView
+    from editor import NoteBodyEdit
+    from prefetch import IdlePrefetcher
+    from tasks import TaskManager, TASK_SYNC, TASK_EXPORT, TASK_BACKUP, TASK_LOAD
 except ImportError:
-    from .notes import Note, NoteStore
+    from .notes import Note, NoteStore, STORE_RESET, content_hash
     from .sync import SyncManager
     from .themes import theme_manager
+    from .search import SearchEngine, SearchToken, MATCH_TITLE, MATCH_TAGS, MATCH_BODY, MATCH_FILTER
+    from .search_index import SearchIndex
+    from .regex_search import RegexError, RegexTimeout
+    from .text_cache import NormalizedText, MatchOffsets, fold
+    from .smart_folders import SmartFolders
+    from .query import is_structured
+    from .replace import VaultReplacer
+    from .replace_dialog import ReplaceDialog
+    from .duplicates import DuplicateFinder
+    from .duplicates_dialog import DuplicatesDialog
+    from .notes_model import NotesListModel, NotesListView
+    from .editor import NoteBodyEdit
+    from .prefetch import IdlePrefetcher
+    from .tasks import TaskManager, TASK_SYNC, TASK_EXPORT, TASK_BACKUP, TASK_LOAD
 
 logger = logging.getLogger(__name__)
 
 
-class SyncSignals(QObject):
-    """Сигналы для межпоточной коммуникации синхронизации."""
-    completed = Signal(bool, int, int)  # success, synced_count, conflict_count
-    error = Signal(Exception)  # error
+class SearchSignals(QObject):
+    """Сигналы для передачи результатов поиска из рабочего потока."""
+    partial = Signal(int, object)  # generation, {note_id: match_type}
+    finished = Signal(int, object, object, object)  # generation, {note_id: match_type}, ranked note_ids, positions
+    failed = Signal(int, str)  # generation, error message
+
+
+class SmartFolderSignals(QObject):
+    """Сигналы изменения умных папок (хранилище может меняться в фоновом потоке)."""
+    changed = Signal(object)  # названия папок с изменившимися результатами
+
+
+class StoreSignals(QObject):
+    """Сигналы изменения хранилища (события синхронизации приходят из фонового потока)."""
+    changed = Signal(str, object)  # event, note_ids
+
+
+class IndexSignals(QObject):
+    """Сигналы фонового построения поискового индекса."""
+    ready = Signal()
+
+
+class SearchTask(QRunnable):
+    """Задача поиска для выполнения в пуле потоков."""
+    
+    def __init__(self, engine: SearchEngine, notes, query: str, token: SearchToken,
+                 signals: SearchSignals, rank: bool = False, fuzzy: bool = False,
+                 regex: bool = False, store_generation: int = None):
+        super().__init__()
+        self.engine = engine
+        self.notes = notes
+        self.query = query
+        self.token = token
+        self.signals = signals
+        self.rank = rank
+        self.fuzzy = fuzzy
+        self.regex = regex
+        self.store_generation = store_generation
+    
+    def run(self):
+        """Выполнение поиска (рабочий поток)."""
+        generation = self.token.generation
+        positions = None
+        try:
+            if self.regex:
+                found = self.engine.search_regex(self.notes, self.query, token=self.token)
+                results, positions = found if found is not None else (None, None)
+            elif self.fuzzy:
+                results = self.engine.search_fuzzy(self.query, token=self.token)
+            else:
+                found = self.engine.search_with_positions(
+                    self.notes,
+                    self.query,
+                    token=self.token,
+                    on_partial=lambda partial: self.signals.partial.emit(generation, partial),
+                    store_generation=self.store_generation
+                )
+                results, positions = found if found is not None else (None, None)
+        except RegexTimeout as e:
+            self.signals.failed.emit(generation, f"Поиск прерван: {e}")
+            return
+        except RegexError as e:
+            self.signals.failed.emit(generation, f"Ошибка в выражении: {e}")
+            return
+        except Exception as e:
+            logger.error("Ошибка в фоновом потоке поиска: %s", e)
+            return
+        
+        # Отменённый поиск не передаёт результатов
+        if results is None:
+            return
+        
+        ranking = []
+        if self.rank and not self.token.cancelled:
+            if self.regex:
+                ranking = self.engine.rank_regex(positions)
+            else:
+                ranking = self.engine.rank(self.query, results.keys(), fuzzy=self.fuzzy)
+        self.signals.finished.emit(generation, results, ranking, positions)
+
+
+class SearchResultDelegate(QStyledItemDelegate):
+    """
+    Отрисовка элемента списка с фрагментом текста вокруг совпадения.
+    
+    Фрагмент запрашивается у провайдера только при отрисовке строки, поэтому
+    вычисляется лишь для видимых элементов, а не для всех результатов поиска.
+    """
+    
+    def __init__(self, snippet_provider, parent=None):
+        """
+        Args:
+            snippet_provider: Функция (ID заметки) -> (фрагмент, начало, конец совпадения) или None
+            parent: Родительский объект
+        """
+        super().__init__(parent)
+        self.snippet_provider = snippet_provider
+        # Режим фрагментов включается только для итоговых результатов поиска
+        self.snippets_enabled = False
+    
+    def _snippet_font(self, font: QFont) -> QFont:
+        """Шрифт второй строки (на пункт меньше шрифта заголовка)."""
+        snippet_font = QFont(font)
+        if font.pointSizeF() > 0:
+            snippet_font.setPointSizeF(max(font.pointSizeF() - 1, 6))
+        return snippet_font
+    
+    def paint(self, painter, option, index):
+        if not self.snippets_enabled:
+            super().paint(painter, option, index)
+            return
+        
+        snippet = self.snippet_provider(index.data(Qt.UserRole))
+        if snippet is None:
+            super().paint(painter, option, index)
+            return
+        
+        # Фон, выделение и рамка - средствами стиля, текст рисуется вручную
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        title = opt.text
+        opt.text = ""
+        widget = opt.widget
+        style = widget.style() if widget else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, opt, painter, widget)
+        
+        rect = style.subElementRect(QStyle.SE_ItemViewItemText, opt, widget)
+        selected = bool(opt.state & QStyle.State_Selected)
+        text_color = opt.palette.color(QPalette.HighlightedText if selected else QPalette.Text)
+        
+        painter.save()
+        painter.setClipRect(opt.rect)
+        
+        # Первая строка - заголовок
+        metrics = QFontMetrics(opt.font)
+        painter.setFont(opt.font)
+        painter.setPen(text_color)
+        painter.drawText(rect.left(), rect.top() + metrics.ascent(),
+                         metrics.elidedText(title, Qt.ElideRight, rect.width()))
+        
+        # Вторая строка - фрагмент, совпадение выделено жирным
+        text, start, end = snippet
+        font = self._snippet_font(opt.font)
+        bold = QFont(font)
+        bold.setBold(True)
+        if not selected:
+            text_color = opt.palette.color(QPalette.PlaceholderText)
+        painter.setPen(text_color)
+        
+        x = rect.left()
+        y = rect.top() + metrics.height()
+        right = rect.right()
+        parts = ((text[:start], font, Qt.ElideLeft), (text[start:end], bold, Qt.ElideRight),
+                 (text[end:], font, Qt.ElideRight))
+        for number, (part, part_font, elide) in enumerate(parts):
+            if not part or x >= right:
+                continue
+            part_metrics = QFontMetrics(part_font)
+            # Контекст до совпадения занимает не больше трети строки, чтобы совпадение было видно
+            width = (right - x) // 3 if number == 0 and end > start else right - x
+            part = part_metrics.elidedText(part, elide, width)
+            painter.setFont(part_font)
+            painter.drawText(x, y + part_metrics.ascent(), part)
+            x += part_metrics.horizontalAdvance(part)
+        
+        painter.restore()
+    
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        if self.snippets_enabled:
+            size.setHeight(size.height() + QFontMetrics(self._snippet_font(option.font)).height())
+        return size
 
 
 class NotesApp(QMainWindow):
@@ -42,9 +238,13 @@ class NotesApp(QMainWindow):
     def __init__(self):
         super().__init__()
         
-        # Инициализация хранилища заметок
+        # Инициализация хранилища заметок. Большое хранилище загружается в фоне
+        # после показа окна, до этого список строится по снимку предыдущего сеанса
         try:
-            self.store = NoteStore()
+            self.store = NoteStore(load=False)
+            path = self.store.storage_path
+            if not path.exists() or path.stat().st_size < NoteStore.BACKGROUND_LOAD_BYTES:
+                self.store.load()
         except Exception as e:
             logger.error("Ошибка при инициализации хранилища: %s", e)
             QMessageBox.critical(
@@ -55,6 +255,8 @@ class NotesApp(QMainWindow):
             sys.exit(1)
         
         self.current_note_id = None
+        # Заметка снимка списка, открытая до загрузки хранилища (только просмотр заголовка)
+        self._placeholder_id = None
         
         # Инициализация темы оформления
         self.theme_manager = theme_manager
@@ -67,10 +269,49 @@ class NotesApp(QMainWindow):
         self.sync_manager = SyncManager(self.store)
         logger.info("Менеджер синхронизации инициализирован")
         
-        # Создание сигналов для межпоточной коммуникации
-        self.sync_signals = SyncSignals()
-        self.sync_signals.completed.connect(self._on_sync_complete)
-        self.sync_signals.error.connect(self._on_sync_error)
+        # Длительные операции (синхронизация, экспорт, резервное копирование) -
+        # фоновые задачи с прогрессом и отменой; синхронизации выполняются по очереди
+        self.task_manager = TaskManager(self)
+        
+        # В простое интерфейса заранее готовятся соседние заметки и первые результаты поиска
+        self.prefetcher = IdlePrefetcher(self)
+        
+        # Поиск выполняется в пуле потоков, UI применяет только последний результат
+        # Индекс строится в фоне после показа окна (см. конец __init__)
+        self.search_index = SearchIndex(self.store, build=False)
+        self.index_signals = IndexSignals()
+        self.index_signals.ready.connect(self._on_index_ready)
+        self.search_engine = SearchEngine(self.search_index)
+        self.search_signals = SearchSignals()
+        self.search_signals.partial.connect(self._on_search_partial)
+        self.search_signals.finished.connect(self._on_search_finished)
+        self.search_signals.failed.connect(self._on_search_failed)
+        self.search_pool = QThreadPool(self)
+        self.search_pool.setMaxThreadCount(2)
+        self._search_generation = 0
+        self._search_token = None
+        # Позиции совпадений последнего поиска {note_id: {поле: [(начало, конец)]}}
+        # (для выражения - все совпадения, для подстроки - лучшее)
+        self._search_positions = {}
+        # Фрагменты текста для результатов поиска (вычисляются при отрисовке строк)
+        self._snippets = {}
+        self._snippet_query = ""
+        
+        # Умные папки: результаты сохранённых поисков поддерживаются по событиям хранилища
+        self.smart_folders = SmartFolders(self.store, self.search_index, self.search_engine.texts)
+        self.smart_folders.load(self._load_config_settings().get('smart_folders', []))
+        self.smart_folder_signals = SmartFolderSignals()
+        self.smart_folder_signals.changed.connect(self._on_smart_folders_changed)
+        self.smart_folders.add_listener(self.smart_folder_signals.changed.emit)
+        self._active_folder = None
+        
+        # Индекс похожих заметок строится при первом открытии диалога
+        self.duplicate_finder = DuplicateFinder(self.store)
+        
+        # Результаты текущего поиска до фильтра по тегам (None - поиска нет)
+        self._search_results = None
+        # Элементы панели тегов по нормализованному тегу
+        self._tag_items = {}
         
         # Настройка окна
         self.setWindowTitle("Заметки")
@@ -105,6 +346,72 @@ class NotesApp(QMainWindow):
         # Загрузка заметок
         self.load_notes_list()
         
+        # Дальнейшие изменения хранилища применяются к списку построчно
+        self.store_signals = StoreSignals()
+        self.store_signals.changed.connect(self._on_store_changed)
+        self.store.add_listener(self.store_signals.changed.emit)
+        
+        if self.store.loaded:
+            # Первое построение поискового индекса - в фоне: простой поиск работает
+            # сразу, запросы с фильтрами и ранжирование ждут его в потоке поиска
+            self.search_index.build_in_background(self._on_index_built)
+        else:
+            # Синхронизация и импорт (та же группа задач) ждут окончания загрузки
+            self.task_manager.submit(
+                TASK_LOAD, "Загрузка заметок", lambda token: self.store.read_notes(),
+                on_finished=self._on_store_loaded,
+                on_failed=self._on_store_load_failed,
+                cancellable=False
+            )
+        
+    def _on_store_loaded(self, notes):
+        """Хранилище прочитано в фоне (главный поток): замена строк снимка заметками."""
+        if self.store.loaded:
+            # Загрузка уже завершена при закрытии окна
+            return
+        self.store.finish_loading(notes)
+        self._on_vault_ready()
+    
+    def _on_store_load_failed(self, error: str):
+        """Ошибка фоновой загрузки: повторная загрузка с восстановлением повреждённого файла."""
+        if self.store.loaded:
+            return
+        try:
+            self.store.load()
+        except Exception as e:
+            logger.error("Ошибка при загрузке хранилища: %s", e)
+            QMessageBox.critical(
+                self,
+                "Ошибка",
+                f"Не удалось загрузить заметки:\n{e}"
+            )
+            QApplication.exit(1)
+            return
+        self._on_vault_ready()
+    
+    def _on_vault_ready(self):
+        """Хранилище загружено: построение индекса и открытие ожидавшей заметки."""
+        logger.info("Хранилище загружено в фоне: %d заметок", len(self.store))
+        self.update_status(f"Загружено заметок: {len(self.store.get_all_notes())}")
+        self.search_index.build_in_background(self._on_index_built)
+        # Заметка, выбранная по снимку списка, открывается для редактирования
+        waiting = self._placeholder_id
+        self._placeholder_id = None
+        if waiting is not None and self.current_note_id is None:
+            if self.store.get_note(waiting) is not None:
+                self.load_note(waiting)
+            else:
+                self.clear_editor()
+    
+    def _on_index_built(self):
+        """Индекс построен (фоновый поток): пересчёт умных папок и уведомление UI."""
+        self.smart_folders.refresh_all()
+        self.index_signals.ready.emit()
+    
+    def _on_index_ready(self):
+        """Индекс построен (главный поток): обновление панели тегов."""
+        self.tag_counts_timer.start()
+    
     def init_ui(self):
         """Инициализация пользовательского интерфейса."""
         
@@ -133,11 +440,39 @@ class NotesApp(QMainWindow):
         # Поле поиска
         self.search_box = QLineEdit()
         self.search_box.setObjectName("search_box")
-        self.search_box.setPlaceholderText("Поиск по заголовку и тексту...")
-        self.search_box.textChanged.connect(self.filter_notes)
+        self.search_box.setPlaceholderText("Поиск... (tag:, pinned:, modified:, size:, \"фраза\", -слово, OR)")
+        self.search_box.setToolTip(
+            "Поиск по заголовку, тексту и тегам.\n"
+            "tag:работа - заметки с тегом\n"
+            "pinned:yes / pinned:no - закреплённые / незакреплённые\n"
+            "modified:>2025-01-01, modified:<30d - дата изменения\n"
+            "size:>10k - размер текста\n"
+            "\"точная фраза\", -исключить, A OR B"
+        )
+        self.search_box.textChanged.connect(self.on_search_text_changed)
         self.search_box.setClearButtonEnabled(True)  # Кнопка очистки
         left_layout.addWidget(self.search_box)
         
+        # Переключатель нечёткого поиска (находит слова с опечатками)
+        self.fuzzy_check = QCheckBox("Учитывать опечатки")
+        self.fuzzy_check.setObjectName("fuzzy_check")
+        self.fuzzy_check.setToolTip(
+            "Находить слова с 1-2 опечатками (например, «pyhton» → «python») "
+            "и другие формы слова («заметки» → «заметкой»)"
+        )
+        self.fuzzy_check.toggled.connect(self.on_fuzzy_toggled)
+        left_layout.addWidget(self.fuzzy_check)
+        
+        # Переключатель поиска по регулярному выражению
+        self.regex_check = QCheckBox("Регулярное выражение")
+        self.regex_check.setObjectName("regex_check")
+        self.regex_check.setToolTip(
+            "Искать по регулярному выражению Python (без учёта регистра),\n"
+            "например: договор №\\d+ или ^итоги"
+        )
+        self.regex_check.toggled.connect(self.on_regex_toggled)
+        left_layout.addWidget(self.regex_check)
+        
         # Метка с количеством результатов
         self.search_results_label = QLabel("")
         self.search_results_label.setObjectName("search_results")
@@ -155,19 +490,63 @@ class NotesApp(QMainWindow):
             "По дате (старые)",
             "По алфавиту (А-Я)",
             "По алфавиту (Я-А)",
-            "По размеру"
+            "По размеру",
+            "По релевантности"
         ])
         self.sort_combo.currentIndexChanged.connect(self.on_sort_changed)
         sort_layout.addWidget(self.sort_combo)
         left_layout.addLayout(sort_layout)
         
-        # Список заметок
-        self.notes_list = QListWidget()
-        self.notes_list.itemClicked.connect(self.on_note_selected)
+        # Умные папки (сохранённые поиски) со счётчиками
+        folders_header = QHBoxLayout()
+        folders_label = QLabel("Умные папки:")
+        folders_label.setObjectName("sort_label")
+        folders_header.addWidget(folders_label)
+        folders_header.addStretch()
+        self.btn_save_search = QPushButton("+")
+        self.btn_save_search.setObjectName("btn_save_search")
+        self.btn_save_search.setFixedWidth(32)
+        self.btn_save_search.setToolTip("Сохранить текущий поиск как умную папку")
+        self.btn_save_search.clicked.connect(self.save_search_as_folder)
+        folders_header.addWidget(self.btn_save_search)
+        left_layout.addLayout(folders_header)
+        
+        self.folders_list = QListWidget()
+        self.folders_list.setObjectName("folders_list")
+        self.folders_list.setMaximumWidth(400)
+        self.folders_list.setMaximumHeight(110)
+        self.folders_list.itemClicked.connect(self.on_smart_folder_selected)
+        self.folders_list.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.folders_list.customContextMenuRequested.connect(self._show_folder_menu)
+        left_layout.addWidget(self.folders_list)
+        self.load_smart_folders_list()
+        
+        # Панель тегов: количество заметок по тегам для текущего поиска, выбор фильтрует список
+        self.tags_label = QLabel("Теги:")
+        self.tags_label.setObjectName("sort_label")
+        left_layout.addWidget(self.tags_label)
+        
+        self.tags_list = QListWidget()
+        self.tags_list.setObjectName("tags_list")
+        self.tags_list.setMaximumWidth(400)
+        self.tags_list.setMaximumHeight(130)
+        self.tags_list.setSelectionMode(QAbstractItemView.MultiSelection)
+        self.tags_list.setUniformItemSizes(True)
+        self.tags_list.setToolTip("Выберите один или несколько тегов, чтобы показать заметки со всеми выбранными тегами")
+        self.tags_list.itemSelectionChanged.connect(self.on_tag_filter_changed)
+        left_layout.addWidget(self.tags_list)
+        
+        # Список заметок: модель над массивом ID, строки вычисляются при отрисовке
+        self.notes_model = NotesListModel(self.store, self)
+        self.notes_list = NotesListView(self.notes_model)
+        self.notes_list.clicked.connect(self.on_note_selected)
         # Ограничение ширины для предотвращения растягивания окна
         self.notes_list.setMaximumWidth(400)
         # Добавляем spacing между элементами списка
         self.notes_list.setSpacing(4)
+        # Фрагменты вокруг совпадений под заголовками результатов поиска
+        self.result_delegate = SearchResultDelegate(self._list_snippet, self.notes_list)
+        self.notes_list.setItemDelegate(self.result_delegate)
         left_layout.addWidget(self.notes_list)
         
         # Кнопка "Создать новую заметку"
@@ -206,21 +585,68 @@ class NotesApp(QMainWindow):
         self.tags_edit.setMaximumWidth(800)
         right_layout.addWidget(self.tags_edit)
         
-        # Текст заметки
+        # Текст заметки (со счётчиком совпадений поиска и навигацией по ним)
+        body_header = QHBoxLayout()
         body_label = QLabel("Текст:")
-        right_layout.addWidget(body_label)
-        
-        self.body_edit = QTextEdit()
+        body_header.addWidget(body_label)
+        body_header.addStretch()
+        
+        self.match_label = QLabel("")
+        self.match_label.setObjectName("match_counter")
+        body_header.addWidget(self.match_label)
+        
+        self.btn_prev_match = QPushButton("▲")
+        self.btn_prev_match.setToolTip("Предыдущее совпадение (Shift+F3)")
+        self.btn_prev_match.setFixedWidth(32)
+        self.btn_prev_match.clicked.connect(self.goto_previous_match)
+        body_header.addWidget(self.btn_prev_match)
+        
+        self.btn_next_match = QPushButton("▼")
+        self.btn_next_match.setToolTip("Следующее совпадение (F3)")
+        self.btn_next_match.setFixedWidth(32)
+        self.btn_next_match.clicked.connect(self.goto_next_match)
+        body_header.addWidget(self.btn_next_match)
+        right_layout.addLayout(body_header)
+        
+        # Обычный текст: разметка только видимых блоков, большие заметки загружаются частями
+        self.body_edit = NoteBodyEdit()
         self.body_edit.setPlaceholderText("Введите текст заметки...")
         self.body_edit.setFont(QFont("Arial", 11))
         # Включение переноса слов для предотвращения горизонтальной прокрутки
-        self.body_edit.setLineWrapMode(QTextEdit.WidgetWidth)
+        self.body_edit.setLineWrapMode(QPlainTextEdit.WidgetWidth)
         self.body_edit.textChanged.connect(self.on_text_changed)
+        # Подсветка совпадений за пределами первой порции - после загрузки всего текста
+        self.body_edit.loaded.connect(self._update_visible_highlights)
+        # Счётчики поля обновляются по изменённому диапазону текста
+        self.body_edit.loaded.connect(self.update_note_info)
         right_layout.addWidget(self.body_edit)
         
         # Сохраняем ссылку на активные подсветки поиска
         self.search_highlights = []
         
+        # Совпадения поиска в тексте хранятся позициями, а ExtraSelections
+        # создаются только для видимой области (с запасом) и пересчитываются при прокрутке
+        self._body_matches = None
+        # Дата изменения текущей заметки: (ID заметки, версия, строка даты)
+        self._note_date = None
+        self._current_match = -1
+        self._highlight_needle = ""
+        self.highlight_margin = 2000  # Запас вокруг видимой области (символы)
+        self.max_visible_highlights = 2000
+        
+        self.highlight_timer = QTimer()
+        self.highlight_timer.setSingleShot(True)
+        self.highlight_timer.setInterval(30)
+        self.highlight_timer.timeout.connect(self._update_visible_highlights)
+        self.body_edit.verticalScrollBar().valueChanged.connect(lambda _value: self.highlight_timer.start())
+        
+        # Пересчёт позиций совпадений после редактирования текста
+        self.body_matches_timer = QTimer()
+        self.body_matches_timer.setSingleShot(True)
+        self.body_matches_timer.setInterval(300)
+        self.body_matches_timer.timeout.connect(self._refresh_body_matches)
+        self._update_match_counter()
+        
         # Панель кнопок
         buttons_layout = QHBoxLayout()
         
@@ -282,6 +708,22 @@ class NotesApp(QMainWindow):
         self.statistics_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
         bottom_status_layout.addWidget(self.statistics_label)
         
+        # Индикатор фоновых задач (скрыт, пока задач нет)
+        self.task_label = QLabel("")
+        self.task_label.setObjectName("task_label")
+        self.task_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.task_label.hide()
+        bottom_status_layout.addWidget(self.task_label)
+        
+        self.btn_cancel_task = QPushButton("✕")
+        self.btn_cancel_task.setObjectName("btn_cancel_task")
+        self.btn_cancel_task.setFixedWidth(28)
+        self.btn_cancel_task.setToolTip("Отменить фоновые задачи")
+        self.btn_cancel_task.clicked.connect(self.task_manager.cancel_all)
+        self.btn_cancel_task.hide()
+        bottom_status_layout.addWidget(self.btn_cancel_task)
+        self.task_manager.changed.connect(self._update_task_indicator)
+        
         right_layout.addLayout(bottom_status_layout)
         
         splitter.addWidget(right_panel)
@@ -318,6 +760,29 @@ class NotesApp(QMainWindow):
         self.autosync_enabled = False  # По умолчанию выключена
         logger.info(f"Интервал автосинхронизации: {autosync_interval} сек")
         
+        # Таймер debounce для поиска (поиск запускается после паузы в наборе)
+        self.search_timer = QTimer()
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self.start_search)
+        self.search_debounce_delay = 150  # В миллисекундах
+        
+        # Счётчики тегов пересчитываются один раз после серии изменений списка
+        self.tag_counts_timer = QTimer()
+        self.tag_counts_timer.setSingleShot(True)
+        self.tag_counts_timer.setInterval(50)
+        self.tag_counts_timer.timeout.connect(self.update_tag_counts)
+        
+        # Фильтр списка (поиск, теги) применяется заново один раз после пакета изменений хранилища
+        self.list_filter_timer = QTimer()
+        self.list_filter_timer.setSingleShot(True)
+        self.list_filter_timer.setInterval(0)
+        self.list_filter_timer.timeout.connect(self._refresh_list_filter)
+        
+        # Папки с условиями modified: пересчитываются, когда возраст заметок заметно изменился
+        self.smart_folders_timer = QTimer()
+        self.smart_folders_timer.timeout.connect(self.smart_folders.refresh_expired)
+        self.smart_folders_timer.start(5 * 60 * 1000)
+        
         # Запускаем автосинхронизацию, если настроена папка облака
         if self.sync_manager.cloud_path:
             self.enable_autosync()
@@ -340,6 +805,11 @@ class NotesApp(QMainWindow):
         # Ctrl+F - Поиск
         QShortcut(QKeySequence.Find, self).activated.connect(self.focus_search)
         logger.info("Горячая клавиша Ctrl+F настроена")
+        
+        # F3 / Shift+F3 - Следующее / предыдущее совпадение в тексте
+        QShortcut(QKeySequence("F3"), self).activated.connect(self.goto_next_match)
+        QShortcut(QKeySequence("Shift+F3"), self).activated.connect(self.goto_previous_match)
+        logger.info("Горячие клавиши F3 / Shift+F3 настроены")
     
     def create_menu_bar(self):
         """Создание меню приложения."""
@@ -380,6 +850,11 @@ class NotesApp(QMainWindow):
         export_all_html_action.triggered.connect(lambda: self.export_all_notes('html'))
         export_menu.addAction(export_all_html_action)
         
+        # Резервная копия файла заметок (в фоне)
+        backup_action = QAction("Создать резервную копию", self)
+        backup_action.triggered.connect(self.backup_notes)
+        file_menu.addAction(backup_action)
+        
         file_menu.addSeparator()
         
         # Настройки
@@ -395,6 +870,18 @@ class NotesApp(QMainWindow):
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
         
+        # Меню "Правка"
+        edit_menu = menubar.addMenu("&Правка")
+        
+        replace_action = QAction("Найти и заменить во всех заметках...", self)
+        replace_action.setShortcut("Ctrl+H")
+        replace_action.triggered.connect(self.open_replace_dialog)
+        edit_menu.addAction(replace_action)
+        
+        duplicates_action = QAction("Найти похожие заметки...", self)
+        duplicates_action.triggered.connect(self.open_duplicates_dialog)
+        edit_menu.addAction(duplicates_action)
+        
         # Меню "Вид"
         view_menu = menubar.addMenu("&Вид")
         
@@ -509,6 +996,10 @@ class NotesApp(QMainWindow):
         """
         from export import NoteExporter
         
+        if not self.store.loaded:
+            self.update_status("Заметки ещё загружаются, экспорт будет доступен после загрузки")
+            return
+        
         notes = self.store.get_all_notes()
         if not notes:
             QMessageBox.warning(
@@ -537,21 +1028,75 @@ class NotesApp(QMainWindow):
         if not file_path:
             return
         
-        # Экспорт
-        success = NoteExporter.export_all_to_zip(notes, Path(file_path), format_type)
+        # Экспорт в фоне: список заметок зафиксирован до запуска задачи
+        def export(token):
+            success = NoteExporter.export_all_to_zip(notes, Path(file_path), format_type, token=token)
+            if not success:
+                token.check()
+            return success
         
-        if success:
-            QMessageBox.information(
-                self,
-                "Экспорт завершен",
-                f"Все заметки ({len(notes)}) успешно экспортированы в:\n{file_path}"
-            )
-        else:
-            QMessageBox.critical(
-                self,
-                "Ошибка экспорта",
-                "Не удалось экспортировать заметки."
-            )
+        def on_finished(success):
+            if success:
+                QMessageBox.information(
+                    self,
+                    "Экспорт завершен",
+                    f"Все заметки ({len(notes)}) успешно экспортированы в:\n{file_path}"
+                )
+            else:
+                QMessageBox.critical(
+                    self,
+                    "Ошибка экспорта",
+                    "Не удалось экспортировать заметки."
+                )
+        
+        self.task_manager.submit(
+            TASK_EXPORT, "Экспорт заметок", export,
+            on_finished=on_finished,
+            on_failed=lambda message: QMessageBox.critical(
+                self, "Ошибка экспорта", f"Не удалось экспортировать заметки:\n{message}"),
+            on_cancelled=lambda: self.update_status("Экспорт отменён")
+        )
+    
+    def backup_notes(self):
+        """Создание резервной копии файла заметок (фоновая задача)."""
+        # Несохранённые изменения должны попасть в резервную копию
+        if self.has_unsaved_changes and self.current_note_id:
+            self.save_current_note()
+        
+        def on_finished(backup_path):
+            if backup_path:
+                self.update_status(f"Резервная копия создана: {backup_path.name}")
+            else:
+                self.update_status("Не удалось создать резервную копию")
+        
+        self.task_manager.submit(
+            TASK_BACKUP, "Резервная копия", lambda token: self.store.create_backup(),
+            on_finished=on_finished,
+            on_failed=lambda message: self.update_status(f"Ошибка резервного копирования: {message}"),
+            cancellable=False
+        )
+    
+    def _update_task_indicator(self):
+        """Индикатор фоновых задач: первая задача, её прогресс и размер очереди."""
+        tasks = self.task_manager.tasks()
+        if not tasks:
+            self.task_label.hide()
+            self.btn_cancel_task.hide()
+            return
+        
+        task = tasks[0]
+        done, total, _ = task.progress
+        text = f"⏳ {task.title}"
+        if total:
+            text += f": {done * 100 // total}%"
+        if len(tasks) > 1:
+            text += f" (+{len(tasks) - 1})"
+        self.task_label.setText(text)
+        self.task_label.setToolTip("\n".join(
+            f"{item.title}: {item.progress[2]}" if item.progress[2] else item.title for item in tasks
+        ))
+        self.task_label.show()
+        self.btn_cancel_task.setVisible(any(item.cancellable for item in tasks))
     
     def open_settings_dialog(self):
         """Открыть диалог настроек."""
@@ -569,6 +1114,33 @@ class NotesApp(QMainWindow):
                 "Настройки сохранены успешно."
             )
     
+    def open_replace_dialog(self):
+        """Открыть диалог поиска и замены во всех заметках."""
+        # Несохранённые изменения должны попасть в замену, а не перезаписать её
+        if self.has_unsaved_changes and self.current_note_id:
+            self.save_current_note()
+        
+        dialog = ReplaceDialog(self, VaultReplacer(self.store, self.search_engine))
+        if dialog.exec() and dialog.updated_ids:
+            reload_current = self.current_note_id in dialog.updated_ids
+            self.load_notes_list(reload_current_note=reload_current)
+            self.update_status(f"Замена выполнена: изменено заметок {len(dialog.updated_ids)}")
+    
+    def open_duplicates_dialog(self):
+        """Открыть диалог поиска похожих заметок (дубликатов)."""
+        if self.has_unsaved_changes and self.current_note_id:
+            self.save_current_note()
+        
+        dialog = DuplicatesDialog(self, self.duplicate_finder)
+        dialog.exec()
+        if dialog.changed_ids:
+            current = self.store.get_note(self.current_note_id) if self.current_note_id else None
+            reload_current = current is not None and self.current_note_id in dialog.changed_ids
+            if current is not None and current.deleted:
+                self.clear_editor()
+            self.load_notes_list(reload_current_note=reload_current and not current.deleted)
+            self.update_status(f"Похожие заметки обработаны: изменено заметок {len(dialog.changed_ids)}")
+    
     def update_intervals(self, autosave_interval: int, autosync_interval: int):
         """
         Обновить интервалы автосохранения и автосинхронизации.
@@ -654,29 +1226,29 @@ class NotesApp(QMainWindow):
                 }}
                 
                 /* Поля ввода */
-                QLineEdit, QTextEdit {{
+                QLineEdit, QTextEdit, QPlainTextEdit {{
                     background-color: {theme.input_background};
                     color: {theme.input_text};
                     border: 1px solid {theme.input_border};
                     padding: 5px;
                     border-radius: 3px;
                 }}
-                QLineEdit:focus, QTextEdit:focus {{
+                QLineEdit:focus, QTextEdit:focus, QPlainTextEdit:focus {{
                     border: 2px solid {theme.button_background};
                 }}
                 
                 /* Список заметок */
-                QListWidget {{
+                QListView {{
                     background-color: {theme.list_background};
                     color: {theme.list_text};
                     border: 1px solid {theme.input_border};
                     border-radius: 3px;
                 }}
-                QListWidget::item:selected {{
+                QListView::item:selected {{
                     background-color: {theme.list_selected};
                     color: white;
                 }}
-                QListWidget::item:hover {{
+                QListView::item:hover {{
                     background-color: {theme.list_hover};
                 }}
                 
@@ -747,7 +1319,7 @@ class NotesApp(QMainWindow):
                 }}
                 
                 /* Статус-бары и информационные метки */
-                QLabel#status_label, QLabel#note_info_label, QLabel#statistics_label {{
+                QLabel#status_label, QLabel#note_info_label, QLabel#statistics_label, QLabel#task_label {{
                     color: {theme.status_text};
                     font-size: 11px;
                     padding: 5px;
@@ -941,7 +1513,7 @@ class NotesApp(QMainWindow):
         logger.info(f"Применена тема: {theme.name}")
     
     def load_notes_list(self, reload_current_note: bool = False):
-        """Загрузка списка заметок в QListWidget.
+        """Загрузка списка заметок (новый порядок ID в модели списка).
         
         Args:
             reload_current_note: Если True, перезагружает текущую открытую заметку после обновления списка
@@ -949,52 +1521,26 @@ class NotesApp(QMainWindow):
         # Сохраняем ID текущей заметки для возможной перезагрузки
         current_note_id = self.current_note_id if reload_current_note else None
         
-        self.notes_list.clear()
+        sort_key, reverse = self._list_sort_key()
+        if not self.store.loaded:
+            # Хранилище загружается в фоне: строки по снимку списка предыдущего сеанса
+            self.notes_model.load(self.store.load_list_snapshot(), sort_key, reverse, placeholders=True)
+            self.update_status("Загрузка заметок...")
+            return
         
         notes = self.store.get_all_notes()
-        
-        # Применяем сортировку в зависимости от выбранного режима
-        sort_mode = self.sort_combo.currentText()
-        
-        if sort_mode == "По дате (новые)":
-            # Закрепленные внизу, затем по дате (новые сверху)
-            notes.sort(key=lambda n: (n.pinned, n.last_modified), reverse=True)
-        elif sort_mode == "По дате (старые)":
-            # Закрепленные внизу, затем по дате (старые сверху)
-            notes.sort(key=lambda n: (n.pinned, n.last_modified))
-        elif sort_mode == "По алфавиту (А-Я)":
-            # Закрепленные внизу, затем по алфавиту А-Я
-            notes.sort(key=lambda n: (n.pinned, (n.title or "").lower()))
-        elif sort_mode == "По алфавиту (Я-А)":
-            # Закрепленные внизу, затем по алфавиту Я-А
-            notes.sort(key=lambda n: (n.pinned, (n.title or "").lower()), reverse=True)
-        elif sort_mode == "По размеру":
-            # Закрепленные внизу, затем по размеру (большие сверху)
-            notes.sort(key=lambda n: (n.pinned, -len(n.body)))
-        
-        for note in notes:
-            # Обрезаем длинные названия для списка
-            title = note.title or "(Без заголовка)"
-            
-            # Добавляем индикатор закрепления
-            if note.pinned:
-                title = "📌 " + title
-            
-            if len(title) > 50:
-                title = title[:47] + "..."
-            
-            item = QListWidgetItem(title)
-            item.setData(Qt.UserRole, note.id)  # Сохраняем ID заметки
-            # Добавляем полный заголовок как подсказку
-            item.setToolTip(note.title or "(Без заголовка)")
-            self.notes_list.addItem(item)
+        # Текст строк вычисляется моделью при отрисовке, до нового поиска
+        # действует прежний фильтр
+        self.notes_model.load(notes, sort_key, reverse)
         
         # Обновление статуса
         self.update_status(f"Загружено заметок: {len(notes)}")
         
-        # Применяем текущий фильтр поиска (если есть)
-        if self.search_box.text():
-            self.filter_notes(self.search_box.text())
+        # Применяем текущий фильтр поиска и тегов (если есть). Поиск выполняется
+        # в фоне, до его завершения показываются прежние результаты
+        if self.search_box.text().strip() and self._search_results is not None:
+            self._apply_search_results(self._search_results, final=False)
+        self._refresh_list_filter()
         
         # Перезагружаем текущую заметку, если она была открыта
         if current_note_id:
@@ -1003,102 +1549,498 @@ class NotesApp(QMainWindow):
                 # Перезагружаем с блокировкой сигналов, чтобы не вызвать has_unsaved_changes
                 self.load_note(current_note_id)
     
+    def on_search_text_changed(self, search_text: str):
+        """Обработчик ввода в поле поиска (запуск поиска с задержкой)."""
+        self.search_timer.stop()
+        
+        # Изменённый запрос больше не соответствует выбранной умной папке
+        if self._active_folder is not None and search_text.strip() != self._active_folder.query:
+            self._active_folder = None
+            self.folders_list.clearSelection()
+        
+        if not search_text.strip():
+            # Сброс фильтра дешёвый - выполняем сразу
+            self.filter_notes("")
+            return
+        
+        self.search_timer.start(self.search_debounce_delay)
+    
+    def start_search(self):
+        """Запуск поиска в пуле потоков (предыдущий поиск отменяется)."""
+        search_text = self.search_box.text()
+        if not search_text.strip():
+            self.filter_notes("")
+            return
+        
+        self._cancel_search()
+        self._search_generation += 1
+        self._search_token = SearchToken(self._search_generation)
+        
+        # Рабочий поток получает снимок списка, а не живой словарь хранилища
+        regex = self.regex_check.isChecked()
+        fuzzy = self.fuzzy_check.isChecked() and not regex
+        task = SearchTask(
+            self.search_engine,
+            [] if fuzzy else self.store.get_all_notes(),
+            search_text,
+            self._search_token,
+            self.search_signals,
+            rank=self._is_relevance_sort(),
+            fuzzy=fuzzy,
+            regex=regex,
+            store_generation=self.store.generation
+        )
+        self.search_pool.start(task)
+        self.search_results_label.setText("Поиск...")
+    
+    def on_fuzzy_toggled(self, checked: bool):
+        """Обработчик переключения нечёткого поиска."""
+        logger.info("Нечёткий поиск: %s", "включён" if checked else "выключен")
+        if self.search_box.text().strip():
+            self.start_search()
+    
+    def on_regex_toggled(self, checked: bool):
+        """Обработчик переключения поиска по регулярному выражению."""
+        logger.info("Поиск по выражению: %s", "включён" if checked else "выключен")
+        # Опечатки в выражении не учитываются
+        self.fuzzy_check.setEnabled(not checked)
+        if self.search_box.text().strip():
+            self.start_search()
+    
+    def _cancel_search(self):
+        """Отмена выполняющегося и отложенного поиска."""
+        self.search_timer.stop()
+        if self._search_token is not None:
+            self._search_token.cancel()
+            self._search_token = None
+    
+    def _on_search_partial(self, generation: int, results: dict):
+        """Обработчик частичных результатов поиска (главный поток)."""
+        if generation != self._search_generation or self._search_token is None:
+            return
+        self._apply_search_results(results, final=False)
+    
+    def _on_search_finished(self, generation: int, results: dict, ranking: list, positions):
+        """Обработчик завершения поиска (главный поток)."""
+        # Результаты устаревших запросов игнорируются
+        if generation != self._search_generation or self._search_token is None:
+            return
+        self._search_token = None
+        self._search_positions = positions or {}
+        self._apply_search_results(results, ranking=ranking)
+    
+    def _on_search_failed(self, generation: int, message: str):
+        """Обработчик ошибки поиска по выражению (главный поток)."""
+        if generation != self._search_generation or self._search_token is None:
+            return
+        self._search_token = None
+        self._search_positions = {}
+        self._apply_search_results({})
+        self.search_results_label.setText(message)
+    
+    def _is_relevance_sort(self) -> bool:
+        """Выбран ли режим сортировки по релевантности."""
+        return self.sort_combo.currentText() == "По релевантности"
+    
+    def _list_sort_key(self):
+        """Ключ сортировки списка для выбранного режима.
+        
+        Returns:
+            Tuple[Callable, bool]: (ключ заметки, сортировка по убыванию)
+        """
+        sort_mode = self.sort_combo.currentText()
+        
+        if sort_mode == "По дате (старые)":
+            # Закрепленные внизу, затем по дате (старые сверху)
+            return (lambda n: (n.pinned, n.last_modified)), False
+        if sort_mode == "По алфавиту (А-Я)":
+            # Закрепленные внизу, затем по алфавиту А-Я
+            return (lambda n: (n.pinned, (n.title or "").lower())), False
+        if sort_mode == "По алфавиту (Я-А)":
+            # Закрепленные внизу, затем по алфавиту Я-А
+            return (lambda n: (n.pinned, (n.title or "").lower())), True
+        if sort_mode == "По размеру":
+            # Закрепленные внизу, затем по размеру (большие сверху)
+            return (lambda n: (n.pinned, -len(n.body))), False
+        # "По дате (новые)": закрепленные внизу, затем по дате (новые сверху).
+        # Для "По релевантности" это базовый порядок (без поиска и для заметок вне топа)
+        return (lambda n: (n.pinned, n.last_modified)), True
+    
+    def _refresh_list_filter(self):
+        """Повторное применение поиска и фильтра по тегам к списку (после изменения заметок)."""
+        if self.search_box.text().strip():
+            self.start_search()
+        elif self._selected_tags():
+            self.filter_notes("")
+        else:
+            self._search_results = None
+            self.notes_model.set_filter(None)
+            self.tag_counts_timer.start()
+    
+    def _on_store_changed(self, event: str, note_ids: list):
+        """Изменение хранилища (главный поток): перемещение, обновление или удаление строк списка.
+        
+        Args:
+            event: Тип события хранилища
+            note_ids: ID затронутых заметок
+        """
+        if event == STORE_RESET:
+            sort_key, reverse = self._list_sort_key()
+            self.notes_model.load(self.store.get_all_notes(), sort_key, reverse)
+            self.body_edit.revalidate(self._note_text)
+        else:
+            self.notes_model.update_notes(note_ids)
+            # Документы заметок, изменённых вне редактора (синхронизация, замена), устарели
+            self.body_edit.revalidate(self._note_text, note_ids)
+        # Совпадения изменённых заметок неизвестны до нового поиска
+        self.list_filter_timer.start()
+    
+    def _note_text(self, note_id: str):
+        """Текст заметки для проверки кэша документов (None - заметка удалена)."""
+        note = self.store.get_note(note_id)
+        if note is None or note.deleted:
+            return None
+        return note.body
+    
     def filter_notes(self, search_text: str = ""):
-        """Фильтрация списка заметок по поисковому запросу."""
-        search_text = search_text.lower().strip()
+        """Фильтрация списка заметок по поисковому запросу.
+        
+        Сброс фильтра и результаты умной папки применяются сразу,
+        поиск по запросу выполняется в пуле потоков (start_search).
+        """
+        self._cancel_search()
+        self._search_positions = {}
+        search_text = search_text.strip()
+        
+        if not search_text and self._selected_tags():
+            # Без запроса, но с выбранными тегами - список фильтруется только по тегам
+            self._search_results = None
+            self._set_snippets_query("")
+            self._apply_search_results(None)
+            return
         
         if not search_text:
-            # Показываем все заметки без подсветки
-            for i in range(self.notes_list.count()):
-                item = self.notes_list.item(i)
-                item.setHidden(False)
-                # Убираем индикаторы поиска
-                note_id = item.data(Qt.UserRole)
-                all_notes = self.store.get_all_notes()
-                note = next((n for n in all_notes if n.id == note_id), None)
-                if note:
-                    title = note.title or "(Без заголовка)"
-                    if len(title) > 50:
-                        title = title[:47] + "..."
-                    item.setText(title)
+            self._search_results = None
+            self.tag_counts_timer.start()
+            # Показываем все заметки без индикаторов поиска
+            self.notes_model.set_filter(None)
             self.search_results_label.setText("")
+            self._set_snippets_query("")
+            
+            # Без запроса релевантность не определена - возвращаем базовый порядок
+            if self._is_relevance_sort():
+                self._reorder_notes_list([])
             
             # Убираем подсветку текста во всех полях
             if self.current_note_id:
                 # Очищаем подсветку в заголовке
                 self.title_edit.deselect()
                 
-                # Очищаем подсветку в теле заметки
+                # Снимаем выделение совпадения в теле заметки (текст без форматирования)
                 cursor = self.body_edit.textCursor()
-                cursor.select(QTextCursor.SelectionType.Document)
-                cursor.setCharFormat(QTextCharFormat())
                 cursor.clearSelection()
                 cursor.movePosition(QTextCursor.MoveOperation.Start)
                 self.body_edit.setTextCursor(cursor)
                 
                 # Очищаем подсветку в тегах
                 self.tags_edit.deselect()
+                
+                # Очищаем совпадения в тексте и счётчик
+                self.clear_search_highlights(self.body_edit)
             
             return
         
-        # Получаем все заметки для поиска по телу
-        all_notes = self.store.get_all_notes()
-        notes_dict = {note.id: note for note in all_notes}
+        # Результаты умной папки с фильтрами уже вычислены - поиск не нужен
+        # (простой запрос ищется заново: нужны позиции совпадений для подсветки)
+        folder = self._active_folder
+        if (folder is not None and folder.query == search_text and is_structured(search_text)
+                and not self.fuzzy_check.isChecked() and not self.regex_check.isChecked()):
+            self._apply_folder_results(folder)
+            return
         
-        visible_count = 0
+        self.start_search()
+    
+    def _apply_search_results(self, results, final: bool = True, ranking: list = None):
+        """Применение результатов поиска к списку заметок.
         
-        for i in range(self.notes_list.count()):
-            item = self.notes_list.item(i)
-            note_id = item.data(Qt.UserRole)
-            note = notes_dict.get(note_id)
-            
-            if note:
-                # Поиск в заголовке, тексте и тегах (регистронезависимый)
-                title_match = search_text in note.title.lower()
-                body_match = search_text in note.body.lower()
-                tags_match = any(search_text in tag.lower() for tag in note.tags)
-                
-                if title_match or body_match or tags_match:
-                    item.setHidden(False)
-                    visible_count += 1
-                    
-                    # Добавляем индикатор типа совпадения
-                    title = note.title or "(Без заголовка)"
-                    if len(title) > 50:
-                        title = title[:47] + "..."
-                    
-                    if title_match:
-                        item.setText(f"📌 {title}")
-                    elif tags_match:
-                        item.setText(f"🏷️ {title}")
-                    else:  # body_match
-                        item.setText(f"📄 {title}")
-                else:
-                    item.setHidden(True)
-            else:
-                item.setHidden(True)
+        Args:
+            results: Словарь {ID заметки: тип совпадения} (None - поиска нет, только фильтр по тегам)
+            final: False для частичных результатов (поиск ещё идёт)
+            ranking: ID лучших заметок по релевантности (для сортировки "По релевантности")
+        """
+        if final:
+            self._search_results = results
+            self.tag_counts_timer.start()
+        results = self._filter_by_tags(results)
+        
+        if final and self._is_relevance_sort():
+            self._reorder_notes_list(ranking or [])
+        
+        # Видимые строки - заметки из результатов, индикатор типа совпадения
+        # (📌 заголовок, 🏷️ теги, 📄 текст) модель добавляет при отрисовке
+        self.notes_model.set_filter(results)
+        visible_count = self.notes_model.rowCount()
+        
+        # Фрагменты показываются только для итоговых результатов
+        # (прежние результаты того же запроса до завершения поиска их сохраняют)
+        query = self.search_box.text().strip()
+        if final:
+            self._set_snippets_query(query)
+            self._schedule_prefetch()
+        elif self._snippet_query != query:
+            self._set_snippets_query("")
         
         # Обновляем счётчик результатов
-        if visible_count == 0:
+        if not final:
+            self.search_results_label.setText(f"Поиск... найдено: {visible_count}")
+        elif visible_count == 0:
             self.search_results_label.setText(f"Ничего не найдено")
         elif visible_count == 1:
             self.search_results_label.setText(f"Найдена 1 заметка")
         else:
             self.search_results_label.setText(f"Найдено заметок: {visible_count}")
     
+    def _selected_tags(self) -> list:
+        """Нормализованные теги, выбранные в панели тегов."""
+        return [item.data(Qt.UserRole) for item in self.tags_list.selectedItems()]
+    
+    def _filter_by_tags(self, results):
+        """Ограничение результатов заметками со всеми выбранными тегами.
+        
+        Args:
+            results: Словарь {ID заметки: тип совпадения} или None (все заметки)
+        
+        Returns:
+            dict: Отфильтрованные результаты
+        """
+        tags = self._selected_tags()
+        if not tags:
+            return results if results is not None else {}
+        
+        # Пересечение начинается с самого редкого тега
+        tag_sets = sorted((self.search_index.tag_ids(tag) for tag in tags), key=len)
+        ids = tag_sets[0]
+        for tag_ids in tag_sets[1:]:
+            ids &= tag_ids
+        
+        if results is None:
+            return {note_id: MATCH_TAGS for note_id in ids}
+        return {note_id: match for note_id, match in results.items() if note_id in ids}
+    
+    def update_tag_counts(self):
+        """Обновление панели тегов: счётчики для текущего поиска и выбранных тегов."""
+        selected = set(self._selected_tags())
+        scope = None
+        if self._search_results is not None or selected:
+            scope = set(self._filter_by_tags(self._search_results))
+        labels, counts = self.search_index.tag_summary(scope)
+        
+        # Элементы создаются заново только при изменении набора тегов
+        if self._tag_items.keys() != labels.keys():
+            self.tags_list.blockSignals(True)
+            self.tags_list.clear()
+            self._tag_items = {}
+            for tag in sorted(labels, key=lambda t: labels[t].lower()):
+                item = QListWidgetItem(labels[tag])
+                item.setData(Qt.UserRole, tag)
+                self.tags_list.addItem(item)
+                item.setSelected(tag in selected)
+                self._tag_items[tag] = item
+            self.tags_list.blockSignals(False)
+        
+        self.tags_list.setUpdatesEnabled(False)
+        for tag, item in self._tag_items.items():
+            count = counts.get(tag, 0)
+            text = f"{labels[tag]} ({count})"
+            if item.text() != text:
+                item.setText(text)
+            # Теги без заметок в текущей выборке скрываются (кроме выбранных)
+            hidden = count == 0 and tag not in selected
+            if item.isHidden() != hidden:
+                item.setHidden(hidden)
+        self.tags_list.setUpdatesEnabled(True)
+        self.tags_label.setText(f"Теги ({len(counts)}):" if counts else "Теги:")
+    
+    def on_tag_filter_changed(self):
+        """Обработчик выбора тегов: фильтрация без повторного поиска."""
+        if self._search_results is not None:
+            self._apply_search_results(self._search_results)
+        else:
+            self.filter_notes(self.search_box.text())
+    
+    def load_smart_folders_list(self):
+        """Заполнение списка умных папок (название и количество заметок)."""
+        self.folders_list.clear()
+        for folder in self.smart_folders:
+            item = QListWidgetItem(f"{folder.name} ({folder.count})")
+            item.setData(Qt.UserRole, folder.name)
+            item.setToolTip(folder.query)
+            self.folders_list.addItem(item)
+            if self._active_folder is not None and folder.name == self._active_folder.name:
+                item.setSelected(True)
+    
+    def _on_smart_folders_changed(self, names: list):
+        """Обновление счётчиков изменившихся папок (главный поток)."""
+        for i in range(self.folders_list.count()):
+            item = self.folders_list.item(i)
+            folder = self.smart_folders.get(item.data(Qt.UserRole))
+            if folder is not None and folder.name in names:
+                item.setText(f"{folder.name} ({folder.count})")
+    
+    def on_smart_folder_selected(self, item):
+        """Переход в умную папку: готовые результаты применяются без поиска."""
+        folder = self.smart_folders.get(item.data(Qt.UserRole))
+        if folder is None:
+            return
+        
+        self._active_folder = folder
+        self.regex_check.setChecked(False)
+        self.fuzzy_check.setChecked(False)
+        # Поле поиска показывает запрос папки, но не запускает поиск
+        self.search_box.blockSignals(True)
+        self.search_box.setText(folder.query)
+        self.search_box.blockSignals(False)
+        self._cancel_search()
+        self.filter_notes(folder.query)
+    
+    def _apply_folder_results(self, folder):
+        """Применение результатов умной папки к списку заметок.
+        
+        Args:
+            folder: Умная папка (SavedSearch)
+        """
+        self._search_positions = {}
+        results = self.smart_folders.results(folder.name)
+        ranking = []
+        if self._is_relevance_sort():
+            ranking = self.search_engine.rank(folder.query, results.keys())
+        self._apply_search_results(results, ranking=ranking)
+    
+    def save_search_as_folder(self):
+        """Сохранение текущего поискового запроса как умной папки."""
+        query = self.search_box.text().strip()
+        if not query or self.regex_check.isChecked():
+            QMessageBox.information(
+                self,
+                "Умные папки",
+                "Введите запрос в поле поиска (например, tag:клиент pinned:no modified:<30d),\n"
+                "затем сохраните его как умную папку."
+            )
+            return
+        
+        name, ok = QInputDialog.getText(self, "Новая умная папка", "Название папки:", text=query)
+        if not ok or not name.strip():
+            return
+        
+        folder = self.smart_folders.add(name, query)
+        self._active_folder = folder
+        self._save_smart_folders_config()
+        self.load_smart_folders_list()
+        self.update_status(f"Умная папка «{folder.name}»: {folder.count} заметок")
+    
+    def _show_folder_menu(self, position):
+        """Контекстное меню умной папки."""
+        item = self.folders_list.itemAt(position)
+        if item is None:
+            return
+        
+        menu = QMenu(self)
+        delete_action = menu.addAction("Удалить папку")
+        if menu.exec(self.folders_list.viewport().mapToGlobal(position)) is delete_action:
+            self.delete_smart_folder(item.data(Qt.UserRole))
+    
+    def delete_smart_folder(self, name: str):
+        """Удаление умной папки (заметки не затрагиваются).
+        
+        Args:
+            name: Название папки
+        """
+        if not self.smart_folders.remove(name):
+            return
+        if self._active_folder is not None and self._active_folder.name == name:
+            self._active_folder = None
+        self._save_smart_folders_config()
+        self.load_smart_folders_list()
+    
+    def _save_smart_folders_config(self):
+        """Сохранить умные папки в config.json."""
+        import json
+        config_path = Path.home() / ".notes_app" / "config.json"
+        try:
+            config = {}
+            if config_path.exists():
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+            
+            config['smart_folders'] = self.smart_folders.to_list()
+            
+            config_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(config_path, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2, ensure_ascii=False)
+            
+            logger.info(f"Умные папки сохранены в конфиг: {len(self.smart_folders)}")
+        except Exception as e:
+            logger.error(f"Не удалось сохранить умные папки в конфиг: {e}")
+    
+    def _set_snippets_query(self, query: str):
+        """Включение фрагментов в списке для запроса (пустой запрос - выключение).
+        
+        Args:
+            query: Поисковый запрос, совпадения которого выделяются во фрагментах
+        """
+        self._snippets = {}
+        self._snippet_query = query
+        enabled = bool(query)
+        if enabled != self.result_delegate.snippets_enabled:
+            self.result_delegate.snippets_enabled = enabled
+            # Высота строк меняется - список пересчитывает раскладку
+            self.notes_list.doItemsLayout()
+        self.notes_list.viewport().update()
+    
+    def _list_snippet(self, note_id: str):
+        """Фрагмент текста заметки для строки списка (вызывается при отрисовке).
+        
+        Args:
+            note_id: ID заметки
+        
+        Returns:
+            Tuple[str, int, int]: (фрагмент, начало и конец совпадения) или None
+        """
+        if note_id in self._snippets:
+            return self._snippets[note_id]
+        
+        note = self.store.get_note(note_id)
+        snippet = None
+        if note is not None and note.body:
+            term = "" if self.regex_check.isChecked() else self.search_engine.highlight_text(self._snippet_query)
+            snippet = self.search_engine.snippet(note, self._search_positions.get(note_id), term)
+        self._snippets[note_id] = snippet
+        return snippet
+    
+    def _reorder_notes_list(self, ranking: list):
+        """Перестановка списка: лучшие по релевантности сверху, остальные в базовом порядке.
+        
+        Args:
+            ranking: ID заметок по убыванию релевантности
+        """
+        # Выбранная заметка сохраняется моделью списка
+        self.notes_model.set_ranking(ranking)
+    
     def focus_search(self):
         """Установка фокуса на поле поиска (Ctrl+F)."""
         self.search_box.setFocus()
         self.search_box.selectAll()
         logger.info("Фокус установлен на поле поиска")
     
-    def highlight_text_in_field(self, text_edit, search_text: str, scroll_to_first: bool = False):
+    def highlight_text_in_field(self, text_edit, search_text: str, scroll_to_first: bool = False,
+                                normalized: NormalizedText = None):
         """Подсветка найденного текста с использованием ExtraSelections (как в VS Code).
         
         Args:
             text_edit: QTextEdit или QLineEdit для подсветки
             search_text: Текст для поиска
             scroll_to_first: Прокручивать к первому совпадению
+            normalized: Нормализованный текст поля из кэша (если поле совпадает с заметкой)
         """
         if not search_text:
             # Очищаем подсветку если поиск пустой
@@ -1106,88 +2048,203 @@ class NotesApp(QMainWindow):
             return
         
         # Получаем текст в зависимости от типа поля
-        from PySide6.QtWidgets import QLineEdit, QTextEdit
+        from PySide6.QtWidgets import QLineEdit
         if isinstance(text_edit, QLineEdit):
             text = text_edit.text()
         else:
-            text = text_edit.toPlainText()
+            text = text_edit.plain_text()
         
         if not text:
             return
         
+        # Нормализованный текст берём из кэша, если поле не отличается от заметки
+        if normalized is None or normalized.original_length != len(text):
+            normalized = NormalizedText(text)
+        
+        # Ищем вхождения без учёта регистра и ё/е
+        needle = fold(search_text)
+        if isinstance(text_edit, QLineEdit):
+            # Для QLineEdit подсвечивается только первое вхождение
+            self.highlight_spans_in_field(text_edit, normalized.find_all(needle, limit=1))
+        else:
+            self._set_body_matches(normalized.find_matches(needle), scroll_to_first)
+            self._highlight_needle = needle
+    
+    def highlight_spans_in_field(self, text_edit, spans: list, scroll_to_first: bool = False):
+        """Подсветка совпадений по готовым позициям (например, результатам поиска по выражению).
+        
+        Args:
+            text_edit: QTextEdit или QLineEdit для подсветки
+            spans: Список позиций (начало, конец)
+            scroll_to_first: Прокручивать к первому совпадению
+        """
+        from PySide6.QtWidgets import QLineEdit
+        
         # Для QLineEdit используем встроенное выделение
         if isinstance(text_edit, QLineEdit):
-            text_lower = text.lower()
-            search_lower = search_text.lower()
-            
-            if search_lower in text_lower:
-                # Находим позицию первого совпадения
-                pos = text_lower.find(search_lower)
+            if spans:
+                start, end = spans[0]
                 # Выделяем текст (использует палитру Highlight)
-                text_edit.setSelection(pos, len(search_text))
-        else:
-            # Для QTextEdit используем ExtraSelections (не влияет на ручное выделение)
-            self.clear_search_highlights(text_edit)
-            
-            # Получаем цвет выделения поиска из темы (отличается от ручного выделения)
-            search_bg_color = QColor(self.current_theme.search_highlight)
-            search_fg_color = QColor(self.current_theme.search_highlight_text)
-            
-            # Создаём формат для подсветки поиска
-            search_format = QTextCharFormat()
-            search_format.setBackground(QBrush(search_bg_color))
-            search_format.setForeground(QBrush(search_fg_color))
-            
-            # Ищем все вхождения (регистронезависимо)
-            extra_selections = []
-            cursor = QTextCursor(text_edit.document())
-            cursor.movePosition(QTextCursor.MoveOperation.Start)
-            
-            text_lower = text.lower()
-            search_lower = search_text.lower()
-            
-            pos = 0
-            first_cursor = None
-            while True:
-                pos = text_lower.find(search_lower, pos)
-                if pos == -1:
-                    break
-                
-                # Создаём выделение для этого вхождения
-                selection_cursor = QTextCursor(text_edit.document())
-                selection_cursor.setPosition(pos)
-                selection_cursor.setPosition(pos + len(search_text), QTextCursor.MoveMode.KeepAnchor)
-                
-                # Создаём ExtraSelection
-                selection = QTextEdit.ExtraSelection()
-                selection.cursor = selection_cursor
-                selection.format = search_format
-                extra_selections.append(selection)
-                
-                # Запоминаем первое вхождение для прокрутки
-                if first_cursor is None:
-                    first_cursor = selection_cursor
-                
-                pos += len(search_text)
-            
-            # Применяем все подсветки поиска (не затрагивает ручное выделение)
-            text_edit.setExtraSelections(extra_selections)
-            self.search_highlights = extra_selections
+                text_edit.setSelection(start, end - start)
+            return
+        
+        self._set_body_matches(MatchOffsets(spans), scroll_to_first)
+        # Позиции выражения нельзя пересчитать после редактирования без повторного поиска
+        self._highlight_needle = ""
+    
+    def _set_body_matches(self, matches: MatchOffsets, scroll_to_first: bool = False):
+        """Установка совпадений поиска в тексте заметки.
+        
+        Args:
+            matches: Позиции совпадений
+            scroll_to_first: Выделить первое совпадение и прокрутить к нему
+        """
+        self._body_matches = matches if len(matches) else None
+        self._current_match = -1
+        
+        if self._body_matches is not None and scroll_to_first:
+            self._select_match(0)
+        
+        self._update_visible_highlights()
+        self._update_match_counter()
+    
+    def _update_visible_highlights(self):
+        """Подсветка совпадений только в видимой области текста (с запасом)."""
+        matches = self._body_matches
+        if matches is None:
+            self.body_edit.setExtraSelections([])
+            self.search_highlights = []
+            return
+        
+        # Диапазон символов, попадающих в видимую область
+        viewport = self.body_edit.viewport()
+        # (пока документ размечается, углы области могут давать позиции в обратном порядке)
+        first, last = sorted((
+            self.body_edit.cursorForPosition(QPoint(0, 0)).position(),
+            self.body_edit.cursorForPosition(QPoint(viewport.width(), viewport.height())).position()
+        ))
+        indices = matches.between(max(0, first - self.highlight_margin), last + self.highlight_margin)
+        indices = indices[:self.max_visible_highlights]
+        
+        # Получаем цвет выделения поиска из темы (отличается от ручного выделения)
+        search_format = QTextCharFormat()
+        search_format.setBackground(QBrush(QColor(self.current_theme.search_highlight)))
+        search_format.setForeground(QBrush(QColor(self.current_theme.search_highlight_text)))
+        
+        document = self.body_edit.document()
+        # Позиции могли устареть после редактирования - не выходим за конец текста
+        length = document.characterCount() - 1
+        
+        extra_selections = []
+        for index in indices:
+            start, end = matches[index]
+            if end > length:
+                break
+            selection_cursor = QTextCursor(document)
+            selection_cursor.setPosition(start)
+            selection_cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
             
-            # Прокручиваем к первому найденному вхождению
-            if scroll_to_first and first_cursor:
-                text_edit.setTextCursor(first_cursor)
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = selection_cursor
+            selection.format = search_format
+            extra_selections.append(selection)
+        
+        # Применяем подсветки поиска (не затрагивает ручное выделение)
+        self.body_edit.setExtraSelections(extra_selections)
+        self.search_highlights = extra_selections
+    
+    def _select_match(self, index: int):
+        """Выделение совпадения в тексте и прокрутка к нему."""
+        start, end = self._body_matches[index]
+        if end > self.body_edit.document().characterCount() - 1:
+            # Совпадение в ещё не загруженной части большой заметки
+            self.body_edit.finish_loading()
+        length = self.body_edit.document().characterCount() - 1
+        if end > length:
+            return
+        self._current_match = index
+        cursor = QTextCursor(self.body_edit.document())
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        self.body_edit.setTextCursor(cursor)
+    
+    def _update_match_counter(self):
+        """Обновление счётчика совпадений ("17 из 3 412") и кнопок навигации."""
+        matches = self._body_matches
+        visible = matches is not None
+        self.match_label.setVisible(visible)
+        self.btn_prev_match.setVisible(visible)
+        self.btn_next_match.setVisible(visible)
+        if not visible:
+            return
+        
+        total = f"{len(matches):,}".replace(",", "\u00a0")
+        if self._current_match >= 0:
+            current = f"{self._current_match + 1:,}".replace(",", "\u00a0")
+            self.match_label.setText(f"{current} из {total}")
+        else:
+            self.match_label.setText(f"Совпадений: {total}")
+    
+    def goto_next_match(self):
+        """Переход к следующему совпадению в тексте (F3)."""
+        self._goto_match(1)
+    
+    def goto_previous_match(self):
+        """Переход к предыдущему совпадению в тексте (Shift+F3)."""
+        self._goto_match(-1)
+    
+    def _goto_match(self, step: int):
+        """Переход к совпадению относительно текущего (без создания всех выделений).
+        
+        Args:
+            step: 1 - следующее, -1 - предыдущее
+        """
+        matches = self._body_matches
+        if matches is None:
+            return
+        
+        if self._current_match >= 0:
+            index = (self._current_match + step) % len(matches)
+        else:
+            # Без текущего совпадения начинаем от позиции курсора
+            index = matches.index_at_or_after(self.body_edit.textCursor().position())
+            if step < 0:
+                index -= 1
+            index %= len(matches)
+        
+        self._select_match(index)
+        self._update_match_counter()
+        self.highlight_timer.start()
+    
+    def _refresh_body_matches(self):
+        """Пересчёт позиций совпадений после редактирования текста."""
+        if self._body_matches is None:
+            return
+        if not self._highlight_needle:
+            self.clear_search_highlights(self.body_edit)
+            return
+        
+        current = self._current_match
+        matches = NormalizedText(self.body_edit.plain_text()).find_matches(self._highlight_needle)
+        self._body_matches = matches if len(matches) else None
+        self._current_match = min(current, len(matches) - 1)
+        self._update_visible_highlights()
+        self._update_match_counter()
     
     def clear_search_highlights(self, text_edit):
         """Очистка подсветки поиска без влияния на ручное выделение.
         
         Args:
-            text_edit: QTextEdit для очистки
+            text_edit: QTextEdit или QPlainTextEdit для очистки
         """
-        from PySide6.QtWidgets import QTextEdit
-        if isinstance(text_edit, QTextEdit):
+        if isinstance(text_edit, (QTextEdit, QPlainTextEdit)):
             text_edit.setExtraSelections([])
             self.search_highlights = []
+            if text_edit is self.body_edit:
+                self._body_matches = None
+                self._current_match = -1
+                self._highlight_needle = ""
+                self._update_match_counter()
     
     def on_note_selected(self, item):
         """Обработчик выбора заметки из списка."""
@@ -1200,6 +2257,9 @@ class NotesApp(QMainWindow):
         except RuntimeError:
             # Item был удален
             return
+        if not note_id:
+            # Строка исчезла при обновлении списка
+            return
         
         # Проверка несохраненных изменений
         if self.has_unsaved_changes:
@@ -1224,9 +2284,16 @@ class NotesApp(QMainWindow):
         self.autosave_timer.stop()
         
         note = self.store.get_note(note_id)
+        if note is None:
+            placeholder = self.notes_model.placeholder(note_id)
+            if placeholder is not None:
+                self._show_placeholder(placeholder)
+                return
         
         if note:
             self.current_note_id = note_id
+            self._placeholder_id = None
+            self._set_editor_read_only(False)
             
             # Блокируем сигналы, чтобы избежать пометки как "измененное"
             self.title_edit.blockSignals(True)
@@ -1236,7 +2303,10 @@ class NotesApp(QMainWindow):
             self.title_edit.setText(note.title)
             # Устанавливаем курсор в начало для длинных заголовков
             self.title_edit.setCursorPosition(0)
-            self.body_edit.setText(note.body)
+            # Документ недавно открытой заметки берётся из кэша поля вместе с историей отмены
+            self.body_edit.show_note(note_id, note.body)
+            # Совпадения поиска предыдущей заметки больше не действительны
+            self.clear_search_highlights(self.body_edit)
             # Конвертируем список тегов в строку через запятую
             self.tags_edit.setText(", ".join(note.tags))
             
@@ -1258,24 +2328,113 @@ class NotesApp(QMainWindow):
             self.has_unsaved_changes = False
             self.update_status(f"Заметка загружена: {note.title}")
             self.update_note_info()
+            self._schedule_prefetch()
+            
+            # Применяем подсветку совпадений с выражением по позициям из результатов поиска
+            positions = self._search_positions.get(note_id)
+            if self.regex_check.isChecked() and positions is not None:
+                self.title_edit.blockSignals(True)
+                self.body_edit.blockSignals(True)
+                self.tags_edit.blockSignals(True)
+                
+                self.highlight_spans_in_field(self.title_edit, positions.get(MATCH_TITLE, []))
+                self.highlight_spans_in_field(self.body_edit, positions.get(MATCH_BODY, []), scroll_to_first=True)
+                self.highlight_spans_in_field(self.tags_edit, positions.get(MATCH_TAGS, []))
+                
+                self.title_edit.blockSignals(False)
+                self.body_edit.blockSignals(False)
+                self.tags_edit.blockSignals(False)
+                return
             
             # Применяем подсветку текста, если есть активный поиск
-            search_text = self.search_box.text().strip()
+            search_text = ""
+            if not self.regex_check.isChecked():
+                search_text = self.search_engine.highlight_text(self.search_box.text())
             if search_text:
                 # Блокируем сигналы при применении подсветки
                 self.title_edit.blockSignals(True)
                 self.body_edit.blockSignals(True)
                 self.tags_edit.blockSignals(True)
                 
-                # Подсвечиваем во всех полях
-                self.highlight_text_in_field(self.title_edit, search_text, scroll_to_first=False)
-                self.highlight_text_in_field(self.body_edit, search_text, scroll_to_first=True)
+                # Подсвечиваем во всех полях (нормализованный текст заметки - из общего кэша)
+                texts = self.search_engine.texts.get(note)
+                self.highlight_text_in_field(self.title_edit, search_text, scroll_to_first=False,
+                                             normalized=texts.title)
+                self.highlight_text_in_field(self.body_edit, search_text, scroll_to_first=True,
+                                             normalized=texts.body)
                 self.highlight_text_in_field(self.tags_edit, search_text, scroll_to_first=False)
                 
                 self.title_edit.blockSignals(False)
                 self.body_edit.blockSignals(False)
                 self.tags_edit.blockSignals(False)
     
+    def _show_placeholder(self, note: Note):
+        """Заметка снимка списка до загрузки хранилища: заголовок без возможности правки.
+        
+        Args:
+            note: Заметка снимка (без текста)
+        """
+        self.clear_editor()
+        self._placeholder_id = note.id
+        self._set_editor_read_only(True)
+        self.title_edit.blockSignals(True)
+        self.title_edit.setText(note.title)
+        self.title_edit.setCursorPosition(0)
+        self.title_edit.blockSignals(False)
+        self.update_status(f"Заметка загружается: {note.title}")
+    
+    def _set_editor_read_only(self, read_only: bool):
+        """Запрет правки полей заметки (заметка ещё не загружена)."""
+        self.title_edit.setReadOnly(read_only)
+        self.body_edit.setReadOnly(read_only)
+        self.tags_edit.setReadOnly(read_only)
+    
+    def _schedule_prefetch(self):
+        """Подготовка в простое заметок, которые вероятно откроют следующими.
+        
+        Соседние с текущей заметкой строки списка (переход стрелками) и первые
+        результаты поиска получают документ редактора, а при активном поиске -
+        нормализованный текст и совпадения для подсветки. Прежняя очередь
+        подготовки отменяется.
+        """
+        note_ids = []
+        row = self.notes_model.row_of(self.current_note_id) if self.current_note_id else -1
+        if row >= 0:
+            note_ids += [self.notes_model.note_id(row + 1), self.notes_model.note_id(row - 1)]
+        if self.search_box.text().strip() or self._selected_tags():
+            # Первые три результата поиска
+            note_ids += [self.notes_model.note_id(i) for i in range(3)]
+        
+        needle = ""
+        if not self.regex_check.isChecked():
+            needle = fold(self.search_engine.highlight_text(self.search_box.text()))
+        
+        seen = {self.current_note_id, None}
+        jobs = []
+        for note_id in note_ids:
+            if note_id not in seen:
+                seen.add(note_id)
+                jobs.append(self._prefetch_note(note_id, needle))
+        self.prefetcher.schedule(jobs)
+    
+    def _prefetch_note(self, note_id: str, needle: str):
+        """Задание подготовки заметки (генератор шагов для IdlePrefetcher).
+        
+        Args:
+            note_id: ID заметки
+            needle: Нормализованный текст поиска для подсветки (пустой - без подсветки)
+        """
+        note = self.store.get_note(note_id)
+        if note is None or note.deleted:
+            return
+        if needle:
+            # Нормализованный текст нужен при открытии только для подсветки найденного
+            texts = self.search_engine.texts.get(note)
+            yield
+            texts.body.find_matches(needle)
+            yield
+        yield from self.body_edit.prepare(note_id, note.body)
+    
     def create_new_note(self):
         """Создание новой заметки."""
         # Проверка несохраненных изменений
@@ -1298,11 +2457,10 @@ class NotesApp(QMainWindow):
             self.store.add_note(new_note)
             logger.info("Создана новая заметка: %s", new_note.id[:8])
             
-            # Обновляем список
-            self.load_notes_list()
-            
+            # Строка заметки добавлена в список по событию хранилища
             # Загружаем новую заметку в редактор
             self.load_note(new_note.id)
+            self.notes_list.select_note(new_note.id)
             
             # Ставим фокус на заголовок
             self.title_edit.selectAll()
@@ -1326,7 +2484,7 @@ class NotesApp(QMainWindow):
         
         try:
             title = self.title_edit.text()
-            body = self.body_edit.toPlainText()
+            body = self.body_edit.plain_text()
             # Парсим теги из текста (разделитель - запятая)
             tags_text = self.tags_edit.text()
             tags = [tag.strip() for tag in tags_text.split(",") if tag.strip()]
@@ -1335,18 +2493,15 @@ class NotesApp(QMainWindow):
             success = self.store.update_note(self.current_note_id, title=title, body=body, tags=tags)
             
             if success:
+                # Следующее сохранение без правок не извлекает текст из документа заново
+                self.body_edit.mark_saved(body)
                 self.has_unsaved_changes = False
                 self.btn_save.setEnabled(False)
-                self.load_notes_list()
                 self.update_status("Заметка сохранена")
                 logger.info("Заметка сохранена: %s", self.current_note_id[:8])
                 
-                # Автоматически выбираем обновленную заметку в списке
-                for i in range(self.notes_list.count()):
-                    item = self.notes_list.item(i)
-                    if item.data(Qt.UserRole) == self.current_note_id:
-                        self.notes_list.setCurrentItem(item)
-                        break
+                # Строка заметки перемещена по событию хранилища, выбираем её в списке
+                self.notes_list.select_note(self.current_note_id)
         
         except Exception as e:
             logger.error("Ошибка при сохранении заметки: %s", e)
@@ -1363,18 +2518,27 @@ class NotesApp(QMainWindow):
         
         try:
             title = self.title_edit.text()
-            body = self.body_edit.toPlainText()
+            body = self.body_edit.plain_text()
             # Парсим теги из текста (разделитель - запятая)
             tags_text = self.tags_edit.text()
             tags = [tag.strip() for tag in tags_text.split(",") if tag.strip()]
             
+            # Правки отменены или совпадают с сохранённым текстом - сохранять нечего
+            note = self.store.get_note(self.current_note_id)
+            if note is not None and content_hash(title, body, tags, note.pinned) == note.content_hash:
+                self.body_edit.mark_saved(body)
+                self.has_unsaved_changes = False
+                self.btn_save.setEnabled(False)
+                return
+            
             # Обновляем заметку
             success = self.store.update_note(self.current_note_id, title=title, body=body, tags=tags)
             
             if success:
+                # Следующее сохранение без правок не извлекает текст из документа заново
+                self.body_edit.mark_saved(body)
                 self.has_unsaved_changes = False
                 self.btn_save.setEnabled(False)
-                self.load_notes_list()
                 
                 # Получаем текущее время для отображения
                 from datetime import datetime
@@ -1382,12 +2546,8 @@ class NotesApp(QMainWindow):
                 self.update_status(f"💾 Автоматически сохранено в {current_time}")
                 logger.info("Заметка автоматически сохранена: %s", self.current_note_id[:8])
                 
-                # Автоматически выбираем обновленную заметку в списке
-                for i in range(self.notes_list.count()):
-                    item = self.notes_list.item(i)
-                    if item.data(Qt.UserRole) == self.current_note_id:
-                        self.notes_list.setCurrentItem(item)
-                        break
+                # Строка заметки перемещена по событию хранилища, выбираем её в списке
+                self.notes_list.select_note(self.current_note_id)
         
         except Exception as e:
             logger.error("Ошибка при автосохранении заметки: %s", e)
@@ -1421,31 +2581,9 @@ class NotesApp(QMainWindow):
                     self.update_status(f"Заметка удалена: {note_title}")
                     logger.info("Заметка удалена: %s", note_id[:8])
                     
-                    # Очищаем редактор
-                    self.current_note_id = None
-                    
-                    # Блокируем сигналы при очистке
-                    self.title_edit.blockSignals(True)
-                    self.body_edit.blockSignals(True)
-                    self.tags_edit.blockSignals(True)
-                    
-                    self.title_edit.clear()
-                    self.body_edit.clear()
-                    self.tags_edit.clear()
-                    
-                    # Разблокируем сигналы
-                    self.title_edit.blockSignals(False)
-                    self.body_edit.blockSignals(False)
-                    self.tags_edit.blockSignals(False)
-                    
-                    self.btn_save.setEnabled(False)
-                    self.btn_delete.setEnabled(False)
-                    self.btn_pin.setEnabled(False)
-                    self.has_unsaved_changes = False
-                    self.note_info_label.setText("")
-                    
-                    # Обновляем список
-                    self.load_notes_list()
+                    # Строка заметки удалена из списка по событию хранилища
+                    self.clear_editor()
+                    self.body_edit.revalidate(self._note_text, [note_id])
             
             except Exception as e:
                 logger.error("Ошибка при удалении заметки: %s", e)
@@ -1455,6 +2593,32 @@ class NotesApp(QMainWindow):
                     f"Не удалось удалить заметку:\n{e}"
                 )
     
+    def clear_editor(self):
+        """Очистка редактора (текущая заметка удалена или не выбрана)."""
+        self.current_note_id = None
+        self._placeholder_id = None
+        self._set_editor_read_only(False)
+        
+        # Блокируем сигналы при очистке
+        self.title_edit.blockSignals(True)
+        self.body_edit.blockSignals(True)
+        self.tags_edit.blockSignals(True)
+        
+        self.title_edit.clear()
+        self.body_edit.show_note(None, "")
+        self.tags_edit.clear()
+        
+        # Разблокируем сигналы
+        self.title_edit.blockSignals(False)
+        self.body_edit.blockSignals(False)
+        self.tags_edit.blockSignals(False)
+        
+        self.btn_save.setEnabled(False)
+        self.btn_delete.setEnabled(False)
+        self.btn_pin.setEnabled(False)
+        self.has_unsaved_changes = False
+        self.note_info_label.setText("")
+    
     def toggle_pin(self):
         """Закрепление/открепление текущей заметки."""
         if not self.current_note_id:
@@ -1466,15 +2630,9 @@ class NotesApp(QMainWindow):
             logger.error("Заметка не найдена: %s", self.current_note_id)
             return
         
-        # Меняем состояние закрепления
-        note.pinned = not note.pinned
-        
-        # Обновляем версию и время модификации
-        note.version += 1
-        note.last_modified = datetime.now(timezone.utc).isoformat()
-        
-        # Сохраняем
-        self.store.save()
+        # Меняем состояние закрепления (версия и время изменения обновляются хранилищем,
+        # строка перемещается по новой сортировке по событию хранилища)
+        self.store.set_pinned(self.current_note_id, not note.pinned)
         
         # Обновляем UI
         if note.pinned:
@@ -1485,9 +2643,6 @@ class NotesApp(QMainWindow):
             self.btn_pin.setText("Закрепить")
             self.update_status(f"Заметка откреплена: {note.title}")
             logger.info("Заметка откреплена: %s", self.current_note_id[:8])
-        
-        # Обновляем список с новой сортировкой
-        self.load_notes_list()
     
     def on_text_changed(self):
         """Обработчик изменения текста в редакторе."""
@@ -1501,16 +2656,16 @@ class NotesApp(QMainWindow):
                 
                 # Создаем новую заметку с текущим содержимым
                 title = self.title_edit.text() or "Новая заметка"
-                body = self.body_edit.toPlainText()
+                body = self.body_edit.plain_text()
                 tags_text = self.tags_edit.text()
                 tags = [tag.strip() for tag in tags_text.split(",") if tag.strip()]
                 
                 new_note = Note(title=title, body=body, tags=tags)
                 self.store.add_note(new_note)
+                self.body_edit.mark_saved(body)
                 self.current_note_id = new_note.id
-                
-                # Обновляем список
-                self.load_notes_list()
+                # Строка заметки добавлена в список по событию хранилища
+                self.notes_list.select_note(new_note.id)
                 
                 # Разблокируем сигналы
                 self.title_edit.blockSignals(False)
@@ -1530,6 +2685,11 @@ class NotesApp(QMainWindow):
         
         self.has_unsaved_changes = True
         self.btn_save.setEnabled(True)
+        
+        # Позиции совпадений поиска устарели - пересчитываем с задержкой
+        if self._body_matches is not None:
+            self.body_matches_timer.start()
+        
         self.update_status("Есть несохраненные изменения")
         self.update_note_info()
         
@@ -1548,18 +2708,13 @@ class NotesApp(QMainWindow):
         self.update_statistics()
     
     def update_statistics(self):
-        """Обновление счетчиков статистики."""
-        all_notes = self.store.get_all_notes()
-        
-        total = len(all_notes)
-        active = len([n for n in all_notes if not n.deleted])
-        pinned = len([n for n in all_notes if not n.deleted and n.pinned])
-        deleted = len([n for n in all_notes if n.deleted])
+        """Обновление счетчиков статистики (счётчики хранилища, без перебора заметок)."""
+        stats = self.store.get_stats()
         
-        # Формируем текст статистики
-        stats_text = f"Всего: {total} | Активных: {active} | Закреплено: {pinned}"
-        if deleted > 0:
-            stats_text += f" | Удалено: {deleted}"
+        # Формируем текст статистики (всего - включая удалённые, ожидающие синхронизации)
+        stats_text = f"Всего: {stats.total} | Активных: {stats.active} | Закреплено: {stats.pinned}"
+        if stats.tombstones > 0:
+            stats_text += f" | Удалено: {stats.tombstones}"
         
         self.statistics_label.setText(stats_text)
     
@@ -1574,25 +2729,14 @@ class NotesApp(QMainWindow):
             self.note_info_label.setText("")
             return
         
-        # Подсчет символов и слов
-        char_count = len(note.body)
-        word_count = len(note.body.split()) if note.body.strip() else 0
+        # Счётчики текста в поле (включая несохранённые правки)
+        char_count = self.body_edit.counter.chars()
+        word_count = self.body_edit.counter.words()
         
-        # Форматирование даты создания
-        try:
-            created_date = datetime.fromisoformat(note.last_modified.replace('Z', '+00:00'))
-            date_str = created_date.strftime("%d %B %Y")
-            # Перевод месяцев на русский
-            months_ru = {
-                'January': 'января', 'February': 'февраля', 'March': 'марта',
-                'April': 'апреля', 'May': 'мая', 'June': 'июня',
-                'July': 'июля', 'August': 'августа', 'September': 'сентября',
-                'October': 'октября', 'November': 'ноября', 'December': 'декабря'
-            }
-            for en, ru in months_ru.items():
-                date_str = date_str.replace(en, ru)
-        except:
-            date_str = "неизвестно"
+        # Дата форматируется один раз для версии заметки
+        if self._note_date is None or self._note_date[:2] != (note.id, note.version):
+            self._note_date = (note.id, note.version, self._format_note_date(note.last_modified))
+        date_str = self._note_date[2]
         
         # Форматирование чисел с запятыми
         char_formatted = f"{char_count:,}".replace(',', ' ')
@@ -1601,6 +2745,26 @@ class NotesApp(QMainWindow):
         info_text = f"Текущая заметка: {char_formatted} символов, {word_formatted} слов | Дата изменения: {date_str}"
         self.note_info_label.setText(info_text)
     
+    def _format_note_date(self, last_modified: str) -> str:
+        """
+        Форматирование даты изменения заметки ("05 марта 2024").
+        
+        Args:
+            last_modified: Время изменения в формате ISO
+            
+        Returns:
+            str: Дата с названием месяца в родительном падеже
+        """
+        months_ru = (
+            'января', 'февраля', 'марта', 'апреля', 'мая', 'июня',
+            'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря'
+        )
+        try:
+            modified = datetime.fromisoformat(last_modified.replace('Z', '+00:00'))
+        except (ValueError, AttributeError):
+            return "неизвестно"
+        return f"{modified.day:02d} {months_ru[modified.month - 1]} {modified.year}"
+    
     def on_sort_changed(self, index):
         """Обработчик изменения режима сортировки."""
         logger.info("Изменена сортировка: %s", self.sort_combo.currentText())
@@ -1608,6 +2772,9 @@ class NotesApp(QMainWindow):
     
     def closeEvent(self, event):
         """Обработчик закрытия окна."""
+        self._cancel_search()
+        self.search_engine.close()
+        
         if self.has_unsaved_changes:
             reply = QMessageBox.question(
                 self,
@@ -1625,6 +2792,21 @@ class NotesApp(QMainWindow):
                 event.ignore()
         else:
             event.accept()
+        
+        if event.isAccepted():
+            # Фоновые задачи останавливаются в ближайшей безопасной точке
+            self.prefetcher.cancel()
+            self.task_manager.cancel_all()
+            self.task_manager.wait(5000)
+            if not self.store.loaded:
+                # Фоновая загрузка не завершилась: хранилище дочитывается здесь,
+                # иначе отложенное сохранение новых заметок не выполнится
+                try:
+                    self.store.load()
+                except Exception as e:
+                    logger.error("Ошибка при загрузке хранилища перед выходом: %s", e)
+            # Снимок списка для мгновенного показа окна при следующем запуске
+            self.store.save_list_snapshot()
     
     def setup_sync_path(self):
         """Настройка пути к облачной папке синхронизации."""
@@ -1681,25 +2863,29 @@ class NotesApp(QMainWindow):
         if self.has_unsaved_changes and self.current_note_id:
             self.save_current_note()
 
-        # Запускаем фоновый поток синхронизации
+        # Запускаем фоновую задачу синхронизации
         self._sync_in_progress = True
         self._is_manual_sync = True  # Помечаем как ручную синхронизацию
         self.update_status("Синхронизация...")
         self.btn_sync.setEnabled(False)
         self.btn_sync_settings.setEnabled(False)
+        self._start_sync_task("Синхронизация")
 
-        def worker():
-            try:
-                logger.info("Фоновая синхронизация запущена")
-                success, synced_count, conflict_count = self.sync_manager.sync()
-                # Передаём результат в главный поток через сигнал
-                self.sync_signals.completed.emit(success, synced_count, conflict_count)
-            except Exception as e:
-                logger.error("Ошибка в фоновом потоке синхронизации: %s", e)
-                self.sync_signals.error.emit(e)
-
-        thread = threading.Thread(target=worker, daemon=True)
-        thread.start()
+    def _start_sync_task(self, title: str):
+        """Запуск синхронизации в фоне (результат - в _on_sync_complete)."""
+        def sync(token):
+            logger.info("Фоновая синхронизация запущена")
+            result = self.sync_manager.sync(token=token)
+            if not result[0]:
+                token.check()
+            return result
+        
+        self.task_manager.submit(
+            TASK_SYNC, title, sync,
+            on_finished=lambda result: self._on_sync_complete(*result),
+            on_failed=self._on_sync_error,
+            on_cancelled=self._on_sync_cancelled
+        )
 
     def _on_sync_complete(self, success: bool, synced_count: int, conflict_count: int):
         """Обработчик завершения синхронизации (главный поток)."""
@@ -1715,8 +2901,10 @@ class NotesApp(QMainWindow):
         
         try:
             if success:
-                # Перезагружаем список и текущую заметку (если открыта)
-                self.load_notes_list(reload_current_note=True)
+                # Список обновлён построчно по событиям хранилища (разница синхронизации),
+                # перезагружаем текущую заметку (если открыта)
+                if self.current_note_id and self.store.get_note(self.current_note_id):
+                    self.load_note(self.current_note_id)
                 
                 if is_manual:
                     # Ручная синхронизация - показываем модальные окна
@@ -1754,7 +2942,15 @@ class NotesApp(QMainWindow):
         except Exception as e:
             logger.error("Ошибка в обработчике завершения синхронизации: %s", e)
 
-    def _on_sync_error(self, error: Exception):
+    def _on_sync_cancelled(self):
+        """Синхронизация отменена до изменения хранилища (главный поток)."""
+        self.update_status("Синхронизация отменена")
+        self._sync_in_progress = False
+        self._is_manual_sync = False
+        self.btn_sync.setEnabled(True)
+        self.btn_sync_settings.setEnabled(True)
+    
+    def _on_sync_error(self, error: str):
         """Обработчик ошибок синхронизации (главный поток)."""
         self.update_status("Ошибка синхронизации")
         QMessageBox.critical(self, "Ошибка", f"Произошла ошибка при синхронизации:\n{error}")
@@ -1798,20 +2994,7 @@ class NotesApp(QMainWindow):
         self._sync_in_progress = True
         self._is_manual_sync = False  # Помечаем как автосинхронизацию
         self.update_status("🔄 Автосинхронизация...")
-        
-        def worker():
-            try:
-                logger.info("Автосинхронизация запущена")
-                success, synced_count, conflict_count = self.sync_manager.sync()
-                # Передаём результат в главный поток через тот же сигнал
-                self.sync_signals.completed.emit(success, synced_count, conflict_count)
-            except Exception as e:
-                logger.error("Ошибка в фоновом потоке автосинхронизации: %s", e)
-                self.sync_signals.error.emit(e)
-        
-        thread = threading.Thread(target=worker, daemon=True)
-        thread.start()
-
+        self._start_sync_task("Автосинхронизация")
 
 def main():
     """Точка входа для запуска GUI приложения."""
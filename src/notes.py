@@ -3,12 +3,13 @@
 Содержит классы Note и NoteStore для управления заметками.
 """
 
+import hashlib
 import json
 import uuid
 import logging
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 # Настройка логирования
 logging.basicConfig(
@@ -21,6 +22,40 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# События изменения хранилища (передаются подписчикам NoteStore)
+NOTE_ADDED = "add"
+NOTE_UPDATED = "update"
+NOTE_DELETED = "delete"    # Заметка помечена удалённой (tombstone)
+NOTE_PURGED = "purge"      # Tombstone физически удалён
+STORE_RESET = "reset"      # Содержимое хранилища заменено целиком (загрузка, синхронизация)
+
+
+def content_hash(title: str, body: str, tags: List[str], pinned: bool) -> str:
+    """
+    Хэш содержимого заметки (заголовок, текст, теги, закрепление).
+    
+    Версия, время изменения и флаг удаления в хэш не входят: по нему
+    определяется, изменилось ли то, что видит пользователь.
+    
+    Args:
+        title: Заголовок
+        body: Текст
+        tags: Теги
+        pinned: Флаг закрепления
+        
+    Returns:
+        str: Хэш в шестнадцатеричном виде
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    # Разделитель \0 не встречается в полях ввода, поля не склеиваются
+    digest.update(title.encode("utf-8", "surrogatepass"))
+    digest.update(b"\0")
+    digest.update(body.encode("utf-8", "surrogatepass"))
+    digest.update(b"\0")
+    digest.update("\x1f".join(tags).encode("utf-8", "surrogatepass"))
+    digest.update(b"\0\1" if pinned else b"\0\0")
+    return digest.hexdigest()
+
 
 class Note:
     """
@@ -66,6 +101,29 @@ class Note:
         self.deleted = deleted
         self.tags = tags or []
         self.pinned = pinned
+        # Кэш хэша содержимого: (заголовок, текст, теги, закрепление, хэш)
+        self._hash_cache = None
+    
+    @property
+    def content_hash(self) -> str:
+        """
+        Хэш содержимого заметки (см. content_hash()).
+        
+        Вычисляется один раз для текущих значений полей: кэш проверяется по
+        тождеству строк заголовка и текста, поэтому повторный запрос не
+        перечитывает текст заметки.
+        
+        Returns:
+            str: Хэш в шестнадцатеричном виде
+        """
+        tags = tuple(self.tags)
+        cached = self._hash_cache
+        if (cached is not None and cached[0] is self.title and cached[1] is self.body
+                and cached[2] == tags and cached[3] == self.pinned):
+            return cached[4]
+        value = content_hash(self.title, self.body, self.tags, self.pinned)
+        self._hash_cache = (self.title, self.body, tags, self.pinned, value)
+        return value
     
     def validate(self) -> bool:
         """
@@ -159,6 +217,61 @@ class Note:
         return f"Note(id={self.id[:8]}..., title='{self.title}', version={self.version})"
 
 
+def _same_note(a: Note, b: Note) -> bool:
+    """Совпадают ли версии заметки (для определения изменений при синхронизации)."""
+    if a is b:
+        return True
+    return (
+        (a.version, a.last_modified, a.deleted, a.pinned, a.title, a.body, a.tags)
+        == (b.version, b.last_modified, b.deleted, b.pinned, b.title, b.body, b.tags)
+    )
+
+
+def _body_size(body: str) -> Tuple[int, int]:
+    """Размер текста заметки: (байт в UTF-8, слов)."""
+    return len(body.encode("utf-8")), len(body.split())
+
+
+class StoreStats:
+    """
+    Счётчики хранилища (поддерживаются при каждом изменении).
+    
+    Атрибуты:
+        total (int): Всего записей, включая tombstones
+        active (int): Активных заметок
+        pinned (int): Закреплённых активных заметок
+        tombstones (int): Удалённых заметок (tombstones)
+        body_bytes (int): Суммарный размер текста активных заметок в байтах UTF-8
+        words (int): Суммарное количество слов в тексте активных заметок
+    """
+    
+    __slots__ = ("total", "active", "pinned", "tombstones", "body_bytes", "words")
+    
+    def __init__(self):
+        self.total = 0
+        self.active = 0
+        self.pinned = 0
+        self.tombstones = 0
+        self.body_bytes = 0
+        self.words = 0
+    
+    def copy(self) -> 'StoreStats':
+        """Снимок счётчиков."""
+        snapshot = StoreStats()
+        for name in self.__slots__:
+            setattr(snapshot, name, getattr(self, name))
+        return snapshot
+    
+    def __eq__(self, other) -> bool:
+        return isinstance(other, StoreStats) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+    
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)}" for name in self.__slots__)
+        return f"StoreStats({fields})"
+
+
 class NoteStore:
     """
     Класс для управления коллекцией заметок и их хранением.
@@ -168,12 +281,17 @@ class NoteStore:
         notes (Dict[str, Note]): Словарь заметок (ключ - ID заметки)
     """
     
-    def __init__(self, storage_path: Optional[str] = None):
+    # Файл хранилища больше этого размера загружается в фоне (см. NotesApp)
+    BACKGROUND_LOAD_BYTES = 1_000_000
+    
+    def __init__(self, storage_path: Optional[str] = None, load: bool = True):
         """
         Инициализация хранилища заметок.
         
         Args:
             storage_path: Путь к файлу хранения (если None, используется ~/.notes_app/notes.json)
+            load: Загрузить заметки сразу; False - хранилище пусто до load()
+                или read_notes() в фоновом потоке и finish_loading()
         """
         if storage_path is None:
             # Используем домашнюю директорию пользователя
@@ -186,7 +304,95 @@ class NoteStore:
             self.storage_path.parent.mkdir(parents=True, exist_ok=True)
         
         self.notes: Dict[str, Note] = {}
-        self.load()
+        self._listeners: List[Callable[[str, List[str]], None]] = []
+        # Счётчики статистики и размеры текста учтённых активных заметок {ID: (байт, слов)}
+        self._stats = StoreStats()
+        self._sizes: Dict[str, Tuple[int, int]] = {}
+        # Поколение хранилища: увеличивается при каждом изменении (для кэшей результатов)
+        self.generation = 0
+        # Снимок списка заметок для показа окна до загрузки хранилища
+        self.snapshot_path = self.storage_path.with_name("list_snapshot.json")
+        # Заметки файла загружены; до этого сохранение откладывается
+        self.loaded = False
+        self._save_pending = False
+        if load:
+            self.load()
+    
+    def add_listener(self, callback: Callable[[str, List[str]], None]) -> None:
+        """
+        Подписка на изменения хранилища.
+        
+        Обработчик вызывается в потоке, выполнившем изменение
+        (при синхронизации - в фоновом потоке).
+        
+        Args:
+            callback: Функция callback(event, note_ids), где event - одно из
+                NOTE_ADDED, NOTE_UPDATED, NOTE_DELETED, NOTE_PURGED, STORE_RESET
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+    
+    def remove_listener(self, callback: Callable[[str, List[str]], None]) -> None:
+        """
+        Отписка от изменений хранилища.
+        
+        Args:
+            callback: Ранее добавленный обработчик
+        """
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _notify(self, event: str, note_ids: List[str]) -> None:
+        """
+        Оповещение подписчиков об изменении.
+        
+        Args:
+            event: Тип события
+            note_ids: ID затронутых заметок (для STORE_RESET - все ID)
+        """
+        self.generation += 1
+        for callback in list(self._listeners):
+            try:
+                callback(event, note_ids)
+            except Exception as e:
+                logger.error("Ошибка в обработчике события %s: %s", event, e)
+    
+    def _count(self, note: Note, sign: int = 1) -> None:
+        """
+        Учёт заметки в счётчиках (sign=-1 - исключение прежнего состояния).
+        
+        Исключать заметку нужно до её изменения, учитывать - после.
+        """
+        stats = self._stats
+        stats.total += sign
+        if note.deleted:
+            stats.tombstones += sign
+            return
+        stats.active += sign
+        if note.pinned:
+            stats.pinned += sign
+        if sign > 0:
+            size = self._sizes[note.id] = _body_size(note.body)
+        else:
+            size = self._sizes.pop(note.id, (0, 0))
+        stats.body_bytes += sign * size[0]
+        stats.words += sign * size[1]
+    
+    def _recount(self) -> None:
+        """Пересчёт счётчиков по всем заметкам (после замены содержимого)."""
+        self._stats = StoreStats()
+        self._sizes = {}
+        for note in self.notes.values():
+            self._count(note)
+    
+    def get_stats(self) -> StoreStats:
+        """
+        Статистика хранилища за O(1): счётчики поддерживаются при изменениях.
+        
+        Returns:
+            StoreStats: Снимок счётчиков
+        """
+        return self._stats.copy()
     
     def add_note(self, note: Note) -> None:
         """
@@ -201,9 +407,25 @@ class NoteStore:
         if not note.validate():
             raise ValueError("Некорректные данные заметки")
         
+        previous = self.notes.get(note.id)
+        if previous is not None:
+            self._count(previous, -1)
         self.notes[note.id] = note
+        self._count(note)
         logger.info("Добавлена заметка: %s", note.id[:8])
         self.save()
+        self._notify(NOTE_ADDED, [note.id])
+    
+    @staticmethod
+    def _changes_content(note: Note, title: Optional[str], body: Optional[str], tags: Optional[List[str]]) -> bool:
+        """Изменит ли обновление содержимое заметки (сравнение хэшей содержимого)."""
+        new_hash = content_hash(
+            note.title if title is None else title,
+            note.body if body is None else body,
+            note.tags if tags is None else tags,
+            note.pinned
+        )
+        return new_hash != note.content_hash
     
     def update_note(self, note_id: str, title: Optional[str] = None, body: Optional[str] = None, tags: Optional[List[str]] = None) -> bool:
         """
@@ -217,13 +439,128 @@ class NoteStore:
             
         Returns:
             bool: True если заметка обновлена, False если заметка не найдена
+            
+        Если содержимое не изменилось (совпадает хэш), версия не увеличивается,
+        хранилище не сохраняется и подписчики не уведомляются.
         """
         if note_id in self.notes:
-            self.notes[note_id].update(title=title, body=body, tags=tags)
+            note = self.notes[note_id]
+            if not self._changes_content(note, title, body, tags):
+                return True
+            self._count(note, -1)
+            note.update(title=title, body=body, tags=tags)
+            self._count(note)
             self.save()
+            self._notify(NOTE_UPDATED, [note_id])
             return True
         return False
     
+    def update_notes(self, changes: Dict[str, Dict[str, Optional[str]]]) -> List[str]:
+        """
+        Пакетное обновление нескольких заметок: одно сохранение и одно событие.
+        
+        Версия каждой изменённой заметки увеличивается ровно один раз;
+        заметки с неизменившимся содержимым пропускаются.
+        
+        Args:
+            changes: {ID заметки: {"title": ..., "body": ..., "tags": ...}} (поля опциональны)
+            
+        Returns:
+            List[str]: ID обновлённых заметок (несуществующие и удалённые пропускаются)
+        """
+        updated = []
+        for note_id, fields in changes.items():
+            note = self.notes.get(note_id)
+            if note is None or note.deleted:
+                continue
+            if not self._changes_content(note, fields.get("title"), fields.get("body"), fields.get("tags")):
+                continue
+            self._count(note, -1)
+            note.update(title=fields.get("title"), body=fields.get("body"), tags=fields.get("tags"))
+            self._count(note)
+            updated.append(note_id)
+        
+        if updated:
+            self.save()
+            self._notify(NOTE_UPDATED, updated)
+            logger.info("Пакетно обновлено заметок: %d", len(updated))
+        return updated
+    
+    def set_pinned(self, note_id: str, pinned: bool) -> bool:
+        """
+        Закрепление/открепление заметки.
+        
+        Args:
+            note_id: ID заметки
+            pinned: Новое состояние закрепления
+            
+        Returns:
+            bool: True если заметка обновлена, False если заметка не найдена
+        """
+        note = self.notes.get(note_id)
+        if note is None:
+            return False
+        if note.pinned == pinned:
+            return True
+        
+        self._count(note, -1)
+        note.pinned = pinned
+        note.last_modified = datetime.now(timezone.utc).isoformat()
+        note.version += 1
+        self._count(note)
+        self.save()
+        self._notify(NOTE_UPDATED, [note_id])
+        return True
+    
+    def replace_notes(self, notes: Dict[str, Note]) -> None:
+        """
+        Замена всего содержимого хранилища (результат синхронизации).
+        
+        Сохранение на диск не выполняется - вызывающий код сам вызывает save().
+        
+        Args:
+            notes: Новый словарь заметок (включая tombstones)
+        """
+        self.notes = notes
+        self._recount()
+        self._notify(STORE_RESET, list(notes.keys()))
+    
+    def sync_notes(self, notes: Dict[str, Note]) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Замена содержимого хранилища результатом синхронизации.
+        
+        В отличие от replace_notes() подписчики получают только разницу:
+        NOTE_ADDED для новых заметок, NOTE_UPDATED для изменённых и NOTE_PURGED
+        для исчезнувших, поэтому индексы обновляются только по изменениям.
+        Сохранение на диск не выполняется - вызывающий код сам вызывает save().
+        
+        Args:
+            notes: Новый словарь заметок (включая tombstones)
+            
+        Returns:
+            Tuple[List[str], List[str], List[str]]: ID добавленных, изменённых и удалённых заметок
+        """
+        old_notes = self.notes
+        added = [note_id for note_id in notes if note_id not in old_notes]
+        updated = [
+            note_id for note_id, note in notes.items()
+            if note_id in old_notes and not _same_note(old_notes[note_id], note)
+        ]
+        purged = [note_id for note_id in old_notes if note_id not in notes]
+        
+        # Счётчики обновляются только по разнице
+        for note_id in updated + purged:
+            self._count(old_notes[note_id], -1)
+        for note_id in added + updated:
+            self._count(notes[note_id])
+        self.notes = notes
+        for event, note_ids in ((NOTE_ADDED, added), (NOTE_UPDATED, updated), (NOTE_PURGED, purged)):
+            if note_ids:
+                self._notify(event, note_ids)
+        logger.info("Синхронизация хранилища: добавлено %d, изменено %d, удалено %d",
+                    len(added), len(updated), len(purged))
+        return added, updated, purged
+    
     def delete_note(self, note_id: str) -> bool:
         """
         Мягкое удаление заметки (установка флага deleted для синхронизации).
@@ -236,10 +573,13 @@ class NoteStore:
         """
         if note_id in self.notes:
             # Устанавливаем флаг deleted вместо физического удаления
+            self._count(self.notes[note_id], -1)
             self.notes[note_id].deleted = True
             self.notes[note_id].last_modified = datetime.now(timezone.utc).isoformat()
             self.notes[note_id].version += 1
+            self._count(self.notes[note_id])
             self.save()
+            self._notify(NOTE_DELETED, [note_id])
             logger.info("Заметка помечена удалённой (tombstone): %s", note_id[:8])
             return True
         
@@ -258,6 +598,7 @@ class NoteStore:
         """
         now = datetime.now(timezone.utc)
         deleted_count = 0
+        purged_ids = []
         
         for note_id in list(self.notes.keys()):
             note = self.notes[note_id]
@@ -267,14 +608,17 @@ class NoteStore:
                     age_days = (now - modified_time).days
                     
                     if age_days > older_than_days:
+                        self._count(note, -1)
                         del self.notes[note_id]
                         deleted_count += 1
+                        purged_ids.append(note_id)
                         logger.info("Tombstone физически удалён: %s (возраст: %d дней)", note_id[:8], age_days)
                 except Exception as e:
                     logger.error("Ошибка при очистке tombstone %s: %s", note_id[:8], e)
         
         if deleted_count > 0:
             self.save()
+            self._notify(NOTE_PURGED, purged_ids)
             logger.info("Очищено tombstones: %d", deleted_count)
         
         return deleted_count
@@ -328,6 +672,10 @@ class NoteStore:
         Raises:
             IOError: Если не удалось сохранить файл
         """
+        if not self.loaded:
+            # Запись без заметок файла потеряла бы их: сохранение после загрузки
+            self._save_pending = True
+            return
         try:
             data = {
                 "notes": {note_id: note.to_dict() for note_id, note in self.notes.items()},
@@ -353,29 +701,62 @@ class NoteStore:
             logger.error("Неожиданная ошибка при сохранении: %s", e)
             raise
     
-    def load(self) -> None:
+    def read_notes(self) -> Optional[Dict[str, Note]]:
         """
-        Загрузка заметок из JSON файла с обработкой ошибок.
+        Чтение заметок из файла без изменения хранилища.
+        
+        Может выполняться в фоновом потоке, результат применяется
+        в потоке хранилища через finish_loading().
+        
+        Returns:
+            Optional[Dict[str, Note]]: Заметки по ID (None, если файла нет)
         
         Raises:
+            json.JSONDecodeError: Если файл повреждён
             IOError: Если не удалось прочитать файл
         """
         if not self.storage_path.exists():
-            # Файл не существует, создаем пустое хранилище
-            logger.info("Файл заметок не найден, создается новый")
-            self.notes = {}
+            return None
+        with open(self.storage_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        notes_data = data.get("notes", {})
+        return {note_id: Note.from_dict(note_data)
+                for note_id, note_data in notes_data.items()}
+    
+    def finish_loading(self, notes: Optional[Dict[str, Note]]) -> None:
+        """
+        Применение заметок, прочитанных из файла.
+        
+        Заметки, добавленные до окончания загрузки, сохраняются вместе
+        с прочитанными, отложенное сохранение выполняется.
+        
+        Args:
+            notes: Результат read_notes() (None - файла нет, создаётся новый)
+        """
+        added = self.notes if not self.loaded else {}
+        self.notes = dict(notes) if notes is not None else {}
+        self.notes.update(added)
+        self.loaded = True
+        self._recount()
+        if notes is None or self._save_pending:
+            self._save_pending = False
             self.save()
-            return
+        self._notify(STORE_RESET, list(self.notes.keys()))
+    
+    def load(self) -> None:
+        """
+        Загрузка заметок из JSON файла с обработкой ошибок.
         
+        Raises:
+            IOError: Если не удалось прочитать файл
+        """
         try:
-            with open(self.storage_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            notes_data = data.get("notes", {})
-            self.notes = {note_id: Note.from_dict(note_data) 
-                         for note_id, note_data in notes_data.items()}
-            
-            logger.info("Загружено заметок: %d", len(self.notes))
+            notes = self.read_notes()
+            if notes is None:
+                # Файл не существует, создаем пустое хранилище
+                logger.info("Файл заметок не найден, создается новый")
+            else:
+                logger.info("Загружено заметок: %d", len(notes))
         
         except json.JSONDecodeError as e:
             logger.error("Ошибка при разборе JSON: %s", e)
@@ -387,19 +768,57 @@ class NoteStore:
                 logger.warning("Резервная копия сохранена: %s", backup_path)
             except Exception as backup_error:
                 logger.error("Не удалось создать резервную копию: %s", backup_error)
-            
-            self.notes = {}
-            self.save()
+            notes = None
         
         except (IOError, OSError) as e:
             logger.error("Ошибка при чтении файла: %s", e)
             self.notes = {}
+            self._recount()
             raise IOError(f"Не удалось загрузить заметки: {e}") from e
         
         except Exception as e:
             logger.error("Неожиданная ошибка при загрузке: %s", e)
             self.notes = {}
+            self._recount()
             raise
+        
+        self.finish_loading(notes)
+    
+    def save_list_snapshot(self) -> None:
+        """
+        Сохранение снимка списка: ID, заголовки, закрепление и время изменения
+        активных заметок (без текста) для показа окна при следующем запуске.
+        """
+        if not self.loaded:
+            return
+        entries = [
+            {"id": note.id, "title": note.title, "last_modified": note.last_modified, "pinned": note.pinned}
+            for note in self.get_all_notes()
+        ]
+        try:
+            temp_path = self.snapshot_path.with_suffix('.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"notes": entries}, f, ensure_ascii=False)
+            temp_path.replace(self.snapshot_path)
+        except (IOError, OSError) as e:
+            logger.error("Не удалось сохранить снимок списка заметок: %s", e)
+    
+    def load_list_snapshot(self) -> List[Note]:
+        """
+        Заметки снимка списка предыдущего сеанса (без текста и тегов).
+        
+        Returns:
+            List[Note]: Заметки снимка (пустой список, если снимка нет или он повреждён)
+        """
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f).get("notes", [])
+            return [Note.from_dict(entry) for entry in entries]
+        except FileNotFoundError:
+            return []
+        except (IOError, OSError, ValueError, AttributeError) as e:
+            logger.warning("Снимок списка заметок не прочитан: %s", e)
+            return []
     
     def __len__(self) -> int:
         """Количество заметок в хранилище."""
@@ -0,0 +1,387 @@
+"""
+Модель списка заметок для QListView.
+Модель хранит только упорядоченный массив ID, текст строки (обрезанный
+заголовок, индикатор закрепления или тип совпадения) вычисляется в data()
+при отрисовке, то есть лишь для видимых строк. Фильтр поиска применяется
+заменой массива ID видимых строк, без создания объектов для каждой заметки,
+а изменения отдельных заметок - перемещением, вставкой или удалением строки.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+from PySide6.QtWidgets import QListView
+
+try:
+    from notes import Note, NoteStore
+    from search import MATCH_TITLE, MATCH_TAGS, MATCH_FILTER
+except ImportError:
+    from .notes import Note, NoteStore
+    from .search import MATCH_TITLE, MATCH_TAGS, MATCH_FILTER
+
+# Максимальная длина текста строки списка
+TITLE_LIMIT = 50
+
+
+def _truncate(title: str) -> str:
+    if len(title) > TITLE_LIMIT:
+        return title[:TITLE_LIMIT - 3] + "..."
+    return title
+
+
+def format_list_title(note: Note, match: Optional[str] = None) -> str:
+    """
+    Текст строки списка для заметки.
+
+    Args:
+        note: Заметка
+        match: Тип совпадения поиска (None - поиска нет)
+
+    Returns:
+        str: Обрезанный заголовок с индикатором закрепления или типа совпадения
+    """
+    title = note.title or "(Без заголовка)"
+    if match is None or match == MATCH_FILTER:
+        # Без поиска (или найдено только по фильтрам) - индикатор закрепления
+        return _truncate("📌 " + title if note.pinned else title)
+    if match == MATCH_TITLE:
+        return f"📌 {_truncate(title)}"
+    if match == MATCH_TAGS:
+        return f"🏷️ {_truncate(title)}"
+    return f"📄 {_truncate(title)}"
+
+
+class NotesListModel(QAbstractListModel):
+    """
+    Модель списка заметок над массивом ID.
+
+    Базовый порядок - ID, отсортированные по ключу сортировки (ключи
+    запоминаются), поэтому изменение одной заметки переставляет, обновляет
+    или удаляет одну строку с поиском позиции двоичным поиском. Порядок по
+    релевантности и фильтр поиска заменяют массив видимых строк целиком.
+
+    До загрузки хранилища строки строятся по заметкам снимка списка
+    (load(..., placeholders=True)): их заголовки берутся из снимка.
+
+    Атрибуты:
+        store (NoteStore): Хранилище заметок (источник заголовков)
+    """
+
+    # Пакет изменений больше этого размера применяется полной перестройкой списка
+    REBUILD_THRESHOLD = 500
+
+    def __init__(self, store: NoteStore, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._sort_key: Callable[[Note], Any] = lambda note: note.last_modified
+        self._reverse = False
+        # Базовый порядок заметок и ключи сортировки, по которым он построен
+        self._base: List[str] = []
+        self._keys: Dict[str, Any] = {}
+        # Лучшие по релевантности заметки (показываются первыми) и итоговый порядок
+        self._ranking: List[str] = []
+        self._display: Optional[List[str]] = None
+        # Видимые строки (подмножество порядка отображения в том же порядке)
+        self._ids: List[str] = []
+        # Типы совпадений {ID: тип} (None - фильтра нет, видны все заметки)
+        self._matches: Optional[Dict[str, str]] = None
+        # Номера строк по ID (только для порядка по релевантности, строятся при обращении)
+        self._rows: Optional[Dict[str, int]] = None
+        # Заметки снимка списка, ещё не загруженные в хранилище {ID: заметка без текста}
+        self._placeholders: Dict[str, Note] = {}
+
+    # --- QAbstractListModel ---
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._ids)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._ids):
+            return None
+        note_id = self._ids[index.row()]
+        if role == Qt.UserRole:
+            return note_id
+        if role == Qt.DisplayRole:
+            return self.display_text(note_id)
+        if role == Qt.ToolTipRole:
+            note = self._note(note_id)
+            return (note.title or "(Без заголовка)") if note is not None else None
+        return None
+
+    # --- Содержимое ---
+
+    def _note(self, note_id: str) -> Optional[Note]:
+        """Заметка строки: из хранилища или, до его загрузки, из снимка списка."""
+        note = self.store.get_note(note_id)
+        if note is None:
+            note = self._placeholders.get(note_id)
+        return note
+
+    def placeholder(self, note_id: str) -> Optional[Note]:
+        """Заметка снимка списка, ещё не загруженная в хранилище (None - строка не из снимка)."""
+        if self.store.get_note(note_id) is not None:
+            return None
+        return self._placeholders.get(note_id)
+
+    def display_text(self, note_id: str) -> str:
+        """Текст строки заметки с учётом текущего фильтра поиска."""
+        note = self._note(note_id)
+        if note is None:
+            return ""
+        match = self._matches.get(note_id) if self._matches is not None else None
+        return format_list_title(note, match)
+
+    def _is_visible(self, note_id: str) -> bool:
+        return self._matches is None or note_id in self._matches
+
+    def _swap(self) -> None:
+        """Пересчёт порядка отображения и видимых строк (сброс модели)."""
+        self.beginResetModel()
+        if self._ranking:
+            ranked = [note_id for note_id in self._ranking if note_id in self._keys]
+            ranked_ids = set(ranked)
+            self._display = ranked + [note_id for note_id in self._base if note_id not in ranked_ids]
+        else:
+            self._display = None
+        order = self.order()
+        if self._matches is None:
+            self._ids = list(order)
+        else:
+            matches = self._matches
+            self._ids = [note_id for note_id in order if note_id in matches]
+        self._rows = None
+        self.endResetModel()
+
+    def load(self, notes: Iterable[Note], sort_key: Callable[[Note], Any], reverse: bool = False,
+             placeholders: bool = False) -> None:
+        """
+        Загрузка заметок в базовом порядке (текущий фильтр сохраняется).
+
+        Args:
+            notes: Активные заметки
+            sort_key: Ключ сортировки заметки
+            reverse: Сортировка по убыванию ключа
+            placeholders: Заметки - строки снимка списка, ещё не загруженные в хранилище
+        """
+        notes = list(notes)
+        self._placeholders = {note.id: note for note in notes} if placeholders else {}
+        self._sort_key = sort_key
+        self._reverse = reverse
+        self._keys = {note.id: sort_key(note) for note in notes}
+        self._base = sorted(self._keys, key=self._keys.__getitem__, reverse=reverse)
+        self._swap()
+
+    def set_ranking(self, note_ids: Iterable[str]) -> None:
+        """
+        Порядок по релевантности: заметки из списка первыми, остальные в базовом порядке.
+
+        Args:
+            note_ids: ID заметок по убыванию релевантности (пустой список - базовый порядок)
+        """
+        ranking = list(dict.fromkeys(note_ids))
+        if not ranking and not self._ranking:
+            return
+        self._ranking = ranking
+        self._swap()
+
+    def set_filter(self, matches: Optional[Dict[str, str]]) -> None:
+        """
+        Фильтр поиска: видимыми остаются заметки из результатов.
+
+        Args:
+            matches: Словарь {ID заметки: тип совпадения} (None - показать все)
+        """
+        if matches is None and self._matches is None:
+            return
+        self._matches = dict(matches) if matches is not None else None
+        self._swap()
+
+    def order(self) -> List[str]:
+        """ID всех заметок списка в порядке отображения (включая скрытые фильтром)."""
+        return self._display if self._display is not None else self._base
+
+    def note_id(self, row: int) -> Optional[str]:
+        """ID заметки в видимой строке (None для несуществующей строки)."""
+        if 0 <= row < len(self._ids):
+            return self._ids[row]
+        return None
+
+    # --- Двоичный поиск по ключам сортировки ---
+
+    def _bisect(self, ids: List[str], key, right: bool = True) -> int:
+        """Позиция вставки ключа в массив ID, упорядоченный по ключам."""
+        keys = self._keys
+        reverse = self._reverse
+        low, high = 0, len(ids)
+        while low < high:
+            middle = (low + high) // 2
+            other = keys[ids[middle]]
+            if reverse:
+                before = other > key or (right and other == key)
+            else:
+                before = other < key or (right and other == key)
+            if before:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _find(self, ids: List[str], note_id: str) -> int:
+        """Позиция ID в массиве, упорядоченном по ключам (-1, если ID нет)."""
+        keys = self._keys
+        if note_id not in keys:
+            return -1
+        key = keys[note_id]
+        for position in range(self._bisect(ids, key, right=False), len(ids)):
+            if ids[position] == note_id:
+                return position
+            if keys[ids[position]] != key:
+                break
+        return -1
+
+    def row_of(self, note_id: str) -> int:
+        """Номер видимой строки заметки (-1, если заметка скрыта или отсутствует)."""
+        if self._display is None:
+            return self._find(self._ids, note_id)
+        if self._rows is None:
+            self._rows = {note_id: row for row, note_id in enumerate(self._ids)}
+        return self._rows.get(note_id, -1)
+
+    def index_of(self, note_id: str) -> QModelIndex:
+        """Индекс строки заметки (недействительный, если строка не видна)."""
+        row = self.row_of(note_id)
+        return self.index(row, 0) if row >= 0 else QModelIndex()
+
+    # --- Инкрементальные изменения ---
+
+    def refresh(self, note_ids: Iterable[str]) -> None:
+        """Перерисовка строк заметок (заголовок или закрепление изменились)."""
+        for note_id in note_ids:
+            row = self.row_of(note_id)
+            if row >= 0:
+                index = self.index(row, 0)
+                self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.ToolTipRole])
+
+    def update_notes(self, note_ids: List[str]) -> None:
+        """
+        Применение изменений заметок из хранилища к списку.
+
+        Изменённая заметка перемещается на позицию по новому ключу (или только
+        перерисовывается), удалённая убирается, новая вставляется. Выбранная
+        строка и прокрутка сохраняются. Видимость строк определяется текущим
+        фильтром до следующего применения результатов поиска.
+
+        Args:
+            note_ids: ID добавленных, изменённых или удалённых заметок
+        """
+        if len(note_ids) > self.REBUILD_THRESHOLD:
+            self.load(self.store.get_all_notes(), self._sort_key, self._reverse)
+            return
+        if self._display is not None:
+            # Порядок по релевантности пересчитывается целиком (до нового поиска)
+            for note_id in note_ids:
+                self._update_base(note_id, self._active_note(note_id))
+            self._swap()
+            return
+        for note_id in note_ids:
+            self._update_row(note_id)
+
+    def _active_note(self, note_id: str) -> Optional[Note]:
+        note = self._note(note_id)
+        return note if note is not None and not note.deleted else None
+
+    def _update_base(self, note_id: str, note: Optional[Note]) -> None:
+        """Перемещение ID в базовом порядке по новому ключу (None - удаление)."""
+        if note_id in self._keys:
+            del self._base[self._find(self._base, note_id)]
+            del self._keys[note_id]
+        if note is not None:
+            key = self._sort_key(note)
+            self._base.insert(self._bisect(self._base, key), note_id)
+            self._keys[note_id] = key
+
+    def _update_row(self, note_id: str) -> None:
+        """Изменение одной строки: перемещение, перерисовка, удаление или вставка."""
+        note = self._active_note(note_id)
+        if note is not None and note_id in self._keys and self._keys[note_id] == self._sort_key(note):
+            self.refresh([note_id])
+            return
+
+        old_row = self._find(self._ids, note_id)
+        self._update_base(note_id, note)
+        parent = QModelIndex()
+
+        if note is None:
+            if old_row >= 0:
+                self.beginRemoveRows(parent, old_row, old_row)
+                del self._ids[old_row]
+                self.endRemoveRows()
+            return
+        if not self._is_visible(note_id):
+            return
+
+        if old_row < 0:
+            row = self._bisect(self._ids, self._keys[note_id])
+            self.beginInsertRows(parent, row, row)
+            self._ids.insert(row, note_id)
+            self.endInsertRows()
+            return
+
+        # Новая позиция определяется без самой строки
+        del self._ids[old_row]
+        row = self._bisect(self._ids, self._keys[note_id])
+        self._ids.insert(old_row, note_id)
+        if row != old_row:
+            self.beginMoveRows(parent, old_row, old_row, parent, row + 1 if row > old_row else row)
+            del self._ids[old_row]
+            self._ids.insert(row, note_id)
+            self.endMoveRows()
+        index = self.index(row, 0)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.ToolTipRole])
+
+
+class NotesListView(QListView):
+    """
+    Список заметок с однородной высотой строк.
+
+    Выбранная заметка сохраняется при замене массива строк (в том числе
+    скрытая фильтром - до возвращения её строки).
+    """
+
+    def __init__(self, model: NotesListModel, parent=None):
+        super().__init__(parent)
+        self.setUniformItemSizes(True)
+        self.setModel(model)
+        self._selected_id: Optional[str] = None
+        model.modelAboutToBeReset.connect(self._remember_selection)
+        model.modelReset.connect(self._restore_selection)
+
+    def _remember_selection(self):
+        note_id = self.currentIndex().data(Qt.UserRole)
+        if note_id is not None:
+            self._selected_id = note_id
+
+    def _restore_selection(self):
+        # Заметка, скрытая фильтром, снова выбирается, когда строка вернётся
+        if self._selected_id is not None and self.select_note(self._selected_id):
+            self._selected_id = None
+
+    def select_note(self, note_id: str) -> bool:
+        """
+        Выбор строки заметки.
+
+        Args:
+            note_id: ID заметки
+
+        Returns:
+            bool: True, если строка видна и выбрана
+        """
+        index = self.model().index_of(note_id)
+        if not index.isValid():
+            return False
+        self.setCurrentIndex(index)
+        return True
+
+    def current_note_id(self) -> Optional[str]:
+        """ID выбранной заметки (None, если ничего не выбрано)."""
+        return self.currentIndex().data(Qt.UserRole)
@@ -0,0 +1,79 @@
+"""
+Подготовка данных заметок в простое интерфейса.
+
+Пока пользователь читает заметку, в свободное время потока интерфейса
+заранее готовятся документы редактора, нормализованный текст для поиска
+и подсветка найденного для заметок, которые вероятно откроют следующими
+(соседние в списке и первые результаты поиска). Работа разбита на короткие
+шаги с ограничением времени, поэтому ввод и перерисовка не задерживаются.
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Iterable, Iterator
+
+from PySide6.QtCore import QObject, QTimer
+
+logger = logging.getLogger(__name__)
+
+
+class IdlePrefetcher(QObject):
+    """
+    Выполнение фоновых заданий подготовки небольшими порциями.
+
+    Задание - генератор, выполняющий один короткий шаг между yield.
+    За один проход цикла событий выполняются шаги, пока не истечёт
+    FRAME_BUDGET, затем управление возвращается циклу событий, и
+    ожидающие события ввода обрабатываются раньше следующей порции.
+    """
+
+    # Время работы за одну порцию (секунды)
+    FRAME_BUDGET = 0.004
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._jobs: deque = deque()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._run)
+
+    def schedule(self, jobs: Iterable[Iterator[None]]) -> None:
+        """
+        Замена очереди заданий (прежние задания отменяются).
+
+        Args:
+            jobs: Генераторы заданий в порядке важности
+        """
+        self.cancel()
+        self._jobs.extend(jobs)
+        if self._jobs:
+            self._timer.start()
+
+    def cancel(self) -> None:
+        """Отмена всех заданий."""
+        self._timer.stop()
+        while self._jobs:
+            self._jobs.popleft().close()
+
+    def pending(self) -> int:
+        """Количество незавершённых заданий."""
+        return len(self._jobs)
+
+    def _run(self) -> None:
+        """Выполнение шагов заданий в пределах FRAME_BUDGET."""
+        deadline = time.perf_counter() + self.FRAME_BUDGET
+        while self._jobs:
+            job = self._jobs[0]
+            try:
+                next(job)
+            except StopIteration:
+                self._jobs.popleft()
+            except Exception as e:
+                logger.error("Ошибка подготовки заметки: %s", e)
+                self._jobs.popleft()
+            if time.perf_counter() >= deadline:
+                break
+        if self._jobs:
+            self._timer.start()
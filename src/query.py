@@ -0,0 +1,506 @@
+"""
+Модуль языка поисковых запросов.
+Разбирает запросы вида `tag:работа -черновик "точная фраза" OR pinned:yes`
+в план, который выполняется по индексам SearchIndex.
+
+Синтаксис:
+    слово              - слово встречается в заголовке, тегах или тексте
+    "точная фраза"     - фраза встречается целиком
+    -слово             - исключение (работает для любого условия)
+    tag:работа         - заметки с тегом
+    pinned:yes / no    - закреплённые / незакреплённые заметки
+    modified:>2025-01-01, modified:<30d  - дата изменения (абсолютная или возраст)
+    size:>10k          - размер текста в символах (k = 1024, m = 1024*1024)
+    A OR B             - объединение групп условий (условия внутри группы - И)
+"""
+
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    from notes import Note
+    from search_index import (
+        SearchIndex, ATTR_MODIFIED, ATTR_SIZE, FIELD_TITLE, FIELD_TAGS, FIELD_BODY, note_attributes,
+        is_single_word
+    )
+    from text_cache import TextCache, NormalizedNote, fold
+except ImportError:
+    from .notes import Note
+    from .search_index import (
+        SearchIndex, ATTR_MODIFIED, ATTR_SIZE, FIELD_TITLE, FIELD_TAGS, FIELD_BODY, note_attributes,
+        is_single_word
+    )
+    from .text_cache import TextCache, NormalizedNote, fold
+
+logger = logging.getLogger(__name__)
+
+# Виды условий запроса
+CLAUSE_TEXT = "text"
+CLAUSE_TAG = "tag"
+CLAUSE_PINNED = "pinned"
+CLAUSE_MODIFIED = "modified"
+CLAUSE_SIZE = "size"
+
+# Тип совпадения для заметок, найденных только по фильтрам (без текста)
+MATCH_FILTER = "filter"
+
+_TOKEN_RE = re.compile(r'(-?)(?:(\w+):)?(?:"([^"]*)"?|(\S+))')
+_STRUCTURED_RE = re.compile(r'"|(?:^|\s)-\S|(?:^|\s)(?:tag|pinned|modified|size):\S|\sOR\s')
+_COMPARE_RE = re.compile(r'^(>=|<=|>|<|=)?(.+)$')
+_AGE_RE = re.compile(r'^(\d+)([hdwmy])$')
+_SIZE_RE = re.compile(r'^(\d+(?:\.\d+)?)([km]?)$')
+_WORD_RE = re.compile(r'\w+')
+
+_AGE_UNITS = {'h': 3600, 'd': 86400, 'w': 7 * 86400, 'm': 30 * 86400, 'y': 365 * 86400}
+_SIZE_UNITS = {'': 1, 'k': 1024, 'm': 1024 * 1024}
+_YES = {'yes', 'true', '1', 'да'}
+_NO = {'no', 'false', '0', 'нет'}
+_DAY = 86400
+
+# Приоритет полей при определении типа совпадения
+_FIELD_PRIORITY = {FIELD_TITLE: 0, FIELD_TAGS: 1, FIELD_BODY: 2}
+
+# Через сколько проверенных заметок проверяется отмена
+_CANCEL_CHECK_INTERVAL = 2000
+
+
+class Clause:
+    """
+    Условие запроса.
+
+    Атрибуты:
+        kind (str): Вид условия (CLAUSE_TEXT, CLAUSE_TAG, ...)
+        value: Значение (текст, тег, bool или интервал (low, high))
+        negated (bool): Условие-исключение
+    """
+
+    def __init__(self, kind: str, value, negated: bool = False):
+        self.kind = kind
+        self.value = value
+        self.negated = negated
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, Clause) and self.kind == other.kind
+                and self.value == other.value and self.negated == other.negated)
+
+    def __repr__(self) -> str:
+        sign = "-" if self.negated else ""
+        return f"Clause({sign}{self.kind}={self.value!r})"
+
+
+class QueryPlan:
+    """
+    Разобранный запрос: объединение (OR) групп условий, связанных через И.
+
+    Атрибуты:
+        groups (List[List[Clause]]): Группы условий
+        word_form (Optional[str]): Слово простого запроса, другие формы которого
+            тоже совпадают (как в строке поиска); None - только подстрока
+    """
+
+    def __init__(self, groups: List[List[Clause]], word_form: Optional[str] = None):
+        self.groups = groups
+        self.word_form = word_form
+
+    def text_terms(self) -> List[str]:
+        """Положительные текстовые условия (для ранжирования и подсветки)."""
+        return [clause.value for group in self.groups for clause in group
+                if clause.kind == CLAUSE_TEXT and not clause.negated]
+
+    def __repr__(self) -> str:
+        return f"QueryPlan({self.groups!r})"
+
+
+def is_structured(query: str) -> bool:
+    """
+    Содержит ли запрос синтаксис языка запросов.
+
+    Простые запросы без фильтров, кавычек, исключений и OR
+    обрабатываются обычным поиском подстроки.
+
+    Args:
+        query: Поисковый запрос
+
+    Returns:
+        bool: True, если запрос нужно разбирать как структурированный
+    """
+    return bool(_STRUCTURED_RE.search(query.strip()))
+
+
+def _parse_interval(op: str, low: float, high: float) -> Tuple[Optional[float], Optional[float]]:
+    """Полуинтервал [low, high) для сравнения со значением, занимающим [low, high)."""
+    if op == '>':
+        return high, None
+    if op == '>=':
+        return low, None
+    if op == '<':
+        return None, low
+    if op == '<=':
+        return None, high
+    return low, high
+
+
+def _parse_modified(raw: str, now: float) -> Optional[Tuple[Optional[float], Optional[float]]]:
+    """Разбор условия modified: абсолютная дата (YYYY-MM-DD) или возраст (30d, 2w, 6h)."""
+    match = _COMPARE_RE.match(raw)
+    if not match:
+        return None
+    op, value = match.group(1) or '=', match.group(2).lower()
+
+    age = _AGE_RE.match(value)
+    if age:
+        # Возраст: "<30d" - изменена менее 30 дней назад, т.е. позже границы
+        boundary = now - int(age.group(1)) * _AGE_UNITS[age.group(2)]
+        if op in ('<', '<=', '='):
+            return boundary, None
+        return None, boundary
+
+    try:
+        day = datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+    return _parse_interval(op, day, day + _DAY)
+
+
+def _parse_size(raw: str) -> Optional[Tuple[Optional[float], Optional[float]]]:
+    """Разбор условия size: число символов с необязательным суффиксом k/m."""
+    match = _COMPARE_RE.match(raw)
+    if not match:
+        return None
+    op, value = match.group(1) or '=', match.group(2).lower()
+
+    size = _SIZE_RE.match(value)
+    if not size:
+        return None
+    chars = int(float(size.group(1)) * _SIZE_UNITS[size.group(2)])
+    return _parse_interval(op, chars, chars + 1)
+
+
+def _parse_clause(field: Optional[str], value: str, negated: bool, now: float) -> Optional[Clause]:
+    """Разбор одного условия (некорректный фильтр трактуется как текст)."""
+    if field is not None:
+        key = field.lower()
+        if key == CLAUSE_TAG and value:
+            return Clause(CLAUSE_TAG, fold(value), negated)
+        if key == CLAUSE_PINNED and value.lower() in _YES | _NO:
+            return Clause(CLAUSE_PINNED, value.lower() in _YES, negated)
+        if key == CLAUSE_MODIFIED:
+            interval = _parse_modified(value, now)
+            if interval is not None:
+                return Clause(CLAUSE_MODIFIED, interval, negated)
+        if key == CLAUSE_SIZE:
+            interval = _parse_size(value)
+            if interval is not None:
+                return Clause(CLAUSE_SIZE, interval, negated)
+        value = f"{field}:{value}"
+
+    value = fold(value)
+    if not value:
+        return None
+    return Clause(CLAUSE_TEXT, value, negated)
+
+
+def parse_query(query: str, now: Optional[float] = None) -> QueryPlan:
+    """
+    Разбор запроса в план.
+
+    Разбор никогда не завершается ошибкой: запрос набирается посимвольно,
+    и незаконченные фильтры (например, "modified:>20") считаются текстом.
+
+    Args:
+        query: Поисковый запрос
+        now: Текущее время (Unix timestamp) для относительных дат
+
+    Returns:
+        QueryPlan: План запроса
+    """
+    now = time.time() if now is None else now
+    groups: List[List[Clause]] = [[]]
+
+    for match in _TOKEN_RE.finditer(query):
+        negated, field, phrase, word = match.groups()
+        if phrase is None and word is None:
+            continue
+
+        if word == "OR" and not negated and field is None:
+            if groups[-1]:
+                groups.append([])
+            continue
+
+        value = phrase if phrase is not None else word
+        clause = _parse_clause(field, value, bool(negated), now)
+        if clause is not None:
+            groups[-1].append(clause)
+
+    return QueryPlan([group for group in groups if group])
+
+
+def plan_query(query: str, now: Optional[float] = None) -> QueryPlan:
+    """
+    План запроса с той же семантикой, что и у SearchEngine.
+
+    Простой запрос (без синтаксиса фильтров) ищется как одна подстрока
+    целиком, а не как набор слов: "встреча с командой" находит только
+    заметки с этой фразой. Запрос из одного слова находит и другие его формы.
+
+    Args:
+        query: Поисковый запрос
+        now: Текущее время (Unix timestamp) для относительных дат
+
+    Returns:
+        QueryPlan: План запроса
+    """
+    if is_structured(query):
+        return parse_query(query, now)
+    text = fold(query.strip())
+    if not text:
+        return QueryPlan([])
+    return QueryPlan([[Clause(CLAUSE_TEXT, text)]], word_form=text if is_single_word(text) else None)
+
+
+class QueryExecutor:
+    """
+    Выполнение плана запроса по индексам.
+
+    Для каждой группы условия упорядочиваются по избирательности: выполнение
+    начинается с самого узкого индекса (тег, закреплённые, диапазон дат/размеров,
+    списки вхождений слов), следующие множества пересекаются или проверяются
+    поштучно, а проверка полного текста выполняется последней и только
+    для оставшихся кандидатов.
+    """
+
+    # Минимальная длина начального фрагмента для отбора по подстроке термина
+    MIN_INFIX_LENGTH = 3
+
+    def __init__(self, index: SearchIndex, get_note: Callable[[str], Optional[Note]],
+                 texts: Optional[TextCache] = None):
+        """
+        Args:
+            index: Поисковый индекс
+            get_note: Функция получения заметки по ID (для проверки текста)
+            texts: Кэш нормализованных текстов (опционально)
+        """
+        self.index = index
+        self.get_note = get_note
+        self.texts = texts
+
+    def estimate(self, clause: Clause) -> int:
+        """Оценка количества заметок, удовлетворяющих положительному условию."""
+        if clause.kind == CLAUSE_TAG:
+            return len(self.index.tag_index.get(clause.value, ()))
+        if clause.kind == CLAUSE_PINNED:
+            pinned = len(self.index.pinned)
+            return pinned if clause.value else len(self.index) - pinned
+        if clause.kind in (CLAUSE_MODIFIED, CLAUSE_SIZE):
+            return self.index.range_count(self._attr(clause), *clause.value)
+        return len(self.index)
+
+    @staticmethod
+    def _attr(clause: Clause) -> str:
+        return ATTR_MODIFIED if clause.kind == CLAUSE_MODIFIED else ATTR_SIZE
+
+    def materialize(self, clause: Clause) -> Set[str]:
+        """Множество заметок, удовлетворяющих условию (без учёта отрицания)."""
+        if clause.kind == CLAUSE_TAG:
+            return self.index.tag_ids(clause.value)
+        if clause.kind == CLAUSE_PINNED:
+            pinned = self.index.pinned_ids()
+            return pinned if clause.value else self.index.all_ids() - pinned
+        return self.index.range_ids(self._attr(clause), *clause.value)
+
+    def check(self, clause: Clause, note_id: str) -> bool:
+        """Проверка индексируемого условия для одной заметки (без учёта отрицания)."""
+        if clause.kind == CLAUSE_TAG:
+            return note_id in self.index.tag_index.get(clause.value, ())
+        if clause.kind == CLAUSE_PINNED:
+            return (note_id in self.index.pinned) == clause.value
+        value = self.index.attribute(self._attr(clause), note_id)
+        if value is None:
+            return False
+        low, high = clause.value
+        return (low is None or value >= low) and (high is None or value < high)
+
+    def match_text(self, note: Note, text: str) -> Optional[str]:
+        """Поле, в котором встречается нормализованный текст (заголовок > теги > текст), или None."""
+        normalized = self.texts.get(note) if self.texts is not None else NormalizedNote(note)
+        if text in normalized.title:
+            return FIELD_TITLE
+        if any(text in tag for tag in normalized.tags):
+            return FIELD_TAGS
+        if text in normalized.body:
+            return FIELD_BODY
+        return None
+
+    def _text_terms(self, texts: List[str]) -> List[Tuple[int, str, bool]]:
+        """
+        Слова текстовых условий для отбора кандидатов по спискам вхождений.
+
+        Текст ищется как подстрока, поэтому начальное слово может оказаться
+        концом или серединой слова заметки ("ект" в "проекта") и отбирается
+        по подстроке термина. Остальные слова начинаются с границы слова
+        и отбираются по префиксу.
+
+        Returns:
+            List[Tuple[int, str, bool]]: (оценка, слово, поиск по подстроке)
+        """
+        terms = []
+        for text in texts:
+            for match in _WORD_RE.finditer(text):
+                word = match.group()
+                if match.start() > 0:
+                    terms.append((self.index.term_estimate(word), word, False))
+                elif len(word) >= self.MIN_INFIX_LENGTH:
+                    terms.append((self.index.infix_estimate(word), word, True))
+        return terms
+
+    def execute_group(self, group: List[Clause], token=None) -> Optional[Dict[str, str]]:
+        """
+        Выполнение группы условий, связанных через И.
+
+        Returns:
+            Optional[Dict[str, str]]: {ID заметки: тип совпадения} или None при отмене
+        """
+        filters = [c for c in group if c.kind != CLAUSE_TEXT and not c.negated]
+        excluded = [c for c in group if c.kind != CLAUSE_TEXT and c.negated]
+        texts = [c.value for c in group if c.kind == CLAUSE_TEXT and not c.negated]
+        excluded_texts = [c.value for c in group if c.kind == CLAUSE_TEXT and c.negated]
+
+        # 1. Фильтры и слова текста - в порядке избирательности, начиная с самого узкого индекса
+        steps = [(self.estimate(clause), clause) for clause in filters]
+        steps.extend((estimate, (word, infix)) for estimate, word, infix in self._text_terms(texts))
+        steps.sort(key=lambda step: step[0])
+
+        total = len(self.index)
+        candidates: Optional[Set[str]] = None
+        for estimate, step in steps:
+            if isinstance(step, Clause):
+                if candidates is None:
+                    candidates = self.materialize(step)
+                elif estimate <= len(candidates):
+                    candidates &= self.materialize(step)
+                else:
+                    candidates = {note_id for note_id in candidates if self.check(step, note_id)}
+            else:
+                # Текст всё равно проверяется на шаге 3: список вхождений
+                # нужен, только если он сужает выборку
+                if estimate >= (total if candidates is None else len(candidates)):
+                    continue
+                word, infix = step
+                ids = self.index.infix_ids(word) if infix else self.index.term_ids(word)
+                candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                break
+
+        if candidates is None:
+            candidates = self.index.all_ids()
+
+        # 2. Исключения по индексам
+        for clause in excluded:
+            if not candidates:
+                break
+            candidates = {note_id for note_id in candidates if not self.check(clause, note_id)}
+
+        # 3. Проверка полного текста - последней и только для оставшихся кандидатов
+        results: Dict[str, str] = {}
+        default_match = FIELD_TAGS if any(c.kind == CLAUSE_TAG for c in filters) else MATCH_FILTER
+        for position, note_id in enumerate(candidates):
+            if token is not None and position % _CANCEL_CHECK_INTERVAL == 0 and token.cancelled:
+                return None
+
+            if not texts and not excluded_texts:
+                results[note_id] = default_match
+                continue
+
+            note = self.get_note(note_id)
+            if note is None or note.deleted:
+                continue
+
+            fields = [self.match_text(note, text) for text in texts]
+            if None in fields:
+                continue
+            if any(self.match_text(note, text) for text in excluded_texts):
+                continue
+
+            results[note_id] = min(fields, key=_FIELD_PRIORITY.get) if fields else default_match
+
+        return results
+
+    def check_note(self, clause: Clause, note: Note) -> bool:
+        """Проверка индексируемого условия по самой заметке (без учёта отрицания и без индекса)."""
+        if clause.kind == CLAUSE_TAG:
+            return any(fold(tag) == clause.value for tag in note.tags)
+        if clause.kind == CLAUSE_PINNED:
+            return note.pinned == clause.value
+        value = note_attributes(note)[self._attr(clause)]
+        low, high = clause.value
+        return (low is None or value >= low) and (high is None or value < high)
+
+    def match_note(self, plan: QueryPlan, note: Note) -> Optional[str]:
+        """
+        Проверка одной заметки по плану (для поддержки результатов при изменении заметки).
+
+        Args:
+            plan: План запроса
+            note: Заметка
+
+        Returns:
+            Optional[str]: Тип совпадения или None, если заметка не подходит
+        """
+        if note.deleted:
+            return None
+
+        for group in plan.groups:
+            matched = True
+            fields = []
+            for clause in group:
+                if clause.kind == CLAUSE_TEXT:
+                    field = self.match_text(note, clause.value)
+                    if (field is not None) == clause.negated:
+                        matched = False
+                        break
+                    if field is not None:
+                        fields.append(field)
+                elif self.check_note(clause, note) == clause.negated:
+                    matched = False
+                    break
+            if not matched:
+                continue
+
+            if fields:
+                return min(fields, key=_FIELD_PRIORITY.get)
+            has_tag = any(c.kind == CLAUSE_TAG and not c.negated for c in group)
+            return FIELD_TAGS if has_tag else MATCH_FILTER
+
+        if plan.word_form is not None:
+            return self.index.form_field(note, plan.word_form)
+        return None
+
+    def execute(self, plan: QueryPlan, token=None) -> Optional[Dict[str, str]]:
+        """
+        Выполнение плана: объединение результатов групп.
+
+        Args:
+            plan: План запроса
+            token: Токен отмены (опционально)
+
+        Returns:
+            Optional[Dict[str, str]]: {ID заметки: тип совпадения} или None при отмене
+        """
+        results: Dict[str, str] = {}
+        for group in plan.groups:
+            group_results = self.execute_group(group, token)
+            if group_results is None:
+                return None
+            for note_id, match in group_results.items():
+                results.setdefault(note_id, match)
+
+        if plan.word_form is not None:
+            for note_id, field in self.index.form_match(plan.word_form).items():
+                if note_id not in results:
+                    note = self.get_note(note_id)
+                    if note is not None and not note.deleted:
+                        results[note_id] = field
+        return results
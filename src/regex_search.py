@@ -0,0 +1,473 @@
+"""
+Модуль поиска по регулярным выражениям.
+Выражение выполняется в отдельном рабочем процессе, который принудительно
+завершается по истечении лимита времени: патологический шаблон
+(например, "(a+)+$") не может заморозить приложение.
+"""
+
+import functools
+import logging
+import multiprocessing
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+try:
+    from notes import Note
+    from search_index import FIELD_TITLE, FIELD_TAGS, FIELD_BODY
+    from text_cache import fold
+except ImportError:
+    from .notes import Note
+    from .search_index import FIELD_TITLE, FIELD_TAGS, FIELD_BODY
+    from .text_cache import fold
+
+logger = logging.getLogger(__name__)
+
+# Поля в порядке передачи рабочему процессу (теги - как в поле ввода тегов)
+REGEX_FIELDS = (FIELD_TITLE, FIELD_TAGS, FIELD_BODY)
+
+# Позиции совпадений: {поле: [(начало, конец), ...]}
+Spans = Dict[str, List[Tuple[int, int]]]
+
+_WORD_RE = re.compile(r'\w+')
+
+# Узлы разбора, после которых литерал гарантированно начинается с начала слова
+_WORD_START_ANCHORS = (sre_parse.AT_BEGINNING, sre_parse.AT_BEGINNING_STRING, sre_parse.AT_BOUNDARY)
+
+
+class RegexError(Exception):
+    """Некорректное регулярное выражение."""
+    pass
+
+
+class RegexTimeout(Exception):
+    """Выражение выполнялось дольше допустимого и было прервано."""
+    pass
+
+
+@functools.lru_cache(maxsize=64)
+def compile_pattern(pattern: str, flags: int = re.IGNORECASE) -> "re.Pattern":
+    """
+    Компиляция выражения с кэшированием (при наборе запрос компилируется многократно).
+
+    Args:
+        pattern: Регулярное выражение
+        flags: Флаги re
+
+    Returns:
+        re.Pattern: Скомпилированное выражение
+
+    Raises:
+        RegexError: Если выражение некорректно
+    """
+    try:
+        return re.compile(pattern, flags)
+    except (re.error, OverflowError, RecursionError) as e:
+        raise RegexError(str(e)) from e
+
+
+def _collect_literals(items, runs: List[Tuple[str, bool]], at_word_start: bool = False) -> None:
+    """Сбор литеральных последовательностей, обязательных для любого совпадения."""
+    current: List[str] = []
+    current_start = at_word_start
+
+    def flush():
+        if current:
+            runs.append(("".join(current), current_start))
+            current.clear()
+
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+            continue
+
+        # Группа после литерала начинается с начала слова, если литерал кончается не буквой
+        starts_word = not _WORD_RE.match(current[-1]) if current else current_start
+        flush()
+
+        if op is sre_parse.SUBPATTERN:
+            # Группа обязательна целиком: её литералы тоже обязательны
+            _collect_literals(av[-1], runs, starts_word)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            _collect_literals(av[2], runs, starts_word)
+        # Альтернативы, классы символов и необязательные части ничего не гарантируют
+
+        current_start = op is sre_parse.AT and av in _WORD_START_ANCHORS
+
+    flush()
+
+
+def required_fragments(pattern: str, flags: int = re.IGNORECASE) -> List[Tuple[str, bool]]:
+    """
+    Фрагменты слов, которые обязательно встречаются в любом совпадении.
+
+    Используются для отбора кандидатов по словарю инвертированного индекса.
+    Фрагмент, начинающийся с начала слова (после не-буквенного символа внутри
+    литерала или после ^ / \\b), ищется как префикс термина, остальные - как
+    подстрока термина.
+
+    Args:
+        pattern: Регулярное выражение
+        flags: Флаги re
+
+    Returns:
+        List[Tuple[str, bool]]: Пары (нормализованный фрагмент, начинается с начала слова);
+            пустой список - отбор невозможен
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except (re.error, OverflowError, RecursionError):
+        return []
+
+    runs: List[Tuple[str, bool]] = []
+    _collect_literals(parsed, runs)
+
+    fragments = []
+    for run, at_word_start in runs:
+        for match in _WORD_RE.finditer(fold(run)):
+            fragments.append((match.group(), match.start() > 0 or at_word_start))
+    return fragments
+
+
+def _find_spans(regex, text: str, limit: int) -> List[Tuple[int, int]]:
+    """Непустые совпадения выражения в тексте (не более limit)."""
+    spans = []
+    for match in regex.finditer(text):
+        if match.end() > match.start():
+            spans.append(match.span())
+            if len(spans) >= limit:
+                break
+    return spans
+
+
+def _substitute(regex, texts: Dict[str, Tuple[str, str, str]], note_ids: List[str],
+                template: str, literal: bool, fields: Tuple[str, ...]) -> Dict[str, Dict[str, Tuple[str, int]]]:
+    """Замена в полях заметок: {ID заметки: {поле: (новый текст, количество замен)}}."""
+    # Литеральный текст замены вставляется как есть (без обработки \ и групп)
+    repl = (lambda _match: template) if literal else template
+    positions = [REGEX_FIELDS.index(field) for field in fields]
+    results = {}
+    for note_id in note_ids:
+        values = texts.get(note_id)
+        if values is None:
+            continue
+        replaced = {}
+        for field, position in zip(fields, positions):
+            new_text, count = regex.subn(repl, values[position])
+            if count:
+                replaced[field] = (new_text, count)
+        if replaced:
+            results[note_id] = replaced
+    return results
+
+
+def _worker_main(conn) -> None:
+    """
+    Цикл рабочего процесса.
+
+    Процесс хранит копию текстов заметок, поэтому при повторных запросах
+    передаются только изменившиеся заметки. Получение запроса подтверждается
+    сообщением "received": лимит времени отсчитывается от него, а не от
+    начала передачи текстов.
+    """
+    texts: Dict[str, Tuple[str, str, str]] = {}
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+
+        request_id, updates, removed, pattern, flags, note_ids, limit, replacement = message
+        texts.update(updates)
+        for note_id in removed:
+            texts.pop(note_id, None)
+        conn.send(("received", request_id, None))
+
+        try:
+            regex = compile_pattern(pattern, flags)
+        except RegexError as e:
+            conn.send(("error", request_id, str(e)))
+            continue
+
+        if replacement is not None:
+            try:
+                conn.send(("ok", request_id, _substitute(regex, texts, note_ids, *replacement)))
+            except (re.error, IndexError) as e:
+                conn.send(("error", request_id, f"некорректный шаблон замены: {e}"))
+            continue
+
+        results: Dict[str, Spans] = {}
+        for note_id in note_ids:
+            fields = texts.get(note_id)
+            if fields is None:
+                continue
+            spans = {}
+            for field, text in zip(REGEX_FIELDS, fields):
+                found = _find_spans(regex, text, limit)
+                if found:
+                    spans[field] = found
+            if spans:
+                results[note_id] = spans
+
+        conn.send(("ok", request_id, results))
+
+
+class RegexSearcher:
+    """
+    Выполнение регулярных выражений в рабочем процессе с лимитом времени.
+
+    Процесс запускается при первом поиске и переиспользуется. Если выражение
+    выполняется дольше TIMEOUT, процесс завершается и будет запущен заново
+    при следующем поиске. Отменённый запрос процесс не прерывает: его ответ
+    отбрасывается, а следующий запрос ждёт его завершения (в пределах того
+    же лимита), поэтому переданные тексты заметок не теряются.
+    """
+
+    # Лимит времени выполнения выражения (секунды)
+    TIMEOUT = 2.0
+
+    # Максимум позиций совпадений на поле заметки
+    MAX_SPANS = 1000
+
+    # Интервал проверки отмены при ожидании результата (секунды)
+    POLL_INTERVAL = 0.05
+
+    # Лимит времени запуска рабочего процесса (не входит в TIMEOUT)
+    STARTUP_TIMEOUT = 30.0
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Args:
+            timeout: Лимит времени (по умолчанию TIMEOUT)
+        """
+        self.timeout = self.TIMEOUT if timeout is None else timeout
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+        # Версии заметок, тексты которых уже переданы рабочему процессу
+        self._sent: Dict[str, Tuple[int, str]] = {}
+        self._request_id = 0
+        # Запрос без ответа (например, отменённый) и время начала его выполнения
+        self._pending: Optional[int] = None
+        self._started: Optional[float] = None
+
+    def _ensure_worker(self) -> None:
+        if self._process is not None and self._process.is_alive():
+            return
+        self._stop_worker()
+
+        # spawn: fork многопоточного Qt-процесса небезопасен
+        context = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = context.Pipe()
+        self._process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._sent = {}
+
+        # Лимит времени выражения отсчитывается только после готовности процесса
+        try:
+            ready = parent_conn.poll(self.STARTUP_TIMEOUT) and parent_conn.recv()[0] == "ready"
+        except (EOFError, OSError):
+            ready = False
+        if not ready:
+            self._stop_worker()
+            raise RegexError("не удалось запустить процесс поиска")
+        logger.debug("Запущен процесс поиска по выражениям: pid=%s", self._process.pid)
+
+    def _stop_worker(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(1.0)
+        if self._conn is not None:
+            self._conn.close()
+        self._process = None
+        self._conn = None
+        self._sent = {}
+        self._pending = None
+        self._started = None
+
+    def _wait_reply(self, token=None) -> Optional[Tuple[str, object]]:
+        """
+        Ожидание ответа на текущий запрос.
+
+        Returns:
+            Optional[Tuple[str, object]]: (статус, данные) или None, если поиск отменён
+                (запрос продолжает выполняться, его ответ будет отброшен)
+
+        Raises:
+            RegexTimeout: Если выражение выполняется дольше лимита (процесс завершается)
+        """
+        while True:
+            if self._started is not None and time.monotonic() - self._started > self.timeout:
+                self._stop_worker()
+                raise RegexTimeout(f"выражение выполнялось дольше {self.timeout:g} с")
+            if token is not None and token.cancelled:
+                return None
+            if not self._conn.poll(self.POLL_INTERVAL):
+                continue
+
+            status, request_id, payload = self._conn.recv()
+            if request_id != self._pending:
+                continue
+            if status == "received":
+                self._started = time.monotonic()
+                continue
+            self._pending = None
+            self._started = None
+            return status, payload
+
+    def _finish_pending(self, token=None) -> bool:
+        """
+        Ожидание завершения предыдущего (отменённого) запроса.
+
+        Returns:
+            bool: False, если текущий поиск отменён во время ожидания
+        """
+        if self._pending is None:
+            return True
+        try:
+            if self._wait_reply(token) is None:
+                return False
+        except RegexTimeout:
+            logger.debug("Отменённое выражение прервано по таймауту")
+            self._ensure_worker()
+        return True
+
+    def search(
+        self,
+        pattern: str,
+        notes: Iterable[Note],
+        token=None,
+        live_ids: Optional[Set[str]] = None,
+        flags: int = re.IGNORECASE
+    ) -> Optional[Dict[str, Spans]]:
+        """
+        Поиск выражения в заметках.
+
+        Args:
+            pattern: Регулярное выражение
+            notes: Заметки-кандидаты
+            token: Токен отмены (опционально)
+            live_ids: ID существующих заметок (для очистки копий в рабочем процессе)
+            flags: Флаги re
+
+        Returns:
+            Optional[Dict[str, Spans]]: {ID заметки: позиции совпадений по полям}
+                или None, если поиск был отменён
+
+        Raises:
+            RegexError: Если выражение некорректно
+            RegexTimeout: Если выражение не уложилось в лимит времени
+        """
+        # Ошибка синтаксиса обнаруживается без обращения к процессу
+        compile_pattern(pattern, flags)
+        return self._request(pattern, flags, notes, token, live_ids, None)
+
+    def substitute(
+        self,
+        pattern: str,
+        replacement: str,
+        notes: Iterable[Note],
+        fields: Tuple[str, ...],
+        literal: bool = False,
+        token=None,
+        flags: int = 0
+    ) -> Optional[Dict[str, Dict[str, Tuple[str, int]]]]:
+        """
+        Замена выражения в заметках (выполняется в рабочем процессе с тем же лимитом времени).
+
+        Args:
+            pattern: Регулярное выражение
+            replacement: Шаблон замены (\\1, \\g<name>) или текст при literal=True
+            notes: Заметки-кандидаты
+            fields: Поля для замены (из REGEX_FIELDS)
+            literal: Вставлять текст замены как есть
+            token: Токен отмены (опционально)
+            flags: Флаги re
+
+        Returns:
+            Optional[Dict[str, Dict[str, Tuple[str, int]]]]: {ID заметки: {поле: (новый текст, замен)}}
+                только для заметок с заменами, или None, если операция отменена
+
+        Raises:
+            RegexError: Если выражение или шаблон замены некорректны
+            RegexTimeout: Если замена не уложилась в лимит времени
+        """
+        regex = compile_pattern(pattern, flags)
+        if not literal:
+            # Ошибки шаблона (например, несуществующая группа) - без обращения к процессу
+            try:
+                regex.sub(replacement, "")
+            except (re.error, IndexError) as e:
+                raise RegexError(f"некорректный шаблон замены: {e}") from e
+        return self._request(pattern, flags, notes, token, None, (replacement, literal, tuple(fields)))
+
+    def _request(self, pattern: str, flags: int, notes: Iterable[Note], token,
+                 live_ids: Optional[Set[str]], replacement: Optional[tuple]):
+        """Передача запроса рабочему процессу и ожидание ответа (None - отменён)."""
+        with self._lock:
+            try:
+                self._ensure_worker()
+                if not self._finish_pending(token):
+                    return None
+            except (EOFError, OSError) as e:
+                self._stop_worker()
+                raise RegexError(f"процесс поиска завершился с ошибкой: {e}") from e
+
+            updates = {}
+            note_ids = []
+            for note in notes:
+                note_ids.append(note.id)
+                version = (note.version, note.last_modified)
+                if self._sent.get(note.id) != version:
+                    updates[note.id] = (note.title, ", ".join(note.tags), note.body)
+                    self._sent[note.id] = version
+
+            removed: List[str] = []
+            if live_ids is not None and len(self._sent) > len(live_ids):
+                removed = [note_id for note_id in self._sent if note_id not in live_ids]
+                for note_id in removed:
+                    del self._sent[note_id]
+
+            self._request_id += 1
+            try:
+                self._conn.send((self._request_id, updates, removed, pattern, flags, note_ids,
+                                 self.MAX_SPANS, replacement))
+                self._pending = self._request_id
+                self._started = None
+
+                reply = self._wait_reply(token)
+            except RegexTimeout:
+                logger.warning("Выражение прервано по таймауту: %r", pattern)
+                raise
+            except (EOFError, OSError) as e:
+                self._stop_worker()
+                raise RegexError(f"процесс поиска завершился с ошибкой: {e}") from e
+
+        if reply is None:
+            return None
+        status, payload = reply
+        if status == "error":
+            raise RegexError(payload)
+        return payload
+
+    def close(self) -> None:
+        """Остановка рабочего процесса."""
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.send(None)
+                except OSError:
+                    pass
+            self._stop_worker()
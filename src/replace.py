@@ -0,0 +1,202 @@
+"""
+Модуль поиска и замены текста во всех заметках.
+Кандидаты отбираются по поисковому индексу, замена выполняется одним пакетным
+изменением хранилища: одно сохранение на диск и одно увеличение версии
+на каждую изменённую заметку.
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from notes import Note, NoteStore
+    from search import SearchEngine
+    from search_index import FIELD_TITLE, FIELD_BODY
+    from regex_search import compile_pattern
+except ImportError:
+    from .notes import Note, NoteStore
+    from .search import SearchEngine
+    from .search_index import FIELD_TITLE, FIELD_BODY
+    from .regex_search import compile_pattern
+
+logger = logging.getLogger(__name__)
+
+# Режимы поиска
+MODE_LITERAL = "literal"          # Точное совпадение с учётом регистра
+MODE_IGNORE_CASE = "ignore_case"  # Без учёта регистра
+MODE_REGEX = "regex"              # Регулярное выражение (группы в замене: \1, \g<name>)
+
+MODES = (MODE_LITERAL, MODE_IGNORE_CASE, MODE_REGEX)
+
+# Поля, в которых выполняется замена (теги не изменяются)
+REPLACE_FIELDS = (FIELD_TITLE, FIELD_BODY)
+
+
+class ReplaceMatch:
+    """
+    Заметка, затронутая заменой.
+
+    Атрибуты:
+        note_id (str): ID заметки
+        title (str): Заголовок до замены
+        key (tuple): Версия заметки на момент предпросмотра
+        counts (Dict[str, int]): Количество замен по полям
+        changes (Dict[str, str]): Новые значения изменённых полей
+    """
+
+    __slots__ = ("note_id", "title", "key", "counts", "changes")
+
+    def __init__(self, note: Note, counts: Dict[str, int], changes: Dict[str, str]):
+        self.note_id = note.id
+        self.title = note.title
+        self.key = (note.version, note.last_modified)
+        self.counts = counts
+        self.changes = changes
+
+    @property
+    def total(self) -> int:
+        """Общее количество замен в заметке."""
+        return sum(self.counts.values())
+
+    def __repr__(self) -> str:
+        return f"ReplaceMatch(note_id={self.note_id!r}, total={self.total})"
+
+
+class VaultReplacer:
+    """
+    Поиск и замена во всех заметках хранилища.
+
+    Сначала вычисляется предпросмотр (список затронутых заметок с новым
+    текстом), затем он применяется одним вызовом NoteStore.update_notes().
+    Замена для предпросмотра выполняется в рабочем процессе поиска с лимитом
+    времени, поэтому зависшее выражение не блокирует приложение.
+    """
+
+    def __init__(self, store: NoteStore, engine: SearchEngine):
+        """
+        Args:
+            store: Хранилище заметок
+            engine: Поисковый движок (индекс для отбора кандидатов и процесс для выражений)
+        """
+        self.store = store
+        self.engine = engine
+
+    @staticmethod
+    def compile(find: str, mode: str) -> "re.Pattern":
+        """
+        Выражение для поиска в выбранном режиме.
+
+        Args:
+            find: Искомый текст или выражение
+            mode: Режим (MODE_LITERAL, MODE_IGNORE_CASE, MODE_REGEX)
+
+        Returns:
+            re.Pattern: Скомпилированное выражение
+
+        Raises:
+            RegexError: Если выражение некорректно
+            ValueError: Если режим неизвестен
+        """
+        if mode == MODE_LITERAL:
+            return compile_pattern(re.escape(find), 0)
+        if mode == MODE_IGNORE_CASE:
+            return compile_pattern(re.escape(find), re.IGNORECASE)
+        if mode == MODE_REGEX:
+            return compile_pattern(find, 0)
+        raise ValueError(f"Неизвестный режим замены: {mode}")
+
+    def _candidates(self, pattern: "re.Pattern") -> List[Note]:
+        """Заметки, которые могут содержать совпадение (по индексу)."""
+        ids = self.engine.regex_candidates(pattern.pattern) if self.engine.index is not None else None
+        if ids is None:
+            return self.store.get_all_notes()
+        return [note for note in map(self.store.get_note, ids) if note is not None and not note.deleted]
+
+    def preview(
+        self,
+        find: str,
+        replacement: str,
+        mode: str = MODE_LITERAL,
+        fields: Tuple[str, ...] = REPLACE_FIELDS,
+        token=None
+    ) -> Optional[List[ReplaceMatch]]:
+        """
+        Предпросмотр замены: затронутые заметки, количество замен и новый текст.
+
+        Args:
+            find: Искомый текст или выражение
+            replacement: Текст замены (в режиме выражения допускаются ссылки на группы)
+            mode: Режим поиска
+            fields: Поля, в которых выполняется замена
+            token: Токен отмены (опционально)
+
+        Returns:
+            Optional[List[ReplaceMatch]]: Затронутые заметки (по убыванию количества замен)
+                или None, если операция была отменена
+
+        Raises:
+            RegexError: Если выражение или шаблон замены некорректны
+            RegexTimeout: Если замена не уложилась в лимит времени
+        """
+        if not find:
+            return []
+
+        pattern = self.compile(find, mode)
+        notes = self._candidates(pattern)
+        if not notes:
+            return []
+
+        # В режимах без выражения текст замены вставляется как есть (без обработки \ и групп)
+        replaced = self.engine.regex.substitute(
+            pattern.pattern, replacement, notes, fields,
+            literal=mode != MODE_REGEX, token=token, flags=pattern.flags
+        )
+        if replaced is None:
+            return None
+
+        matches = []
+        for note in notes:
+            fields_replaced = replaced.get(note.id)
+            if not fields_replaced:
+                continue
+            counts = {field: count for field, (_text, count) in fields_replaced.items()}
+            changes = {
+                field: text for field, (text, _count) in fields_replaced.items()
+                if text != (note.title if field == FIELD_TITLE else note.body)
+            }
+            matches.append(ReplaceMatch(note, counts, changes))
+
+        matches.sort(key=lambda match: (-match.total, match.title))
+        logger.info("Предпросмотр замены '%s': %d заметок, %d замен",
+                    find, len(matches), sum(match.total for match in matches))
+        return matches
+
+    def apply(self, matches: List[ReplaceMatch]) -> List[str]:
+        """
+        Применение предпросмотра одним пакетным изменением хранилища.
+
+        Заметки, изменённые после предпросмотра, пропускаются.
+
+        Args:
+            matches: Результат preview()
+
+        Returns:
+            List[str]: ID изменённых заметок
+        """
+        changes = {}
+        for match in matches:
+            note = self.store.get_note(match.note_id)
+            if note is None or note.deleted or (note.version, note.last_modified) != match.key:
+                continue
+            if match.changes:
+                changes[match.note_id] = {
+                    "title" if field == FIELD_TITLE else "body": text
+                    for field, text in match.changes.items()
+                }
+
+        updated = self.store.update_notes(changes)
+        skipped = len(matches) - len(changes)
+        if skipped:
+            logger.warning("Замена: пропущено заметок, изменённых после предпросмотра или без изменений: %d", skipped)
+        return updated
@@ -0,0 +1,268 @@
+"""
+Диалог поиска и замены во всех заметках.
+"""
+
+import logging
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLineEdit, QComboBox,
+    QCheckBox, QPushButton, QListWidget, QListWidgetItem, QLabel, QMessageBox
+)
+from PySide6.QtCore import Qt, Signal, QObject, QRunnable, QThreadPool
+
+try:
+    from replace import VaultReplacer, MODE_LITERAL, MODE_IGNORE_CASE, MODE_REGEX, REPLACE_FIELDS
+    from regex_search import RegexError, RegexTimeout
+    from search import SearchToken
+    from search_index import FIELD_BODY
+except ImportError:
+    from .replace import VaultReplacer, MODE_LITERAL, MODE_IGNORE_CASE, MODE_REGEX, REPLACE_FIELDS
+    from .regex_search import RegexError, RegexTimeout
+    from .search import SearchToken
+    from .search_index import FIELD_BODY
+
+logger = logging.getLogger(__name__)
+
+
+class PreviewSignals(QObject):
+    """Сигналы для передачи предпросмотра замены из рабочего потока."""
+    finished = Signal(int, object)  # generation, [ReplaceMatch]
+    failed = Signal(int, str)  # generation, error message
+
+
+class PreviewTask(QRunnable):
+    """Вычисление предпросмотра замены в пуле потоков (с отменой)."""
+
+    def __init__(self, replacer: VaultReplacer, find: str, replacement: str, mode: str,
+                 fields: tuple, token: SearchToken, signals: PreviewSignals):
+        super().__init__()
+        self.replacer = replacer
+        self.find = find
+        self.replacement = replacement
+        self.mode = mode
+        self.fields = fields
+        self.token = token
+        self.signals = signals
+
+    def run(self):
+        """Выполнение предпросмотра (рабочий поток)."""
+        generation = self.token.generation
+        try:
+            matches = self.replacer.preview(self.find, self.replacement, self.mode, self.fields, token=self.token)
+        except RegexTimeout as e:
+            self.signals.failed.emit(generation, f"Поиск прерван: {e}")
+            return
+        except RegexError as e:
+            self.signals.failed.emit(generation, f"Ошибка в выражении: {e}")
+            return
+        except Exception as e:
+            logger.error("Ошибка в фоновом потоке предпросмотра замены: %s", e)
+            self.signals.failed.emit(generation, f"Ошибка: {e}")
+            return
+
+        # Отменённый предпросмотр не передаёт результатов
+        if matches is not None:
+            self.signals.finished.emit(generation, matches)
+
+
+class ReplaceDialog(QDialog):
+    """Диалог замены текста во всех заметках с предпросмотром."""
+
+    MODE_NAMES = [
+        ("Точное совпадение", MODE_LITERAL),
+        ("Без учёта регистра", MODE_IGNORE_CASE),
+        ("Регулярное выражение", MODE_REGEX),
+    ]
+
+    def __init__(self, parent, replacer: VaultReplacer):
+        super().__init__(parent)
+        self.replacer = replacer
+        self.matches = []
+        # Изменённые заметки после применения замены
+        self.updated_ids = []
+
+        # Предпросмотр вычисляется в фоне, применяется только последний результат
+        self.preview_signals = PreviewSignals()
+        self.preview_signals.finished.connect(self._on_preview_finished)
+        self.preview_signals.failed.connect(self._on_preview_failed)
+        self.preview_pool = QThreadPool(self)
+        self.preview_pool.setMaxThreadCount(1)
+        self._preview_generation = 0
+        self._preview_token = None
+
+        self.setWindowTitle("Найти и заменить во всех заметках")
+        self.setModal(True)
+        self.setMinimumSize(560, 460)
+
+        self.init_ui()
+
+    def init_ui(self):
+        """Инициализация интерфейса."""
+        layout = QVBoxLayout(self)
+
+        form = QFormLayout()
+        self.find_edit = QLineEdit()
+        self.find_edit.setPlaceholderText("Искомый текст")
+        self.find_edit.textChanged.connect(self._invalidate_preview)
+        form.addRow("Найти:", self.find_edit)
+
+        self.replace_edit = QLineEdit()
+        self.replace_edit.setPlaceholderText("Текст замены (в выражении - \\1 для групп)")
+        self.replace_edit.textChanged.connect(self._invalidate_preview)
+        form.addRow("Заменить на:", self.replace_edit)
+
+        self.mode_combo = QComboBox()
+        for name, _mode in self.MODE_NAMES:
+            self.mode_combo.addItem(name)
+        self.mode_combo.currentIndexChanged.connect(self._invalidate_preview)
+        form.addRow("Режим:", self.mode_combo)
+
+        self.titles_check = QCheckBox("Заменять также в заголовках")
+        self.titles_check.setChecked(True)
+        self.titles_check.toggled.connect(self._invalidate_preview)
+        form.addRow("", self.titles_check)
+        layout.addLayout(form)
+
+        # Предпросмотр: затронутые заметки с количеством замен (снятая галочка - пропустить)
+        self.preview_list = QListWidget()
+        self.preview_list.itemChanged.connect(self._update_summary)
+        layout.addWidget(self.preview_list)
+
+        self.summary_label = QLabel("Нажмите «Найти», чтобы увидеть затронутые заметки")
+        layout.addWidget(self.summary_label)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch()
+
+        self.btn_preview = QPushButton("Найти")
+        self.btn_preview.setDefault(True)
+        self.btn_preview.clicked.connect(self.run_preview)
+        buttons_layout.addWidget(self.btn_preview)
+
+        self.btn_replace = QPushButton("Заменить")
+        self.btn_replace.setEnabled(False)
+        self.btn_replace.clicked.connect(self.apply_replace)
+        buttons_layout.addWidget(self.btn_replace)
+
+        btn_close = QPushButton("Закрыть")
+        btn_close.clicked.connect(self.reject)
+        buttons_layout.addWidget(btn_close)
+
+        layout.addLayout(buttons_layout)
+
+    def _mode(self) -> str:
+        return self.MODE_NAMES[self.mode_combo.currentIndex()][1]
+
+    def _cancel_preview(self):
+        """Отмена выполняющегося предпросмотра."""
+        if self._preview_token is not None:
+            self._preview_token.cancel()
+            self._preview_token = None
+
+    def _invalidate_preview(self, *args):
+        """Параметры изменились - предпросмотр больше не актуален."""
+        if self._preview_token is not None:
+            self._cancel_preview()
+            self.summary_label.setText("Параметры изменены - нажмите «Найти» ещё раз")
+        if self.matches:
+            self.matches = []
+            self.preview_list.clear()
+            self.summary_label.setText("Параметры изменены - нажмите «Найти» ещё раз")
+        self.btn_replace.setEnabled(False)
+
+    def run_preview(self):
+        """Запуск предпросмотра замены в пуле потоков (предыдущий отменяется)."""
+        find = self.find_edit.text()
+        if not find:
+            return
+
+        self._cancel_preview()
+        self._preview_generation += 1
+        self._preview_token = SearchToken(self._preview_generation)
+        fields = REPLACE_FIELDS if self.titles_check.isChecked() else (FIELD_BODY,)
+        task = PreviewTask(
+            self.replacer, find, self.replace_edit.text(), self._mode(), fields,
+            self._preview_token, self.preview_signals
+        )
+        self.preview_pool.start(task)
+        self.btn_replace.setEnabled(False)
+        self.summary_label.setText("Поиск...")
+
+    def _on_preview_failed(self, generation: int, message: str):
+        """Ошибка предпросмотра (главный поток)."""
+        if generation != self._preview_generation or self._preview_token is None:
+            return
+        self._preview_token = None
+        self._show_matches([])
+        self.summary_label.setText(message)
+
+    def _on_preview_finished(self, generation: int, matches: list):
+        """Готовый предпросмотр (главный поток): результаты устаревших запусков игнорируются."""
+        if generation != self._preview_generation or self._preview_token is None:
+            return
+        self._preview_token = None
+        self._show_matches(matches)
+        self._update_summary()
+
+    def _show_matches(self, matches: list):
+        """Заполнение списка предпросмотра."""
+        self.preview_list.blockSignals(True)
+        self.preview_list.clear()
+        self.matches = matches
+        for match in self.matches:
+            title = match.title or "(Без заголовка)"
+            item = QListWidgetItem(f"{title} — замен: {match.total}")
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked)
+            self.preview_list.addItem(item)
+        self.preview_list.blockSignals(False)
+
+    def _selected_matches(self) -> list:
+        """Отмеченные в предпросмотре заметки."""
+        return [
+            match for row, match in enumerate(self.matches)
+            if self.preview_list.item(row).checkState() == Qt.Checked
+        ]
+
+    def _update_summary(self, *args):
+        """Итог предпросмотра: количество заметок и замен."""
+        selected = self._selected_matches()
+        if not self.matches:
+            self.summary_label.setText("Совпадений не найдено")
+        else:
+            total = sum(match.total for match in selected)
+            self.summary_label.setText(
+                f"Будет изменено заметок: {len(selected)} из {len(self.matches)}, замен: {total}"
+            )
+        self.btn_replace.setEnabled(bool(selected))
+
+    def apply_replace(self):
+        """Применение замены одним пакетным изменением."""
+        selected = self._selected_matches()
+        if not selected:
+            return
+
+        reply = QMessageBox.question(
+            self,
+            "Подтверждение замены",
+            f"Заменить текст в {len(selected)} заметках?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        try:
+            self.updated_ids = self.replacer.apply(selected)
+        except Exception as e:
+            logger.error("Ошибка при замене текста: %s", e)
+            QMessageBox.critical(self, "Ошибка", f"Не удалось выполнить замену:\n{e}")
+            return
+
+        logger.info("Замена выполнена: изменено заметок %d", len(self.updated_ids))
+        self.accept()
+
+    def done(self, result: int):
+        """Закрытие диалога: выполняющийся предпросмотр отменяется и дожидается завершения."""
+        self._cancel_preview()
+        self.preview_pool.waitForDone()
+        super().done(result)
@@ -0,0 +1,578 @@
+"""
+Модуль поиска по заметкам.
+Выполняет поиск вне UI-потока с поддержкой отмены и частичных результатов.
+"""
+
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from notes import Note
+    from search_index import SearchIndex, FIELD_TITLE, FIELD_TAGS, FIELD_BODY, is_single_word
+    from query import QueryExecutor, parse_query, is_structured, MATCH_FILTER
+    from regex_search import RegexSearcher, Spans, required_fragments, REGEX_FIELDS
+    from text_cache import TextCache, fold
+except ImportError:
+    from .notes import Note
+    from .search_index import SearchIndex, FIELD_TITLE, FIELD_TAGS, FIELD_BODY, is_single_word
+    from .query import QueryExecutor, parse_query, is_structured, MATCH_FILTER
+    from .regex_search import RegexSearcher, Spans, required_fragments, REGEX_FIELDS
+    from .text_cache import TextCache, fold
+
+logger = logging.getLogger(__name__)
+
+# Типы совпадений (определяют индикатор в списке заметок)
+MATCH_TITLE = FIELD_TITLE
+MATCH_TAGS = FIELD_TAGS
+MATCH_BODY = FIELD_BODY
+
+_SNIPPET_WHITESPACE = str.maketrans({"\n": " ", "\r": " ", "\t": " "})
+
+
+class SearchToken:
+    """
+    Токен кооперативной отмены поиска.
+
+    Атрибуты:
+        generation (int): Номер поколения запроса (более новые запросы имеют больший номер)
+    """
+
+    def __init__(self, generation: int = 0):
+        self.generation = generation
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """Запросить отмену поиска."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True, если поиск был отменён."""
+        return self._cancelled.is_set()
+
+    def __repr__(self) -> str:
+        return f"SearchToken(generation={self.generation}, cancelled={self.cancelled})"
+
+
+class SearchEngine:
+    """
+    Поисковый движок по заголовку, тексту и тегам заметок.
+
+    Поиск выполняется порциями: между порциями проверяется токен отмены,
+    а накопленные результаты передаются в on_partial (для больших хранилищ).
+    """
+
+    # Количество заметок, обрабатываемых между проверками отмены
+    CHUNK_SIZE = 2000
+
+    # Количество заметок, ранжируемых по релевантности
+    RANK_TOP_K = 100
+
+    # Минимальная длина фрагмента выражения для отбора кандидатов по подстроке термина
+    MIN_INFIX_LENGTH = 3
+
+    # Количество запоминаемых результатов запросов (для уточнения и стирания символов)
+    QUERY_CACHE_SIZE = 16
+
+    # Фрагмент текста в результатах поиска: контекст до совпадения и общая длина (символы)
+    SNIPPET_CONTEXT = 30
+    SNIPPET_LENGTH = 100
+
+    # Виды записей кэша запросов
+    _KEY_SUBSTRING = "substring"
+    _KEY_STRUCTURED = "structured"
+
+    def __init__(self, index: Optional[SearchIndex] = None):
+        """
+        Инициализация движка.
+
+        Args:
+            index: Поисковый индекс (нужен для ранжирования по релевантности)
+        """
+        self.index = index
+        self.regex = RegexSearcher()
+        # Нормализованные тексты заметок (общие для поиска, подсветки и фрагментов)
+        self.texts = TextCache(index.store if index is not None else None)
+        # Кэш запросов: (вид, запрос) -> (поколение хранилища, результаты, позиции)
+        self._query_cache: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def match_note(self, note: Note, query: str) -> Optional[str]:
+        """
+        Проверка совпадения заметки с запросом.
+
+        Args:
+            note: Заметка для проверки
+            query: Поисковый запрос, нормализованный через fold()
+
+        Returns:
+            Optional[str]: Тип совпадения (MATCH_TITLE, MATCH_TAGS, MATCH_BODY) или None
+        """
+        located = self.locate(note, query)
+        return located[0] if located else None
+
+    def locate(self, note: Note, query: str) -> Optional[Tuple[str, int, int]]:
+        """
+        Лучшее совпадение запроса в заметке (заголовок > теги > текст).
+
+        Args:
+            note: Заметка для проверки
+            query: Поисковый запрос, нормализованный через fold()
+
+        Returns:
+            Optional[Tuple[str, int, int]]: (поле, начало, конец) в исходном тексте поля
+                (для тегов - в строке тегов через запятую) или None
+        """
+        texts = self.texts.get(note)
+
+        position = texts.title.text.find(query)
+        if position != -1:
+            return (MATCH_TITLE, *texts.title.to_original(position, position + len(query)))
+
+        offset = 0
+        for tag, normalized in zip(note.tags, texts.tags):
+            position = normalized.text.find(query)
+            if position != -1:
+                start, end = normalized.to_original(position, position + len(query))
+                return MATCH_TAGS, offset + start, offset + end
+            offset += len(tag) + 2  # разделитель ", "
+
+        position = texts.body.text.find(query)
+        if position != -1:
+            return (MATCH_BODY, *texts.body.to_original(position, position + len(query)))
+        return None
+
+    def search(
+        self,
+        notes: List[Note],
+        query: str,
+        token: Optional[SearchToken] = None,
+        on_partial: Optional[Callable[[Dict[str, str]], None]] = None
+    ) -> Optional[Dict[str, str]]:
+        """
+        Поиск заметок по запросу (регистронезависимый).
+
+        Args:
+            notes: Снимок списка заметок для поиска
+            query: Поисковый запрос
+            token: Токен отмены (опционально)
+            on_partial: Обработчик частичных результатов (опционально)
+
+        Returns:
+            Optional[Dict[str, str]]: Словарь {ID заметки: тип совпадения}
+                или None, если поиск был отменён
+        """
+        found = self.search_with_positions(notes, query, token, on_partial)
+        return found[0] if found is not None else None
+
+    def search_with_positions(
+        self,
+        notes: List[Note],
+        query: str,
+        token: Optional[SearchToken] = None,
+        on_partial: Optional[Callable[[Dict[str, str]], None]] = None,
+        store_generation: Optional[int] = None
+    ) -> Optional[Tuple[Dict[str, str], Dict[str, Spans]]]:
+        """
+        Поиск заметок по запросу с позициями лучших совпадений.
+
+        Запросы с синтаксисом фильтров (tag:, pinned:, modified:, size:,
+        кавычки, исключения, OR) выполняются по индексам через QueryExecutor,
+        простые запросы - поиском подстроки по снимку заметок. Запрос из одного
+        слова, когда индекс построен, находит и другие формы слова ("заметкой"
+        находит "заметка"); фраза ищется как подстрока целиком.
+
+        Результаты последних запросов запоминаются вместе с поколением хранилища:
+        повтор запроса (например, после стирания символа) берётся из кэша, а
+        уточнённый запрос ("прое" -> "проек") проверяется только среди заметок,
+        найденных по более короткому запросу.
+
+        Args:
+            notes: Снимок списка заметок для поиска
+            query: Поисковый запрос
+            token: Токен отмены (опционально)
+            on_partial: Обработчик частичных результатов (опционально)
+            store_generation: Поколение хранилища, соответствующее снимку
+                (по умолчанию текущее поколение хранилища индекса)
+
+        Returns:
+            Optional[Tuple[Dict[str, str], Dict[str, Spans]]]: ({ID заметки: тип совпадения},
+                {ID заметки: {поле: [(начало, конец)]}}) или None, если поиск был отменён
+        """
+        generation = store_generation
+        if generation is None and self.index is not None and self.index.store is not None:
+            generation = self.index.store.generation
+
+        if self.index is not None and is_structured(query):
+            key = (self._KEY_STRUCTURED, query.strip())
+            cached = self._cached(key, generation)
+            if cached is not None:
+                return cached
+
+            # Простой поиск по подстроке индекса не требует, запрос с фильтрами - ждёт его построения
+            self.index.wait_ready()
+
+            results = QueryExecutor(self.index, self._note_getter(notes), self.texts).execute(
+                parse_query(query), token
+            )
+            if results is None:
+                return None
+            self._remember(key, generation, results, {})
+            return results, {}
+
+        query = fold(query.strip())
+        if not query:
+            return {}, {}
+
+        key = (self._KEY_SUBSTRING, query)
+        cached = self._cached(key, generation)
+        if cached is not None:
+            return cached
+
+        # Формы слова ищутся по индексу, только если он уже построен (простой поиск его не ждёт)
+        use_forms = self.index is not None and is_single_word(query)
+        index_ready = not use_forms or self.index.ready.is_set()
+        get_note = self._note_getter(notes)
+
+        # Уточнённый запрос: кандидаты - результаты запроса, который в нём содержится
+        narrowed = self._narrowing_candidates(query, generation)
+        if narrowed is not None:
+            notes = [note for note in map(get_note, narrowed) if note is not None and not note.deleted]
+
+        results: Dict[str, str] = {}
+        positions: Dict[str, Spans] = {}
+
+        for start in range(0, len(notes), self.CHUNK_SIZE):
+            if token is not None and token.cancelled:
+                logger.debug("Поиск отменён: '%s'", query)
+                return None
+
+            for note in notes[start:start + self.CHUNK_SIZE]:
+                located = self.locate(note, query)
+                if located:
+                    field, match_start, match_end = located
+                    results[note.id] = field
+                    positions[note.id] = {field: [(match_start, match_end)]}
+
+            # Частичные результаты имеют смысл только если впереди ещё есть порции
+            if on_partial is not None and start + self.CHUNK_SIZE < len(notes):
+                on_partial(dict(results))
+
+        if token is not None and token.cancelled:
+            return None
+
+        if use_forms and index_ready:
+            self._add_word_forms(query, get_note, results, positions)
+        if index_ready:
+            # Результат без форм слова (индекс ещё строится) не запоминается
+            self._remember(key, generation, results, positions)
+        return results, positions
+
+    def _add_word_forms(self, word: str, get_note: Callable[[str], Optional[Note]],
+                        results: Dict[str, str], positions: Dict[str, Spans]) -> None:
+        """
+        Добавление заметок, содержащих другие формы слова запроса.
+
+        Позиция совпадения - первое вхождение самой длинной из найденных форм.
+
+        Args:
+            word: Слово запроса, нормализованное через fold()
+            get_note: Получение заметки по ID
+            results: Результаты поиска подстроки (дополняются)
+            positions: Позиции совпадений (дополняются)
+        """
+        found = self.index.form_match(word)
+        if not found:
+            return
+        forms = sorted(set(self.index.word_forms(word)) | {word}, key=len, reverse=True)
+        for note_id, field in found.items():
+            if note_id in results:
+                continue
+            note = get_note(note_id)
+            if note is None or note.deleted:
+                continue
+            results[note_id] = field
+            for form in forms:
+                located = self.locate(note, form)
+                if located:
+                    positions[note_id] = {located[0]: [located[1:]]}
+                    break
+
+    def _note_getter(self, notes: List[Note]) -> Callable[[str], Optional[Note]]:
+        """Получение заметки по ID: из хранилища индекса или из снимка."""
+        if self.index is not None and self.index.store is not None:
+            return self.index.store.get_note
+        return {note.id: note for note in notes}.get
+
+    def _cached(self, key: Tuple[str, str], generation: Optional[int]):
+        """Результат из кэша запросов (копия) или None."""
+        if generation is None:
+            return None
+        with self._cache_lock:
+            entry = self._query_cache.get(key)
+            if entry is None or entry[0] != generation:
+                return None
+            self._query_cache.move_to_end(key)
+            _, results, positions = entry
+        return dict(results), dict(positions)
+
+    def _remember(self, key: Tuple[str, str], generation: Optional[int],
+                  results: Dict[str, str], positions: Dict[str, Spans]) -> None:
+        """Сохранение результата в кэш запросов (устаревшие поколения вытесняются)."""
+        if generation is None:
+            return
+        with self._cache_lock:
+            self._query_cache[key] = (generation, dict(results), dict(positions))
+            self._query_cache.move_to_end(key)
+            stale = [k for k, entry in self._query_cache.items() if entry[0] != generation]
+            for k in stale:
+                del self._query_cache[k]
+            while len(self._query_cache) > self.QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+
+    def _narrowing_candidates(self, query: str, generation: Optional[int]) -> Optional[List[str]]:
+        """ID заметок, найденных по самому узкому из запомненных запросов, входящих в query."""
+        if generation is None:
+            return None
+        best = None
+        with self._cache_lock:
+            for (kind, previous), (entry_generation, results, _) in self._query_cache.items():
+                # Текст, содержащий query, содержит и любую его подстроку
+                if (kind == self._KEY_SUBSTRING and entry_generation == generation
+                        and previous in query and (best is None or len(results) < len(best))):
+                    best = results
+            return list(best) if best is not None else None
+
+    def search_fuzzy(self, query: str, token: Optional[SearchToken] = None) -> Optional[Dict[str, str]]:
+        """
+        Нечёткий поиск (с опечатками) только по индексу.
+
+        Args:
+            query: Поисковый запрос
+            token: Токен отмены (опционально)
+
+        Returns:
+            Optional[Dict[str, str]]: Словарь {ID заметки: тип совпадения}
+                или None, если поиск был отменён
+        """
+        if self.index is None or not query.strip():
+            return {}
+
+        self.index.wait_ready()
+        results = self.index.fuzzy_match(query)
+
+        if token is not None and token.cancelled:
+            return None
+
+        # Поля индекса совпадают с типами совпадений
+        return results
+
+    def search_regex(
+        self,
+        notes: List[Note],
+        pattern: str,
+        token: Optional[SearchToken] = None
+    ) -> Optional[Tuple[Dict[str, str], Dict[str, Spans]]]:
+        """
+        Поиск по регулярному выражению (регистронезависимый).
+
+        Кандидаты отбираются по словарю индекса (обязательные литералы выражения),
+        само выражение выполняется в рабочем процессе с лимитом времени.
+
+        Args:
+            notes: Снимок списка заметок (если индекс не сужает выборку)
+            pattern: Регулярное выражение
+            token: Токен отмены (опционально)
+
+        Returns:
+            Optional[Tuple[Dict[str, str], Dict[str, Spans]]]: ({ID заметки: тип совпадения},
+                {ID заметки: позиции совпадений по полям}) или None, если поиск был отменён
+
+        Raises:
+            RegexError: Если выражение некорректно
+            RegexTimeout: Если выражение не уложилось в лимит времени
+        """
+        if not pattern.strip():
+            return {}, {}
+
+        live_ids = None
+        candidates = None
+        if self.index is not None:
+            self.index.wait_ready()
+            live_ids = self.index.all_ids()
+            candidates = self.regex_candidates(pattern)
+
+        if candidates is not None:
+            if self.index.store is not None:
+                notes = [note for note in map(self.index.store.get_note, candidates)
+                         if note is not None and not note.deleted]
+            else:
+                notes = [note for note in notes if note.id in candidates]
+            logger.debug("Выражение '%s': кандидатов по индексу %d", pattern, len(notes))
+
+        positions = self.regex.search(pattern, notes, token=token, live_ids=live_ids)
+        if positions is None or (token is not None and token.cancelled):
+            return None
+
+        # Поля перечислены в порядке приоритета: первое совпавшее - тип совпадения
+        results = {
+            note_id: next(field for field in REGEX_FIELDS if field in spans)
+            for note_id, spans in positions.items()
+        }
+        return results, positions
+
+    def regex_candidates(self, pattern: str) -> Optional[set]:
+        """
+        Кандидаты по обязательным фрагментам выражения.
+
+        Args:
+            pattern: Регулярное выражение
+
+        Returns:
+            Optional[set]: ID заметок, которые могут содержать совпадение
+                (None, если индекс не сужает выборку)
+        """
+        self.index.wait_ready()
+        # Префиксы дешевле (поиск по отсортированному словарю) и обычно избирательнее
+        fragments = sorted(required_fragments(pattern), key=lambda f: (not f[1], -len(f[0])))
+
+        candidates = None
+        for fragment, at_word_start in fragments:
+            if at_word_start:
+                ids = self.index.term_ids(fragment)
+            elif len(fragment) >= self.MIN_INFIX_LENGTH:
+                ids = self.index.infix_ids(fragment)
+            else:
+                continue
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                break
+        return candidates
+
+    def rank_regex(self, positions: Dict[str, Spans], k: Optional[int] = None) -> List[str]:
+        """
+        Ранжирование результатов поиска по выражению: по числу совпадений.
+
+        Args:
+            positions: Позиции совпадений по заметкам
+            k: Количество лучших результатов (по умолчанию RANK_TOP_K)
+
+        Returns:
+            List[str]: ID лучших заметок по убыванию числа совпадений
+        """
+        counts = ((sum(len(spans) for spans in fields.values()), note_id)
+                  for note_id, fields in positions.items())
+        return [note_id for _, note_id in heapq.nlargest(k or self.RANK_TOP_K, counts)]
+
+    def clear_cache(self, texts: bool = False) -> None:
+        """
+        Очистка кэша запросов (например, для замеров без повторного использования результатов).
+
+        Args:
+            texts: Очистить также кэш нормализованных текстов
+        """
+        with self._cache_lock:
+            self._query_cache.clear()
+        if texts:
+            self.texts.clear()
+
+    def close(self) -> None:
+        """Освобождение ресурсов (рабочий процесс поиска по выражениям)."""
+        self.regex.close()
+
+    def rank(self, query: str, candidates: Iterable[str], k: Optional[int] = None,
+             fuzzy: bool = False) -> List[str]:
+        """
+        Ранжирование найденных заметок по релевантности (BM25).
+
+        Args:
+            query: Поисковый запрос
+            candidates: ID найденных заметок
+            k: Количество лучших результатов (по умолчанию RANK_TOP_K)
+            fuzzy: Учитывать слова с опечатками
+
+        Returns:
+            List[str]: ID лучших заметок по убыванию релевантности
+                (заметки без совпадений в индексе не включаются)
+        """
+        if self.index is None:
+            return []
+        self.index.wait_ready()
+
+        if is_structured(query):
+            # Ранжируем только по текстовым условиям запроса
+            query = " ".join(parse_query(query).text_terms())
+            if not query:
+                return []
+
+        top = self.index.top_k(query, candidates, k or self.RANK_TOP_K, fuzzy=fuzzy)
+        return [note_id for _, note_id in top]
+
+    def snippet(self, note: Note, spans: Optional[Spans] = None, term: str = "") -> Tuple[str, int, int]:
+        """
+        Фрагмент текста заметки вокруг лучшего совпадения (для списка результатов).
+
+        Позиция берётся из результатов поиска; если совпадения в тексте нет
+        в позициях, подстрока term ищется в кэшированном нормализованном тексте.
+
+        Args:
+            note: Заметка
+            spans: Позиции совпадений по полям из результатов поиска
+            term: Текст для поиска позиции (если в spans нет позиции в тексте)
+
+        Returns:
+            Tuple[str, int, int]: (фрагмент, начало и конец совпадения во фрагменте);
+                начало равно концу, если выделять нечего
+        """
+        body = note.body
+        start = end = 0
+        if spans and spans.get(MATCH_BODY):
+            start, end = spans[MATCH_BODY][0]
+        elif term:
+            normalized = self.texts.get(note).body
+            needle = fold(term)
+            position = normalized.text.find(needle)
+            if position != -1:
+                start, end = normalized.to_original(position, position + len(needle))
+
+        # Начало фрагмента - на границе слова перед совпадением
+        window_start = max(0, start - self.SNIPPET_CONTEXT)
+        if window_start > 0:
+            space = body.find(" ", window_start, start)
+            if space != -1:
+                window_start = space + 1
+
+        # Конец фрагмента - на границе слова, но не раньше конца совпадения
+        window_end = min(len(body), max(end, window_start + self.SNIPPET_LENGTH))
+        if window_end < len(body):
+            space = body.rfind(" ", end, window_end)
+            if space != -1:
+                window_end = space
+
+        # Переводы строк заменяются пробелами (позиции не меняются)
+        text = body[window_start:window_end].translate(_SNIPPET_WHITESPACE)
+        prefix = "…" if window_start > 0 else ""
+        suffix = "…" if window_end < len(body) else ""
+        offset = len(prefix) - window_start
+        if end <= start:
+            return prefix + text + suffix, 0, 0
+        return prefix + text + suffix, start + offset, end + offset
+
+    def highlight_text(self, query: str) -> str:
+        """
+        Текст для подсветки в редакторе.
+
+        Args:
+            query: Поисковый запрос
+
+        Returns:
+            str: Первое текстовое условие структурированного запроса или сам запрос
+        """
+        query = query.strip()
+        if not is_structured(query):
+            return query
+        terms = parse_query(query).text_terms()
+        return terms[0] if terms else ""
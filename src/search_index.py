@@ -0,0 +1,933 @@
+"""
+Модуль поискового индекса заметок.
+Инвертированный индекс со статистикой терминов для ранжирования BM25
+и индексы атрибутов (теги, закрепление, дата изменения, размер) для фильтров.
+"""
+
+import bisect
+import heapq
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from notes import Note, NoteStore, NOTE_PURGED, STORE_RESET
+    from text_cache import fold
+    from analysis import Analyzer, KEYWORD_ANALYZER, TEXT_ANALYZER, segment
+except ImportError:
+    from .notes import Note, NoteStore, NOTE_PURGED, STORE_RESET
+    from .text_cache import fold
+    from .analysis import Analyzer, KEYWORD_ANALYZER, TEXT_ANALYZER, segment
+
+logger = logging.getLogger(__name__)
+
+# Поля заметки, участвующие в индексе
+FIELD_TITLE = "title"
+FIELD_TAGS = "tags"
+FIELD_BODY = "body"
+FIELDS = (FIELD_TITLE, FIELD_TAGS, FIELD_BODY)
+
+# Атрибуты заметки с упорядоченным индексом (для фильтров по диапазону)
+ATTR_MODIFIED = "modified"  # Время изменения (Unix timestamp)
+ATTR_SIZE = "size"          # Размер текста в символах
+ATTRS = (ATTR_MODIFIED, ATTR_SIZE)
+
+# Приоритет полей при определении типа совпадения
+_FIELD_PRIORITY = {FIELD_TITLE: 0, FIELD_TAGS: 1, FIELD_BODY: 2}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Разбиение текста на термины (нормализованные слова: регистр, NFC, ё → е).
+
+    Первая стадия всех анализаторов (см. analysis.segment).
+
+    Args:
+        text: Исходный текст
+
+    Returns:
+        List[str]: Список терминов
+    """
+    return segment(text)
+
+
+def is_single_word(text: str) -> bool:
+    """Текст запроса - одно слово (для поиска по формам слова)."""
+    return tokenize(text) == [text]
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Расстояние Дамерау-Левенштейна (с перестановкой соседних символов).
+
+    Вычисление прекращается, как только расстояние гарантированно превышает max_distance.
+
+    Args:
+        a: Первая строка
+        b: Вторая строка
+        max_distance: Порог расстояния
+
+    Returns:
+        int: Расстояние или max_distance + 1, если порог превышен
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1,         # удаление
+                current[j - 1] + 1,      # вставка
+                previous[j - 1] + cost   # замена
+            )
+            if (i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)  # перестановка
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+
+    return previous[len(b)]
+
+
+def _timestamp(iso_time: str) -> float:
+    """Время изменения заметки в виде Unix timestamp (0 для некорректной даты)."""
+    try:
+        return datetime.fromisoformat(iso_time.replace('Z', '+00:00')).timestamp()
+    except (ValueError, AttributeError):
+        return 0.0
+
+
+def note_attributes(note: Note) -> Dict[str, float]:
+    """
+    Значения атрибутов заметки для фильтров по диапазону.
+
+    Args:
+        note: Заметка
+
+    Returns:
+        Dict[str, float]: {ATTR_MODIFIED: время изменения, ATTR_SIZE: размер текста}
+    """
+    return {ATTR_MODIFIED: _timestamp(note.last_modified), ATTR_SIZE: len(note.body)}
+
+
+def _deletes(word: str, distance: int) -> Set[str]:
+    """Все варианты слова с удалением не более distance символов (включая само слово)."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+class SearchIndex:
+    """
+    Инвертированный индекс заметок по полям (заголовок, теги, текст).
+
+    Индекс обновляется инкрементально по событиям NoteStore и хранит
+    статистику терминов для ранжирования BM25 с весами полей.
+    Все операции защищены блокировкой: индекс читается из потока поиска,
+    а изменяется из главного потока и потока синхронизации.
+
+    Термины индекса - нормализованные слова (по ним работают префиксы,
+    подстроки и нечёткий поиск). Анализатор поля задаёт ключ термина (основу
+    слова): при ранжировании и нечётком поиске формы одного слова совпадают.
+
+    Атрибуты:
+        postings (Dict[str, Dict[str, Dict[str, int]]]): поле -> термин -> {ID заметки: частота}
+        doc_freq (Dict[str, int]): Количество заметок, содержащих термин (в любом поле)
+    """
+
+    # Анализаторы полей: заголовок и текст - по основам слов, теги - как написаны
+    FIELD_ANALYZERS: Dict[str, Analyzer] = {
+        FIELD_TITLE: TEXT_ANALYZER,
+        FIELD_TAGS: KEYWORD_ANALYZER,
+        FIELD_BODY: TEXT_ANALYZER,
+    }
+
+    # Веса полей: совпадение в заголовке важнее, чем в тегах, а в тегах - чем в тексте
+    FIELD_BOOSTS = {FIELD_TITLE: 3.0, FIELD_TAGS: 2.0, FIELD_BODY: 1.0}
+
+    # Параметры BM25
+    K1 = 1.2
+    B = 0.75
+
+    # Максимальное количество терминов словаря для одного префикса запроса
+    MAX_PREFIX_EXPANSIONS = 64
+
+    # Нечёткий поиск: максимальное расстояние и длина префикса в индексе удалений
+    MAX_EDIT_DISTANCE = 2
+    FUZZY_PREFIX_LENGTH = 7
+
+    # Вес терминов, найденных нечётким поиском (при ранжировании)
+    FUZZY_WEIGHT = 0.3
+
+    # Вес других форм слова запроса (с той же основой)
+    FORM_WEIGHT = 0.8
+
+    # Структуры индекса, которые заменяются целиком при фоновом построении
+    _STATE = (
+        "postings", "doc_freq", "_doc_lengths", "_total_lengths", "_doc_terms", "_sorted_terms",
+        "_deletion_index", "_key_terms", "tag_index", "tag_labels", "_doc_tags", "pinned",
+        "_attr_values", "_attr_order",
+    )
+
+    def __init__(self, store: Optional[NoteStore] = None, build: bool = True):
+        """
+        Инициализация индекса.
+
+        Args:
+            store: Хранилище заметок (если задано, индекс подписывается на изменения)
+            build: Построить индекс сразу; False - построение вызывается позже
+                через build_in_background(), а изменения до его завершения откладываются
+        """
+        self._lock = threading.RLock()
+        self._reset()
+        self.store = store
+        # Индекс готов к запросам (построен)
+        self.ready = threading.Event()
+        # ID заметок, изменённых во время фонового построения (None - построение не идёт)
+        self._pending: Optional[Set[str]] = None
+        self._pending_reset = False
+        self._pending_lock = threading.Lock()
+
+        if store is not None:
+            if build:
+                self.rebuild(store.get_all_notes())
+            else:
+                self._pending = set()
+            store.add_listener(self._on_store_changed)
+        if self._pending is None:
+            self.ready.set()
+
+    def __len__(self) -> int:
+        """Количество проиндексированных заметок."""
+        return len(self._doc_terms)
+
+    def __contains__(self, note_id: str) -> bool:
+        return note_id in self._doc_terms
+
+    def _analyze(self, note: Note) -> Dict[str, Counter]:
+        """Разбор заметки на термины по полям (анализатором каждого поля)."""
+        analyzers = self.FIELD_ANALYZERS
+        return {
+            FIELD_TITLE: Counter(analyzers[FIELD_TITLE].terms(note.title)),
+            FIELD_TAGS: Counter(term for tag in note.tags for term in analyzers[FIELD_TAGS].terms(tag)),
+            FIELD_BODY: Counter(analyzers[FIELD_BODY].terms(note.body)),
+        }
+
+    def _analyzers(self) -> List[Analyzer]:
+        """Анализаторы полей, изменяющие слова (для них ведётся словарь ключей)."""
+        result = []
+        for analyzer in self.FIELD_ANALYZERS.values():
+            if analyzer.normalizes and analyzer not in result:
+                result.append(analyzer)
+        return result
+
+    def rebuild(self, notes: Iterable[Note]) -> None:
+        """
+        Полное перестроение индекса.
+
+        Args:
+            notes: Активные заметки
+        """
+        with self._lock:
+            self._reset()
+            self._fill(notes)
+        logger.info("Поисковый индекс построен: %d заметок, %d терминов", len(self), len(self.doc_freq))
+
+    def build_in_background(self, on_ready: Optional[Callable[[], None]] = None) -> threading.Thread:
+        """
+        Первое построение индекса в фоновом потоке (индекс создан с build=False).
+
+        Индекс строится без блокировки в отдельном объекте и подменяется
+        целиком, поэтому запросы и изменения хранилища во время построения
+        не ждут его. Заметки, изменённые за это время, переиндексируются
+        сразу после подмены.
+
+        Args:
+            on_ready: Функция, вызываемая в фоновом потоке после построения (опционально)
+
+        Returns:
+            threading.Thread: Поток построения
+        """
+        # Снимок списка берётся в вызывающем потоке: словарь хранилища меняется только в нём.
+        # Изменения до снимка (например, загрузка хранилища) в нём уже учтены
+        with self._pending_lock:
+            notes = self.store.get_all_notes()
+            self._pending = set()
+            self._pending_reset = False
+        thread = threading.Thread(
+            target=self._build, args=(notes, on_ready), name="search-index-build", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _build(self, notes: List[Note], on_ready: Optional[Callable[[], None]]) -> None:
+        started = time.perf_counter()
+        fresh = type(self)()
+        fresh._fill(notes)
+
+        with self._lock:
+            for name in self._STATE:
+                setattr(self, name, getattr(fresh, name))
+            with self._pending_lock:
+                pending, reset = self._pending or set(), self._pending_reset
+                self._pending = None
+                self._pending_reset = False
+
+            if reset:
+                for note_id in [note_id for note_id in self._doc_terms if self.store.get_note(note_id) is None]:
+                    self._remove(note_id)
+            for note_id in pending:
+                note = self.store.get_note(note_id)
+                if note is None:
+                    self._remove(note_id)
+                else:
+                    self.add_note(note)
+        self.ready.set()
+
+        logger.info("Поисковый индекс построен в фоне за %.2f с: %d заметок, %d терминов "
+                    "(изменено во время построения: %d)",
+                    time.perf_counter() - started, len(self), len(self.doc_freq), len(pending))
+        if on_ready is not None:
+            on_ready()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ожидание завершения фонового построения индекса.
+
+        Args:
+            timeout: Лимит ожидания в секундах (None - без ограничения)
+
+        Returns:
+            bool: True, если индекс готов
+        """
+        return self.ready.wait(timeout)
+
+    def _reset(self) -> None:
+        self.postings: Dict[str, Dict[str, Dict[str, int]]] = {field: {} for field in FIELDS}
+        self.doc_freq: Dict[str, int] = {}
+        self._doc_lengths: Dict[str, Dict[str, int]] = {field: {} for field in FIELDS}
+        self._total_lengths: Dict[str, int] = {field: 0 for field in FIELDS}
+        self._doc_terms: Dict[str, Dict[str, Counter]] = {}
+        self._sorted_terms: Optional[List[str]] = None
+        # Индекс удалений (SymSpell) для нечёткого поиска, строится при первом использовании
+        self._deletion_index: Optional[Dict[str, Set[str]]] = None
+        # анализатор -> ключ (основа слова) -> термины словаря с этим ключом
+        self._key_terms: Dict[str, Dict[str, Set[str]]] = {
+            analyzer.name: {} for analyzer in self._analyzers()
+        }
+        self._reset_attributes()
+
+    def _fill(self, notes: Iterable[Note]) -> None:
+        """Добавление заметок в пустой индекс: упорядоченные индексы атрибутов сортируются один раз."""
+        for note in notes:
+            self._add(note, ordered=False)
+        for attr in ATTRS:
+            self._attr_order[attr] = sorted((value, note_id) for note_id, value in self._attr_values[attr].items())
+
+    def _reset_attributes(self) -> None:
+        # тег (нормализованный через fold) -> ID заметок
+        self.tag_index: Dict[str, Set[str]] = {}
+        # тег (нормализованный) -> написание для отображения (первое встреченное)
+        self.tag_labels: Dict[str, str] = {}
+        self._doc_tags: Dict[str, Set[str]] = {}
+        self.pinned: Set[str] = set()
+        # атрибут -> {ID: значение} и отсортированный список (значение, ID)
+        self._attr_values: Dict[str, Dict[str, float]] = {attr: {} for attr in ATTRS}
+        self._attr_order: Dict[str, List[Tuple[float, str]]] = {attr: [] for attr in ATTRS}
+
+    def add_note(self, note: Note) -> None:
+        """
+        Добавление или переиндексация заметки.
+
+        Args:
+            note: Заметка (удалённые заметки из индекса исключаются)
+        """
+        with self._lock:
+            self._remove(note.id)
+            if not note.deleted:
+                self._add(note)
+
+    def remove_note(self, note_id: str) -> None:
+        """
+        Удаление заметки из индекса.
+
+        Args:
+            note_id: ID заметки
+        """
+        with self._lock:
+            self._remove(note_id)
+
+    def _add(self, note: Note, ordered: bool = True) -> None:
+        fields = self._analyze(note)
+        self._doc_terms[note.id] = fields
+
+        for field, counts in fields.items():
+            field_postings = self.postings[field]
+            for term, tf in counts.items():
+                field_postings.setdefault(term, {})[note.id] = tf
+            length = sum(counts.values())
+            self._doc_lengths[field][note.id] = length
+            self._total_lengths[field] += length
+
+        for term in set().union(*fields.values()):
+            if term not in self.doc_freq:
+                self._sorted_terms = None
+                self._index_deletes(term)
+                self._index_keys(term)
+            self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+
+        tags = set()
+        for label in note.tags:
+            tag = fold(label)
+            tags.add(tag)
+            self.tag_index.setdefault(tag, set()).add(note.id)
+            self.tag_labels.setdefault(tag, label)
+        self._doc_tags[note.id] = tags
+        if note.pinned:
+            self.pinned.add(note.id)
+
+        for attr, value in note_attributes(note).items():
+            self._attr_values[attr][note.id] = value
+            if ordered:
+                bisect.insort(self._attr_order[attr], (value, note.id))
+
+    def _remove(self, note_id: str) -> None:
+        fields = self._doc_terms.pop(note_id, None)
+        if fields is None:
+            return
+
+        for field, counts in fields.items():
+            field_postings = self.postings[field]
+            for term in counts:
+                docs = field_postings.get(term)
+                if docs is not None:
+                    docs.pop(note_id, None)
+                    if not docs:
+                        del field_postings[term]
+            self._total_lengths[field] -= self._doc_lengths[field].pop(note_id, 0)
+
+        for term in set().union(*fields.values()):
+            count = self.doc_freq.get(term, 0) - 1
+            if count > 0:
+                self.doc_freq[term] = count
+            else:
+                self.doc_freq.pop(term, None)
+                self._sorted_terms = None
+                self._unindex_deletes(term)
+                self._unindex_keys(term)
+
+        for tag in self._doc_tags.pop(note_id, ()):
+            docs = self.tag_index.get(tag)
+            if docs is not None:
+                docs.discard(note_id)
+                if not docs:
+                    del self.tag_index[tag]
+                    self.tag_labels.pop(tag, None)
+        self.pinned.discard(note_id)
+
+        for attr in ATTRS:
+            value = self._attr_values[attr].pop(note_id, None)
+            if value is not None:
+                order = self._attr_order[attr]
+                position = bisect.bisect_left(order, (value, note_id))
+                if position < len(order) and order[position] == (value, note_id):
+                    del order[position]
+
+    def _on_store_changed(self, event: str, note_ids: List[str]) -> None:
+        """Обработчик событий NoteStore (инкрементальное обновление)."""
+        with self._pending_lock:
+            if self._pending is not None:
+                # Индекс ещё строится: изменения применяются после построения
+                self._pending.update(note_ids)
+                self._pending_reset |= event == STORE_RESET
+                return
+
+        if event == STORE_RESET:
+            self.rebuild(self.store.get_all_notes())
+            return
+
+        with self._lock:
+            for note_id in note_ids:
+                note = self.store.get_note(note_id)
+                if note is None or event == NOTE_PURGED:
+                    self._remove(note_id)
+                else:
+                    self.add_note(note)
+
+    def all_ids(self) -> Set[str]:
+        """ID всех проиндексированных (активных) заметок."""
+        with self._lock:
+            return set(self._doc_terms)
+
+    def tag_ids(self, tag: str) -> Set[str]:
+        """
+        Заметки с указанным тегом (без учёта регистра).
+
+        Args:
+            tag: Тег
+
+        Returns:
+            Set[str]: ID заметок
+        """
+        with self._lock:
+            return set(self.tag_index.get(fold(tag), ()))
+
+    def tag_counts(self, note_ids: Optional[Set[str]] = None) -> Dict[str, int]:
+        """
+        Количество заметок по тегам (для панели тегов).
+
+        Без ограничения счётчики берутся из размеров списков тега. С ограничением
+        подсчёт идёт от меньшей стороны: по тегам найденных заметок, если их мало,
+        иначе пересечением списка каждого тега с множеством найденных.
+
+        Args:
+            note_ids: Ограничение множеством заметок (например, результатами поиска)
+
+        Returns:
+            Dict[str, int]: {нормализованный тег: количество}; теги с нулём не включаются
+        """
+        with self._lock:
+            if note_ids is None:
+                return {tag: len(ids) for tag, ids in self.tag_index.items()}
+
+            counts: Dict[str, int] = {}
+            if len(note_ids) < len(self.tag_index):
+                doc_tags = self._doc_tags
+                for note_id in note_ids:
+                    for tag in doc_tags.get(note_id, ()):
+                        counts[tag] = counts.get(tag, 0) + 1
+                return counts
+
+            for tag, ids in self.tag_index.items():
+                count = len(ids & note_ids)
+                if count:
+                    counts[tag] = count
+            return counts
+
+    def tag_summary(self, note_ids: Optional[Set[str]] = None) -> Tuple[Dict[str, str], Dict[str, int]]:
+        """
+        Снимок для панели тегов: написания всех тегов и счётчики, согласованные между собой.
+
+        Индекс изменяется из других потоков (синхронизация), поэтому оба словаря
+        собираются под одной блокировкой.
+
+        Args:
+            note_ids: Ограничение множеством заметок (см. tag_counts())
+
+        Returns:
+            Tuple[Dict[str, str], Dict[str, int]]: ({тег: написание}, {тег: количество})
+        """
+        with self._lock:
+            return dict(self.tag_labels), self.tag_counts(note_ids)
+
+    def pinned_ids(self) -> Set[str]:
+        """ID закреплённых заметок."""
+        with self._lock:
+            return set(self.pinned)
+
+    def attribute(self, attr: str, note_id: str) -> Optional[float]:
+        """
+        Значение атрибута заметки (ATTR_MODIFIED или ATTR_SIZE).
+
+        Args:
+            attr: Атрибут
+            note_id: ID заметки
+
+        Returns:
+            Optional[float]: Значение или None, если заметка не проиндексирована
+        """
+        return self._attr_values[attr].get(note_id)
+
+    def _range_bounds(self, attr: str, low: Optional[float], high: Optional[float]) -> Tuple[int, int]:
+        order = self._attr_order[attr]
+        start = 0 if low is None else bisect.bisect_left(order, (low, ""))
+        end = len(order) if high is None else bisect.bisect_left(order, (high, ""))
+        return start, max(start, end)
+
+    def range_count(self, attr: str, low: Optional[float], high: Optional[float]) -> int:
+        """
+        Количество заметок со значением атрибута в полуинтервале [low, high) за O(log n).
+
+        Args:
+            attr: Атрибут (ATTR_MODIFIED или ATTR_SIZE)
+            low: Нижняя граница включительно (None - без ограничения)
+            high: Верхняя граница не включительно (None - без ограничения)
+
+        Returns:
+            int: Количество заметок
+        """
+        with self._lock:
+            start, end = self._range_bounds(attr, low, high)
+            return end - start
+
+    def range_ids(self, attr: str, low: Optional[float], high: Optional[float]) -> Set[str]:
+        """
+        Заметки со значением атрибута в полуинтервале [low, high).
+
+        Args:
+            attr: Атрибут (ATTR_MODIFIED или ATTR_SIZE)
+            low: Нижняя граница включительно (None - без ограничения)
+            high: Верхняя граница не включительно (None - без ограничения)
+
+        Returns:
+            Set[str]: ID заметок
+        """
+        with self._lock:
+            start, end = self._range_bounds(attr, low, high)
+            return {note_id for _, note_id in self._attr_order[attr][start:end]}
+
+    def term_ids(self, word: str) -> Set[str]:
+        """
+        Заметки, содержащие термин с данным префиксом в любом поле.
+
+        Args:
+            word: Слово запроса в нижнем регистре
+
+        Returns:
+            Set[str]: ID заметок
+        """
+        result: Set[str] = set()
+        with self._lock:
+            for term in self.expand_prefix(word, unlimited=True):
+                for field in FIELDS:
+                    result.update(self.postings[field].get(term, ()))
+        return result
+
+    def term_estimate(self, word: str) -> int:
+        """Оценка количества заметок с термином-продолжением префикса (сверху)."""
+        with self._lock:
+            return sum(self.doc_freq[term] for term in self.expand_prefix(word, unlimited=True))
+
+    def infix_estimate(self, fragment: str) -> int:
+        """Оценка количества заметок с термином, содержащим подстроку (сверху)."""
+        with self._lock:
+            return sum(count for term, count in self.doc_freq.items() if fragment in term)
+
+    def infix_ids(self, fragment: str) -> Set[str]:
+        """
+        Заметки, содержащие термин с данной подстрокой в любом поле.
+
+        Словарь просматривается целиком, но он значительно меньше текстов заметок.
+
+        Args:
+            fragment: Часть слова в нижнем регистре
+
+        Returns:
+            Set[str]: ID заметок
+        """
+        result: Set[str] = set()
+        with self._lock:
+            for term in self.doc_freq:
+                if fragment in term:
+                    for field in FIELDS:
+                        result.update(self.postings[field].get(term, ()))
+        return result
+
+    def expand_prefix(self, prefix: str, unlimited: bool = False) -> List[str]:
+        """
+        Поиск терминов словаря, начинающихся с префикса.
+
+        Args:
+            prefix: Префикс в нижнем регистре
+            unlimited: Вернуть все продолжения (для отбора кандидатов, а не ранжирования)
+
+        Returns:
+            List[str]: Термины словаря (не более MAX_PREFIX_EXPANSIONS, если не unlimited)
+        """
+        with self._lock:
+            if self._sorted_terms is None:
+                self._sorted_terms = sorted(self.doc_freq)
+            terms = self._sorted_terms
+
+            start = bisect.bisect_left(terms, prefix)
+            end = len(terms) if unlimited else min(len(terms), start + self.MAX_PREFIX_EXPANSIONS)
+            result = []
+            for position in range(start, end):
+                term = terms[position]
+                if not term.startswith(prefix):
+                    break
+                result.append(term)
+            return result
+
+    def max_edit_distance(self, term: str) -> int:
+        """
+        Допустимое число опечаток в зависимости от длины слова.
+
+        Args:
+            term: Слово запроса
+
+        Returns:
+            int: 0 для коротких слов (до 3 символов), 1 для слов до 7 символов, иначе 2
+        """
+        if len(term) <= 3:
+            return 0
+        if len(term) <= 7:
+            return 1
+        return self.MAX_EDIT_DISTANCE
+
+    def _index_deletes(self, term: str) -> None:
+        if self._deletion_index is None:
+            return
+        for variant in _deletes(term[:self.FUZZY_PREFIX_LENGTH], self.MAX_EDIT_DISTANCE):
+            self._deletion_index.setdefault(variant, set()).add(term)
+
+    def _unindex_deletes(self, term: str) -> None:
+        if self._deletion_index is None:
+            return
+        for variant in _deletes(term[:self.FUZZY_PREFIX_LENGTH], self.MAX_EDIT_DISTANCE):
+            terms = self._deletion_index.get(variant)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._deletion_index[variant]
+
+    def _index_keys(self, term: str) -> None:
+        for analyzer in self._analyzers():
+            key = analyzer.key(term)
+            if key is not None:
+                self._key_terms[analyzer.name].setdefault(key, set()).add(term)
+
+    def _unindex_keys(self, term: str) -> None:
+        for analyzer in self._analyzers():
+            key = analyzer.key(term)
+            terms = self._key_terms[analyzer.name].get(key)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._key_terms[analyzer.name][key]
+
+    def word_forms(self, token: str, analyzer: Analyzer = TEXT_ANALYZER) -> List[str]:
+        """
+        Термины словаря с той же основой, что и слово запроса.
+
+        Args:
+            token: Слово запроса в нижнем регистре
+            analyzer: Анализатор поля
+
+        Returns:
+            List[str]: Формы слова из словаря (пусто для стоп-слов и анализаторов без основ)
+        """
+        key = analyzer.key(token)
+        if key is None or not analyzer.normalizes:
+            return []
+        with self._lock:
+            return list(self._key_terms.get(analyzer.name, {}).get(key, ()))
+
+    def _query_tokens(self, query: str, analyzer: Analyzer) -> List[str]:
+        """Слова запроса для анализатора: стоп-слова отбрасываются, если есть другие слова."""
+        tokens = segment(query)
+        content = [token for token in tokens if analyzer.key(token) is not None]
+        return content or tokens
+
+    def fuzzy_terms(self, token: str) -> List[str]:
+        """
+        Термины словаря в пределах допустимого расстояния редактирования.
+
+        Кандидаты берутся из индекса удалений (SymSpell), а не перебором словаря,
+        и проверяются точным расчётом расстояния.
+
+        Args:
+            token: Слово запроса в нижнем регистре
+
+        Returns:
+            List[str]: Похожие термины словаря (включая точное совпадение)
+        """
+        distance = self.max_edit_distance(token)
+        with self._lock:
+            if distance == 0:
+                return [token] if token in self.doc_freq else []
+
+            if self._deletion_index is None:
+                self._deletion_index = {}
+                for term in self.doc_freq:
+                    self._index_deletes(term)
+                logger.info("Индекс нечёткого поиска построен: %d вариантов", len(self._deletion_index))
+
+            candidates: Set[str] = set()
+            for variant in _deletes(token[:self.FUZZY_PREFIX_LENGTH], distance):
+                candidates.update(self._deletion_index.get(variant, ()))
+
+        return [term for term in candidates if edit_distance(token, term, distance) <= distance]
+
+    def query_terms(self, query: str, fuzzy: bool = False,
+                    analyzer: Analyzer = TEXT_ANALYZER) -> List[Tuple[str, float]]:
+        """
+        Разбор запроса на термины индекса с учётом набора по префиксу.
+
+        Точное совпадение термина имеет полный вес, другие формы слова
+        (та же основа) - FORM_WEIGHT, продолжения префикса (например,
+        "прое" -> "проект") - половинный, похожие слова при нечётком поиске -
+        FUZZY_WEIGHT. Запрос разбирается тем же анализатором, что и поле.
+
+        Args:
+            query: Поисковый запрос
+            fuzzy: Учитывать слова с опечатками
+            analyzer: Анализатор поля
+
+        Returns:
+            List[Tuple[str, float]]: Пары (термин, вес)
+        """
+        weights: Dict[str, float] = {}
+        for token in self._query_tokens(query, analyzer):
+            for term in self.expand_prefix(token):
+                weight = 1.0 if term == token else 0.5
+                weights[term] = max(weights.get(term, 0.0), weight)
+            for term in self.word_forms(token, analyzer):
+                weight = 1.0 if term == token else self.FORM_WEIGHT
+                weights[term] = max(weights.get(term, 0.0), weight)
+            if fuzzy:
+                for term in self.fuzzy_terms(token):
+                    weight = 1.0 if term == token else self.FUZZY_WEIGHT
+                    weights[term] = max(weights.get(term, 0.0), weight)
+        return list(weights.items())
+
+    def form_match(self, word: str) -> Dict[str, str]:
+        """
+        Заметки с другими формами слова только по индексу ("заметкой" находит "заметка").
+
+        Формы определяются анализатором каждого поля: в тегах (без основ)
+        совпадает только само слово.
+
+        Args:
+            word: Слово запроса, нормализованное через fold()
+
+        Returns:
+            Dict[str, str]: Словарь {ID заметки: поле лучшего совпадения}
+        """
+        matches: Dict[str, str] = {}
+        with self._lock:
+            for field in FIELDS:
+                field_postings = self.postings[field]
+                for term in {word}.union(self.word_forms(word, self.FIELD_ANALYZERS[field])):
+                    for note_id in field_postings.get(term, ()):
+                        matches.setdefault(note_id, field)
+        return matches
+
+    def form_field(self, note: Note, word: str) -> Optional[str]:
+        """
+        Поле заметки, содержащее форму слова, по тексту самой заметки (без индекса).
+
+        Args:
+            note: Заметка
+            word: Слово запроса, нормализованное через fold()
+
+        Returns:
+            Optional[str]: Поле (заголовок > теги > текст) или None
+        """
+        for field, text in ((FIELD_TITLE, note.title), (FIELD_TAGS, " ".join(note.tags)), (FIELD_BODY, note.body)):
+            analyzer = self.FIELD_ANALYZERS[field]
+            key = analyzer.key(word) if analyzer.normalizes else None
+            if key is None:
+                if word in analyzer.terms(text):
+                    return field
+            elif any(analyzer.key(term) == key for term in analyzer.terms(text)):
+                return field
+        return None
+
+    def fuzzy_match(self, query: str) -> Dict[str, str]:
+        """
+        Нечёткий поиск заметок только по индексу (без просмотра текста заметок).
+
+        Каждое слово запроса должно совпасть с термином заметки с точностью
+        до опечаток, как префикс или как другая форма слова (по анализатору поля).
+
+        Args:
+            query: Поисковый запрос
+
+        Returns:
+            Dict[str, str]: Словарь {ID заметки: поле лучшего совпадения}
+        """
+        result: Optional[Dict[str, str]] = None
+
+        with self._lock:
+            for token in tokenize(query):
+                terms = set(self.fuzzy_terms(token)) | set(self.expand_prefix(token))
+                matches: Dict[str, str] = {}
+                for field in FIELDS:
+                    field_postings = self.postings[field]
+                    for term in terms.union(self.word_forms(token, self.FIELD_ANALYZERS[field])):
+                        for note_id in field_postings.get(term, ()):
+                            matches.setdefault(note_id, field)
+
+                if result is None:
+                    result = matches
+                else:
+                    result = {
+                        note_id: min(field, matches[note_id], key=_FIELD_PRIORITY.get)
+                        for note_id, field in result.items()
+                        if note_id in matches
+                    }
+                if not result:
+                    break
+
+        return result or {}
+
+    def idf(self, term: str) -> float:
+        """Обратная документная частота термина (BM25, всегда положительная)."""
+        n = len(self._doc_terms)
+        df = self.doc_freq.get(term, 0)
+        return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+    def top_k(self, query: str, candidates: Optional[Iterable[str]] = None, k: int = 100,
+              fuzzy: bool = False) -> List[Tuple[float, str]]:
+        """
+        Лучшие k заметок по BM25 (с весами полей).
+
+        Баллы накапливаются по спискам вхождений терминов запроса,
+        а отбор выполняется кучей за O(n log k) без полной сортировки.
+
+        Args:
+            query: Поисковый запрос
+            candidates: Ограничение множества заметок (например, результаты фильтра)
+            k: Количество лучших результатов
+            fuzzy: Учитывать слова с опечатками
+
+        Returns:
+            List[Tuple[float, str]]: Пары (балл, ID заметки) по убыванию балла
+        """
+        allowed = set(candidates) if candidates is not None else None
+        scores: Dict[str, float] = {}
+
+        with self._lock:
+            # Запрос разбирается анализатором каждого поля (один раз на анализатор)
+            analyzed: Dict[str, List[Tuple[str, float]]] = {}
+            idfs: Dict[str, float] = {}
+            for field in FIELDS:
+                analyzer = self.FIELD_ANALYZERS[field]
+                if analyzer.name not in analyzed:
+                    analyzed[analyzer.name] = self.query_terms(query, fuzzy=fuzzy, analyzer=analyzer)
+
+                boost = self.FIELD_BOOSTS[field]
+                lengths = self._doc_lengths[field]
+                avg_length = self._total_lengths[field] / max(len(lengths), 1) or 1.0
+
+                for term, weight in analyzed[analyzer.name]:
+                    docs = self.postings[field].get(term)
+                    if not docs:
+                        continue
+                    if term not in idfs:
+                        idfs[term] = self.idf(term)
+                    idf = idfs[term] * weight
+
+                    for note_id, tf in docs.items():
+                        if allowed is not None and note_id not in allowed:
+                            continue
+                        norm = 1.0 - self.B + self.B * lengths.get(note_id, 0) / avg_length
+                        gain = boost * idf * tf * (self.K1 + 1.0) / (tf + self.K1 * norm)
+                        scores[note_id] = scores.get(note_id, 0.0) + gain
+
+        return heapq.nlargest(k, ((score, note_id) for note_id, score in scores.items()))
+
+    def __repr__(self) -> str:
+        return f"SearchIndex(notes={len(self)}, terms={len(self.doc_freq)})"
@@ -0,0 +1,271 @@
+"""
+Модуль умных папок (сохранённых поисков).
+Умная папка - именованный запрос на языке поиска (например,
+`tag:клиент pinned:no modified:<30d`). Результаты всех папок вычисляются
+один раз и поддерживаются по событиям NoteStore: при изменении заметки
+заново проверяется только она, поэтому переход в папку и её счётчик
+не требуют просмотра хранилища.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    from notes import NoteStore, NOTE_ADDED, NOTE_UPDATED, STORE_RESET
+    from search_index import SearchIndex
+    from query import QueryExecutor, QueryPlan, CLAUSE_MODIFIED, plan_query
+    from text_cache import TextCache
+except ImportError:
+    from .notes import NoteStore, NOTE_ADDED, NOTE_UPDATED, STORE_RESET
+    from .search_index import SearchIndex
+    from .query import QueryExecutor, QueryPlan, CLAUSE_MODIFIED, plan_query
+    from .text_cache import TextCache
+
+logger = logging.getLogger(__name__)
+
+
+class SavedSearch:
+    """
+    Сохранённый поиск.
+
+    Атрибуты:
+        name (str): Название папки
+        query (str): Запрос
+        plan (QueryPlan): Разобранный запрос
+        results (Dict[str, str]): {ID заметки: тип совпадения}
+        parsed_at (float): Время разбора запроса (от него отсчитывается modified:<30d)
+    """
+
+    __slots__ = ("name", "query", "plan", "results", "parsed_at")
+
+    def __init__(self, name: str, query: str):
+        self.name = name
+        self.query = query
+        self.plan: QueryPlan = QueryPlan([])
+        self.results: Dict[str, str] = {}
+        self.parsed_at = 0.0
+
+    @property
+    def relative(self) -> bool:
+        """Зависит ли результат от текущего времени (условия modified:)."""
+        return any(clause.kind == CLAUSE_MODIFIED for group in self.plan.groups for clause in group)
+
+    @property
+    def count(self) -> int:
+        """Количество заметок в папке."""
+        return len(self.results)
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"name": self.name, "query": self.query}
+
+    def __repr__(self) -> str:
+        return f"SavedSearch(name={self.name!r}, query={self.query!r}, count={self.count})"
+
+
+class SmartFolders:
+    """
+    Набор умных папок с результатами, поддерживаемыми по событиям хранилища.
+
+    Слушатели получают названия папок, результаты которых изменились;
+    они вызываются в потоке, изменившем хранилище.
+    """
+
+    # Через сколько секунд пересчитываются папки с условиями modified: (возраст заметок растёт)
+    PLAN_TTL = 3600
+
+    def __init__(self, store: NoteStore, index: SearchIndex, texts: Optional[TextCache] = None):
+        """
+        Args:
+            store: Хранилище заметок
+            index: Поисковый индекс (для первоначального вычисления результатов)
+            texts: Кэш нормализованных текстов (опционально)
+        """
+        self.store = store
+        self.executor = QueryExecutor(index, store.get_note, texts)
+        self._folders: "OrderedDict[str, SavedSearch]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[List[str]], None]] = []
+
+        store.add_listener(self._on_store_changed)
+
+    def add_listener(self, callback: Callable[[List[str]], None]) -> None:
+        """
+        Подписка на изменение результатов папок.
+
+        Args:
+            callback: Функция (названия изменившихся папок)
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, names: List[str]) -> None:
+        if not names:
+            return
+        for callback in list(self._listeners):
+            try:
+                callback(names)
+            except Exception as e:
+                logger.error("Ошибка в обработчике умных папок: %s", e)
+
+    def _evaluate(self, folder: SavedSearch, now: Optional[float] = None) -> None:
+        """
+        Полное вычисление результатов папки по индексам.
+
+        Простой запрос ищется как подстрока целиком (как в строке поиска),
+        поэтому результаты совпадают с проверкой match_note() при изменениях.
+        """
+        folder.parsed_at = time.time() if now is None else now
+        folder.plan = plan_query(folder.query, now=folder.parsed_at)
+        if not self.executor.index.ready.is_set():
+            # Индекс ещё строится: результаты вычисляются в refresh_all() после построения
+            folder.results = {}
+            return
+        folder.results = self.executor.execute(folder.plan) or {}
+
+    def add(self, name: str, query: str) -> SavedSearch:
+        """
+        Создание папки (или замена запроса существующей).
+
+        Args:
+            name: Название
+            query: Запрос на языке поиска
+
+        Returns:
+            SavedSearch: Папка с вычисленными результатами
+
+        Raises:
+            ValueError: Если название или запрос пусты
+        """
+        name = name.strip()
+        query = query.strip()
+        if not name:
+            raise ValueError("Название умной папки не может быть пустым")
+        if not query:
+            raise ValueError("Запрос умной папки не может быть пустым")
+
+        folder = SavedSearch(name, query)
+        with self._lock:
+            self._evaluate(folder)
+            self._folders[name] = folder
+        logger.info("Умная папка %r: %s (%d заметок)", name, query, folder.count)
+        self._notify([name])
+        return folder
+
+    def remove(self, name: str) -> bool:
+        """
+        Удаление папки.
+
+        Returns:
+            bool: True, если папка существовала
+        """
+        with self._lock:
+            removed = self._folders.pop(name, None) is not None
+        if removed:
+            logger.info("Умная папка удалена: %r", name)
+        return removed
+
+    def get(self, name: str) -> Optional[SavedSearch]:
+        """Папка по названию."""
+        return self._folders.get(name)
+
+    def results(self, name: str) -> Dict[str, str]:
+        """
+        Результаты папки (копия).
+
+        Returns:
+            Dict[str, str]: {ID заметки: тип совпадения}; пустой словарь для неизвестной папки
+        """
+        with self._lock:
+            folder = self._folders.get(name)
+            return dict(folder.results) if folder is not None else {}
+
+    def refresh_expired(self, now: Optional[float] = None) -> List[str]:
+        """
+        Пересчёт папок, зависящих от текущего времени, если их запрос разобран давно.
+
+        Args:
+            now: Текущее время (для тестов)
+
+        Returns:
+            List[str]: Названия пересчитанных папок
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [f for f in self._folders.values() if f.relative and now - f.parsed_at >= self.PLAN_TTL]
+            for folder in expired:
+                self._evaluate(folder, now)
+        names = [folder.name for folder in expired]
+        self._notify(names)
+        return names
+
+    def refresh_all(self) -> List[str]:
+        """
+        Полный пересчёт всех папок (после фонового построения индекса).
+
+        Returns:
+            List[str]: Названия пересчитанных папок
+        """
+        with self._lock:
+            for folder in self._folders.values():
+                self._evaluate(folder)
+            names = list(self._folders)
+        self._notify(names)
+        return names
+
+    def load(self, items: Iterable[Dict[str, str]]) -> None:
+        """
+        Загрузка папок из настроек (некорректные записи пропускаются).
+
+        Args:
+            items: Список словарей {"name": ..., "query": ...}
+        """
+        for item in items:
+            try:
+                self.add(item["name"], item["query"])
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning("Пропущена некорректная умная папка %r: %s", item, e)
+
+    def to_list(self) -> List[Dict[str, str]]:
+        """Папки для сохранения в настройках."""
+        return [folder.to_dict() for folder in self]
+
+    def _on_store_changed(self, event: str, note_ids: List[str]) -> None:
+        """Поддержка результатов: перепроверяются только изменившиеся заметки."""
+        changed: List[str] = []
+        with self._lock:
+            if event == STORE_RESET:
+                for folder in self._folders.values():
+                    self._evaluate(folder)
+                changed = list(self._folders)
+            else:
+                notes = {}
+                if event in (NOTE_ADDED, NOTE_UPDATED):
+                    notes = {note_id: self.store.get_note(note_id) for note_id in note_ids}
+
+                for folder in self._folders.values():
+                    modified = False
+                    for note_id in note_ids:
+                        note = notes.get(note_id)
+                        match = self.executor.match_note(folder.plan, note) if note is not None else None
+                        if match is None:
+                            modified |= folder.results.pop(note_id, None) is not None
+                        elif folder.results.get(note_id) != match:
+                            folder.results[note_id] = match
+                            modified = True
+                    if modified:
+                        changed.append(folder.name)
+        self._notify(changed)
+
+    def __iter__(self):
+        return iter(list(self._folders.values()))
+
+    def __len__(self) -> int:
+        return len(self._folders)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._folders
+
+    def __repr__(self) -> str:
+        return f"SmartFolders(folders={len(self)})"
@@ -57,6 +57,9 @@ class SyncManager:
         self.local_store = local_store
         self.cloud_path = cloud_path
         self.conflicts: List[SyncConflict] = []
+        # Содержимое облачного файла на момент последней загрузки или записи:
+        # {ID заметки: (хэш содержимого, флаг удаления)}, None если неизвестно
+        self._remote_state: Optional[Dict[str, Tuple[str, bool]]] = None
         self.config_path = Path.home() / ".notes_app" / "config.json"
         
         # Загрузка конфигурации (в т.ч. сохраненного пути к облаку)
@@ -86,6 +89,7 @@ class SyncManager:
                 return False
             
             self.cloud_path = path
+            self._remote_state = None
             self._save_config()
             logger.info("Установлен путь к облачной папке: %s", path)
             return True
@@ -106,6 +110,11 @@ class SyncManager:
         
         return self.cloud_path / "notes.json"
     
+    @staticmethod
+    def _content_state(notes: Dict[str, Note]) -> Dict[str, Tuple[str, bool]]:
+        """Снимок содержимого заметок для сравнения с облачным файлом."""
+        return {note_id: (note.content_hash, note.deleted) for note_id, note in notes.items()}
+    
     def find_conflict_files(self) -> List[Path]:
         """
         Поиск конфликтных копий OneDrive в облачной папке.
@@ -147,6 +156,7 @@ class SyncManager:
             Optional[Dict[str, Note]]: Словарь заметок или None при ошибке
         """
         cloud_file = self.get_cloud_file_path()
+        self._remote_state = None
         
         if not cloud_file:
             logger.warning("Облачная папка не настроена")
@@ -170,7 +180,10 @@ class SyncManager:
             # Ищем и обрабатываем конфликтные файлы OneDrive
             conflict_files = self.find_conflict_files()
             
-            if conflict_files:
+            if not conflict_files:
+                # Заметки совпадают с содержимым основного файла
+                self._remote_state = self._content_state(remote_notes)
+            else:
                 logger.warning("Обнаружено конфликтных файлов OneDrive: %d", len(conflict_files))
                 
                 for conflict_file in conflict_files:
@@ -225,6 +238,9 @@ class SyncManager:
             
         Returns:
             bool: True если успешно, False иначе
+            
+        Если содержимое заметок (хэши и флаги удаления) совпадает с последним
+        загруженным или записанным облачным файлом, файл не перезаписывается.
         """
         cloud_file = self.get_cloud_file_path()
         
@@ -232,6 +248,11 @@ class SyncManager:
             logger.error("Облачная папка не настроена")
             return False
         
+        state = self._content_state(notes)
+        if state == self._remote_state:
+            logger.info("Облачный файл не изменился, запись пропущена")
+            return True
+        
         try:
             data = {
                 "notes": {note_id: note.to_dict() for note_id, note in notes.items()},
@@ -247,10 +268,12 @@ class SyncManager:
                 json.dump(data, f, ensure_ascii=False, indent=2)
             
             temp_file.replace(cloud_file)
+            self._remote_state = state
             logger.info("Сохранено удаленных заметок: %d", len(notes))
             return True
         
         except Exception as e:
+            self._remote_state = None
             logger.error("Ошибка при сохранении удаленных заметок: %s", e)
             return False
     
@@ -261,7 +284,7 @@ class SyncManager:
         Конфликт возникает когда:
         - Обе заметки изменены (version > 1)
         - Временные метки очень близки (< 5 секунд)
-        - Содержимое различается
+        - Содержимое различается (хэши содержимого не совпадают)
         
         Args:
             local_note: Локальная версия заметки
@@ -270,6 +293,10 @@ class SyncManager:
         Returns:
             bool: True если есть конфликт, False иначе
         """
+        # Одинаковое содержимое не конфликтует, временные метки не разбираются
+        if local_note.content_hash == remote_note.content_hash:
+            return False
+        
         try:
             # Парсим временные метки
             local_time = datetime.fromisoformat(local_note.last_modified.replace('Z', '+00:00'))
@@ -278,8 +305,8 @@ class SyncManager:
             # Разница во времени
             time_diff = abs((local_time - remote_time).total_seconds())
             
-            # Конфликт если обе изменены недавно и содержимое разное
-            if time_diff < 5 and (local_note.body != remote_note.body or local_note.title != remote_note.title):
+            # Конфликт если обе изменены недавно (содержимое разное)
+            if time_diff < 5:
                 logger.warning("Обнаружен конфликт для заметки %s", local_note.id[:8])
                 return True
             
@@ -405,10 +432,14 @@ class SyncManager:
         logger.info("Создана заметка-конфликт: %s", conflict_note.id[:8])
         return conflict_note
     
-    def sync(self) -> Tuple[bool, int, int]:
+    def sync(self, token=None) -> Tuple[bool, int, int]:
         """
         Выполнение полной синхронизации.
         
+        Args:
+            token: Токен фоновой задачи (TaskToken): прогресс по этапам и отмена.
+                Отмена проверяется только до изменения локального хранилища.
+        
         Returns:
             Tuple[bool, int, int]: (успех, количество синхронизированных, количество конфликтов)
         """
@@ -420,16 +451,26 @@ class SyncManager:
             logger.info("Начало синхронизации...")
             
             # Загружаем удаленные заметки
+            if token is not None:
+                token.progress(0, 3, "Загрузка из облака")
             remote_notes = self.load_remote_notes()
             if remote_notes is None:
                 logger.error("Не удалось загрузить удаленные заметки")
                 return False, 0, 0
+            if token is not None and token.cancelled:
+                logger.info("Синхронизация отменена до слияния")
+                return False, 0, 0
             
             # Получаем локальные заметки ВКЛЮЧАЯ TOMBSTONES для правильной синхронизации удаления
             local_notes = {note.id: note for note in self.local_store.get_all_notes_including_deleted()}
             
             # Слияние
+            if token is not None:
+                token.progress(1, 3, "Слияние")
             merged_notes, conflicts = self.merge_notes(local_notes, remote_notes)
+            if token is not None and token.cancelled:
+                logger.info("Синхронизация отменена до изменения хранилища")
+                return False, 0, 0
             
             # Сохраняем конфликты
             self.conflicts = conflicts
@@ -437,8 +478,10 @@ class SyncManager:
                 conflict_note = self.create_conflict_note(conflict)
                 merged_notes[conflict_note.id] = conflict_note
             
-            # Обновляем локальное хранилище
-            self.local_store.notes = merged_notes
+            # Обновляем локальное хранилище (подписчики получают только изменения)
+            if token is not None:
+                token.progress(2, 3, "Сохранение")
+            self.local_store.sync_notes(merged_notes)
             self.local_store.save()
             
             # Сохраняем в облако
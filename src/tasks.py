@@ -0,0 +1,329 @@
+"""
+Фоновые задачи приложения: ограниченный пул потоков, прогресс и кооперативная отмена.
+
+Длительные операции (синхронизация, экспорт, резервное копирование) выполняются
+вне потока интерфейса. Задачи одной группы (синхронизация и импорт изменяют
+хранилище целиком) выполняются строго по очереди, остальные - параллельно
+в пределах размера пула. Результаты, ошибки и прогресс передаются в поток
+интерфейса сигналами.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+logger = logging.getLogger(__name__)
+
+# Типы задач
+TASK_SYNC = "sync"
+TASK_IMPORT = "import"
+TASK_EXPORT = "export"
+TASK_BACKUP = "backup"
+TASK_LOAD = "load"
+
+# Группа задач, изменяющих хранилище целиком: не выполняются одновременно
+GROUP_VAULT = "vault"
+
+# Группа по умолчанию для каждого типа задачи (None - без ограничений)
+TASK_GROUPS = {
+    TASK_SYNC: GROUP_VAULT,
+    TASK_IMPORT: GROUP_VAULT,
+    TASK_LOAD: GROUP_VAULT,
+}
+
+# Состояния задачи
+TASK_PENDING = "pending"
+TASK_RUNNING = "running"
+TASK_DONE = "done"
+TASK_FAILED = "failed"
+TASK_CANCELLED = "cancelled"
+
+
+class TaskCancelled(Exception):
+    """Задача остановлена по запросу отмены (см. TaskToken.check)."""
+
+
+class TaskToken:
+    """
+    Токен задачи: кооперативная отмена и передача прогресса.
+
+    Функция задачи периодически вызывает check() (или проверяет cancelled)
+    и сообщает прогресс через progress(). Задача считается отменённой, только
+    если функция завершилась исключением TaskCancelled. Прогресс передаётся
+    в интерфейс не чаще PROGRESS_INTERVAL, кроме последнего шага.
+    """
+
+    # Минимальный интервал между передачами прогресса (секунды)
+    PROGRESS_INTERVAL = 0.05
+
+    def __init__(self, on_progress: Optional[Callable[[int, int, str], None]] = None):
+        self._cancelled = threading.Event()
+        self._on_progress = on_progress
+        self._last_progress = 0.0
+
+    def cancel(self) -> None:
+        """Запросить отмену задачи."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True, если запрошена отмена."""
+        return self._cancelled.is_set()
+
+    def check(self) -> None:
+        """
+        Проверка отмены.
+
+        Raises:
+            TaskCancelled: Если запрошена отмена
+        """
+        if self._cancelled.is_set():
+            raise TaskCancelled()
+
+    def progress(self, done: int, total: int, text: str = "") -> None:
+        """
+        Сообщить прогресс выполнения.
+
+        Args:
+            done: Выполнено шагов
+            total: Всего шагов (0 - неизвестно)
+            text: Описание текущего шага
+        """
+        if self._on_progress is None:
+            return
+        now = time.monotonic()
+        if done < total and now - self._last_progress < self.PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        self._on_progress(done, total, text)
+
+
+class Task:
+    """
+    Фоновая задача.
+
+    Атрибуты:
+        id (int): Номер задачи
+        kind (str): Тип задачи (TASK_SYNC, TASK_EXPORT, ...)
+        title (str): Название для индикатора задач
+        group (Optional[str]): Группа конфликтующих задач
+        cancellable (bool): Можно ли отменить задачу из интерфейса
+        state (str): Состояние (TASK_PENDING, TASK_RUNNING, ...)
+        progress (tuple): Последний прогресс (выполнено, всего, описание)
+        token (TaskToken): Токен отмены и прогресса
+    """
+
+    def __init__(self, task_id: int, kind: str, title: str, func: Callable[[TaskToken], Any],
+                 group: Optional[str] = None, cancellable: bool = True):
+        self.id = task_id
+        self.kind = kind
+        self.title = title
+        self.func = func
+        self.group = group
+        self.cancellable = cancellable
+        self.state = TASK_PENDING
+        self.progress = (0, 0, "")
+        self.token: Optional[TaskToken] = None
+        # Обработчики результата (вызываются в потоке интерфейса)
+        self.on_finished: Optional[Callable[[Any], None]] = None
+        self.on_failed: Optional[Callable[[str], None]] = None
+        self.on_cancelled: Optional[Callable[[], None]] = None
+
+    def __repr__(self) -> str:
+        return f"Task(id={self.id}, kind={self.kind}, state={self.state})"
+
+
+class TaskSignals(QObject):
+    """Сигналы рабочего потока задачи (доставляются в поток интерфейса)."""
+    progress = Signal(int, int, int, str)  # task id, done, total, text
+    finished = Signal(int, object)  # task id, result
+    failed = Signal(int, str)  # task id, error message
+    cancelled = Signal(int)  # task id
+
+
+class _TaskRunnable(QRunnable):
+    """Выполнение функции задачи в пуле потоков."""
+
+    def __init__(self, task: Task, signals: TaskSignals):
+        super().__init__()
+        self.task = task
+        self.signals = signals
+
+    def run(self):
+        """Выполнение задачи (рабочий поток)."""
+        task = self.task
+        try:
+            task.token.check()
+            result = task.func(task.token)
+        except TaskCancelled:
+            self.signals.cancelled.emit(task.id)
+            return
+        except Exception as e:
+            logger.error("Ошибка фоновой задачи %s: %s", task.title, e)
+            self.signals.failed.emit(task.id, str(e))
+            return
+        # Результат задачи, дошедшей до конца, передаётся и при поздней отмене
+        self.signals.finished.emit(task.id, result)
+
+
+class TaskManager(QObject):
+    """
+    Менеджер фоновых задач.
+
+    Задачи выполняются в собственном пуле потоков ограниченного размера.
+    Задача, группа которой занята, ждёт в очереди и запускается после
+    завершения предыдущей задачи группы (в порядке добавления) и вызова
+    её обработчика результата.
+    """
+
+    # Изменился список задач или прогресс одной из них
+    changed = Signal()
+
+    # Количество одновременно выполняемых задач
+    MAX_THREADS = 2
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(self.MAX_THREADS)
+        self._ids = itertools.count(1)
+        # Задачи в порядке добавления: ожидающие и выполняемые
+        self._tasks: Dict[int, Task] = {}
+        self._signals = TaskSignals()
+        self._signals.progress.connect(self._on_progress)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+        self._signals.cancelled.connect(self._on_cancelled)
+
+    def submit(self, kind: str, title: str, func: Callable[[TaskToken], Any],
+               on_finished: Optional[Callable[[Any], None]] = None,
+               on_failed: Optional[Callable[[str], None]] = None,
+               on_cancelled: Optional[Callable[[], None]] = None,
+               cancellable: bool = True) -> Task:
+        """
+        Добавление задачи.
+
+        Args:
+            kind: Тип задачи (определяет группу по TASK_GROUPS)
+            title: Название для индикатора задач
+            func: Функция задачи (token) -> результат, выполняется в рабочем потоке
+            on_finished: Обработчик результата (поток интерфейса)
+            on_failed: Обработчик ошибки с текстом исключения (поток интерфейса)
+            on_cancelled: Обработчик отмены (поток интерфейса)
+            cancellable: Можно ли отменить задачу из интерфейса
+
+        Returns:
+            Task: Добавленная задача
+        """
+        task = Task(next(self._ids), kind, title, func, TASK_GROUPS.get(kind), cancellable)
+        task.on_finished = on_finished
+        task.on_failed = on_failed
+        task.on_cancelled = on_cancelled
+        task_id = task.id
+        task.token = TaskToken(lambda done, total, text: self._signals.progress.emit(task_id, done, total, text))
+        self._tasks[task_id] = task
+        logger.info("Фоновая задача добавлена: %s", title)
+        self._schedule()
+        self.changed.emit()
+        return task
+
+    def _schedule(self) -> None:
+        """Запуск ожидающих задач, группы которых свободны."""
+        busy = {task.group for task in self._tasks.values()
+                if task.state == TASK_RUNNING and task.group is not None}
+        for task in list(self._tasks.values()):
+            if task.state != TASK_PENDING:
+                continue
+            if task.group is not None:
+                if task.group in busy:
+                    continue
+                busy.add(task.group)
+            task.state = TASK_RUNNING
+            self.pool.start(_TaskRunnable(task, self._signals))
+
+    def _complete(self, task_id: int, state: str, handler: str, *args) -> Optional[Task]:
+        """
+        Завершение задачи: удаление из списка, обработчик и запуск ожидающих.
+
+        Ожидающие задачи запускаются после обработчика: следующая задача
+        группы видит его результат (например, загруженное хранилище).
+        """
+        task = self._tasks.pop(task_id, None)
+        if task is None:
+            return None
+        task.state = state
+        try:
+            callback = getattr(task, handler)
+            if callback is not None:
+                callback(*args)
+        finally:
+            self._schedule()
+            self.changed.emit()
+        return task
+
+    def _on_progress(self, task_id: int, done: int, total: int, text: str) -> None:
+        task = self._tasks.get(task_id)
+        if task is not None:
+            task.progress = (done, total, text)
+            self.changed.emit()
+
+    def _on_finished(self, task_id: int, result) -> None:
+        task = self._tasks.get(task_id)
+        if task is not None:
+            logger.info("Фоновая задача завершена: %s", task.title)
+        self._complete(task_id, TASK_DONE, "on_finished", result)
+
+    def _on_failed(self, task_id: int, message: str) -> None:
+        self._complete(task_id, TASK_FAILED, "on_failed", message)
+
+    def _on_cancelled(self, task_id: int) -> None:
+        task = self._tasks.get(task_id)
+        if task is not None:
+            logger.info("Фоновая задача отменена: %s", task.title)
+        self._complete(task_id, TASK_CANCELLED, "on_cancelled")
+
+    def cancel(self, task: Task) -> None:
+        """
+        Запрос отмены задачи.
+
+        Ожидающая задача снимается с очереди сразу, выполняемая
+        останавливается при следующей проверке токена.
+
+        Args:
+            task: Задача
+        """
+        if task.id not in self._tasks:
+            return
+        task.token.cancel()
+        if task.state == TASK_PENDING:
+            self._on_cancelled(task.id)
+
+    def cancel_all(self) -> None:
+        """Запрос отмены всех отменяемых задач."""
+        for task in list(self._tasks.values()):
+            if task.cancellable:
+                self.cancel(task)
+
+    def tasks(self) -> List[Task]:
+        """Ожидающие и выполняемые задачи в порядке добавления."""
+        return list(self._tasks.values())
+
+    def is_active(self, kind: str) -> bool:
+        """Есть ли ожидающая или выполняемая задача данного типа."""
+        return any(task.kind == kind for task in self._tasks.values())
+
+    def wait(self, timeout_ms: int = -1) -> bool:
+        """
+        Ожидание завершения выполняемых задач (без обработки их результатов).
+
+        Args:
+            timeout_ms: Предельное время ожидания (-1 - без ограничения)
+
+        Returns:
+            bool: True, если все задачи пула завершились
+        """
+        return self.pool.waitForDone(timeout_ms)
@@ -0,0 +1,337 @@
+"""
+Модуль нормализации текста для поиска.
+Хранит нормализованные (casefold, NFC, ё → е) копии полей заметок с отображением
+позиций обратно в исходный текст. Копия вычисляется один раз на версию заметки
+и используется поиском, подсветкой и фрагментами результатов.
+"""
+
+import bisect
+import logging
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    from notes import Note, NOTE_ADDED, STORE_RESET
+except ImportError:
+    from .notes import Note, NOTE_ADDED, STORE_RESET
+
+logger = logging.getLogger(__name__)
+
+def fold(text: str) -> str:
+    """
+    Нормализация текста для сравнения: NFC, casefold и замена ё на е.
+
+    Args:
+        text: Исходный текст
+
+    Returns:
+        str: Нормализованный текст
+    """
+    if text.isascii():
+        return text.lower()
+    if not unicodedata.is_normalized("NFC", text):
+        text = unicodedata.normalize("NFC", text)
+    # replace() заметно быстрее translate() для замены одного символа
+    return text.casefold().replace("ё", "е")
+
+
+class NormalizedText:
+    """
+    Нормализованный текст с отображением позиций в исходный.
+
+    Атрибуты:
+        text (str): Нормализованный текст
+        original_length (int): Длина исходного текста
+    """
+
+    __slots__ = ("text", "original_length", "_offsets", "_last_matches")
+
+    def __init__(self, original: str):
+        self.original_length = len(original)
+        # Результат последнего find_matches: (подстрока, позиции)
+        self._last_matches = None
+        # Позиция в исходном тексте для каждого символа нормализованного (+ конец);
+        # None - позиции совпадают (почти всегда: ё → е и casefold кириллицы не меняют длину)
+        self._offsets: Optional[array] = None
+
+        if original.isascii():
+            self.text = original.lower()
+            return
+
+        if unicodedata.is_normalized("NFC", original):
+            folded = original.casefold().replace("ё", "е")
+            # casefold не укорачивает символы, поэтому равная длина означает 1:1
+            if len(folded) == len(original):
+                self.text = folded
+                return
+
+        self._build_with_offsets(original)
+
+    def _build_with_offsets(self, original: str) -> None:
+        """Посимвольная нормализация по кластерам (базовый символ + комбинируемые знаки)."""
+        parts: List[str] = []
+        offsets = array("l")
+        length = len(original)
+
+        start = 0
+        while start < length:
+            end = start + 1
+            while end < length and unicodedata.combining(original[end]):
+                end += 1
+            piece = fold(original[start:end])
+            parts.append(piece)
+            offsets.extend([start] * len(piece))
+            start = end
+
+        offsets.append(length)
+        self.text = "".join(parts)
+        self._offsets = offsets
+
+    def to_original(self, start: int, end: int) -> Tuple[int, int]:
+        """
+        Перевод позиций нормализованного текста в позиции исходного.
+
+        Args:
+            start: Начало в нормализованном тексте
+            end: Конец в нормализованном тексте (не включительно)
+
+        Returns:
+            Tuple[int, int]: (начало, конец) в исходном тексте
+        """
+        offsets = self._offsets
+        if offsets is None:
+            return start, end
+
+        original_start = offsets[start]
+        if end <= start:
+            return original_start, original_start
+
+        # Конец - граница кластера, в который попал последний символ совпадения
+        last = offsets[end - 1]
+        while offsets[end] == last:
+            end += 1
+        return original_start, offsets[end]
+
+    def find_all(self, needle: str, limit: Optional[int] = None) -> List[Tuple[int, int]]:
+        """
+        Все вхождения нормализованной подстроки (позиции в исходном тексте).
+
+        Args:
+            needle: Подстрока, нормализованная через fold()
+            limit: Максимум вхождений (опционально)
+
+        Returns:
+            List[Tuple[int, int]]: Список (начало, конец) в исходном тексте
+        """
+        spans = []
+        if not needle:
+            return spans
+
+        position = self.text.find(needle)
+        while position != -1:
+            spans.append(self.to_original(position, position + len(needle)))
+            if limit is not None and len(spans) >= limit:
+                break
+            position = self.text.find(needle, position + len(needle))
+        return spans
+
+    def find_matches(self, needle: str) -> "MatchOffsets":
+        """
+        Все вхождения нормализованной подстроки в компактном виде (для очень частых совпадений).
+
+        Результат для последней подстроки запоминается: подсветка заметки,
+        подготовленная заранее, не ищет вхождения повторно.
+
+        Args:
+            needle: Подстрока, нормализованная через fold()
+
+        Returns:
+            MatchOffsets: Позиции вхождений в исходном тексте (не изменять)
+        """
+        last = self._last_matches
+        if last is not None and last[0] == needle:
+            return last[1]
+
+        matches = MatchOffsets()
+        if not needle:
+            return matches
+
+        text = self.text
+        step = len(needle)
+        starts, ends = matches.starts, matches.ends
+        identity = self._offsets is None
+        position = text.find(needle)
+        while position != -1:
+            if identity:
+                starts.append(position)
+                ends.append(position + step)
+            else:
+                start, end = self.to_original(position, position + step)
+                starts.append(start)
+                ends.append(end)
+            position = text.find(needle, position + step)
+        self._last_matches = (needle, matches)
+        return matches
+
+    def __contains__(self, needle: str) -> bool:
+        return needle in self.text
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+
+class MatchOffsets:
+    """
+    Позиции совпадений в исходном тексте, упорядоченные по началу.
+
+    Хранятся в массивах, а не в списке кортежей: поиск одной буквы
+    в большой заметке даёт сотни тысяч совпадений.
+
+    Атрибуты:
+        starts (array): Начала совпадений
+        ends (array): Концы совпадений (не включительно)
+    """
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, spans: Iterable[Tuple[int, int]] = ()):
+        self.starts = array("l")
+        self.ends = array("l")
+        for start, end in spans:
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def between(self, low: int, high: int) -> range:
+        """Номера совпадений, начинающихся в диапазоне [low, high)."""
+        return range(bisect.bisect_left(self.starts, low), bisect.bisect_left(self.starts, high))
+
+    def index_at_or_after(self, position: int) -> int:
+        """Номер первого совпадения, начинающегося не раньше позиции (len, если таких нет)."""
+        return bisect.bisect_left(self.starts, position)
+
+    def __getitem__(self, index: int) -> Tuple[int, int]:
+        return self.starts[index], self.ends[index]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+class NormalizedNote:
+    """
+    Нормализованные поля заметки.
+
+    Атрибуты:
+        title (NormalizedText): Заголовок
+        tags (List[NormalizedText]): Теги
+        body (NormalizedText): Текст
+        key: Версия заметки, для которой вычислены поля
+    """
+
+    __slots__ = ("title", "tags", "body", "key")
+
+    def __init__(self, note: Note):
+        self.key = (note.version, note.last_modified)
+        self.title = NormalizedText(note.title)
+        self.tags = [NormalizedText(tag) for tag in note.tags]
+        self.body = NormalizedText(note.body)
+
+    @property
+    def size(self) -> int:
+        """Объём в символах (для ограничения кэша)."""
+        return len(self.title) + len(self.body) + sum(len(tag) for tag in self.tags)
+
+
+class TextCache:
+    """
+    LRU-кэш нормализованных полей заметок.
+
+    Запись действительна для версии заметки (version, last_modified) и удаляется
+    по событиям хранилища. Общий объём ограничен MAX_CHARS символами: давно не
+    использованные заметки вытесняются, а заметка больше лимита не кэшируется.
+    """
+
+    # Максимальный суммарный объём нормализованных текстов (символы)
+    MAX_CHARS = 16 * 1024 * 1024
+
+    def __init__(self, store=None, max_chars: Optional[int] = None):
+        """
+        Args:
+            store: Хранилище NoteStore для инвалидации по событиям (опционально)
+            max_chars: Лимит объёма (по умолчанию MAX_CHARS)
+        """
+        self.max_chars = self.MAX_CHARS if max_chars is None else max_chars
+        self._entries: "OrderedDict[str, NormalizedNote]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+        if store is not None:
+            store.add_listener(self._on_store_changed)
+
+    def get(self, note: Note) -> NormalizedNote:
+        """
+        Нормализованные поля заметки (из кэша или вычисленные заново).
+
+        Args:
+            note: Заметка
+
+        Returns:
+            NormalizedNote: Нормализованные поля
+        """
+        key = (note.version, note.last_modified)
+        with self._lock:
+            entry = self._entries.get(note.id)
+            if entry is not None and entry.key == key:
+                self._entries.move_to_end(note.id)
+                return entry
+
+        # Нормализация выполняется без блокировки: её результат детерминирован
+        entry = NormalizedNote(note)
+        size = entry.size
+        if size > self.max_chars:
+            return entry
+
+        with self._lock:
+            old = self._entries.pop(note.id, None)
+            if old is not None:
+                self._chars -= old.size
+            self._entries[note.id] = entry
+            self._chars += size
+            while self._chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= evicted.size
+        return entry
+
+    def invalidate(self, note_ids: Iterable[str]) -> None:
+        """Удаление записей заметок из кэша."""
+        with self._lock:
+            for note_id in note_ids:
+                entry = self._entries.pop(note_id, None)
+                if entry is not None:
+                    self._chars -= entry.size
+
+    def clear(self) -> None:
+        """Очистка кэша."""
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+    def _on_store_changed(self, event: str, note_ids: List[str]) -> None:
+        """Инвалидация по событиям NoteStore."""
+        if event == STORE_RESET:
+            self.clear()
+        elif event != NOTE_ADDED:
+            self.invalidate(note_ids)
+
+    @property
+    def chars(self) -> int:
+        """Текущий объём кэша в символах."""
+        return self._chars
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"TextCache(notes={len(self)}, chars={self._chars})"
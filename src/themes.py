@@ -298,7 +298,7 @@ class ThemeManager:
             }}
             
             /* Поля ввода */
-            QLineEdit, QTextEdit {{
+            QLineEdit, QTextEdit, QPlainTextEdit {{
                 background-color: {theme.input_background};
                 color: {theme.input_text};
                 border: 1px solid {theme.input_border};
@@ -306,24 +306,24 @@ class ThemeManager:
                 border-radius: 3px;
             }}
             
-            QLineEdit:focus, QTextEdit:focus {{
+            QLineEdit:focus, QTextEdit:focus, QPlainTextEdit:focus {{
                 border: 2px solid {theme.button_background};
             }}
             
             /* Список заметок */
-            QListWidget {{
+            QListView {{
                 background-color: {theme.list_background};
                 color: {theme.list_text};
                 border: 1px solid {theme.input_border};
                 border-radius: 3px;
             }}
             
-            QListWidget::item:selected {{
+            QListView::item:selected {{
                 background-color: {theme.list_selected};
                 color: white;
             }}
             
-            QListWidget::item:hover {{
+            QListView::item:hover {{
                 background-color: {theme.list_hover};
             }}
             
@@ -0,0 +1,324 @@
+"""
+Замеры производительности поиска на синтетических корпусах (без GUI).
+
+Генерирует воспроизводимые (по seed) корпуса заметок на русском и английском
+с заданным количеством заметок и распределением длины текста, затем измеряет:
+    - время построения поискового индекса и его объём в памяти;
+    - задержку запросов (p50/p95/p99) - как при фильтрации списка в окне
+      (SearchEngine.search_with_positions): короткий префикс, длинная фраза,
+      запрос без совпадений, запрос только по тегу.
+
+Результат выводится в JSON, чтобы сравнивать версии между собой.
+
+Запуск:
+    python tests/benchmark_search.py --size 20000 --languages ru en --output bench.json
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import math
+import platform
+import random
+import sys
+import tempfile
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from notes import Note, NoteStore
+from search import SearchEngine
+from search_index import SearchIndex
+
+# Версия приложения для сравнения отчётов (src/__init__.py)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src import __version__
+
+# Слоги для генерации слов (слова похожи на настоящие по длине и набору букв)
+SYLLABLES = {
+    "ru": ["ка", "ро", "ми", "на", "сто", "пре", "вал", "ень", "ор", "ти", "лё", "ды", "шко",
+           "зна", "ние", "про", "ект", "дог", "вор", "ста", "ции", "ре", "жа", "быт", "ёж", "ус"],
+    "en": ["ka", "ro", "mi", "na", "sto", "pre", "val", "ent", "or", "ti", "le", "dy", "sch",
+           "kno", "tion", "pro", "ject", "con", "tract", "sta", "ing", "re", "ful", "ness", "th", "us"],
+}
+
+# Запросы без совпадений: буквы, не встречающиеся в слогах
+NO_HIT_QUERIES = {"ru": "щъэфюх", "en": "qzxjwv"}
+
+# Виды запросов в отчёте
+QUERY_KINDS = ("short", "long", "no_hit", "tag_only")
+
+
+class CorpusConfig:
+    """
+    Параметры синтетического корпуса.
+
+    Атрибуты:
+        size (int): Количество заметок
+        language (str): "ru" или "en"
+        seed (int): Начальное значение генератора
+        body_words (int): Медианная длина текста в словах
+        body_sigma (float): Разброс длины (сигма логнормального распределения)
+        vocabulary (int): Размер словаря
+        tags (int): Количество различных тегов
+    """
+
+    def __init__(self, size: int, language: str, seed: int = 42, body_words: int = 120,
+                 body_sigma: float = 0.8, vocabulary: int = 20000, tags: int = 200):
+        self.size = size
+        self.language = language
+        self.seed = seed
+        self.body_words = body_words
+        self.body_sigma = body_sigma
+        self.vocabulary = vocabulary
+        self.tags = tags
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+
+def make_vocabulary(rng: random.Random, language: str, size: int) -> List[str]:
+    """Словарь уникальных слов из 1-4 слогов (порядок задаёт частоту по закону Ципфа)."""
+    syllables = SYLLABLES[language]
+    words = []
+    seen = set()
+    while len(words) < size:
+        word = "".join(rng.choice(syllables) for _ in range(rng.randint(1, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def generate_corpus(config: CorpusConfig) -> List[Note]:
+    """
+    Генерация воспроизводимого корпуса заметок.
+
+    Args:
+        config: Параметры корпуса
+
+    Returns:
+        List[Note]: Заметки (одинаковые для одинаковых параметров)
+    """
+    rng = random.Random(f"{config.seed}-{config.language}")
+    words = make_vocabulary(rng, config.language, config.vocabulary)
+    # Частота слова обратно пропорциональна его рангу (закон Ципфа)
+    weights = list(itertools.accumulate(1.0 / rank for rank in range(1, len(words) + 1)))
+    tags = [f"{words[rng.randrange(len(words))]}-{i}" for i in range(config.tags)]
+    tag_weights = list(itertools.accumulate(1.0 / rank for rank in range(1, len(tags) + 1)))
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    mu = math.log(max(config.body_words, 1))
+    notes = []
+    for i in range(config.size):
+        length = max(1, min(int(rng.lognormvariate(mu, config.body_sigma)), 100000))
+        body_words = rng.choices(words, cum_weights=weights, k=length)
+        # Абзацы по 40 слов
+        paragraphs = [" ".join(body_words[j:j + 40]) for j in range(0, length, 40)]
+        title_words = rng.choices(words, cum_weights=weights, k=rng.randint(2, 6))
+        modified = start + timedelta(seconds=rng.randrange(365 * 86400))
+        notes.append(Note(
+            nid=f"bench-{config.language}-{i}",
+            title=" ".join(title_words).capitalize(),
+            body="\n".join(paragraphs)[:1000000],
+            last_modified=modified.isoformat(),
+            tags=sorted(set(rng.choices(tags, cum_weights=tag_weights, k=rng.randint(0, 3)))),
+            pinned=rng.random() < 0.05
+        ))
+    return notes
+
+
+def make_queries(notes: List[Note], config: CorpusConfig) -> Dict[str, str]:
+    """Запросы каждого вида, выбранные из корпуса детерминированно."""
+    rng = random.Random(f"{config.seed}-{config.language}-queries")
+    # Фраза берётся из одного абзаца: слова через перевод строки не образуют фразу в тексте
+    paragraphs = [p.split() for note in notes for p in note.body.split("\n") if len(p.split()) >= 4]
+    sample = rng.choice(paragraphs) if paragraphs else ["нет", "данных"]
+    position = rng.randrange(max(len(sample) - 3, 1))
+
+    tag_counts: Dict[str, int] = {}
+    for note in notes:
+        for tag in note.tags:
+            tag_counts[tag] = tag_counts.get(tag, 0) + 1
+    top_tag = max(sorted(tag_counts), key=tag_counts.get) if tag_counts else "нет"
+
+    return {
+        "short": sample[0][:3],
+        "long": " ".join(sample[position:position + 4]),
+        "no_hit": NO_HIT_QUERIES[config.language],
+        "tag_only": f"tag:{top_tag}",
+    }
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Перцентиль с линейной интерполяцией (p от 0 до 100)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * p / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def deep_size(obj, seen: Optional[set] = None) -> int:
+    """Приблизительный объём структуры в памяти (байты), без повторного учёта общих объектов."""
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif isinstance(current, (str, bytes, int, float, array)) or current is None:
+            continue
+        elif hasattr(current, "__dict__"):
+            stack.append(vars(current))
+    return total
+
+
+def index_size(index: SearchIndex) -> int:
+    """Объём структур индекса (без хранилища заметок)."""
+    seen = {id(index.store)}
+    return sum(deep_size(value, seen) for name, value in vars(index).items() if name not in ("store", "_lock"))
+
+
+def measure_query(engine: SearchEngine, store: NoteStore, query: str, repeat: int, rank: bool) -> Dict:
+    """Задержка запроса: первый запуск (холодный кэш текстов) и повторные без кэша запросов."""
+    def run() -> int:
+        results, _ = engine.search_with_positions(store.get_all_notes(), query)
+        if rank:
+            engine.rank(query, results.keys())
+        return len(results)
+
+    engine.clear_cache(texts=True)
+    started = time.perf_counter()
+    hits = run()
+    first = time.perf_counter() - started
+
+    timings = []
+    for _ in range(repeat):
+        engine.clear_cache()
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+
+    return {
+        "query": query,
+        "hits": hits,
+        "first_ms": round(first * 1000, 3),
+        "p50_ms": round(percentile(timings, 50) * 1000, 3),
+        "p95_ms": round(percentile(timings, 95) * 1000, 3),
+        "p99_ms": round(percentile(timings, 99) * 1000, 3),
+    }
+
+
+def run_corpus(config: CorpusConfig, repeat: int, rank: bool) -> Dict:
+    """Замеры для одного корпуса."""
+    notes = generate_corpus(config)
+    with tempfile.TemporaryDirectory(prefix="notes_bench_") as temp_dir:
+        store = NoteStore(str(Path(temp_dir) / "notes.json"))
+        store.replace_notes({note.id: note for note in notes})
+        return _measure_store(config, notes, store, repeat, rank)
+
+
+def _measure_store(config: CorpusConfig, notes: List[Note], store: NoteStore, repeat: int, rank: bool) -> Dict:
+    """Замеры индекса и запросов для заполненного хранилища."""
+    gc.collect()
+    started = time.perf_counter()
+    index = SearchIndex(store)
+    build_seconds = time.perf_counter() - started
+    engine = SearchEngine(index)
+
+    report = {
+        "config": config.to_dict(),
+        "body_chars": sum(len(note.body) for note in notes),
+        "index_build_s": round(build_seconds, 4),
+        "index_bytes": index_size(index),
+        "index_terms": len(index.doc_freq),
+        "queries": {},
+    }
+    queries = make_queries(notes, config)
+    for kind in QUERY_KINDS:
+        report["queries"][kind] = measure_query(engine, store, queries[kind], repeat, rank)
+    engine.close()
+    return report
+
+
+def run_benchmark(size: int, languages: List[str], seed: int = 42, repeat: int = 20,
+                  body_words: int = 120, body_sigma: float = 0.8, vocabulary: int = 20000,
+                  tags: int = 200, rank: bool = False) -> Dict:
+    """
+    Полный набор замеров.
+
+    Args:
+        size: Количество заметок в каждом корпусе
+        languages: Языки корпусов ("ru", "en")
+        seed: Начальное значение генератора
+        repeat: Количество повторов каждого запроса
+        body_words: Медианная длина текста в словах
+        body_sigma: Разброс длины текста
+        vocabulary: Размер словаря
+        tags: Количество различных тегов
+        rank: Включать ранжирование (как при сортировке "По релевантности")
+
+    Returns:
+        Dict: Отчёт (сериализуется в JSON)
+    """
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "repeat": repeat,
+        "rank": rank,
+        "corpora": {
+            language: run_corpus(
+                CorpusConfig(size, language, seed, body_words, body_sigma, vocabulary, tags), repeat, rank
+            )
+            for language in languages
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Замеры производительности поиска")
+    parser.add_argument("--size", type=int, default=10000, help="количество заметок в корпусе")
+    parser.add_argument("--languages", nargs="+", choices=sorted(SYLLABLES), default=["ru", "en"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20, help="повторов каждого запроса")
+    parser.add_argument("--body-words", type=int, default=120, help="медианная длина текста в словах")
+    parser.add_argument("--body-sigma", type=float, default=0.8, help="разброс длины текста (логнормальный)")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="размер словаря")
+    parser.add_argument("--tags", type=int, default=200, help="количество различных тегов")
+    parser.add_argument("--rank", action="store_true", help="включать ранжирование по релевантности")
+    parser.add_argument("--output", help="файл для JSON-отчёта (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        args.size, args.languages, args.seed, args.repeat, args.body_words,
+        args.body_sigma, args.vocabulary, args.tags, args.rank
+    )
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Тест анализа текста для поиска (без GUI).
+Проверяет основы слов, стоп-слова и сопоставление форм слова в индексе.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from analysis import Analyzer, KEYWORD_ANALYZER, TEXT_ANALYZER, segment, stem, stopword_filter
+from notes import Note, NoteStore
+from search import SearchEngine
+from search_index import SearchIndex
+
+
+def make_store():
+    """Создание хранилища во временной папке."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_analysis_")
+    return NoteStore(str(Path(temp_dir) / "notes.json"))
+
+
+def test_stemming():
+    """Тест: формы слова приводятся к одной основе (русский и английский)."""
+    forms = [
+        ("заметка", "заметки", "заметкой", "заметкам", "заметках"),
+        ("проект", "проекты", "проекта", "проектами"),
+        ("красивая", "красивый", "красивого"),
+        ("читать", "читаю", "читали"),
+        ("meeting", "meetings", "meet"),
+        ("search", "searched", "searching"),
+        ("story", "stories"),
+    ]
+    for group in forms:
+        assert len({stem(word) for word in group}) == 1, group
+
+    # Короткие слова, числа и слова с цифрами не изменяются
+    assert stem("мир") == "мир"
+    assert stem("2024") == "2024"
+    assert stem("python3") == "python3"
+
+
+def test_analyzers():
+    """Тест: цепочки анализаторов и кэш ключей."""
+    assert segment("Ёлка, ЗАМЕТКИ и python!") == ["елка", "заметки", "и", "python"]
+    assert TEXT_ANALYZER.analyze("Встреча с командой по проекту and the meetings") == [
+        "встреч", "команд", "проект", "meet"
+    ]
+    assert KEYWORD_ANALYZER.analyze("Заметки и проекты") == ["заметки", "и", "проекты"]
+    assert TEXT_ANALYZER.key("и") is None
+
+    calls = []
+    analyzer = Analyzer("test", (lambda word: calls.append(word) or word.upper(), stopword_filter))
+    assert analyzer.analyze("слово слово слово") == ["СЛОВО"] * 3
+    assert calls == ["слово"]
+
+
+def test_ranking_matches_word_forms():
+    """Тест: ранжирование находит другие формы слова, точная форма выше."""
+    store = make_store()
+    exact = Note(nid="exact", title="Заметки", body="текст")
+    form = Note(nid="form", title="Работа с заметкой", body="текст")
+    other = Note(nid="other", title="Прочее", body="текст")
+    tagged = Note(nid="tagged", title="Прочее", body="текст", tags=["заметка"])
+    meeting = Note(nid="meeting", title="План", body="Вопросы перед встречей")
+    for note in (exact, form, other, tagged, meeting):
+        store.add_note(note)
+
+    index = SearchIndex(store)
+    ranked = [note_id for _, note_id in index.top_k("заметки")]
+    assert ranked[:2] == ["exact", "form"]
+    # Теги анализируются без основ: форма слова в теге не совпадает
+    assert "tagged" not in ranked
+    # Нечёткий поиск учитывает формы слова, а не только опечатки
+    assert index.fuzzy_match("встречи") == {"meeting": "body"}
+
+    # Стоп-слова не влияют на ранжирование, если в запросе есть другие слова
+    assert [note_id for _, note_id in index.top_k("и заметки")][:2] == ["exact", "form"]
+
+    # Словарь форм обновляется вместе с индексом
+    assert sorted(index.word_forms("заметки")) == ["заметка", "заметки", "заметкой"]
+    store.delete_note("form")
+    assert sorted(index.word_forms("заметки")) == ["заметка", "заметки"]
+
+    # Поиск по подстроке по-прежнему точный
+    engine = SearchEngine(index)
+    assert set(engine.search(store.get_all_notes(), "заметки")) == {"exact"}
+    engine.close()
+
+
+if __name__ == "__main__":
+    test_stemming()
+    test_analyzers()
+    test_ranking_matches_word_forms()
+    print("✅ Все тесты анализа текста пройдены")
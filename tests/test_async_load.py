@@ -0,0 +1,102 @@
+"""
+Тест загрузки хранилища в фоне (без окна приложения).
+Проверяет отложенное сохранение до загрузки, объединение заметок,
+снимок списка и строки модели, построенные по снимку.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from notes import Note, NoteStore, STORE_RESET
+from notes_model import NotesListModel
+
+
+def make_vault():
+    """Файл хранилища с тремя заметками; возвращает путь к нему."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_async_")
+    path = str(Path(temp_dir) / "notes.json")
+    store = NoteStore(path)
+    store.add_note(Note(nid="a", title="Первая", body="текст", last_modified="2024-01-01T00:00:00+00:00"))
+    store.add_note(Note(nid="b", title="Вторая", body="текст", last_modified="2024-02-01T00:00:00+00:00",
+                        pinned=True))
+    store.add_note(Note(nid="c", title="Третья", body="текст", last_modified="2024-03-01T00:00:00+00:00"))
+    store.delete_note("c")
+    return path
+
+
+def test_deferred_load_merges_added_notes():
+    """Тест: до загрузки файл не перезаписывается, добавленные заметки объединяются с загруженными."""
+    path = make_vault()
+    store = NoteStore(path, load=False)
+    events = []
+    store.add_listener(lambda event, ids: events.append((event, sorted(ids))))
+    assert not store.loaded and len(store) == 0
+
+    # Заметка, созданная до окончания загрузки, не затирает файл
+    store.add_note(Note(nid="new", title="Новая"))
+    assert "new" not in NoteStore(path).notes
+
+    notes = store.read_notes()
+    assert sorted(notes) == ["a", "b", "c"] and len(store) == 1
+    store.finish_loading(notes)
+    assert store.loaded
+    assert sorted(store.notes) == ["a", "b", "c", "new"]
+    assert store.get_stats().active == 3
+    assert events[-1] == (STORE_RESET, ["a", "b", "c", "new"])
+
+    # Отложенное сохранение выполнено после загрузки
+    assert sorted(NoteStore(path).notes) == ["a", "b", "c", "new"]
+
+
+def test_list_snapshot():
+    """Тест: снимок списка содержит активные заметки без текста."""
+    path = make_vault()
+    store = NoteStore(path)
+    store.save_list_snapshot()
+
+    snapshot = NoteStore(path, load=False).load_list_snapshot()
+    assert sorted(note.id for note in snapshot) == ["a", "b"]
+    second = next(note for note in snapshot if note.id == "b")
+    assert (second.title, second.pinned, second.body) == ("Вторая", True, "")
+    assert second.last_modified == "2024-02-01T00:00:00+00:00"
+
+    # Незагруженное хранилище снимок не перезаписывает, повреждённый снимок игнорируется
+    NoteStore(path, load=False).save_list_snapshot()
+    assert len(store.load_list_snapshot()) == 2
+    store.snapshot_path.write_text("{повреждён", encoding="utf-8")
+    assert store.load_list_snapshot() == []
+
+
+def test_model_placeholders():
+    """Тест: строки снимка показываются до загрузки и заменяются заметками хранилища."""
+    path = make_vault()
+    NoteStore(path).save_list_snapshot()
+    store = NoteStore(path, load=False)
+    model = NotesListModel(store)
+    sort_key = lambda note: (note.pinned, note.last_modified)
+    model.load(store.load_list_snapshot(), sort_key, reverse=True, placeholders=True)
+
+    assert [model.index(row, 0).data() for row in range(model.rowCount())] == ["📌 Вторая", "Первая"]
+    assert model.placeholder("a").title == "Первая"
+
+    # Новая заметка во время загрузки вставляется среди строк снимка
+    store.add_note(Note(nid="new", title="Новая"))
+    model.update_notes(["new"])
+    assert [model.note_id(row) for row in range(model.rowCount())] == ["b", "new", "a"]
+    assert model.placeholder("new") is None
+
+    store.finish_loading(store.read_notes())
+    model.load(store.get_all_notes(), sort_key, reverse=True)
+    assert model.placeholder("a") is None
+    assert [model.note_id(row) for row in range(model.rowCount())] == ["b", "new", "a"]
+
+
+if __name__ == "__main__":
+    test_deferred_load_merges_added_notes()
+    test_list_snapshot()
+    test_model_placeholders()
+    print("✅ Все тесты загрузки хранилища в фоне пройдены")
@@ -9,7 +9,7 @@ from PySide6.QtTest import QTest
 from PySide6.QtCore import Qt
 
 # Импортируем модули приложения
-sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 from gui import NotesApp
 
 
@@ -34,7 +34,7 @@ def test_auto_create_note_on_edit(qtbot):
     app.show()
     qtbot.waitExposed(app)
     
-    initial_count = app.notes_list.count()
+    initial_count = app.notes_model.rowCount()
     print(f"📊 Начальное количество заметок: {initial_count}")
     
     # Тест 1: Создание заметки при редактировании после запуска без выбранной заметки
@@ -79,7 +79,7 @@ def test_auto_create_note_on_edit(qtbot):
     print("   ✅ Кнопки сохранения и удаления активны")
     
     # Проверяем количество заметок
-    new_count = app.notes_list.count()
+    new_count = app.notes_model.rowCount()
     assert new_count == initial_count + 1, f"Должна добавиться 1 заметка, было {initial_count}, стало {new_count}"
     print(f"   ✅ Количество заметок увеличилось: {initial_count} → {new_count}")
     
@@ -50,7 +50,7 @@ def test_autosync():
     
     # Тест 2: Создание тестовой заметки
     print("\n2️⃣ Тест: Создание тестовой заметки")
-    initial_count = window.notes_list.count()
+    initial_count = window.notes_model.rowCount()
     print(f"   Заметок до создания: {initial_count}")
     
     window.create_new_note()
@@ -61,7 +61,7 @@ def test_autosync():
     QApplication.processEvents()
     time.sleep(0.5)
     
-    new_count = window.notes_list.count()
+    new_count = window.notes_model.rowCount()
     print(f"   Заметок после создания: {new_count}")
     
     if new_count != initial_count + 1:
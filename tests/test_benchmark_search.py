@@ -0,0 +1,69 @@
+"""
+Тест набора замеров поиска (без GUI).
+Проверяет воспроизводимость корпусов и формат отчёта на маленьком корпусе.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Добавляем путь к src и к самому замеру
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from benchmark_search import CorpusConfig, QUERY_KINDS, generate_corpus, make_queries, percentile, run_benchmark
+
+
+def test_corpus_is_reproducible():
+    """Тест: одинаковые параметры дают одинаковый корпус, seed - другой."""
+    config = CorpusConfig(50, "ru", seed=1, body_words=30)
+    first = [note.to_dict() for note in generate_corpus(config)]
+    second = [note.to_dict() for note in generate_corpus(config)]
+    assert first == second
+    assert len(first) == 50
+
+    other = [note.to_dict() for note in generate_corpus(CorpusConfig(50, "ru", seed=2, body_words=30))]
+    assert other != first
+
+
+def test_long_query_is_a_phrase():
+    """Тест: длинный запрос - слова подряд из одного абзаца, поэтому он всегда находится."""
+    for seed in range(5):
+        config = CorpusConfig(30, "en", seed=seed, body_words=120)
+        notes = generate_corpus(config)
+        phrase = make_queries(notes, config)["long"]
+        assert len(phrase.split()) == 4
+        assert any(phrase in note.body for note in notes)
+
+
+def test_percentile():
+    """Тест: перцентили с интерполяцией."""
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.5
+    assert percentile(values, 99) == 99.01
+    assert percentile([], 95) == 0.0
+
+
+def test_report_format():
+    """Тест: отчёт содержит замеры всех видов запросов и сериализуется в JSON."""
+    report = run_benchmark(60, ["ru", "en"], seed=3, repeat=2, body_words=20, vocabulary=500, tags=10)
+    json.dumps(report)
+
+    for language in ("ru", "en"):
+        corpus = report["corpora"][language]
+        assert corpus["index_bytes"] > 0
+        assert corpus["index_terms"] > 0
+        assert set(corpus["queries"]) == set(QUERY_KINDS)
+        assert corpus["queries"]["no_hit"]["hits"] == 0
+        assert corpus["queries"]["tag_only"]["hits"] > 0
+        assert corpus["queries"]["short"]["hits"] > 0
+        for measurement in corpus["queries"].values():
+            assert measurement["p50_ms"] <= measurement["p95_ms"] <= measurement["p99_ms"]
+
+
+if __name__ == "__main__":
+    test_corpus_is_reproducible()
+    test_long_query_is_a_phrase()
+    test_percentile()
+    test_report_format()
+    print("✅ Все тесты замеров поиска пройдены")
@@ -0,0 +1,68 @@
+"""
+Тест закрытия окна во время фоновой загрузки хранилища.
+Проверяет, что заметки, созданные до окончания загрузки, сохраняются
+вместе с прочитанными и поздний результат загрузки не применяется повторно.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from PySide6.QtWidgets import QApplication
+
+from notes import Note, NoteStore
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def test_close_while_loading():
+    """Тест: закрытие окна до окончания загрузки не теряет новую заметку."""
+    from gui import NotesApp
+
+    home = tempfile.mkdtemp(prefix="notes_test_close_")
+    old_home, old_limit = os.environ.get("HOME"), NoteStore.BACKGROUND_LOAD_BYTES
+    os.environ["HOME"] = home
+    NoteStore.BACKGROUND_LOAD_BYTES = 0
+    try:
+        path = Path(home) / ".notes_app" / "notes.json"
+        store = NoteStore(str(path))
+        store.add_note(Note(nid="a", title="Первая", body="текст"))
+        store.add_note(Note(nid="b", title="Вторая", body="текст"))
+
+        window = NotesApp()
+        # Результат фоновой загрузки доставляется циклом событий - до него хранилище не загружено
+        assert not window.store.loaded
+        window.create_new_note()
+        window.title_edit.setText("Создана во время загрузки")
+        window.save_current_note()
+        new_id = window.current_note_id
+        assert new_id is not None
+        assert new_id not in NoteStore(str(path)).notes
+
+        window.close()
+        assert window.store.loaded
+        saved = NoteStore(str(path)).notes
+        assert sorted(saved) == sorted(["a", "b", new_id])
+        assert saved[new_id].title == "Создана во время загрузки"
+        assert len(window.store.load_list_snapshot()) == 3
+
+        # Поздний результат фоновой загрузки не заменяет заметки хранилища
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.01)
+        assert sorted(window.store.notes) == sorted(["a", "b", new_id])
+    finally:
+        NoteStore.BACKGROUND_LOAD_BYTES = old_limit
+        if old_home is not None:
+            os.environ["HOME"] = old_home
+
+
+if __name__ == "__main__":
+    test_close_while_loading()
+    print("✅ Все тесты закрытия окна во время загрузки пройдены")
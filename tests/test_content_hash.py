@@ -0,0 +1,124 @@
+"""
+Тест хэша содержимого заметок (без GUI).
+Проверяет, что обновления без изменения содержимого не увеличивают версию,
+не сохраняют хранилище и не перезаписывают облачный файл.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from notes import Note, NoteStore, content_hash
+from sync import SyncManager
+
+
+def make_store():
+    """Создание хранилища во временной папке."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_hash_")
+    return NoteStore(str(Path(temp_dir) / "notes.json"))
+
+
+def test_content_hash():
+    """Тест: хэш зависит от заголовка, текста, тегов и закрепления, но не от версии."""
+    note = Note(nid="a", title="Заголовок", body="Текст", tags=["работа"])
+    base = note.content_hash
+    assert base == content_hash("Заголовок", "Текст", ["работа"], False)
+    assert base == Note(nid="b", title="Заголовок", body="Текст", tags=["работа"], version=7).content_hash
+
+    # Поля не склеиваются между собой
+    assert content_hash("ab", "c", [], False) != content_hash("a", "bc", [], False)
+    assert content_hash("", "", ["a,b"], False) != content_hash("", "", ["a", "b"], False)
+
+    # Кэш сбрасывается при изменении любого поля, в том числе тегов на месте
+    note.body = "Другой текст"
+    assert note.content_hash != base
+    note.body = "Текст"
+    assert note.content_hash == base
+    note.tags.append("дом")
+    assert note.content_hash != base
+    note.tags.pop()
+    note.pinned = True
+    assert note.content_hash != base
+
+
+def test_update_without_changes_is_noop():
+    """Тест: обновление тем же содержимым не меняет версию и не уведомляет подписчиков."""
+    store = make_store()
+    store.add_note(Note(nid="a", title="Заметка", body="текст", tags=["t"]))
+    events = []
+    store.add_listener(lambda event, ids: events.append((event, ids)))
+    saves = []
+    original_save = store.save
+    store.save = lambda: saves.append(1) or original_save()
+
+    note = store.get_note("a")
+    version, modified = note.version, note.last_modified
+    assert store.update_note("a", title="Заметка", body="текст", tags=["t"])
+    assert store.update_notes({"a": {"body": "текст"}}) == []
+    assert store.set_pinned("a", False)
+    assert (note.version, note.last_modified) == (version, modified)
+    assert events == [] and saves == []
+
+    assert store.update_note("a", body="новый текст")
+    assert note.version == version + 1
+    assert events == [("update", ["a"])] and len(saves) == 1
+
+
+def test_sync_skips_unchanged_writes():
+    """Тест: облачный файл перезаписывается только при изменении содержимого."""
+    store = make_store()
+    store.add_note(Note(nid="a", title="Первая", body="текст"))
+    store.add_note(Note(nid="b", title="Вторая", body="текст"))
+    cloud = Path(tempfile.mkdtemp(prefix="notes_test_cloud_"))
+    manager = SyncManager(store, cloud_path=cloud)
+    manager.config_path = cloud / "config.json"
+
+    writes = []
+    original_replace = Path.replace
+    def counting_replace(self, target):
+        if Path(target).parent == cloud:
+            writes.append(Path(target).name)
+        return original_replace(self, target)
+    Path.replace = counting_replace
+    try:
+        assert manager.sync()[0]
+        assert writes == ["notes.json"]
+
+        # Повторная синхронизация без изменений не пишет в облако
+        assert manager.sync()[0]
+        assert writes == ["notes.json"]
+
+        # Правка, отменённая до синхронизации, тоже не требует записи
+        store.update_note("a", body="правка")
+        store.update_note("a", body="текст")
+        assert manager.sync()[0]
+        assert writes == ["notes.json"]
+
+        store.update_note("b", title="Изменённая")
+        assert manager.sync()[0]
+        assert writes == ["notes.json", "notes.json"]
+    finally:
+        Path.replace = original_replace
+
+
+def test_detect_conflicts_by_hash():
+    """Тест: одинаковое содержимое не конфликтует, разное при близких метках - конфликт."""
+    manager = SyncManager(make_store(), cloud_path=Path(tempfile.mkdtemp()))
+    local = Note(nid="a", title="Заметка", body="текст", version=3)
+    same = Note(nid="a", title="Заметка", body="текст", version=4, last_modified="invalid")
+    assert not manager.detect_conflicts(local, same)
+
+    other = Note(nid="a", title="Заметка", body="текст", tags=["новый"], version=4,
+                 last_modified=local.last_modified)
+    assert manager.detect_conflicts(local, other)
+
+
+if __name__ == "__main__":
+    test_content_hash()
+    test_update_without_changes_is_noop()
+    test_sync_skips_unchanged_writes()
+    test_detect_conflicts_by_hash()
+    print("✅ Все тесты хэша содержимого пройдены")
@@ -0,0 +1,93 @@
+"""
+Тест кэша документов поля текста заметки.
+Проверяет повторное открытие без загрузки текста, сохранение истории
+отмены и позиции курсора, проверку текста заметки и ограничение размера.
+"""
+
+import sys
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from PySide6.QtWidgets import QApplication
+
+from editor import NoteBodyEdit
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def type_text(edit: NoteBodyEdit, text: str):
+    """Ввод текста в позиции курсора (правка пользователя)."""
+    edit.insertPlainText(text)
+
+
+def test_reopen_uses_cached_document():
+    """Тест: документ заметки берётся из кэша вместе с историей отмены и курсором."""
+    edit = NoteBodyEdit()
+    assert not edit.show_note("a", "первая заметка")
+    document = edit.document()
+    cursor = edit.textCursor()
+    cursor.setPosition(6)
+    edit.setTextCursor(cursor)
+    type_text(edit, " правка")
+    edit.mark_saved(edit.plain_text())
+
+    assert not edit.show_note("b", "вторая")
+    assert edit.show_note("a", "первая правка заметка")
+    assert edit.document() is document
+    assert edit.textCursor().position() == 13
+    assert edit.counter.words() == 3
+
+    # История отмены сохранилась, отмена делает документ изменённым
+    edit.undo()
+    assert edit.toPlainText() == "первая заметка"
+    assert edit.document().isModified()
+    assert edit.plain_text() == "первая заметка"
+
+
+def test_stale_and_modified_documents_are_dropped():
+    """Тест: изменённый текст заметки и несохранённые правки не берутся из кэша."""
+    edit = NoteBodyEdit()
+    edit.show_note("a", "текст")
+    edit.show_note("b", "другой")
+    assert edit.cached_notes() == ["a", "b"]
+
+    # Текст заметки изменился вне поля
+    assert not edit.show_note("a", "новый текст")
+    assert edit.toPlainText() == "новый текст"
+
+    # Несохранённые правки при уходе с заметки отбрасываются
+    type_text(edit, "!")
+    edit.show_note("b", "другой")
+    assert "a" not in edit.cached_notes()
+
+    # Проверка по изменениям хранилища (удалённая заметка и изменённый текст)
+    edit.show_note("c", "третья")
+    edit.show_note("d", "четвёртая")
+    texts = {"b": "изменённая", "c": "третья"}
+    edit.revalidate(texts.get)
+    assert edit.cached_notes() == ["c", "d"]
+
+
+def test_cache_size_limit():
+    """Тест: давно открытые документы удаляются при превышении размера кэша."""
+    edit = NoteBodyEdit()
+    edit.CACHE_CHARS = 25
+    for note_id in "abcd":
+        edit.show_note(note_id, note_id * 10)
+    assert edit.cached_notes() == ["c", "d"]
+
+    # Текущий документ не удаляется, даже если он больше ограничения
+    edit.show_note("e", "e" * 40)
+    assert edit.cached_notes() == ["e"]
+    # После ухода с заметки он удаляется при следующей проверке размера
+    edit.show_note(None, "")
+    assert edit.cached_notes() == [] and edit.toPlainText() == ""
+
+
+if __name__ == "__main__":
+    test_reopen_uses_cached_document()
+    test_stale_and_modified_documents_are_dropped()
+    test_cache_size_limit()
+    print("✅ Все тесты кэша документов пройдены")
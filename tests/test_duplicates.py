@@ -0,0 +1,155 @@
+"""
+Тест поиска похожих заметок (MinHash + LSH, без GUI).
+Проверяет группы дубликатов, инкрементальное обновление индекса и объединение.
+"""
+
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from notes import Note, NoteStore
+import duplicates
+from duplicates import DuplicateFinder, minhash_signature, similarity
+
+WORDS = (
+    "встреча проект отчёт задача план бюджет клиент договор срок команда "
+    "релиз тест сервер база данные интерфейс поиск заметка идея вопрос "
+    "project report task meeting budget release server search idea review"
+).split()
+
+
+def make_store():
+    """Создание хранилища во временной папке."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_duplicates_")
+    return NoteStore(str(Path(temp_dir) / "notes.json"))
+
+
+def random_text(rng: random.Random, length: int = 60) -> str:
+    """Случайный текст из словаря."""
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def cluster_ids(finder: DuplicateFinder) -> list:
+    """Группы в виде отсортированных множеств ID."""
+    return sorted(sorted(cluster.note_ids) for cluster in finder.clusters())
+
+
+def test_signature_similarity():
+    """Тест: сходство подписей приближает коэффициент Жаккара."""
+    rng = random.Random(1)
+    words = [f"слово{i}" for i in range(400)]
+    first = set(zip(words, words[1:], words[2:]))
+    second = set(list(first)[:300]) | {("другое", str(i), "x") for i in range(100)}
+    exact = len(first & second) / len(first | second)
+
+    a, b = minhash_signature(first), minhash_signature(second)
+    assert abs(similarity(a, b) - exact) < 0.2
+    assert similarity(a, a) == 1.0
+    assert minhash_signature(set()) is None
+
+    # Короткий текст: большинство ячеек заполнено уплотнением, подпись детерминирована
+    short = {("одно", "слово", rng.choice(words))}
+    assert minhash_signature(short) == minhash_signature(set(short))
+
+
+def test_clusters():
+    """Тест: копии конфликтов и слегка изменённые тексты попадают в одну группу."""
+    rng = random.Random(2)
+    store = make_store()
+    original = random_text(rng)
+    store.add_note(Note(nid="a", title="Планёрка", body=original))
+    store.add_note(Note(nid="b", title="⚠️ Конфликт: Планёрка", body=original))
+    store.add_note(Note(nid="c", title="Планёрка", body=original + " дополнение"))
+    for i in range(50):
+        store.add_note(Note(nid=f"x{i}", title=f"Заметка {i}", body=random_text(rng)))
+    store.add_note(Note(nid="d", title="Удалённая копия", body=original))
+    store.delete_note("d")
+
+    finder = DuplicateFinder(store)
+    assert cluster_ids(finder) == [["a", "b", "c"]]
+    assert finder.similarity("a", "b") >= finder.threshold
+
+
+def test_incremental_updates():
+    """Тест: индекс поддерживается по событиям хранилища после построения."""
+    rng = random.Random(3)
+    store = make_store()
+    original = random_text(rng)
+    store.add_note(Note(nid="a", title="Отчёт", body=original))
+    store.add_note(Note(nid="b", title="Отчёт", body=original))
+
+    finder = DuplicateFinder(store)
+    assert not finder.built
+    assert cluster_ids(finder) == [["a", "b"]]
+
+    store.add_note(Note(nid="c", title="Отчёт (копия)", body=original))
+    assert cluster_ids(finder) == [["a", "b", "c"]]
+
+    store.update_note("b", body=random_text(rng))
+    assert cluster_ids(finder) == [["a", "c"]]
+
+    store.delete_note("c")
+    assert cluster_ids(finder) == []
+
+    # Полная замена содержимого хранилища перестраивает индекс
+    store.replace_notes({
+        "p": Note(nid="p", title="Идея", body=original),
+        "q": Note(nid="q", title="Идея", body=original),
+    })
+    assert cluster_ids(finder) == [["p", "q"]]
+
+
+def test_merge():
+    """Тест: остаётся самая новая заметка с объединёнными тегами и закреплением."""
+    store = make_store()
+    body = random_text(random.Random(4))
+    store.add_note(Note(nid="old", title="Бюджет", body=body, tags=["финансы", "Q1"], pinned=True,
+                        last_modified="2024-01-01T10:00:00+00:00"))
+    store.add_note(Note(nid="new", title="Бюджет", body=body, tags=["q1", "план"],
+                        last_modified="2024-03-01T10:00:00+00:00"))
+
+    finder = DuplicateFinder(store)
+    cluster = finder.clusters()[0]
+    assert cluster.note_ids == ["new", "old"]
+
+    assert finder.merge(cluster.note_ids) == "new"
+    kept = store.get_note("new")
+    assert kept.tags == ["q1", "план", "финансы"]
+    assert kept.pinned
+    assert store.get_note("old").deleted
+    assert finder.clusters() == []
+
+
+def test_large_bucket():
+    """Тест: большая группа одинаковых заметок находится без попарного сравнения всех."""
+    rng = random.Random(5)
+    store = make_store()
+    body = random_text(rng)
+    notes = {f"copy{i}": Note(nid=f"copy{i}", title="Шаблон", body=body) for i in range(300)}
+    notes.update({f"x{i}": Note(nid=f"x{i}", title="Заметка", body=random_text(rng)) for i in range(300)})
+    store.replace_notes(notes)
+
+    finder = DuplicateFinder(store)
+    calls = []
+    real_similarity = duplicates.similarity
+    duplicates.similarity = lambda a, b: calls.append(1) or real_similarity(a, b)
+    try:
+        clusters = finder.clusters()
+    finally:
+        duplicates.similarity = real_similarity
+    assert [len(cluster) for cluster in clusters] == [300]
+    # Попарное сравнение копий потребовало бы 300 * 299 / 2 = 44 850 вызовов
+    assert len(calls) < 2000
+
+
+if __name__ == "__main__":
+    test_signature_similarity()
+    test_clusters()
+    test_incremental_updates()
+    test_merge()
+    test_large_bucket()
+    print("✅ Все тесты поиска похожих заметок пройдены")
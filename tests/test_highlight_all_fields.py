@@ -6,10 +6,9 @@ import sys
 from pathlib import Path
 from PySide6.QtWidgets import QApplication
 from PySide6.QtTest import QTest
-from PySide6.QtCore import Qt
 
 # Импортируем модули приложения
-sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 from gui import NotesApp
 
 
@@ -32,7 +31,7 @@ def test_highlight_in_all_fields(qtbot):
     app.show()
     qtbot.waitExposed(app)
     
-    print(f"📊 Начальное количество заметок: {app.notes_list.count()}")
+    print(f"📊 Начальное количество заметок: {app.notes_model.rowCount()}")
     
     # Тест 1: Создание заметки с ключевым словом во всех полях
     print("\n1️⃣ Создание тестовой заметки")
@@ -59,19 +58,14 @@ def test_highlight_in_all_fields(qtbot):
     app.filter_notes(test_keyword)
     QTest.qWait(200)
     
-    visible_count = sum(1 for i in range(app.notes_list.count()) 
-                       if not app.notes_list.item(i).isHidden())
+    visible_count = app.notes_model.rowCount()
     print(f"   Найдено заметок: {visible_count}")
     assert visible_count >= 1, f"Должна быть найдена хотя бы 1 заметка с '{test_keyword}'"
     
     # Выбираем найденную заметку
-    for i in range(app.notes_list.count()):
-        item = app.notes_list.item(i)
-        if not item.isHidden() and item.data(Qt.UserRole) == note_id:
-            app.notes_list.setCurrentItem(item)
-            app.on_note_selected(item)
-            QTest.qWait(200)
-            break
+    if app.notes_list.select_note(note_id):
+        app.on_note_selected(app.notes_model.index_of(note_id))
+        QTest.qWait(200)
     
     print(f"   ✅ Заметка выбрана и загружена")
     
@@ -0,0 +1,144 @@
+"""
+Тест модели списка заметок (без окна приложения).
+Проверяет порядок строк, фильтр заменой массива ID, текст строк
+и построчное применение изменений хранилища.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from PySide6.QtCore import Qt
+
+from notes import Note, NoteStore
+from notes_model import NotesListModel, format_list_title
+from search import MATCH_TITLE, MATCH_TAGS, MATCH_BODY, MATCH_FILTER
+
+
+def make_model():
+    """Модель над хранилищем с тремя заметками."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_model_")
+    store = NoteStore(str(Path(temp_dir) / "notes.json"))
+    store.add_note(Note(nid="a", title="Первая", body="текст"))
+    store.add_note(Note(nid="b", title="Вторая", body="текст", pinned=True))
+    store.add_note(Note(nid="c", title="", body="текст"))
+    model = NotesListModel(store)
+    model.load(store.get_all_notes(), lambda note: (note.pinned, note.title), reverse=True)
+    return store, model
+
+
+def rows(model):
+    """Тексты видимых строк."""
+    return [model.index(row, 0).data() for row in range(model.rowCount())]
+
+
+def test_format_list_title():
+    """Тест: индикаторы закрепления и типа совпадения, обрезка длинных заголовков."""
+    note = Note(nid="x", title="Заметка", pinned=True)
+    assert format_list_title(note) == "📌 Заметка"
+    assert format_list_title(note, MATCH_FILTER) == "📌 Заметка"
+    assert format_list_title(note, MATCH_TITLE) == "📌 Заметка"
+    assert format_list_title(note, MATCH_TAGS) == "🏷️ Заметка"
+    assert format_list_title(note, MATCH_BODY) == "📄 Заметка"
+
+    long_title = Note(nid="y", title="д" * 80)
+    assert format_list_title(long_title) == "д" * 47 + "..."
+    assert format_list_title(long_title, MATCH_BODY) == "📄 " + "д" * 47 + "..."
+    assert format_list_title(Note(nid="z", title="")) == "(Без заголовка)"
+
+
+def test_order_and_data():
+    """Тест: строки в заданном порядке, данные строк вычисляются по ID."""
+    store, model = make_model()
+    assert rows(model) == ["📌 Вторая", "Первая", "(Без заголовка)"]
+
+    index = model.index(1, 0)
+    assert index.data(Qt.UserRole) == "a"
+    assert index.data(Qt.ToolTipRole) == "Первая"
+    assert model.row_of("c") == 2
+    assert model.note_id(5) is None
+
+    # Текст берётся из хранилища при запросе, модель не хранит копий
+    store.update_note("a", title="Изменённая")
+    assert rows(model)[1] == "Изменённая"
+
+
+def test_filter():
+    """Тест: фильтр оставляет заметки из результатов в порядке списка."""
+    _, model = make_model()
+    model.set_filter({"c": MATCH_BODY, "b": MATCH_TAGS, "missing": MATCH_BODY})
+    assert rows(model) == ["🏷️ Вторая", "📄 (Без заголовка)"]
+    assert model.row_of("a") == -1
+    assert model.order() == ["b", "a", "c"]
+
+    # Порядок по релевантности сохраняет фильтр
+    model.set_ranking(["c", "a"])
+    assert [model.note_id(row) for row in range(model.rowCount())] == ["c", "b"]
+
+    # Скрытая фильтром заметка не имеет индекса строки
+    assert not model.index_of("a").isValid()
+    assert model.index_of("c").data() == "📄 (Без заголовка)"
+
+    model.set_filter(None)
+    assert rows(model) == ["(Без заголовка)", "Первая", "📌 Вторая"]
+    model.set_ranking([])
+    assert model.order() == ["b", "a", "c"]
+
+
+def test_incremental_updates():
+    """Тест: изменения заметок перемещают, вставляют и удаляют строки без сброса модели."""
+    store, model = make_model()
+    resets, moves, inserts, removes = [], [], [], []
+    model.modelReset.connect(lambda: resets.append(1))
+    model.rowsMoved.connect(lambda *args: moves.append(args[1]))
+    model.rowsInserted.connect(lambda *args: inserts.append(args[1]))
+    model.rowsRemoved.connect(lambda *args: removes.append(args[1]))
+
+    # Изменение ключа сортировки перемещает строку
+    store.update_note("c", title="Яблоко")
+    model.update_notes(["c"])
+    assert model.order() == ["b", "c", "a"]
+    assert moves == [2] and model.row_of("c") == 1
+
+    # Закрепление перемещает строку к закреплённым (по алфавиту от Я к А)
+    store.set_pinned("a", True)
+    model.update_notes(["a"])
+    assert model.order() == ["a", "b", "c"]
+
+    # Новая заметка вставляется по ключу, удалённая убирается
+    store.add_note(Note(nid="d", title="Вишня"))
+    model.update_notes(["d"])
+    assert model.order() == ["a", "b", "c", "d"]
+    assert inserts == [3]
+    store.delete_note("b")
+    model.update_notes(["b"])
+    assert model.order() == ["a", "c", "d"]
+    assert removes == [1]
+    assert resets == []
+
+    # При фильтре новая заметка скрыта до применения результатов поиска
+    model.set_filter({"a": MATCH_TITLE, "d": MATCH_BODY})
+    store.add_note(Note(nid="e", title="Апельсин"))
+    model.update_notes(["e"])
+    assert [model.note_id(row) for row in range(model.rowCount())] == ["a", "d"]
+    assert model.row_of("e") == -1 and "e" in model.order()
+
+    # Большой пакет изменений применяется перестройкой
+    model.set_filter(None)
+    notes = [Note(nid=f"n{i}", title=f"Заметка {i:04d}") for i in range(NotesListModel.REBUILD_THRESHOLD + 1)]
+    for note in notes:
+        store.add_note(note)
+    model.update_notes([note.id for note in notes])
+    assert model.rowCount() == len(store.get_all_notes())
+    assert model.order()[:2] == ["a", "c"]
+
+
+if __name__ == "__main__":
+    test_format_list_title()
+    test_order_and_data()
+    test_filter()
+    test_incremental_updates()
+    print("✅ Все тесты модели списка заметок пройдены")
@@ -0,0 +1,103 @@
+"""
+Тест подготовки заметок в простое интерфейса.
+Проверяет выполнение заданий порциями, подготовку документа редактора
+и повторное использование найденных совпадений.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from PySide6.QtWidgets import QApplication
+
+from editor import NoteBodyEdit
+from prefetch import IdlePrefetcher
+from text_cache import NormalizedText, fold
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def run_idle(prefetcher: IdlePrefetcher, timeout: float = 5.0):
+    """Обработка событий до завершения всех заданий."""
+    deadline = time.monotonic() + timeout
+    while prefetcher.pending() and time.monotonic() < deadline:
+        app.processEvents()
+    assert not prefetcher.pending()
+
+
+def test_jobs_run_in_slices():
+    """Тест: задания выполняются порциями, ошибка одного не останавливает остальные."""
+    prefetcher = IdlePrefetcher()
+    prefetcher.FRAME_BUDGET = 0
+    steps = []
+
+    def job(name, count):
+        for i in range(count):
+            steps.append((name, i))
+            yield
+
+    def broken():
+        yield
+        raise ValueError("сломалось")
+
+    prefetcher.schedule([job("a", 3), broken(), job("b", 2)])
+    assert steps == []
+    app.processEvents()
+    # За одну порцию с нулевым бюджетом выполняется один шаг
+    assert steps == [("a", 0)]
+    run_idle(prefetcher)
+    assert steps == [("a", 0), ("a", 1), ("a", 2), ("b", 0), ("b", 1)]
+
+    # Новая очередь отменяет прежние задания
+    steps.clear()
+    prefetcher.schedule([job("c", 5)])
+    prefetcher.schedule([job("d", 1)])
+    run_idle(prefetcher)
+    assert steps == [("d", 0)]
+
+
+def test_prepared_document_is_reused():
+    """Тест: подготовленный документ открывается без загрузки текста."""
+    edit = NoteBodyEdit()
+    edit.CHUNK_SIZE = 10
+    edit.show_note("a", "текущая")
+    text = "слово " * 50
+
+    steps = list(edit.prepare("b", text))
+    assert len(steps) > 1
+    assert edit.cached_notes() == ["a", "b"]
+    assert edit.show_note("b", text)
+    assert edit.toPlainText() == text
+    assert edit.counter.words() == 50
+    assert not edit.document().isModified()
+    # Подготовка не попадает в историю отмены
+    assert not edit.document().isUndoAvailable()
+
+    # Подготовка текущей и уже подготовленной заметки не выполняется
+    assert list(edit.prepare("b", text)) == []
+    # Прерванная подготовка не оставляет документ в кэше
+    job = edit.prepare("c", text)
+    next(job)
+    job.close()
+    assert "c" not in edit.cached_notes()
+
+
+def test_matches_are_memoized():
+    """Тест: совпадения для той же подстроки не ищутся повторно."""
+    normalized = NormalizedText("Кот и КОТ, и ещё кот")
+    needle = fold("кот")
+    matches = normalized.find_matches(needle)
+    assert len(matches.starts) == 3
+    assert normalized.find_matches(needle) is matches
+    assert len(normalized.find_matches(fold("и")).starts) == 2
+    assert normalized.find_matches(needle) is not matches
+
+
+if __name__ == "__main__":
+    test_jobs_run_in_slices()
+    test_prepared_document_is_reused()
+    test_matches_are_memoized()
+    print("✅ Все тесты подготовки заметок пройдены")
@@ -0,0 +1,188 @@
+"""
+Тест языка поисковых запросов (без GUI).
+Проверяет разбор фильтров, исключений, фраз и OR, а также выполнение плана по индексам.
+"""
+
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from notes import Note, NoteStore
+from search_index import SearchIndex, ATTR_SIZE
+from search import SearchEngine, MATCH_TITLE, MATCH_TAGS, MATCH_BODY
+from query import (
+    Clause, QueryExecutor, parse_query, is_structured, MATCH_FILTER,
+    CLAUSE_TEXT, CLAUSE_TAG, CLAUSE_PINNED, CLAUSE_SIZE
+)
+
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc).timestamp()
+DAY = 86400
+
+
+def make_store():
+    """Создание хранилища во временной папке."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_query_")
+    return NoteStore(str(Path(temp_dir) / "notes.json"))
+
+
+def iso(days_ago: float) -> str:
+    """Дата изменения за days_ago дней до NOW."""
+    return datetime.fromtimestamp(NOW - days_ago * DAY, tz=timezone.utc).isoformat()
+
+
+def test_is_structured():
+    """Тест: простые запросы не считаются структурированными."""
+    assert not is_structured("встреча с командой")
+    assert not is_structured("e-mail")
+    assert is_structured("tag:работа")
+    assert is_structured('"точная фраза"')
+    assert is_structured("отчёт -черновик")
+    assert is_structured("python OR java")
+
+
+def test_parse_filters():
+    """Тест: разбор тегов, закрепления, размера, фраз и исключений."""
+    plan = parse_query('tag:Работа pinned:no size:>10k "Точная фраза" -черновик', now=NOW)
+    assert plan.groups == [[
+        Clause(CLAUSE_TAG, "работа"),
+        Clause(CLAUSE_PINNED, False),
+        Clause(CLAUSE_SIZE, (10 * 1024 + 1, None)),
+        Clause(CLAUSE_TEXT, "точная фраза"),
+        Clause(CLAUSE_TEXT, "черновик", negated=True),
+    ]]
+    assert plan.text_terms() == ["точная фраза"]
+
+
+def test_parse_modified():
+    """Тест: абсолютные даты и возраст в фильтре modified."""
+    day = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    assert parse_query("modified:>2025-01-01").groups[0][0].value == (day + DAY, None)
+    assert parse_query("modified:2025-01-01").groups[0][0].value == (day, day + DAY)
+    assert parse_query("modified:<30d", now=NOW).groups[0][0].value == (NOW - 30 * DAY, None)
+    assert parse_query("modified:>2w", now=NOW).groups[0][0].value == (None, NOW - 14 * DAY)
+
+
+def test_parse_or_and_incomplete():
+    """Тест: OR разделяет группы, незаконченные фильтры считаются текстом."""
+    plan = parse_query("tag:a OR tag:b")
+    assert plan.groups == [[Clause(CLAUSE_TAG, "a")], [Clause(CLAUSE_TAG, "b")]]
+
+    plan = parse_query("modified:>20")
+    assert plan.groups == [[Clause(CLAUSE_TEXT, "modified:>20")]]
+    assert parse_query("OR").groups == []
+
+
+def test_execute_filters():
+    """Тест: выполнение плана по индексам тегов, закрепления, дат и размеров."""
+    store = make_store()
+    client = Note(title="Звонок клиенту", body="обсудить договор", tags=["клиент"], last_modified=iso(5))
+    old = Note(title="Старый договор", body="x" * 20000, tags=["клиент"], last_modified=iso(90))
+    pinned = Note(title="Список дел", body="купить молоко", pinned=True, last_modified=iso(1))
+    store.replace_notes({note.id: note for note in (client, old, pinned)})
+    index = SearchIndex(store)
+    executor = QueryExecutor(index, store.get_note)
+
+    def run(query):
+        return executor.execute(parse_query(query, now=NOW))
+
+    assert run("tag:клиент") == {client.id: MATCH_TAGS, old.id: MATCH_TAGS}
+    assert run("tag:клиент modified:<30d") == {client.id: MATCH_TAGS}
+    assert run("tag:клиент -modified:<30d") == {old.id: MATCH_TAGS}
+    assert run("pinned:yes") == {pinned.id: MATCH_FILTER}
+    assert run("size:>10k") == {old.id: MATCH_FILTER}
+    assert run("договор -tag:клиент") == {}
+    assert run("договор -звонок") == {old.id: MATCH_TITLE}
+    assert run('"обсудить договор"') == {client.id: MATCH_BODY}
+    assert run("молоко OR size:>10k") == {pinned.id: MATCH_BODY, old.id: MATCH_FILTER}
+
+
+def test_planner_selectivity():
+    """Тест: оценка избирательности и подсчёт диапазонов по отсортированным индексам."""
+    store = make_store()
+    notes = [Note(title=f"Заметка {i}", body="a" * i, tags=["редкий"] if i == 7 else ["частый"])
+             for i in range(100)]
+    store.replace_notes({note.id: note for note in notes})
+    index = SearchIndex(store)
+    executor = QueryExecutor(index, store.get_note)
+
+    assert index.range_count(ATTR_SIZE, 10, 20) == 10
+    assert index.range_count(ATTR_SIZE, None, 50) == 50
+    rare, frequent = Clause(CLAUSE_TAG, "редкий"), Clause(CLAUSE_TAG, "частый")
+    assert executor.estimate(rare) < executor.estimate(frequent)
+
+    group = parse_query("tag:частый size:<5").groups[0]
+    assert sorted(group, key=executor.estimate)[0].kind == CLAUSE_SIZE
+    assert len(executor.execute_group(group)) == 5
+
+
+def test_engine_routes_structured_queries():
+    """Тест: движок выполняет структурированные запросы по индексу и ранжирует по тексту."""
+    store = make_store()
+    note = Note(title="Отчёт", body="квартальный отчёт", tags=["работа"])
+    store.add_note(note)
+    store.add_note(Note(title="Отчёт черновик", body="", tags=["работа"]))
+    engine = SearchEngine(SearchIndex(store))
+
+    assert engine.search(store.get_all_notes(), "tag:работа -черновик") == {note.id: MATCH_TAGS}
+    assert engine.search(store.get_all_notes(), "tag:работа отчёт -черновик") == {note.id: MATCH_TITLE}
+    assert engine.rank("tag:работа отчёт -черновик", [note.id]) == [note.id]
+    assert engine.rank("tag:работа", [note.id]) == []
+    assert engine.highlight_text('tag:работа "квартальный отчёт"') == "квартальный отчет"
+    assert engine.highlight_text("отчёт") == "отчёт"
+
+
+def test_structured_text_matches_plain_search():
+    """Тест: текст в структурированном запросе находит то же, что и простой поиск."""
+    store = make_store()
+    project = Note(nid="project", title="Статус проекта", body="word project")
+    other = Note(nid="other", title="Прочее", body="объект учёта")
+    store.replace_notes({note.id: note for note in (project, other)})
+    engine = SearchEngine(SearchIndex(store))
+    notes = store.get_all_notes()
+
+    # Фрагмент из середины слова
+    expected = set(engine.search(notes, "ект"))
+    assert expected == {"project", "other"}
+    assert set(engine.search(notes, "ект -zzz")) == expected
+    assert set(engine.search(notes, '"ект"')) == expected
+
+    # Конец слова перед пробелом и начало следующего слова
+    assert set(engine.search(notes, "d pro")) == {"project"}
+    assert set(engine.search(notes, '"d pro"')) == {"project"}
+    assert set(engine.search(notes, "a pro")) == set()
+    assert set(engine.search(notes, '"a pro"')) == set()
+
+    # Короткий фрагмент без сужения по индексу
+    assert set(engine.search(notes, '"кт"')) == set(engine.search(notes, "кт")) == {"project", "other"}
+    engine.close()
+
+
+def test_filters_narrowed_by_text_postings():
+    """Тест: редкое слово сужает выборку раньше широкого фильтра."""
+    store = make_store()
+    notes = [Note(nid=f"n{i}", title=f"Заметка {i}", body="уникальное" if i == 3 else "обычное")
+             for i in range(200)]
+    store.replace_notes({note.id: note for note in notes})
+    index = SearchIndex(store)
+    checked = []
+    executor = QueryExecutor(index, lambda note_id: checked.append(note_id) or store.get_note(note_id))
+
+    assert executor.execute(parse_query("pinned:no уникальное")) == {"n3": MATCH_BODY}
+    assert checked == ["n3"]
+
+
+if __name__ == "__main__":
+    test_is_structured()
+    test_parse_filters()
+    test_parse_modified()
+    test_parse_or_and_incomplete()
+    test_execute_filters()
+    test_planner_selectivity()
+    test_engine_routes_structured_queries()
+    test_structured_text_matches_plain_search()
+    test_filters_narrowed_by_text_postings()
+    print("✅ Все тесты языка запросов пройдены")
@@ -0,0 +1,144 @@
+"""
+Тест поиска по регулярным выражениям (без GUI).
+Проверяет отбор кандидатов по литералам, позиции совпадений и прерывание по таймауту.
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from notes import Note, NoteStore
+from search_index import SearchIndex
+from search import SearchEngine, SearchToken, MATCH_TITLE, MATCH_TAGS, MATCH_BODY
+from regex_search import RegexSearcher, RegexError, RegexTimeout, compile_pattern, required_fragments
+
+
+def make_store():
+    """Создание хранилища во временной папке."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_regex_")
+    return NoteStore(str(Path(temp_dir) / "notes.json"))
+
+
+def test_required_fragments():
+    """Тест: обязательные литералы выражения и признак начала слова."""
+    assert required_fragments(r"отчёт\s+\d+") == [("отчет", False)]
+    assert required_fragments(r"\bпроект-x") == [("проект", True), ("x", True)]
+    assert required_fragments(r"^Итоги (года)") == [("итоги", True), ("года", True)]
+    assert required_fragments(r"под(отчёт)") == [("под", False), ("отчет", False)]
+    assert required_fragments(r"договор №\d+ от") == [("договор", False), ("от", True)]
+    # Альтернативы и необязательные части ничего не гарантируют
+    assert required_fragments(r"кошка|собака") == []
+    assert required_fragments(r"(?:кот)?ик") == [("ик", False)]
+
+
+def test_compile_pattern_cache():
+    """Тест: выражения кэшируются, ошибки синтаксиса превращаются в RegexError."""
+    assert compile_pattern(r"\d+") is compile_pattern(r"\d+")
+    try:
+        compile_pattern("(")
+        assert False, "ожидалась RegexError"
+    except RegexError:
+        pass
+
+
+def test_search_regex_positions():
+    """Тест: тип совпадения, позиции по полям и отбор кандидатов по индексу."""
+    store = make_store()
+    contract = Note(title="Договор №15", body="Подписать договор №15 и договор №7", tags=["юрист"])
+    tagged = Note(title="Встреча", body="без номеров", tags=["договор №3"])
+    other = Note(title="Список", body="купить молоко")
+    for note in (contract, tagged, other):
+        store.add_note(note)
+    engine = SearchEngine(SearchIndex(store))
+
+    try:
+        results, positions = engine.search_regex(store.get_all_notes(), r"договор №\d+")
+        assert results == {contract.id: MATCH_TITLE, tagged.id: MATCH_TAGS}
+        assert positions[contract.id]["body"] == [(10, 21), (24, 34)]
+        assert engine.regex_candidates(r"договор №\d+") == {contract.id, tagged.id}
+        assert engine.rank_regex(positions) == [contract.id, tagged.id]
+
+        results, _ = engine.search_regex(store.get_all_notes(), r"МОЛОК[ОА]")
+        assert results == {other.id: MATCH_BODY}
+
+        # Изменённая заметка передаётся рабочему процессу заново
+        store.update_note(other.id, body="купить хлеб")
+        results, _ = engine.search_regex(store.get_all_notes(), r"хлеб|молоко")
+        assert results == {other.id: MATCH_BODY}
+    finally:
+        engine.close()
+
+
+def test_search_timeout():
+    """Тест: патологическое выражение прерывается, процесс перезапускается."""
+    searcher = RegexSearcher(timeout=0.5)
+    notes = [Note(title="", body="a" * 40 + "!")]
+    try:
+        started = time.monotonic()
+        try:
+            searcher.search(r"(a+)+$", notes)
+            assert False, "ожидался RegexTimeout"
+        except RegexTimeout:
+            pass
+        assert time.monotonic() - started < 5
+
+        assert searcher.search(r"a{3}", notes) == {notes[0].id: {"body": [(i, i + 3) for i in range(0, 39, 3)]}}
+    finally:
+        searcher.close()
+
+
+def test_cancel_keeps_worker():
+    """Тест: отмена не завершает процесс и не требует повторной передачи текстов."""
+    searcher = RegexSearcher(timeout=10)
+    slow = Note(title="", body="a" * 22 + "!")
+    notes = [slow] + [Note(title=f"Заметка {i}", body="текст 42") for i in range(100)]
+    try:
+        assert len(searcher.search(r"\d+", notes)) == 100
+        pid = searcher._process.pid
+
+        token = SearchToken()
+        threading.Timer(0.1, token.cancel).start()
+        started = time.monotonic()
+        assert searcher.search(r"(a+)+$", notes, token=token) is None
+        assert time.monotonic() - started < 1
+
+        # Ответ отменённого запроса отбрасывается, тексты повторно не передаются
+        sent = []
+        send = searcher._conn.send
+        searcher._conn.send = lambda message: sent.append(message) or send(message)
+        assert searcher.search(r"a{3}", [slow]) == {slow.id: {"body": [(i, i + 3) for i in range(0, 21, 3)]}}
+        assert searcher._process.pid == pid
+        assert sent[0][1] == {}
+    finally:
+        searcher.close()
+
+
+def test_cancelled_pathological_pattern_is_stopped():
+    """Тест: зависшее отменённое выражение прерывается по лимиту времени следующим запросом."""
+    searcher = RegexSearcher(timeout=0.5)
+    notes = [Note(title="", body="a" * 40 + "!")]
+    try:
+        token = SearchToken()
+        threading.Timer(0.1, token.cancel).start()
+        assert searcher.search(r"(a+)+$", notes, token=token) is None
+
+        started = time.monotonic()
+        assert searcher.search(r"!", notes) == {notes[0].id: {"body": [(40, 41)]}}
+        assert time.monotonic() - started < 5
+    finally:
+        searcher.close()
+
+
+if __name__ == "__main__":
+    test_required_fragments()
+    test_compile_pattern_cache()
+    test_search_regex_positions()
+    test_search_timeout()
+    test_cancel_keeps_worker()
+    test_cancelled_pathological_pattern_is_stopped()
+    print("✅ Все тесты поиска по выражениям пройдены")
@@ -0,0 +1,108 @@
+"""
+Тест поиска и замены во всех заметках (без GUI).
+Проверяет режимы поиска, предпросмотр и пакетное применение.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from notes import Note, NoteStore, NOTE_UPDATED
+from regex_search import RegexError
+from replace import VaultReplacer, MODE_LITERAL, MODE_IGNORE_CASE, MODE_REGEX
+from search import SearchEngine
+from search_index import SearchIndex, FIELD_TITLE, FIELD_BODY
+
+
+def make_replacer():
+    """Создание хранилища во временной папке с несколькими заметками."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_replace_")
+    store = NoteStore(str(Path(temp_dir) / "notes.json"))
+    store.add_note(Note(nid="a", title="Договор с ООО Ромашка", body="ООО Ромашка: договор №12, договор №15"))
+    store.add_note(Note(nid="b", title="Заметка", body="ооо ромашка - строчными"))
+    store.add_note(Note(nid="c", title="Прочее", body="Нет совпадений"))
+    engine = SearchEngine(SearchIndex(store))
+    return store, engine, VaultReplacer(store, engine)
+
+
+def test_literal_and_ignore_case():
+    """Тест: точный режим учитывает регистр, второй режим - нет."""
+    store, engine, replacer = make_replacer()
+
+    matches = replacer.preview("ООО Ромашка", "ООО Лютик", MODE_LITERAL)
+    assert [m.note_id for m in matches] == ["a"]
+    assert matches[0].counts == {FIELD_TITLE: 1, FIELD_BODY: 1}
+
+    matches = replacer.preview("ООО Ромашка", "ООО Лютик", MODE_IGNORE_CASE)
+    assert {m.note_id for m in matches} == {"a", "b"}
+    assert next(m for m in matches if m.note_id == "b").changes[FIELD_BODY] == "ООО Лютик - строчными"
+
+    # Текст замены вставляется как есть
+    matches = replacer.preview("Прочее", r"\1 и \n", MODE_LITERAL)
+    assert matches[0].changes[FIELD_TITLE] == r"\1 и \n"
+    engine.close()
+
+
+def test_batched_apply():
+    """Тест: одно сохранение, одно событие и одно увеличение версии на заметку."""
+    store, engine, replacer = make_replacer()
+    versions = {note.id: note.version for note in store.get_all_notes()}
+
+    events = []
+    store.add_listener(lambda event, note_ids: events.append((event, sorted(note_ids))))
+    saves = []
+    save = store.save
+    store.save = lambda: saves.append(1) or save()
+
+    matches = replacer.preview("ромашка", "Лютик", MODE_IGNORE_CASE)
+    assert replacer.apply(matches) == [m.note_id for m in matches]
+    assert len(saves) == 1
+    assert events == [(NOTE_UPDATED, ["a", "b"])]
+    assert store.get_note("a").title == "Договор с ООО Лютик"
+    assert store.get_note("a").version == versions["a"] + 1
+    assert store.get_note("c").version == versions["c"]
+
+    # Индекс обновлён: новый текст находится поиском
+    assert set(engine.search(store.get_all_notes(), "лютик")) == {"a", "b"}
+    engine.close()
+
+
+def test_stale_preview_is_skipped():
+    """Тест: заметка, изменённая после предпросмотра, не перезаписывается."""
+    store, engine, replacer = make_replacer()
+    matches = replacer.preview("ромашка", "Лютик", MODE_IGNORE_CASE)
+    store.update_note("b", body="ромашка, но уже другой текст")
+
+    assert replacer.apply(matches) == ["a"]
+    assert store.get_note("b").body == "ромашка, но уже другой текст"
+    engine.close()
+
+
+def test_regex_mode():
+    """Тест: выражение с группами и ошибки в выражении или шаблоне замены."""
+    store, engine, replacer = make_replacer()
+    try:
+        matches = replacer.preview(r"договор №(\d+)", r"контракт \1", MODE_REGEX)
+        assert [m.note_id for m in matches] == ["a"]
+        assert matches[0].counts == {FIELD_BODY: 2}
+        assert matches[0].changes[FIELD_BODY] == "ООО Ромашка: контракт 12, контракт 15"
+
+        for find, replacement in ((r"договор (", "x"), (r"договор", r"\2")):
+            try:
+                replacer.preview(find, replacement, MODE_REGEX)
+                assert False, "ожидалась RegexError"
+            except RegexError:
+                pass
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    test_literal_and_ignore_case()
+    test_batched_apply()
+    test_stale_preview_is_skipped()
+    test_regex_mode()
+    print("✅ Все тесты поиска и замены пройдены")
@@ -11,6 +11,16 @@ from PySide6.QtTest import QTest
 from gui import NotesApp
 
 
+def wait_for_search(window, timeout: float = 5.0):
+    """Ожидание завершения фонового поиска (debounce + рабочий поток)."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        QApplication.processEvents()
+        if not window.search_timer.isActive() and window._search_token is None:
+            return
+        time.sleep(0.02)
+
+
 def test_search():
     """Тест поиска с визуальной обратной связью."""
     print("\n" + "="*70)
@@ -23,7 +33,7 @@ def test_search():
     QApplication.processEvents()
     
     # Получаем начальное количество заметок
-    initial_count = window.notes_list.count()
+    initial_count = window.notes_model.rowCount()
     print(f"\n📊 Начальное количество заметок: {initial_count}")
     
     # Создаём тестовые заметки для поиска
@@ -48,12 +58,12 @@ def test_search():
     QApplication.processEvents()
     time.sleep(0.2)
     
-    total_count = window.notes_list.count()
+    total_count = window.notes_model.rowCount()
     print(f"✅ Создано {len(test_notes)} тестовых заметок. Всего в базе: {total_count}")
     
     # Тест 1: Проверка видимости всех заметок без фильтра
     print("\n1️⃣ Тест: Все заметки видимы без фильтра")
-    visible = sum(1 for i in range(window.notes_list.count()) if not window.notes_list.item(i).isHidden())
+    visible = window.notes_model.rowCount()
     print(f"   Видимых заметок: {visible}/{total_count}")
     
     if visible != total_count:
@@ -65,10 +75,9 @@ def test_search():
     # Тест 2: Поиск по заголовку
     print("\n2️⃣ Тест: Поиск 'Python' (должен найти в заголовке)")
     window.search_box.setText("Python")
-    QApplication.processEvents()
-    time.sleep(0.2)
+    wait_for_search(window)
     
-    visible = sum(1 for i in range(window.notes_list.count()) if not window.notes_list.item(i).isHidden())
+    visible = window.notes_model.rowCount()
     print(f"   Видимых заметок: {visible}")
     print(f"   Текст результатов: '{window.search_results_label.text()}'")
     
@@ -81,10 +90,9 @@ def test_search():
     # Тест 3: Поиск по тексту
     print("\n3️⃣ Тест: Поиск 'молоко' (должен найти в тексте)")
     window.search_box.setText("молоко")
-    QApplication.processEvents()
-    time.sleep(0.2)
+    wait_for_search(window)
     
-    visible = sum(1 for i in range(window.notes_list.count()) if not window.notes_list.item(i).isHidden())
+    visible = window.notes_model.rowCount()
     print(f"   Видимых заметок: {visible}")
     print(f"   Текст результатов: '{window.search_results_label.text()}'")
     
@@ -97,10 +105,9 @@ def test_search():
     # Тест 4: Поиск несуществующего текста
     print("\n4️⃣ Тест: Поиск 'НЕСУЩЕСТВУЮЩИЙТЕКСТ123' (не должен ничего найти)")
     window.search_box.setText("НЕСУЩЕСТВУЮЩИЙТЕКСТ123")
-    QApplication.processEvents()
-    time.sleep(0.2)
+    wait_for_search(window)
     
-    visible = sum(1 for i in range(window.notes_list.count()) if not window.notes_list.item(i).isHidden())
+    visible = window.notes_model.rowCount()
     print(f"   Видимых заметок: {visible}")
     print(f"   Текст результатов: '{window.search_results_label.text()}'")
     
@@ -120,7 +127,7 @@ def test_search():
     QApplication.processEvents()
     time.sleep(0.2)
     
-    visible = sum(1 for i in range(window.notes_list.count()) if not window.notes_list.item(i).isHidden())
+    visible = window.notes_model.rowCount()
     print(f"   Видимых заметок: {visible}/{total_count}")
     
     if visible != total_count:
@@ -162,14 +169,12 @@ def test_search():
     print("\n7️⃣ Тест: Регистронезависимый поиск 'PYTHON' vs 'python'")
     
     window.search_box.setText("PYTHON")
-    QApplication.processEvents()
-    time.sleep(0.1)
-    visible_upper = sum(1 for i in range(window.notes_list.count()) if not window.notes_list.item(i).isHidden())
+    wait_for_search(window)
+    visible_upper = window.notes_model.rowCount()
     
     window.search_box.setText("python")
-    QApplication.processEvents()
-    time.sleep(0.1)
-    visible_lower = sum(1 for i in range(window.notes_list.count()) if not window.notes_list.item(i).isHidden())
+    wait_for_search(window)
+    visible_lower = window.notes_model.rowCount()
     
     print(f"   'PYTHON': {visible_upper} заметок")
     print(f"   'python': {visible_lower} заметок")
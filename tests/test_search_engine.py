@@ -0,0 +1,171 @@
+"""
+Тест поискового движка (без GUI).
+Проверяет типы совпадений, отмену поиска и частичные результаты.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from notes import Note, NoteStore
+from search import SearchEngine, SearchToken, MATCH_TITLE, MATCH_TAGS, MATCH_BODY
+from search_index import SearchIndex
+
+
+def make_notes(count: int):
+    """Создание тестового набора заметок."""
+    notes = []
+    for i in range(count):
+        notes.append(Note(
+            nid=f"note-{i}",
+            title=f"Заметка {i}",
+            body="Обсудить Python проект" if i % 10 == 0 else "Обычный текст",
+            tags=["работа"] if i % 3 == 0 else []
+        ))
+    return notes
+
+
+def test_match_types():
+    """Тест: тип совпадения определяется по приоритету заголовок > теги > текст."""
+    engine = SearchEngine()
+    note = Note(title="Python Tutorial", body="Изучаем python", tags=["python"])
+    assert engine.match_note(note, "python") == MATCH_TITLE
+
+    note = Note(title="Учебник", body="Изучаем python", tags=["Python"])
+    assert engine.match_note(note, "python") == MATCH_TAGS
+
+    note = Note(title="Учебник", body="Изучаем PYTHON", tags=[])
+    assert engine.match_note(note, "python") == MATCH_BODY
+
+    assert engine.match_note(note, "java") is None
+
+
+def test_search_case_insensitive():
+    """Тест: регистронезависимый поиск по всем полям."""
+    engine = SearchEngine()
+    notes = make_notes(100)
+
+    upper = engine.search(notes, "PYTHON")
+    lower = engine.search(notes, "python")
+    assert upper == lower
+    assert len(lower) == 10
+    assert all(match == MATCH_BODY for match in lower.values())
+
+    assert engine.search(notes, "   ") == {}
+
+
+def test_search_cancelled():
+    """Тест: отменённый поиск не возвращает результатов."""
+    engine = SearchEngine()
+    token = SearchToken(generation=1)
+    token.cancel()
+
+    assert engine.search(make_notes(100), "python", token=token) is None
+
+
+def test_search_partial_results():
+    """Тест: частичные результаты передаются порциями и только растут."""
+    engine = SearchEngine()
+    engine.CHUNK_SIZE = 100
+    notes = make_notes(450)
+    partials = []
+
+    results = engine.search(notes, "работа", on_partial=partials.append)
+
+    assert len(partials) == 4
+    sizes = [len(p) for p in partials]
+    assert sizes == sorted(sizes)
+    assert len(results) == 150
+
+
+def test_incremental_narrowing():
+    """Тест: уточнённый запрос проверяет только прошлые результаты, стирание берётся из кэша."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_engine_")
+    store = NoteStore(str(Path(temp_dir) / "notes.json"))
+    for note in make_notes(100):
+        store.add_note(note)
+    engine = SearchEngine(SearchIndex(store))
+
+    checked = []
+    locate = engine.locate
+    engine.locate = lambda note, query: checked.append(note.id) or locate(note, query)
+
+    assert len(engine.search(store.get_all_notes(), "обсудить")) == 10
+    assert len(checked) == 100
+
+    checked.clear()
+    results, positions = engine.search_with_positions(store.get_all_notes(), "обсудить python")
+    assert len(results) == 10
+    assert len(checked) == 10
+    assert positions["note-0"] == {MATCH_BODY: [(0, 15)]}
+
+    # Стирание символов: результат из кэша без проверки заметок
+    checked.clear()
+    assert len(engine.search(store.get_all_notes(), "Обсудить")) == 10
+    assert checked == []
+
+    # Изменение хранилища делает кэш недействительным
+    store.update_note("note-1", body="Обсудить отпуск")
+    checked.clear()
+    assert len(engine.search(store.get_all_notes(), "обсудить")) == 11
+    assert len(checked) == 100
+
+
+def test_word_forms_in_default_search():
+    """Тест: простой запрос находит другие формы слова ("заметкой" -> "заметка")."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_engine_")
+    store = NoteStore(str(Path(temp_dir) / "notes.json"))
+    store.add_note(Note(nid="a", title="Первая заметка", body="текст"))
+    store.add_note(Note(nid="b", title="Список", body="Поделиться заметками с командой"))
+    store.add_note(Note(nid="c", title="Другое", body="Ничего похожего"))
+    engine = SearchEngine(SearchIndex(store))
+    notes = store.get_all_notes()
+
+    results, positions = engine.search_with_positions(notes, "заметкой")
+    assert results == {"a": MATCH_TITLE, "b": MATCH_BODY}
+    assert positions["a"] == {MATCH_TITLE: [(7, 14)]}
+    assert positions["b"] == {MATCH_BODY: [(11, 20)]}
+
+    # Фраза по-прежнему ищется как подстрока целиком
+    assert engine.search(notes, "первой заметкой") == {}
+    assert engine.search(notes, "первая заметка") == {"a": MATCH_TITLE}
+
+    # Пока индекс строится, работает только поиск подстроки
+    building = SearchIndex(store, build=False)
+    assert SearchEngine(building).search(notes, "заметкой") == {}
+
+
+def test_snippet():
+    """Тест: фрагмент вокруг совпадения обрезается по словам, совпадение размечено."""
+    engine = SearchEngine()
+    body = "Вчера долго обсуждали новый проект и решили\nначать с пилота в отделе продаж. " + "Текст " * 30
+    note = Note(title="Планёрка", body=body)
+
+    text, start, end = engine.snippet(note, term="ПИЛОТА")
+    assert text[start:end] == "пилота"
+    assert text.startswith("…") and text.endswith("…")
+    assert "\n" not in text
+    assert len(text) <= engine.SNIPPET_LENGTH + 2
+
+    # Позиция из результатов поиска важнее текста запроса
+    position = body.index("продаж")
+    text, start, end = engine.snippet(note, {MATCH_BODY: [(position, position + 6)]}, term="пилота")
+    assert text[start:end] == "продаж"
+
+    # Совпадения в тексте нет - начало текста без выделения
+    text, start, end = engine.snippet(note, term="планёрка")
+    assert text.startswith("Вчера") and start == end
+
+
+if __name__ == "__main__":
+    test_match_types()
+    test_search_case_insensitive()
+    test_search_cancelled()
+    test_search_partial_results()
+    test_incremental_narrowing()
+    test_word_forms_in_default_search()
+    test_snippet()
+    print("✅ Все тесты поискового движка пройдены")
@@ -0,0 +1,208 @@
+"""
+Тест поискового индекса и ранжирования BM25 (без GUI).
+Проверяет веса полей, инкрементальное обновление по событиям хранилища и отбор top-k.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from notes import Note, NoteStore
+from search_index import SearchIndex, tokenize, edit_distance
+
+
+def make_store():
+    """Создание хранилища во временной папке."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_index_")
+    return NoteStore(str(Path(temp_dir) / "notes.json"))
+
+
+def test_tokenize():
+    """Тест: разбиение на слова в нижнем регистре (кириллица и латиница)."""
+    assert tokenize("Встреча с командой: Python 3!") == ["встреча", "с", "командой", "python", "3"]
+
+
+def test_field_boosts():
+    """Тест: совпадение в заголовке важнее тегов, а теги важнее текста."""
+    store = make_store()
+    in_body = Note(title="Заметка", body="проект")
+    in_tags = Note(title="Заметка", body="текст", tags=["проект"])
+    in_title = Note(title="Проект", body="текст")
+    for note in (in_body, in_tags, in_title):
+        store.add_note(note)
+
+    index = SearchIndex(store)
+    ranked = [note_id for _, note_id in index.top_k("проект")]
+    assert ranked == [in_title.id, in_tags.id, in_body.id]
+
+
+def test_incremental_updates():
+    """Тест: индекс обновляется по событиям хранилища без перестроения."""
+    store = make_store()
+    index = SearchIndex(store)
+
+    note = Note(title="Черновик", body="кошка")
+    store.add_note(note)
+    assert [n for _, n in index.top_k("кошка")] == [note.id]
+
+    store.update_note(note.id, body="собака")
+    assert index.top_k("кошка") == []
+    assert [n for _, n in index.top_k("собака")] == [note.id]
+
+    store.delete_note(note.id)
+    assert note.id not in index
+    assert index.doc_freq == {}
+
+
+def test_top_k_and_candidates():
+    """Тест: отбор ограничен k и множеством кандидатов."""
+    store = make_store()
+    notes = [Note(title=f"Заметка {i}", body="слово " * (i + 1)) for i in range(50)]
+    for note in notes:
+        store.add_note(note)
+    index = SearchIndex(store)
+
+    top = index.top_k("слово", k=5)
+    assert len(top) == 5
+    assert [score for score, _ in top] == sorted((score for score, _ in top), reverse=True)
+
+    allowed = {notes[0].id, notes[1].id}
+    assert {n for _, n in index.top_k("слово", candidates=allowed)} == allowed
+
+
+def test_prefix_expansion():
+    """Тест: незаконченное слово ранжируется по продолжениям из словаря."""
+    store = make_store()
+    note = Note(title="Проекты на год", body="")
+    store.add_note(note)
+    index = SearchIndex(store)
+
+    assert index.expand_prefix("прое") == ["проекты"]
+    assert [n for _, n in index.top_k("прое")] == [note.id]
+
+
+def test_edit_distance():
+    """Тест: расстояние с учётом перестановки соседних символов и порога."""
+    assert edit_distance("python", "pyhton", 2) == 1
+    assert edit_distance("встреча", "встерча", 2) == 1
+    assert edit_distance("кошка", "кошки", 2) == 1
+    assert edit_distance("кот", "собака", 2) == 3
+
+
+def test_fuzzy_search():
+    """Тест: опечатки находятся через индекс удалений, в том числе после изменений."""
+    store = make_store()
+    meeting = Note(title="Встреча с командой", body="")
+    python = Note(title="Заметки", body="Изучаем python")
+    store.add_note(meeting)
+    store.add_note(python)
+    index = SearchIndex(store)
+
+    assert index.fuzzy_terms("встерча") == ["встреча"]
+    assert index.fuzzy_terms("pyhton") == ["python"]
+    # Короткие слова ищутся только точно
+    assert index.fuzzy_terms("сс") == []
+
+    assert index.fuzzy_match("встерча командой") == {meeting.id: "title"}
+    assert index.fuzzy_match("pyhton") == {python.id: "body"}
+    assert index.fuzzy_match("встерча pyhton") == {}
+
+    # Индекс удалений обновляется инкрементально
+    store.update_note(python.id, body="Изучаем javascript")
+    assert index.fuzzy_terms("pyhton") == []
+    assert index.fuzzy_terms("javscript") == ["javascript"]
+
+
+def test_tag_counts():
+    """Тест: счётчики тегов для всех заметок и для результатов поиска."""
+    store = make_store()
+    index = SearchIndex(store)
+    notes = [Note(title=f"Заметка {i}", tags=["Работа"] + (["клиент"] if i % 2 else [])) for i in range(6)]
+    for note in notes:
+        store.add_note(note)
+
+    assert index.tag_counts() == {"работа": 6, "клиент": 3}
+    assert index.tag_labels["работа"] == "Работа"
+
+    # Оба способа подсчёта (по заметкам и по тегам) дают одинаковый результат
+    few = {notes[0].id, notes[1].id}
+    assert index.tag_counts(few) == {"работа": 2, "клиент": 1}
+    many = {note.id for note in notes[:5]}
+    assert index.tag_counts(many) == {"работа": 5, "клиент": 2}
+
+    store.update_note(notes[1].id, tags=["Работа"])
+    store.update_note(notes[3].id, tags=["Работа"])
+    store.update_note(notes[5].id, tags=["Работа"])
+    assert index.tag_counts() == {"работа": 6}
+    assert "клиент" not in index.tag_labels
+    assert index.tag_summary() == ({"работа": "Работа"}, {"работа": 6})
+
+
+def index_state(index):
+    """Содержимое индекса для сравнения (без служебных структур)."""
+    return (index.postings, index.doc_freq, index.tag_index, index.pinned, index._attr_order)
+
+
+def test_background_build():
+    """Тест: фоновое построение совпадает с обычным и учитывает изменения во время построения."""
+    store = make_store()
+    notes = [Note(nid=f"n{i}", title=f"Заметка {i}", body="текст " * i, tags=[f"тег{i % 3}"], pinned=i % 5 == 0)
+             for i in range(50)]
+    store.replace_notes({note.id: note for note in notes})
+
+    index = SearchIndex(store, build=False)
+    assert not index.ready.is_set()
+
+    # Изменения до завершения построения откладываются
+    store.update_note("n1", body="новый текст")
+    store.delete_note("n2")
+    store.add_note(Note(nid="new", title="Новая", body="проект"))
+
+    ready = []
+    index.build_in_background(lambda: ready.append(True)).join(5)
+    assert index.wait_ready(0) and ready == [True]
+    assert index_state(index) == index_state(SearchIndex(store))
+    assert "n2" not in index and "new" in index
+
+    # После построения индекс обновляется как обычно
+    store.update_note("n3", tags=["другой"])
+    assert index.tag_ids("другой") == {"n3"}
+
+
+def test_sync_notes_emits_diff():
+    """Тест: синхронизация оповещает только об изменившихся заметках."""
+    store = make_store()
+    for i in range(5):
+        store.add_note(Note(nid=f"n{i}", title=f"Заметка {i}", body="текст"))
+    index = SearchIndex(store)
+    events = []
+    store.add_listener(lambda event, note_ids: events.append((event, sorted(note_ids))))
+
+    merged = {note.id: note for note in store.get_all_notes_including_deleted()}
+    same = merged["n0"]
+    merged["n0"] = Note(nid="n0", title=same.title, body=same.body, last_modified=same.last_modified,
+                        version=same.version)
+    merged["n1"] = Note(nid="n1", title="Изменена", body="текст", version=5)
+    merged["n9"] = Note(nid="n9", title="Новая", body="")
+    del merged["n4"]
+
+    assert store.sync_notes(merged) == (["n9"], ["n1"], ["n4"])
+    assert events == [("add", ["n9"]), ("update", ["n1"]), ("purge", ["n4"])]
+    assert index_state(index) == index_state(SearchIndex(store))
+
+
+if __name__ == "__main__":
+    test_tokenize()
+    test_field_boosts()
+    test_incremental_updates()
+    test_top_k_and_candidates()
+    test_prefix_expansion()
+    test_edit_distance()
+    test_fuzzy_search()
+    test_tag_counts()
+    test_background_build()
+    test_sync_notes_emits_diff()
+    print("✅ Все тесты поискового индекса пройдены")
@@ -0,0 +1,152 @@
+"""
+Тест умных папок (без GUI).
+Проверяет вычисление результатов и их поддержку по событиям хранилища.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from notes import Note, NoteStore
+from search import SearchEngine
+from search_index import SearchIndex
+from smart_folders import SmartFolders
+
+
+def make_folders():
+    """Создание хранилища во временной папке и умных папок над ним."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_smart_folders_")
+    store = NoteStore(str(Path(temp_dir) / "notes.json"))
+    for i in range(20):
+        store.add_note(Note(
+            nid=f"note-{i}",
+            title=f"Встреча {i}",
+            body="Обсудить договор" if i % 2 == 0 else "Прочее",
+            tags=["клиент"] if i % 4 == 0 else ["работа"],
+            pinned=i % 8 == 0
+        ))
+    folders = SmartFolders(store, SearchIndex(store))
+    return store, folders
+
+
+def test_initial_results():
+    """Тест: результаты папки совпадают с поиском по запросу."""
+    store, folders = make_folders()
+    folder = folders.add("Клиенты", "tag:клиент pinned:no modified:<30d")
+    assert set(folder.results) == {"note-4", "note-12"}
+
+    folders.add("Договоры", "договор -tag:клиент")
+    assert folders.get("Договоры").count == 5
+
+
+def test_incremental_updates():
+    """Тест: изменения заметок обновляют результаты без полного пересчёта."""
+    store, folders = make_folders()
+    folders.add("Клиенты", "tag:клиент pinned:no")
+    changes = []
+    folders.add_listener(changes.append)
+
+    # Полный пересчёт не выполняется - проверяется только изменённая заметка
+    executed = []
+    execute = folders.executor.execute
+    folders.executor.execute = lambda plan, token=None: executed.append(plan) or execute(plan, token)
+
+    store.update_note("note-1", tags=["клиент"])
+    assert "note-1" in folders.results("Клиенты")
+    assert changes == [["Клиенты"]]
+
+    store.set_pinned("note-4", True)
+    assert "note-4" not in folders.results("Клиенты")
+
+    store.add_note(Note(nid="new", title="Новый", body="", tags=["Клиент"]))
+    assert "new" in folders.results("Клиенты")
+
+    store.delete_note("note-12")
+    assert set(folders.results("Клиенты")) == {"note-1", "new"}
+
+    # Изменение, не влияющее на результат, не вызывает уведомлений
+    changes.clear()
+    store.update_note("note-3", body="Другой текст")
+    assert changes == []
+    assert executed == []
+
+
+def test_relative_dates_refresh():
+    """Тест: папки с modified: пересчитываются по истечении PLAN_TTL."""
+    store, folders = make_folders()
+    folders.add("Свежие", "modified:<1d")
+    folders.add("Работа", "tag:работа")
+    assert folders.get("Свежие").count == 20
+
+    assert folders.refresh_expired() == []
+    later = time.time() + 2 * 86400
+    assert folders.refresh_expired(now=later) == ["Свежие"]
+    assert folders.get("Свежие").count == 0
+    assert folders.get("Работа").count == 15
+
+
+def test_persistence_format():
+    """Тест: папки сохраняются и загружаются как список словарей."""
+    store, folders = make_folders()
+    folders.add("Клиенты", "tag:клиент")
+    saved = folders.to_list()
+    assert saved == [{"name": "Клиенты", "query": "tag:клиент"}]
+
+    _, restored = make_folders()
+    restored.load(saved + [{"name": ""}, {"name": "Пустая", "query": " "}])
+    assert len(restored) == 1
+    assert restored.get("Клиенты").count == 5
+
+
+def test_results_agree_with_note_checks():
+    """Тест: первоначальный расчёт совпадает с поштучной проверкой и с поиском."""
+    store, folders = make_folders()
+    store.add_note(Note(nid="phrase", title="Итоги", body="Обсудить с командой проекта"))
+    store.add_note(Note(nid="words", title="Команда", body="обсудить позже, с утра"))
+    engine = SearchEngine(folders.executor.index)
+
+    for query in ("обсудить с командой", "ект", "ект -tag:клиент", "суд", "встреча 1"):
+        folder = folders.add(query, query)
+        checked = {}
+        for note in store.get_all_notes():
+            match = folders.executor.match_note(folder.plan, note)
+            if match is not None:
+                checked[note.id] = match
+        assert folder.results == checked, query
+        if query != "ект -tag:клиент":
+            assert folder.results == engine.search(store.get_all_notes(), query), query
+
+    # Простой запрос - подстрока целиком, а не набор слов
+    assert set(folders.results("обсудить с командой")) == {"phrase"}
+    engine.close()
+
+
+def test_word_forms_agree_with_search():
+    """Тест: папка из одного слова находит его формы, как строка поиска."""
+    store, folders = make_folders()
+    store.add_note(Note(nid="form", title="Итоги", body="Обсудили договоры с юристом"))
+    engine = SearchEngine(folders.executor.index)
+
+    folder = folders.add("Договоры", "договора")
+    assert folder.results == engine.search(store.get_all_notes(), "договора")
+    assert "form" in folder.results and "note-0" in folder.results
+
+    # Поддержка по событиям хранилища проверяет формы по тексту заметки
+    store.add_note(Note(nid="new", title="Договор поставки", body=""))
+    store.update_note("form", body="Без совпадений")
+    assert folder.results == engine.search(store.get_all_notes(), "договора")
+    assert "new" in folder.results and "form" not in folder.results
+
+
+if __name__ == "__main__":
+    test_initial_results()
+    test_incremental_updates()
+    test_relative_dates_refresh()
+    test_persistence_format()
+    test_results_agree_with_note_checks()
+    test_word_forms_agree_with_search()
+    print("✅ Все тесты умных папок пройдены")
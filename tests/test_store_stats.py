@@ -0,0 +1,98 @@
+"""
+Тест счётчиков статистики NoteStore (без GUI).
+Проверяет, что счётчики совпадают с полным пересчётом после каждого изменения.
+"""
+
+import copy
+import sys
+import tempfile
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from notes import Note, NoteStore, StoreStats
+
+
+def make_store():
+    """Создание хранилища во временной папке."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_stats_")
+    return NoteStore(str(Path(temp_dir) / "notes.json"))
+
+
+def expected_stats(store: NoteStore) -> StoreStats:
+    """Статистика полным перебором заметок."""
+    stats = StoreStats()
+    for note in store.notes.values():
+        stats.total += 1
+        if note.deleted:
+            stats.tombstones += 1
+            continue
+        stats.active += 1
+        stats.pinned += note.pinned
+        stats.body_bytes += len(note.body.encode("utf-8"))
+        stats.words += len(note.body.split())
+    return stats
+
+
+def test_counters_follow_mutations():
+    """Тест: добавление, изменение, закрепление и удаление обновляют счётчики."""
+    store = make_store()
+    assert store.get_stats() == StoreStats()
+
+    store.add_note(Note(nid="a", title="Первая", body="три слова здесь"))
+    store.add_note(Note(nid="b", title="Вторая", body="ёлка"))
+    stats = store.get_stats()
+    assert (stats.total, stats.active, stats.words) == (2, 2, 4)
+    assert stats.body_bytes == len("три слова здесь".encode("utf-8")) + len("ёлка".encode("utf-8"))
+
+    store.update_note("a", body="одно")
+    store.set_pinned("b", True)
+    store.update_notes({"b": {"body": "ещё два"}})
+    assert store.get_stats() == expected_stats(store)
+    assert store.get_stats().pinned == 1
+
+    store.delete_note("b")
+    stats = store.get_stats()
+    assert (stats.total, stats.active, stats.pinned, stats.tombstones) == (2, 1, 0, 1)
+    assert stats == expected_stats(store)
+
+    # Снимок не меняется вместе с хранилищем
+    store.add_note(Note(nid="c", title="Третья", body="текст"))
+    assert stats.total == 2
+    assert store.get_stats() == expected_stats(store)
+
+
+def test_counters_follow_sync_and_reload():
+    """Тест: синхронизация, очистка tombstones, замена и загрузка с диска."""
+    store = make_store()
+    for i in range(10):
+        store.add_note(Note(nid=f"n{i}", title=f"Заметка {i}", body="слово " * i, pinned=i % 3 == 0))
+    store.delete_note("n1")
+
+    merged = {note_id: note for note_id, note in store.notes.items() if note_id != "n2"}
+    changed = copy.copy(merged["n3"])
+    changed.body = "совсем другой текст"
+    changed.version += 1
+    merged["n3"] = changed
+    merged["new"] = Note(nid="new", title="Из облака", body="новая заметка", pinned=True)
+    store.sync_notes(merged)
+    assert store.get_stats() == expected_stats(store)
+
+    old = store.notes["n1"]
+    old.last_modified = "2000-01-01T00:00:00+00:00"
+    assert store.cleanup_tombstones(older_than_days=30) == 1
+    assert store.get_stats() == expected_stats(store)
+    assert store.get_stats().tombstones == 0
+
+    reloaded = NoteStore(str(store.storage_path))
+    assert reloaded.get_stats() == store.get_stats()
+
+    store.replace_notes({"x": Note(nid="x", title="Одна", body="одна заметка")})
+    assert store.get_stats() == expected_stats(store)
+
+
+if __name__ == "__main__":
+    test_counters_follow_mutations()
+    test_counters_follow_sync_and_reload()
+    print("✅ Все тесты счётчиков хранилища пройдены")
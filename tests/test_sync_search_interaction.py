@@ -10,14 +10,22 @@ import shutil
 from pathlib import Path
 from PySide6.QtWidgets import QApplication
 from PySide6.QtTest import QTest
-from PySide6.QtCore import Qt
 
 # Импортируем модули приложения
-sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 from gui import NotesApp
 from notes import NoteStore
 
 
+def wait_for_search(window, timeout: float = 5.0):
+    """Ожидание завершения фонового поиска (debounce + рабочий поток)."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        QTest.qWait(20)
+        if not window.search_timer.isActive() and window._search_token is None:
+            return
+
+
 def test_sync_search_no_false_changes(qtbot):
     """
     Тест: Синхронизация с активным поиском не должна вызывать has_unsaved_changes.
@@ -43,7 +51,7 @@ def test_sync_search_no_false_changes(qtbot):
         app.show()
         qtbot.waitForWindowShown(app)
         
-        print(f"📊 Начальное количество заметок: {app.notes_list.count()}")
+        print(f"📊 Начальное количество заметок: {app.notes_model.rowCount()}")
         
         # 1. Создаём тестовые заметки с уникальным тегом
         print("\n📝 Создаём тестовые заметки...")
@@ -62,7 +70,7 @@ def test_sync_search_no_false_changes(qtbot):
             app.save_current_note()
             QTest.qWait(100)
         
-        initial_count = app.notes_list.count()
+        initial_count = app.notes_model.rowCount()
         print(f"✅ Создано {len(test_notes)} заметок. Всего в базе: {initial_count}")
         
         # 2. Настраиваем синхронизацию
@@ -83,22 +91,18 @@ def test_sync_search_no_false_changes(qtbot):
         print(f"\n🔍 Включаем поиск по '{unique_tag}'...")
         app.search_box.setText(unique_tag)
         app.filter_notes(unique_tag)
-        QTest.qWait(200)
+        wait_for_search(app)
         
-        visible_count = sum(1 for i in range(app.notes_list.count()) 
-                           if not app.notes_list.item(i).isHidden())
+        visible_count = app.notes_model.rowCount()
         print(f"   Найдено заметок: {visible_count}")
         assert visible_count == 2, f"Должно быть найдено 2 заметки с '{unique_tag}', найдено: {visible_count}"
         
         # 5. Открываем первую найденную заметку
         print("\n📄 Открываем первую найденную заметку...")
-        for i in range(app.notes_list.count()):
-            item = app.notes_list.item(i)
-            if not item.isHidden():
-                app.notes_list.setCurrentItem(item)
-                app.on_note_selected(item)
-                QTest.qWait(200)
-                break
+        index = app.notes_model.index(0, 0)
+        app.notes_list.select_note(app.notes_model.note_id(0))
+        app.on_note_selected(index)
+        QTest.qWait(200)
         
         print(f"   Открыта заметка: {app.title_edit.text()}")
         print(f"   has_unsaved_changes ДО синхронизации: {app.has_unsaved_changes}")
@@ -122,16 +126,14 @@ def test_sync_search_no_false_changes(qtbot):
         found_another = False
         current_note_id = app.current_note_id
         
-        for i in range(app.notes_list.count()):
-            item = app.notes_list.item(i)
-            if not item.isHidden():
-                note_id = item.data(Qt.UserRole)
-                if note_id != current_note_id:
-                    app.notes_list.setCurrentItem(item)
-                    app.on_note_selected(item)
-                    QTest.qWait(200)
-                    found_another = True
-                    break
+        for row in range(app.notes_model.rowCount()):
+            note_id = app.notes_model.note_id(row)
+            if note_id != current_note_id:
+                app.notes_list.select_note(note_id)
+                app.on_note_selected(app.notes_model.index(row, 0))
+                QTest.qWait(200)
+                found_another = True
+                break
         
         assert found_another, "Не удалось найти вторую заметку"
         print(f"   Переключились на: {app.title_edit.text()}")
@@ -126,7 +126,7 @@ def test_tags():
     QApplication.processEvents()
     time.sleep(0.2)
     
-    total_notes = window.notes_list.count()
+    total_notes = window.notes_model.rowCount()
     print(f"   Всего заметок: {total_notes}")
     
     # Поиск по тегу "работа"
@@ -134,7 +134,7 @@ def test_tags():
     QApplication.processEvents()
     time.sleep(0.2)
     
-    visible = sum(1 for i in range(window.notes_list.count()) if not window.notes_list.item(i).isHidden())
+    visible = window.notes_model.rowCount()
     print(f"   Поиск 'работа': найдено {visible} заметок")
     
     if visible == 0:
@@ -148,7 +148,7 @@ def test_tags():
     QApplication.processEvents()
     time.sleep(0.2)
     
-    visible_personal = sum(1 for i in range(window.notes_list.count()) if not window.notes_list.item(i).isHidden())
+    visible_personal = window.notes_model.rowCount()
     print(f"   Поиск 'личное': найдено {visible_personal} заметок")
     
     if visible_personal == 0:
@@ -0,0 +1,163 @@
+"""
+Тест менеджера фоновых задач.
+Проверяет доставку результатов, ошибок и прогресса, отмену
+и последовательное выполнение конфликтующих задач.
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from PySide6.QtCore import QCoreApplication
+
+from export import NoteExporter
+from notes import Note
+from tasks import TaskManager, TASK_SYNC, TASK_IMPORT, TASK_EXPORT, TASK_BACKUP, TASK_LOAD
+
+app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+
+
+def wait_idle(manager: TaskManager, timeout: float = 10.0):
+    """Обработка событий до завершения всех задач."""
+    deadline = time.monotonic() + timeout
+    while manager.tasks() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    app.processEvents()
+    assert not manager.tasks()
+
+
+def test_results_errors_and_progress():
+    """Тест: результат, ошибка и прогресс передаются обработчикам в потоке интерфейса."""
+    manager = TaskManager()
+    results, errors, progress = [], [], []
+    main_thread = threading.current_thread()
+
+    def work(token):
+        for step in range(5):
+            token.progress(step + 1, 5, f"шаг {step + 1}")
+        return 42
+
+    def fail(token):
+        raise ValueError("сломалось")
+
+    task = manager.submit(TASK_EXPORT, "Работа", work,
+                          on_finished=lambda result: results.append((result, threading.current_thread())))
+    manager.changed.connect(lambda: progress.append(task.progress))
+    manager.submit(TASK_BACKUP, "Ошибка", fail, on_failed=errors.append)
+    assert manager.is_active(TASK_EXPORT)
+    wait_idle(manager)
+
+    assert results == [(42, main_thread)]
+    assert errors == ["сломалось"]
+    # Последний шаг передаётся всегда, промежуточные - с ограничением частоты
+    assert (5, 5, "шаг 5") in progress
+    assert not manager.is_active(TASK_EXPORT)
+
+
+def test_conflicting_tasks_are_serialized():
+    """Тест: синхронизация и импорт не выполняются одновременно, экспорт - параллельно."""
+    manager = TaskManager()
+    running, overlaps, order = set(), [], []
+    lock = threading.Lock()
+
+    def make(name, kind):
+        def work(token):
+            with lock:
+                if kind in (TASK_SYNC, TASK_IMPORT) and running & {TASK_SYNC, TASK_IMPORT}:
+                    overlaps.append(name)
+                running.add(kind)
+                order.append(name)
+            time.sleep(0.05)
+            with lock:
+                running.discard(kind)
+            return name
+        return work
+
+    finished = []
+    for name, kind in (("sync1", TASK_SYNC), ("import", TASK_IMPORT), ("export", TASK_EXPORT), ("sync2", TASK_SYNC)):
+        manager.submit(kind, name, make(name, kind), on_finished=finished.append)
+    wait_idle(manager)
+
+    assert overlaps == []
+    assert sorted(finished) == ["export", "import", "sync1", "sync2"]
+    # Задачи одной группы выполняются в порядке добавления
+    vault_order = [name for name in order if name != "export"]
+    assert vault_order == ["sync1", "import", "sync2"]
+    # Экспорт не ждёт очереди синхронизаций
+    assert order.index("export") < order.index("sync2")
+
+
+def test_group_waits_for_handler():
+    """Тест: следующая задача группы запускается после обработчика результата предыдущей."""
+    manager = TaskManager()
+    loaded, seen = [], []
+
+    manager.submit(TASK_LOAD, "Загрузка", lambda token: ["заметка"], on_finished=loaded.extend)
+    manager.submit(TASK_SYNC, "Синхронизация", lambda token: seen.append(list(loaded)))
+    wait_idle(manager)
+    assert seen == [["заметка"]]
+
+
+def test_cancellation():
+    """Тест: отмена выполняемой и ожидающей задачи."""
+    manager = TaskManager()
+    started = threading.Event()
+    cancelled, finished = [], []
+
+    def long_work(token):
+        started.set()
+        while True:
+            token.check()
+            time.sleep(0.005)
+
+    first = manager.submit(TASK_SYNC, "Долгая", long_work, on_cancelled=lambda: cancelled.append("first"))
+    second = manager.submit(TASK_IMPORT, "В очереди", lambda token: "done",
+                            on_finished=finished.append, on_cancelled=lambda: cancelled.append("second"))
+    assert started.wait(5)
+    assert second.state == "pending"
+
+    manager.cancel(second)
+    assert cancelled == ["second"]
+    manager.cancel_all()
+    wait_idle(manager)
+    assert cancelled == ["second", "first"] and finished == []
+    assert first.state == "cancelled"
+
+
+def test_export_with_token():
+    """Тест: экспорт в ZIP сообщает прогресс и удаляет архив при отмене."""
+    manager = TaskManager()
+    notes = [Note(title=f"Заметка {i}", body="текст") for i in range(30)]
+    zip_path = Path(tempfile.mkdtemp(prefix="notes_test_tasks_")) / "export.zip"
+    results = []
+
+    manager.submit(TASK_EXPORT, "Экспорт",
+                   lambda token: NoteExporter.export_all_to_zip(notes, zip_path, "txt", token=token),
+                   on_finished=results.append)
+    wait_idle(manager)
+    assert results == [True] and zip_path.exists()
+
+    class CancelledToken:
+        cancelled = True
+
+        def progress(self, done, total, text=""):
+            pass
+
+    zip_path.unlink()
+    assert not NoteExporter.export_all_to_zip(notes, zip_path, "txt", token=CancelledToken())
+    assert not zip_path.exists()
+
+
+if __name__ == "__main__":
+    test_results_errors_and_progress()
+    test_conflicting_tasks_are_serialized()
+    test_group_waits_for_handler()
+    test_cancellation()
+    test_export_with_token()
+    print("✅ Все тесты фоновых задач пройдены")
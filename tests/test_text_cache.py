@@ -0,0 +1,114 @@
+"""
+Тест кэша нормализованных текстов (без GUI).
+Проверяет нормализацию (регистр, NFC, ё → е), отображение позиций и инвалидацию.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from notes import Note, NoteStore
+from search import SearchEngine, MATCH_BODY
+from search_index import SearchIndex
+from text_cache import NormalizedText, MatchOffsets, TextCache, fold
+
+
+def make_store():
+    """Создание хранилища во временной папке."""
+    temp_dir = tempfile.mkdtemp(prefix="notes_test_text_cache_")
+    return NoteStore(str(Path(temp_dir) / "notes.json"))
+
+
+def test_fold():
+    """Тест: регистр, ё → е, NFC и casefold."""
+    assert fold("Ёлка ПОД Новый год") == "елка под новый год"
+    assert fold("Straße") == "strasse"
+    # "е" + комбинируемая диерезис (NFD) -> "ё" -> "е"
+    assert fold("\u0435\u0308лка") == "елка"
+
+
+def test_offsets_mapping():
+    """Тест: позиции в нормализованном тексте переводятся в исходные."""
+    # Длина не меняется - отображение тождественное
+    text = NormalizedText("Купить Ёлку")
+    assert text.find_all("елку") == [(7, 11)]
+
+    # ß раскрывается в ss: позиции после неё сдвигаются
+    text = NormalizedText("Straße Берлин")
+    assert text.text == "strasse берлин"
+    assert text.find_all("берлин") == [(7, 13)]
+    assert text.find_all("s") == [(0, 1), (4, 5), (4, 5)]
+
+    # Разложенная ё (два символа) занимает один символ нормализованного текста
+    text = NormalizedText("\u0435\u0308лка и елка")
+    assert text.find_all("елка") == [(0, 5), (8, 12)]
+
+
+def test_match_offsets():
+    """Тест: компактные позиции совпадений и выбор диапазона для видимой области."""
+    matches = NormalizedText("a " * 100000).find_matches("a")
+    assert len(matches) == 100000
+    assert matches[10] == (20, 21)
+    assert matches.between(1000, 1010) == range(500, 505)
+    assert matches.index_at_or_after(1001) == 501
+    assert matches.index_at_or_after(10 ** 6) == len(matches)
+
+    assert list(MatchOffsets([(3, 5), (8, 9)]).between(0, 8)) == [0]
+
+
+def test_cache_versions_and_invalidation():
+    """Тест: запись действительна для версии заметки и удаляется по событиям хранилища."""
+    store = make_store()
+    cache = TextCache(store)
+    note = Note(title="Заметка", body="Старый текст")
+    store.add_note(note)
+
+    first = cache.get(note)
+    assert cache.get(note) is first
+    assert len(cache) == 1
+
+    store.update_note(note.id, body="Новый текст")
+    assert len(cache) == 0
+    assert "новый" in cache.get(store.get_note(note.id)).body
+
+    store.delete_note(note.id)
+    assert len(cache) == 0
+
+
+def test_cache_lru_bound():
+    """Тест: объём кэша ограничен, вытесняются давно не использованные заметки."""
+    cache = TextCache(max_chars=100)
+    notes = [Note(title="", body="x" * 40) for _ in range(3)]
+    for note in notes:
+        cache.get(note)
+    assert len(cache) == 2
+    assert cache.chars == 80
+
+    # Заметка больше лимита не кэшируется
+    cache.get(Note(title="", body="y" * 200))
+    assert len(cache) == 2
+
+
+def test_search_uses_normalized_text():
+    """Тест: поиск не различает ё и е и использует общий кэш движка."""
+    store = make_store()
+    note = Note(title="Праздник", body="Нарядить ёлку")
+    store.add_note(note)
+    engine = SearchEngine(SearchIndex(store))
+
+    assert engine.search(store.get_all_notes(), "ЕЛКУ") == {note.id: MATCH_BODY}
+    assert engine.search(store.get_all_notes(), '"нарядить елку"') == {note.id: MATCH_BODY}
+    assert len(engine.texts) == 1
+
+
+if __name__ == "__main__":
+    test_fold()
+    test_offsets_mapping()
+    test_match_offsets()
+    test_cache_versions_and_invalidation()
+    test_cache_lru_bound()
+    test_search_uses_normalized_text()
+    print("✅ Все тесты кэша нормализованных текстов пройдены")
@@ -0,0 +1,68 @@
+"""
+Тест счётчика символов и слов поля текста заметки.
+Проверяет, что счётчик, обновляемый по изменённому диапазону,
+совпадает с полным подсчётом после произвольных правок.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Добавляем путь к src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QApplication
+
+from editor import NoteBodyEdit
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def assert_counts(edit: NoteBodyEdit):
+    """Счётчик совпадает с подсчётом по всему тексту поля."""
+    text = edit.toPlainText()
+    assert (edit.counter.chars(), edit.counter.words()) == (len(text), len(text.split()))
+
+
+def test_counts_after_random_edits():
+    """Тест: вставка, удаление, замена, отмена и повтор правок."""
+    edit = NoteBodyEdit()
+    edit.set_text("раз два\nтри  четыре\n\nпять")
+    assert (edit.counter.chars(), edit.counter.words()) == (25, 5)
+
+    rng = random.Random(7)
+    alphabet = "аб в\n  x\t"
+    for step in range(1500):
+        cursor = edit.textCursor()
+        length = len(edit.toPlainText())
+        start = rng.randint(0, length)
+        cursor.setPosition(start)
+        cursor.setPosition(min(length, start + rng.choice([0, 0, 1, 3, 10])), QTextCursor.KeepAnchor)
+        cursor.insertText("".join(rng.choice(alphabet) for _ in range(rng.choice([0, 1, 1, 2, 6]))))
+        if step % 7 == 0:
+            edit.undo()
+        if step % 11 == 0:
+            edit.redo()
+        assert_counts(edit)
+
+
+def test_counts_after_loading():
+    """Тест: загрузка частями и замена всего текста."""
+    edit = NoteBodyEdit()
+    body = "\n".join("слово " * (i % 20) for i in range(30000))
+    edit.set_text(body)
+    assert edit.is_loading()
+    edit.finish_loading()
+    assert (edit.counter.chars(), edit.counter.words()) == (len(body), len(body.split()))
+
+    edit.setPlainText("новый текст")
+    assert_counts(edit)
+    edit.set_text("")
+    assert (edit.counter.chars(), edit.counter.words()) == (0, 0)
+
+
+if __name__ == "__main__":
+    test_counts_after_random_edits()
+    test_counts_after_loading()
+    print("✅ Все тесты счётчика текста пройдены")
@@ -12,6 +12,16 @@ from PySide6.QtCore import QTimer
 from gui import NotesApp
 
 
+def wait_for_search(window, timeout: float = 5.0):
+    """Ожидание завершения фонового поиска (debounce + рабочий поток)."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        QApplication.processEvents()
+        if not window.search_timer.isActive() and window._search_token is None:
+            return
+        time.sleep(0.02)
+
+
 def test_ui_improvements():
     """Тест UI улучшений."""
     print("\n" + "="*70)
@@ -97,18 +107,15 @@ def test_ui_improvements():
     # A) Поиск по заголовку (должен быть 📌)
     print("\n   A) Поиск 'Python' (в заголовке)")
     window.search_box.setText("Python")
-    QApplication.processEvents()
-    time.sleep(0.2)
+    wait_for_search(window)
     
     found_title_indicator = False
-    for i in range(window.notes_list.count()):
-        item = window.notes_list.item(i)
-        if not item.isHidden():
-            text = item.text()
-            print(f"      Найдено: '{text}'")
-            if "📌" in text:
-                found_title_indicator = True
-                print("      ✅ Индикатор заголовка (📌) присутствует")
+    for row in range(window.notes_model.rowCount()):
+        text = window.notes_model.index(row, 0).data()
+        print(f"      Найдено: '{text}'")
+        if "📌" in text:
+            found_title_indicator = True
+            print("      ✅ Индикатор заголовка (📌) присутствует")
     
     if not found_title_indicator:
         print("      ❌ ОШИБКА: Индикатор заголовка не найден")
@@ -117,18 +124,15 @@ def test_ui_improvements():
     # B) Поиск по тексту (должен быть 📄)
     print("\n   B) Поиск 'молоко' (в тексте)")
     window.search_box.setText("молоко")
-    QApplication.processEvents()
-    time.sleep(0.2)
+    wait_for_search(window)
     
     found_body_indicator = False
-    for i in range(window.notes_list.count()):
-        item = window.notes_list.item(i)
-        if not item.isHidden():
-            text = item.text()
-            print(f"      Найдено: '{text}'")
-            if "📄" in text:
-                found_body_indicator = True
-                print("      ✅ Индикатор текста (📄) присутствует")
+    for row in range(window.notes_model.rowCount()):
+        text = window.notes_model.index(row, 0).data()
+        print(f"      Найдено: '{text}'")
+        if "📄" in text:
+            found_body_indicator = True
+            print("      ✅ Индикатор текста (📄) присутствует")
     
     if not found_body_indicator:
         print("      ❌ ОШИБКА: Индикатор текста не найден")
@@ -137,18 +141,15 @@ def test_ui_improvements():
     # C) Поиск по тегу (должен быть 🏷️)
     print("\n   C) Поиск 'работа' (в тегах)")
     window.search_box.setText("работа")
-    QApplication.processEvents()
-    time.sleep(0.2)
+    wait_for_search(window)
     
     found_tag_indicator = False
-    for i in range(window.notes_list.count()):
-        item = window.notes_list.item(i)
-        if not item.isHidden():
-            text = item.text()
-            print(f"      Найдено: '{text}'")
-            if "🏷️" in text:
-                found_tag_indicator = True
-                print("      ✅ Индикатор тега (🏷️) присутствует")
+    for row in range(window.notes_model.rowCount()):
+        text = window.notes_model.index(row, 0).data()
+        print(f"      Найдено: '{text}'")
+        if "🏷️" in text:
+            found_tag_indicator = True
+            print("      ✅ Индикатор тега (🏷️) присутствует")
     
     if not found_tag_indicator:
         print("      ❌ ОШИБКА: Индикатор тега не найден")
@@ -161,9 +162,8 @@ def test_ui_improvements():
     time.sleep(0.2)
     
     indicators_removed = True
-    for i in range(window.notes_list.count()):
-        item = window.notes_list.item(i)
-        text = item.text()
+    for row in range(window.notes_model.rowCount()):
+        text = window.notes_model.index(row, 0).data()
         if "📌" in text or "📄" in text or "🏷️" in text:
             print(f"      ❌ Индикатор остался: '{text}'")
             indicators_removed = False